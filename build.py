@@ -1,4 +1,8 @@
+import argparse
+import hashlib
+import json
 import os
+import re
 import shutil
 import sys
 from pathlib import Path
@@ -7,6 +11,13 @@ from pathlib import Path
 SOURCE_DIR = "src"
 BUILD_DIR = "build"
 SKETCH_NAME = "build.ino"
+MANIFEST_NAME = ".build_manifest.json"
+
+# Editor/backup leftovers that must never reach the compiler
+BACKUP_SUFFIXES = (".bak", ".backup", ".orig", ".old", "~")
+SOURCE_SUFFIXES = (".c", ".cpp")
+INCLUDE_PATTERN = re.compile(r'^\s*#\s*include\s*"([^"]+)"', re.MULTILINE)
+COMMENT_PATTERN = re.compile(r"//[^\n]*|/\*.*?\*/", re.DOTALL)
 
 def clean_build_dir():
     """Removes the existing build directory."""
@@ -15,41 +26,212 @@ def clean_build_dir():
         shutil.rmtree(BUILD_DIR)
     os.makedirs(BUILD_DIR)
 
-def process_files():
-    """Copies files from src to build, renaming .c to .cpp and handling main.c."""
+def file_hash(path):
+    """SHA-256 of a file's content."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(65536), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def load_manifest():
+    """Returns the manifest of the previous staging run ({dest_name: {source, sha256}})."""
+    path = Path(BUILD_DIR) / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(manifest):
+    path = Path(BUILD_DIR) / MANIFEST_NAME
+    path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+
+def destination_name(src_path, root):
+    """Maps a source file to its flattened name in the build directory."""
+    if src_path.name == "main.c" and root.endswith("sys"):
+        # Special case: src/sys/main.c -> build/build.ino
+        return SKETCH_NAME
+    elif src_path.suffix == ".ino":
+        # Treat any .ino file as the main sketch
+        return SKETCH_NAME
+    elif src_path.suffix == ".c":
+        # General case: .c -> .cpp (masquerade)
+        return src_path.with_suffix(".cpp").name
+    else:
+        # Keep other files (headers, etc.) as is
+        return src_path.name
+
+def is_backup(path):
+    return path.name.endswith(BACKUP_SUFFIXES)
+
+def find_entry_sketches():
+    """Returns every .ino under src that is not a backup copy."""
+    return sorted(p for p in Path(SOURCE_DIR).rglob("*.ino") if not is_backup(p))
+
+def local_includes(path):
+    """Returns the quoted #include targets of a file, ignoring commented-out lines."""
+    text = path.read_text(encoding="utf-8", errors="ignore")
+    return INCLUDE_PATTERN.findall(COMMENT_PATTERN.sub("", text))
+
+def resolve_include(name, including_file, index):
+    """
+    Resolves a quoted include the way the flattened sketch will see it:
+    relative to the including file first, then by file name anywhere under src.
+    """
+    candidate = (including_file.parent / name).resolve()
+    if candidate.is_file():
+        return candidate
+    matches = index.get(Path(name).name, [])
+    return matches[0] if matches else None
+
+def collect_dependencies(entry):
+    """
+    Follows #include "..." from the entry sketch and collects the headers it
+    needs plus the translation unit implementing each header (same stem).
+
+    Returns:
+        list: Source paths, entry first
+    """
+    index = {}
+    for path in sorted(Path(SOURCE_DIR).rglob("*")):
+        if path.is_file() and not is_backup(path):
+            index.setdefault(path.name, []).append(path.resolve())
+
+    entry = Path(entry).resolve()
+    seen = {entry}
+    order = [entry]
+    pending = [entry]
+    while pending:
+        current = pending.pop()
+        for name in local_includes(current):
+            header = resolve_include(name, current, index)
+            if header is None:
+                # Library or core header (e.g. a quoted "FS.h"): left to arduino-cli
+                continue
+            related = [header]
+            for suffix in SOURCE_SUFFIXES:
+                related.extend(index.get(header.with_suffix(suffix).name, []))
+            for dep in related:
+                if dep not in seen:
+                    seen.add(dep)
+                    order.append(dep)
+                    pending.append(dep)
+
+    root = Path(SOURCE_DIR).resolve()
+    return [Path(SOURCE_DIR) / p.relative_to(root) for p in order]
+
+def collect_sources(entry=None):
+    """
+    Plans the flattened copy, either for everything under src (entry=None)
+    or only for what the entry sketch reaches through its includes.
+    Backup files are always skipped.
+
+    Returns:
+        tuple: ({dest_name: src_path}, {dest_name: [src_path, ...]} for collisions)
+    """
+    if entry is not None:
+        sources = collect_dependencies(entry)
+    else:
+        sources = []
+        for root, _, files in os.walk(SOURCE_DIR):
+            for file in sorted(files):
+                src_path = Path(root) / file
+                if not is_backup(src_path):
+                    sources.append(src_path)
+
+    plan = {}
+    collisions = {}
+    for src_path in sources:
+        dest_name = destination_name(src_path, str(src_path.parent))
+        if dest_name in plan:
+            collisions.setdefault(dest_name, [plan[dest_name]]).append(src_path)
+            continue
+        plan[dest_name] = src_path
+    return plan, collisions
+
+def report_collisions(collisions):
+    """Prints every flattening collision; the build is not deterministic while any exist."""
+    print(f"\nERROR: {len(collisions)} name collision(s) while flattening {SOURCE_DIR}:")
+    for dest_name, sources in sorted(collisions.items()):
+        print(f"  {dest_name}:")
+        for src_path in sources:
+            print(f"    - {src_path}")
+
+def process_files(plan):
+    """
+    Stages planned files into the build directory, rewriting only files whose
+    content changed so arduino-cli's incremental compile sees stable mtimes.
+    """
     print(f"Processing source files from {SOURCE_DIR} to {BUILD_DIR}...")
-    
-    for root, _, files in os.walk(SOURCE_DIR):
-        for file in files:
-            src_path = Path(root) / file
-            
-            # Determine destination filename and extension
-            if src_path.name == "main.c" and root.endswith("sys"):
-                # Special case: src/sys/main.c -> build/build.ino
-                dest_name = SKETCH_NAME
-            elif src_path.suffix == ".ino":
-                # Treat any .ino file as the main sketch
-                dest_name = SKETCH_NAME
-            elif src_path.suffix == ".c":
-                # General case: .c -> .cpp (masquerade)
-                dest_name = src_path.with_suffix(".cpp").name
-            else:
-                # Keep other files (headers, etc.) as is
-                dest_name = src_path.name
-            
-            dest_path = Path(BUILD_DIR) / dest_name
-            
-            # Check for name collisions (since we are flattening)
-            if dest_path.exists():
-                print(f"WARNING: Name collision for {dest_name} (from {src_path})")
-            
-            shutil.copy2(src_path, dest_path)
-            print(f"  {src_path} -> {dest_path}")
+    os.makedirs(BUILD_DIR, exist_ok=True)
+
+    previous = load_manifest()
+    manifest = {}
+    counts = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0}
+
+    for dest_name, src_path in sorted(plan.items()):
+        dest_path = Path(BUILD_DIR) / dest_name
+        digest = file_hash(src_path)
+        manifest[dest_name] = {"source": str(src_path), "sha256": digest}
+
+        if dest_path.exists() and (previous.get(dest_name, {}).get("sha256") or file_hash(dest_path)) == digest:
+            counts["unchanged"] += 1
+            continue
+
+        status = "updated" if dest_path.exists() else "added"
+        # copyfile (not copy2): a changed file must get a fresh mtime to trigger recompilation
+        shutil.copyfile(src_path, dest_path)
+        counts[status] += 1
+        print(f"  {'~' if status == 'updated' else '+'} {src_path} -> {dest_path}")
+
+    # Remove files staged by a previous run whose source no longer exists
+    for dest_name in sorted(set(previous) - set(manifest)):
+        dest_path = Path(BUILD_DIR) / dest_name
+        if dest_path.exists():
+            dest_path.unlink()
+            counts["removed"] += 1
+            print(f"  - {dest_path}")
+
+    save_manifest(manifest)
+    print(f"  {counts['added']} added, {counts['updated']} updated, "
+          f"{counts['unchanged']} unchanged, {counts['removed']} removed")
 
 def main():
+    parser = argparse.ArgumentParser(description="Stage src/ into a flat Arduino sketch directory")
+    parser.add_argument("--clean", action="store_true", help="Delete the build directory and stage everything from scratch")
+    parser.add_argument("--entry", help="Entry sketch; only files it reaches through #include are staged (default: the single .ino under src)")
+    parser.add_argument("--all", action="store_true", help="Stage every file under src instead of following includes")
+    args = parser.parse_args()
+
     try:
-        clean_build_dir()
-        process_files()
+        entry = None
+        if args.entry:
+            entry = Path(args.entry)
+            if not entry.is_file():
+                print(f"Error: entry sketch not found: {entry}")
+                sys.exit(1)
+        elif not args.all:
+            sketches = find_entry_sketches()
+            if len(sketches) == 1:
+                entry = sketches[0]
+            elif len(sketches) > 1:
+                print("Error: multiple sketches under src, choose one with --entry:")
+                for sketch in sketches:
+                    print(f"  {sketch}")
+                sys.exit(1)
+        if entry is not None:
+            print(f"Entry sketch: {entry}")
+
+        plan, collisions = collect_sources(entry)
+        if collisions:
+            report_collisions(collisions)
+            sys.exit(1)
+
+        if args.clean:
+            clean_build_dir()
+        process_files(plan)
         print("\nBuild preparation complete.")
         print(f"You can now compile the '{BUILD_DIR}' directory with Arduino.")
         print(f"Example: arduino-cli compile --fqbn esp32:esp32:esp32 {BUILD_DIR}")
@@ -3,6 +3,8 @@
 let isConnected = false;
 let currentTrack = "";
 let currentStatus = {};
+let currentOverview = null;
+let overviewFile = "";
 
 // Elements
 // Elements
@@ -284,6 +286,14 @@ function handleSerialData(data) {
         // Highlight active track
         if (data.file) highlightTrack(data.file);
 
+        // Waveform: the device sends the sidecar's peaks, never the audio itself
+        if (data.file && data.file !== overviewFile) {
+            overviewFile = data.file;
+            currentOverview = null;
+            document.getElementById('progress-container').classList.remove('has-waveform');
+            sendCmd(`overview_json ${data.file}`);
+        }
+
         // Update Loop Icon
         const loopBtn = document.getElementById('btn-loop');
         if (loopBtn && data.loop) {
@@ -319,12 +329,59 @@ function handleSerialData(data) {
         renderFileList(data.files);
     }
 
-    // 6. TASKS / DIAGNOSTICS
+    // 6. OVERVIEW (waveform)
+    if (data.overview) {
+        handleOverview(data.overview);
+    }
+
+    // 7. TASKS / DIAGNOSTICS
     if (data.tasks || data.heap_free) {
         handleDiagnostics(data);
     }
 }
 
+// ========== WAVEFORM ==========
+
+function handleOverview(overview) {
+    if (overview.file !== overviewFile || !overview.peaks.length) return;
+    currentOverview = overview;
+    document.getElementById('progress-container').classList.add('has-waveform');
+    drawWaveform();
+}
+
+function drawWaveform() {
+    const canvas = document.getElementById('waveform');
+    if (!currentOverview || !canvas.clientWidth) return;
+    const dpr = window.devicePixelRatio || 1;
+    canvas.width = canvas.clientWidth * dpr;
+    canvas.height = canvas.clientHeight * dpr;
+
+    const ctx = canvas.getContext('2d');
+    const peaks = currentOverview.peaks; // [min, max, min, max, ...]
+    const buckets = peaks.length / 2;
+    const mid = canvas.height / 2;
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+    ctx.fillStyle = getComputedStyle(document.documentElement).getPropertyValue('--accent-color') || '#888';
+    for (let x = 0; x < canvas.width; x++) {
+        const from = Math.floor(x * buckets / canvas.width);
+        const to = Math.max(from + 1, Math.floor((x + 1) * buckets / canvas.width));
+        let lo = 0, hi = 0;
+        for (let i = from; i < to && i < buckets; i++) {
+            lo = Math.min(lo, peaks[2 * i]);
+            hi = Math.max(hi, peaks[2 * i + 1]);
+        }
+        ctx.fillRect(x, mid - hi / 127 * mid, 1, Math.max(1, (hi - lo) / 127 * mid));
+    }
+}
+
+function seekWaveform(event) {
+    if (!currentOverview) return;
+    const fraction = event.offsetX / event.currentTarget.clientWidth;
+    sendCmd(`seek ${Math.floor(fraction * currentOverview.duration_ms / 1000)}`);
+}
+
+window.addEventListener('resize', drawWaveform);
+
 // Add global listener for animation end to cleanup marquee
 document.addEventListener('DOMContentLoaded', () => {
     const titleEl = document.getElementById('now-playing-title');
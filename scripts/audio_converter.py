@@ -14,6 +14,7 @@ from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.table import Table
 from rich import print as rprint
 import re
+import struct
 
 console = Console()
 
@@ -23,8 +24,25 @@ QUALITY_PRESETS = {
         'codec': 'pcm_s16le',
         'sample_rate': '44100',
         'channels': '2',
+        'sample_fmt': 's16',
         'bit_depth': '16'
     },
+    # Hi-res WAVs matching the player's I2S bit depth (`bitdepth 24|32`): the firmware
+    # reads them without the 16-bit decoder and without widening samples
+    'wav24': {
+        'codec': 'pcm_s24le',      # Packed 3-byte samples
+        'sample_rate': '44100',
+        'channels': '2',
+        'sample_fmt': 's32',
+        'bit_depth': '24'
+    },
+    'wav32': {
+        'codec': 'pcm_s32le',      # 32-bit container, byte-identical to the I2S frame
+        'sample_rate': '44100',
+        'channels': '2',
+        'sample_fmt': 's32',
+        'bit_depth': '32'
+    },
     'flac': {
         'codec': 'flac',
         'sample_rate': '44100',
@@ -37,6 +55,10 @@ QUALITY_PRESETS = {
 
 SUPPORTED_INPUT = ['.mp3', '.m4a', '.aac', '.flac', '.wav', '.ogg', '.wma', '.ape', '.alac']
 SUPPORTED_OUTPUT = ['wav', 'flac']
+WAV_PRESETS = {16: 'wav', 24: 'wav24', 32: 'wav32'}
+
+# SD sector size: the player reads the card in 512-byte blocks
+SECTOR_SIZE = 512
 
 def check_ffmpeg():
     """Check if FFmpeg is installed"""
@@ -87,10 +109,72 @@ def get_audio_info(file_path):
     except:
         return None
 
-def convert_to_wav(input_path, output_path=None, verbose=False):
+def align_wav(path, boundary=SECTOR_SIZE):
+    """
+    Rewrite a WAV file in place so its PCM data starts on a `boundary`-byte offset.
+    Only the fmt and data chunks are kept (LIST/INFO and other metadata are dropped);
+    a JUNK chunk pads the header up to the boundary.
+
+    Returns:
+        int: new data offset ; None if the file is not a RIFF/WAVE with fmt and data chunks
     """
-    Convert audio to WAV format (16-bit PCM, 44.1kHz, Stereo)
+    path = Path(path)
+    with open(path, 'rb') as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+            return None
+        fmt = None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, size = chunk[:4], struct.unpack('<I', chunk[4:])[0]
+            if chunk_id == b'fmt ':
+                fmt_size = size
+                fmt = f.read(size + (size & 1))
+            elif chunk_id == b'data':
+                data_offset = f.tell()
+                break
+            else:
+                f.seek(size + (size & 1), 1)
+        if fmt is None:
+            return None
+        # Streamed ffmpeg output can leave the data size unset (0 / 0xFFFFFFFF)
+        file_size = path.stat().st_size
+        if size == 0 or data_offset + size > file_size:
+            size = file_size - data_offset
+
+        header = b'WAVE' + b'fmt ' + struct.pack('<I', fmt_size) + fmt
+        junk = -(8 + len(header) + 8) % boundary
+        if 0 < junk < 8:
+            junk += boundary
+        if junk:
+            header += b'JUNK' + struct.pack('<I', junk - 8) + b'\0' * (junk - 8)
+        header += b'data' + struct.pack('<I', size)
+        new_offset = 8 + len(header)
+        riff_size = len(header) + size + (size & 1)
+
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'wb') as out:
+            out.write(b'RIFF' + struct.pack('<I', riff_size) + header)
+            f.seek(data_offset)
+            remaining = size
+            while remaining > 0:
+                block = f.read(min(remaining, 1 << 20))
+                if not block:
+                    break
+                out.write(block)
+                remaining -= len(block)
+            if size & 1:
+                out.write(b'\0')
+    tmp.replace(path)
+    return new_offset
+
+def convert_to_wav(input_path, output_path=None, verbose=False, align=None, bit_depth=16):
+    """
+    Convert audio to WAV format (16/24/32-bit PCM, 44.1kHz, Stereo)
     Maximum quality for ESP32 playback
+    With align (bytes), PCM data starts on that boundary and metadata chunks are stripped
     """
     if not os.path.exists(input_path):
         console.print(f"[red]❌ File not found: {input_path}[/red]")
@@ -99,7 +183,7 @@ def convert_to_wav(input_path, output_path=None, verbose=False):
     if output_path is None:
         output_path = Path(input_path).with_suffix('.wav')
 
-    preset = QUALITY_PRESETS['wav']
+    preset = QUALITY_PRESETS[WAV_PRESETS[bit_depth]]
     
     cmd = [
         'ffmpeg',
@@ -107,7 +191,11 @@ def convert_to_wav(input_path, output_path=None, verbose=False):
         '-acodec', preset['codec'],
         '-ar', preset['sample_rate'],
         '-ac', preset['channels'],
-        '-sample_fmt', 's16',  # 16-bit signed
+        '-sample_fmt', preset['sample_fmt'],
+    ]
+    if align:
+        cmd += ['-map_metadata', '-1', '-fflags', '+bitexact']  # No LIST/INFO chunk
+    cmd += [
         '-y',
         '-loglevel', 'error' if not verbose else 'info',
         str(output_path)
@@ -115,9 +203,12 @@ def convert_to_wav(input_path, output_path=None, verbose=False):
 
     try:
         subprocess.run(cmd, check=True, capture_output=not verbose)
-        return True
     except subprocess.CalledProcessError:
         return False
+    if align and align_wav(output_path, align) is None:
+        console.print(f"[red]❌ Could not align {Path(output_path).name}[/red]")
+        return False
+    return True
 
 def convert_to_flac(input_path, output_path=None, verbose=False):
     """
@@ -152,7 +243,7 @@ def convert_to_flac(input_path, output_path=None, verbose=False):
     except subprocess.CalledProcessError:
         return False
 
-def convert_audio(input_path, output_format='wav', output_path=None, verbose=False):
+def convert_audio(input_path, output_format='wav', output_path=None, verbose=False, align=None, bit_depth=16):
     """Main conversion function"""
     input_path = Path(input_path)
     
@@ -175,8 +266,10 @@ def convert_audio(input_path, output_format='wav', output_path=None, verbose=Fal
     
     # Convert based on format
     if output_format == 'wav':
-        success = convert_to_wav(input_path, output_path, verbose)
-        target_format = "WAV (16-bit PCM, 44.1kHz, Stereo)"
+        success = convert_to_wav(input_path, output_path, verbose, align, bit_depth)
+        target_format = f"WAV ({bit_depth}-bit PCM, 44.1kHz, Stereo)"
+        if align:
+            target_format += f", data aligned to {align} bytes"
     elif output_format == 'flac':
         success = convert_to_flac(input_path, output_path, verbose)
         target_format = "FLAC (Lossless, 44.1kHz, Stereo)"
@@ -224,7 +317,31 @@ def sanitize_filename(path):
     
     return None
 
-def process_input(input_path, output_format, output_path, verbose):
+DUPLICATE = 'duplicate'  # Result status of a file skipped by --dedup
+
+def find_duplicate(path, dedup):
+    """
+    Look a file up in the fingerprint index; record_converted() adds it once converted.
+
+    Returns:
+        dict: best match (path, score, offset_s) ; None if new or dedup is off
+    """
+    if dedup is None:
+        return None
+    matches = dedup.check(path, add=False)
+    if not matches:
+        return None
+    match = matches[0]
+    console.print(f"[yellow]⏭️  Duplicate:[/yellow] {Path(path).name} ≈ {Path(match['path']).name} "
+                  f"[dim]({match['score']:.0%} match)[/dim]")
+    return match
+
+def record_converted(path, success, dedup):
+    """Index a source whose conversion succeeded (a failed run must not make it a duplicate)"""
+    if dedup is not None and success:
+        dedup.record(path)
+
+def process_input(input_path, output_format, output_path, verbose, align=None, dedup=None, bit_depth=16):
     """Process a single input file or directory"""
     input_path = Path(input_path)
     
@@ -256,13 +373,21 @@ def process_input(input_path, output_format, output_path, verbose):
                     console.print(f"[red]❌ Rename failed:[/red] {e}")
                     continue
             
-            # 2. Convert
+            # 2. Skip recordings already in the library
+            if find_duplicate(final_path, dedup):
+                results.append((final_path, DUPLICATE))
+                continue
+            
+            # 3. Convert
             success = convert_audio(
                 final_path,
                 output_format=output_format,
                 output_path=None, # Auto-generate output path
-                verbose=verbose
+                verbose=verbose,
+                align=align,
+                bit_depth=bit_depth
             )
+            record_converted(final_path, success, dedup)
             results.append((final_path, success))
             
         return results
@@ -280,12 +405,18 @@ def process_input(input_path, output_format, output_path, verbose):
                 console.print(f"[red]❌ Rename failed:[/red] {e}")
                 return [(input_path, False)]
         
+        if find_duplicate(final_path, dedup):
+            return [(final_path, DUPLICATE)]
+        
         success = convert_audio(
             final_path, 
             output_format=output_format, 
             output_path=output_path, 
-            verbose=verbose
+            verbose=verbose,
+            align=align,
+            bit_depth=bit_depth
         )
+        record_converted(final_path, success, dedup)
         return [(final_path, success)]
 
 def main():
@@ -305,6 +436,22 @@ Examples:
   
   # Batch convert multiple files
   python3 audio_converter.py *.mp3 --format wav
+
+  # Convert straight onto a mounted SD card and write its playlist index
+  python3 audio_converter.py /Volumes/SDCARD --index
+
+  # Waveform overview + seek table sidecars for the desktop app / seek command
+  python3 audio_converter.py album/ --overview
+
+  # Skip tracks that are the same recording as one converted before
+  python3 audio_converter.py ~/Downloads/music --dedup
+
+  # Sector-aligned WAV data (or --align 32768 for the card's cluster size)
+  python3 audio_converter.py song.mp3 --align
+
+  # 24-bit WAV for a player set to `bitdepth 24` (or ask the player with --device)
+  python3 audio_converter.py album/ --bit-depth 24
+  python3 audio_converter.py album/ --device /dev/cu.usbmodem101
         '''
     )
     
@@ -313,9 +460,37 @@ Examples:
                        help='Output format (default: wav)')
     parser.add_argument('-o', '--output', help='Output file path (single file only)')
     parser.add_argument('-v', '--verbose', action='store_true', help='Verbose FFmpeg output')
+    parser.add_argument('--index', action='store_true',
+                       help='Write playlist.idx into each input directory (SD card root) after converting')
+    
+    parser.add_argument('--overview', action='store_true',
+                       help='Write a <track>.ovw waveform/seek sidecar next to each output (needs numpy)')
+    parser.add_argument('--dedup', action='store_true',
+                       help='Skip recordings already converted (acoustic fingerprint, needs numpy)')
+    parser.add_argument('--dedup-db', metavar='PATH',
+                       help='Fingerprint index for --dedup (default ~/.cache/dap/fingerprints.sqlite)')
+    parser.add_argument('--align', type=int, nargs='?', const=SECTOR_SIZE, metavar='BYTES',
+                       help=f'WAV: start PCM data on a BYTES boundary (default {SECTOR_SIZE}) and strip metadata chunks')
+    parser.add_argument('--bit-depth', type=int, choices=sorted(WAV_PRESETS), default=16,
+                       help='WAV sample width; match the player\'s I2S bit depth (default: 16)')
+    parser.add_argument('--device', metavar='PORT',
+                       help='WAV: use the bit depth the player on PORT is set to (`bitdepth`)')
     
     args = parser.parse_args()
 
+    if args.align is not None and (args.align <= 0 or args.align % SECTOR_SIZE):
+        console.print(f"[red]❌ --align must be a multiple of {SECTOR_SIZE}[/red]")
+        sys.exit(1)
+
+    if args.device:
+        from serial_upload import query_bit_depth
+        depth = query_bit_depth(args.device)
+        if depth not in WAV_PRESETS:
+            console.print(f"[red]❌ No bit depth from the player on {args.device}[/red]")
+            sys.exit(1)
+        console.print(f"[cyan]Player I2S bit depth:[/cyan] {depth}-bit")
+        args.bit_depth = depth
+
     # Check FFmpeg
     console.print("\n[bold cyan]ESP32-S3 HiFi-DAP Audio Converter[/bold cyan]")
     console.print("[dim]Maximum quality audio conversion + Filename Sanitizer[/dim]\n")
@@ -330,25 +505,56 @@ Examples:
         console.print("[red]❌ Cannot specify --output with multiple files or directory input[/red]")
         sys.exit(1)
 
+    # Fingerprint index shared by every input, so duplicates across folders are caught too
+    dedup = None
+    if args.dedup:
+        from audio_fingerprint import DEFAULT_DB, FingerprintIndex
+        dedup = FingerprintIndex(args.dedup_db or DEFAULT_DB)
+
     # Convert files
     all_results = []
     
     for input_item in args.inputs:
-        results = process_input(input_item, args.format, args.output, args.verbose)
+        results = process_input(input_item, args.format, args.output, args.verbose, args.align, dedup, args.bit_depth)
         all_results.extend(results)
+    
+    if dedup is not None:
+        dedup.close()
 
     # Summary
     if all_results:
         console.print(f"\n[bold]Summary[/bold]")
-        success_count = sum(1 for _, success in all_results if success)
+        success_count = sum(1 for _, success in all_results if success is True)
         console.print(f"Converted: [green]{success_count}[/green]/{len(all_results)} files")
+        duplicate_count = sum(1 for _, success in all_results if success == DUPLICATE)
+        if duplicate_count:
+            console.print(f"Skipped duplicates: [yellow]{duplicate_count}[/yellow]")
         
-        failed = [(f, s) for f, s in all_results if not s]
+        failed = [(f, s) for f, s in all_results if s is False]
         if failed:
             console.print("\n[yellow]Failed files:[/yellow]")
             for file, success in failed:
                  console.print(f"  • {file.name}")
 
+    # Waveform + seek sidecars (cached by content hash, so re-runs are cheap)
+    if args.overview:
+        from track_overview import write_overview
+        outputs = [Path(args.output) if args.output else Path(f).with_suffix(f'.{args.format}')
+                   for f, success in all_results if success is True]
+        written = 0
+        for out in outputs:
+            if out.suffix.lower() in ('.wav', '.mp3') and write_overview(out)[0]:
+                written += 1
+        console.print(f"[green]✓ Overviews:[/green] {written} sidecars")
+
+    # Playlist index for the player's fast boot
+    if args.index:
+        from playlist_index import write_index
+        for input_item in args.inputs:
+            if Path(input_item).is_dir():
+                records = write_index(input_item)
+                console.print(f"[green]✓ Playlist index:[/green] {len(records)} tracks → {Path(input_item) / 'playlist.idx'}")
+
 if __name__ == '__main__':
     main()
 
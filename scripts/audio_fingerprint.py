@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Audio Fingerprint Dedup
+Finds the same recording under different names and formats before it is converted
+or uploaded. Each track is decoded to mono 5512 Hz and reduced to one 32-bit
+band-energy hash per 46 ms (Haitsma/Kalker style, computed with NumPy); a
+content-selected subset of those hashes goes into an SQLite inverted index, so a
+lookup is one indexed query plus offset voting, independent of library size.
+
+The index lives in ~/.cache/dap/fingerprints.sqlite (or --db / DAP_CACHE_DIR);
+serial_upload.py keeps what reached the device in its own index next to it
+(uploads.sqlite), since an uploaded WAV is by design the same recording as the
+source the converter indexed.
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+import click
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+from playlist_index import wav_info
+from track_overview import content_hash, wav_samples
+
+console = Console()
+
+SAMPLE_RATE = 5512
+FRAME = 2048                  # 0.37 s analysis window
+HOP = 256                     # 46 ms between hashes
+BANDS = np.geomspace(300, 2000, 34)
+INDEX_MASK = 0x7              # Index hashes whose low bits are zero: ~1/8, the same ones in every copy
+WEAK_BITS = 2                 # Query also flips the 2 least reliable bits of each hash
+MIN_VOTES = 5
+MATCH_THRESHOLD = 0.1         # Votes on one time offset per indexed hash
+QUERY_BATCH = 900             # SQLite parameter limit headroom
+
+AUDIO_SUFFIXES = ('.mp3', '.m4a', '.aac', '.flac', '.wav', '.ogg', '.wma', '.ape', '.alac')
+DEFAULT_DB = Path(os.environ.get('DAP_CACHE_DIR', Path.home() / '.cache' / 'dap')) / 'fingerprints.sqlite'
+UPLOADS_DB = DEFAULT_DB.with_name('uploads.sqlite')
+
+
+def resample(samples, rate, target):
+    """Band-limited resampling through the FFT (no aliasing into the fingerprint bands)"""
+    n = int(len(samples) * target / rate)
+    if n < 2:
+        return np.zeros(0, dtype=np.float32)
+    spectrum = np.fft.rfft(samples)[:n // 2 + 1]
+    return (np.fft.irfft(spectrum, n) * (n / len(samples))).astype(np.float32)
+
+
+def decode_mono(path):
+    """
+    Mono float PCM at SAMPLE_RATE: ffmpeg for any format, NumPy for WAV when ffmpeg is missing.
+
+    Returns:
+        ndarray ; None if the file cannot be decoded
+    """
+    path = Path(path)
+    try:
+        result = subprocess.run(['ffmpeg', '-v', 'error', '-i', str(path), '-ac', '1', '-ar', str(SAMPLE_RATE),
+                                 '-f', 's16le', '-acodec', 'pcm_s16le', '-'], capture_output=True, check=True)
+        return np.frombuffer(result.stdout, dtype='<i2').astype(np.float32) / 32768.0
+    except subprocess.CalledProcessError:
+        return None
+    except OSError:
+        pass
+    if path.suffix.lower() != '.wav':
+        return None
+    info = wav_info(path)
+    if not info or info['bits'] not in (8, 16, 24, 32):
+        return None
+    return resample(wav_samples(path, info).mean(axis=1), info['sample_rate'], SAMPLE_RATE)
+
+
+def fingerprint(samples):
+    """
+    One 32-bit hash per HOP: signs of the time derivative of adjacent band-energy differences.
+
+    Returns:
+        tuple: (uint32 sub-fingerprints, indices of the WEAK_BITS least reliable bits of each)
+    """
+    if len(samples) < FRAME + HOP:
+        return np.zeros(0, dtype=np.uint32), np.zeros((0, WEAK_BITS), dtype=np.int64)
+    windows = np.lib.stride_tricks.sliding_window_view(samples, FRAME)[::HOP]
+    power = np.abs(np.fft.rfft(windows * np.hanning(FRAME).astype(np.float32), axis=1)) ** 2
+    bins = np.round(BANDS * FRAME / SAMPLE_RATE).astype(np.int64)
+    cumulative = np.cumsum(power, axis=1)
+    energy = cumulative[:, bins[1:] - 1] - cumulative[:, bins[:-1] - 1]
+    diff = energy[:, :-1] - energy[:, 1:]
+    margin = diff[1:] - diff[:-1]
+    bits = margin > 0
+    fp = np.ascontiguousarray(np.packbits(bits, axis=1, bitorder='little')).view('<u4').ravel()
+    # A bit is unreliable when its margin is small relative to the band energies involved
+    scale = energy[1:, :-1] + energy[1:, 1:] + 1e-12
+    weak = np.argsort(np.abs(margin) / scale, axis=1)[:, :WEAK_BITS]
+    return fp, weak
+
+
+def indexed_hashes(fp):
+    """(hash, frame) pairs that go into / are looked up in the inverted index"""
+    frames = np.flatnonzero(((fp & INDEX_MASK) == 0) & (fp != 0) & (fp != 0xFFFFFFFF))
+    return fp[frames], frames
+
+
+def query_hashes(fp, weak):
+    """indexed_hashes() of the fingerprint and of every variant with its weak bits flipped"""
+    flips = np.zeros((len(fp), 1), dtype=np.uint32)
+    for i in range(WEAK_BITS):
+        bit = (np.uint32(1) << weak[:, i:i + 1].astype(np.uint32))
+        flips = np.concatenate([flips, flips ^ bit], axis=1)
+    variants = (fp[:, None] ^ flips).ravel()
+    frames = np.repeat(np.arange(len(fp)), flips.shape[1])
+    keep = ((variants & INDEX_MASK) == 0) & (variants != 0) & (variants != 0xFFFFFFFF)
+    return variants[keep], frames[keep]
+
+
+class FingerprintIndex:
+    """SQLite inverted index: hash -> (track, frame)"""
+
+    def __init__(self, db_path=DEFAULT_DB):
+        db_path = Path(db_path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS tracks (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                content_hash TEXT NOT NULL,
+                duration REAL NOT NULL,
+                hash_count INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS tracks_content ON tracks (content_hash);
+            CREATE TABLE IF NOT EXISTS hashes (
+                hash INTEGER NOT NULL,
+                track_id INTEGER NOT NULL,
+                frame INTEGER NOT NULL,
+                PRIMARY KEY (hash, track_id, frame)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS hashes_track ON hashes (track_id);
+        """)
+        self.pending = {}  # path -> (fingerprint, digest) from check(add=False), for record()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def track_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+
+    def hash_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+
+    def remove(self, path):
+        row = self.conn.execute("SELECT id FROM tracks WHERE path = ?", (str(path),)).fetchone()
+        if row:
+            self.conn.execute("DELETE FROM hashes WHERE track_id = ?", row)
+            self.conn.execute("DELETE FROM tracks WHERE id = ?", row)
+            self.conn.commit()
+
+    def add(self, path, fp, digest):
+        """Store a fingerprint under path (replacing what was there)"""
+        self.remove(path)
+        hashes, frames = indexed_hashes(fp)
+        cur = self.conn.execute("INSERT INTO tracks (path, content_hash, duration, hash_count) VALUES (?, ?, ?, ?)",
+                                (str(path), digest, len(fp) * HOP / SAMPLE_RATE, len(hashes)))
+        track_id = cur.lastrowid
+        self.conn.executemany("INSERT OR IGNORE INTO hashes VALUES (?, ?, ?)",
+                              zip(hashes.tolist(), [track_id] * len(hashes), frames.tolist()))
+        self.conn.commit()
+
+    def lookup(self, fp, weak, exclude=None):
+        """
+        Near-duplicates of a fingerprint.
+
+        Returns:
+            list: dicts (path, score, offset_s), best first
+        """
+        return self.lookup_hashes(*query_hashes(fp, weak), len(indexed_hashes(fp)[0]), exclude=exclude)
+
+    def lookup_hashes(self, hashes, frames, indexed_count, exclude=None):
+        if indexed_count == 0:
+            return []
+        query_frames = defaultdict(list)
+        for h, f in zip(hashes.tolist(), frames.tolist()):
+            query_frames[h].append(f)
+
+        # Vote for (track, time offset); a real duplicate piles its votes onto one offset
+        votes = defaultdict(int)
+        keys = list(query_frames)
+        for start in range(0, len(keys), QUERY_BATCH):
+            batch = keys[start:start + QUERY_BATCH]
+            rows = self.conn.execute(
+                f"SELECT hash, track_id, frame FROM hashes WHERE hash IN ({','.join('?' * len(batch))})", batch)
+            for h, track_id, frame in rows:
+                for f in query_frames[h]:
+                    votes[(track_id, frame - f)] += 1
+
+        best = {}
+        for (track_id, delta), count in votes.items():
+            # Neighbouring offsets: the copies' analysis frames rarely line up exactly
+            total = count + votes.get((track_id, delta - 1), 0) + votes.get((track_id, delta + 1), 0)
+            if total > best.get(track_id, (0, 0))[0]:
+                best[track_id] = (total, delta)
+
+        matches = []
+        for track_id, (total, delta) in best.items():
+            if total < MIN_VOTES:
+                continue
+            path, hash_count = self.conn.execute("SELECT path, hash_count FROM tracks WHERE id = ?",
+                                                 (track_id,)).fetchone()
+            if path == exclude:
+                continue
+            score = total / max(1, min(indexed_count, hash_count))
+            if score >= MATCH_THRESHOLD:
+                matches.append({'path': path, 'score': min(score, 1.0), 'offset_s': delta * HOP / SAMPLE_RATE})
+        return sorted(matches, key=lambda m: -m['score'])
+
+    def check(self, path, add=True):
+        """
+        Look a file up (exact content first, then acoustically) and optionally index it.
+
+        Returns:
+            list: matches as from lookup() ; None if the file cannot be decoded
+        """
+        path = Path(path).resolve()
+        digest = content_hash(path).hex()
+        row = self.conn.execute("SELECT path FROM tracks WHERE content_hash = ? AND path != ?",
+                                (digest, str(path))).fetchone()
+        if row:
+            return [{'path': row[0], 'score': 1.0, 'offset_s': 0.0}]
+
+        # Already indexed and unchanged: no need to decode again
+        row = self.conn.execute("SELECT id FROM tracks WHERE path = ? AND content_hash = ?",
+                                (str(path), digest)).fetchone()
+        if row:
+            stored = np.array(self.conn.execute("SELECT hash, frame FROM hashes WHERE track_id = ?", row).fetchall(),
+                              dtype=np.int64).reshape(-1, 2)
+            return self.lookup_hashes(stored[:, 0], stored[:, 1], len(stored), exclude=str(path))
+
+        samples = decode_mono(path)
+        if samples is None:
+            return None
+        fp, weak = fingerprint(samples)
+        matches = self.lookup(fp, weak, exclude=str(path))
+        if add:
+            self.add(path, fp, digest)
+        else:
+            self.pending[str(path)] = (fp, digest)
+        return matches
+
+    def record(self, path):
+        """Index a file looked up with check(add=False), once whatever it was checked for has succeeded"""
+        path = Path(path).resolve()
+        pending = self.pending.pop(str(path), None)
+        if pending and pending[1] == content_hash(path).hex():
+            self.add(path, *pending)
+        else:
+            self.check(path)
+
+
+def find_audio(paths, recursive=True):
+    files = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            pattern = '**/*' if recursive else '*'
+            files.extend(sorted(f for f in p.glob(pattern) if f.is_file() and f.suffix.lower() in AUDIO_SUFFIXES
+                                and not f.name.startswith('.')))
+        elif p.suffix.lower() in AUDIO_SUFFIXES:
+            files.append(p)
+    return files
+
+
+def duplicates_table(duplicates):
+    table = Table(show_header=True, header_style="bold cyan", border_style="cyan")
+    table.add_column("File")
+    table.add_column("Duplicate of")
+    table.add_column("Match", justify="right")
+    table.add_column("Offset", justify="right")
+    for path, match in duplicates:
+        table.add_row(str(path), match['path'], f"{match['score']:.0%}", f"{match['offset_s']:+.1f} s")
+    return table
+
+
+@click.group()
+def cli():
+    """
+    Find duplicate recordings by acoustic fingerprint
+    """
+
+
+@cli.command()
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--db', type=click.Path(dir_okay=False), default=str(DEFAULT_DB), show_default=True,
+              help='Fingerprint index')
+def scan(paths, db):
+    """Index PATHS (files or directories) and report duplicates found among them and the index"""
+    files = find_audio(paths)
+    duplicates = []
+    failed = 0
+    with FingerprintIndex(db) as index, console.status("[cyan]Fingerprinting...[/cyan]") as status:
+        for i, f in enumerate(files, 1):
+            status.update(f"[cyan]{i}/{len(files)} {f.name}[/cyan]")
+            matches = index.check(f)
+            if matches is None:
+                failed += 1
+                console.print(f"[yellow]⚠️  Could not decode: {f}[/yellow]")
+            elif matches:
+                duplicates.append((f, matches[0]))
+        total = index.track_count()
+    if duplicates:
+        console.print(duplicates_table(duplicates))
+    console.print(f"[green]✓ {len(files) - failed} files indexed[/green] ({total} in index), "
+                  f"{len(duplicates)} duplicates")
+
+
+@cli.command()
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--db', type=click.Path(dir_okay=False), default=str(DEFAULT_DB), show_default=True,
+              help='Fingerprint index')
+def check(paths, db):
+    """Look PATHS up without adding them; exit 1 if any is a duplicate"""
+    duplicates = []
+    with FingerprintIndex(db) as index:
+        for f in find_audio(paths):
+            matches = index.check(f, add=False)
+            if matches:
+                duplicates.append((f, matches[0]))
+    if duplicates:
+        console.print(duplicates_table(duplicates))
+        sys.exit(1)
+    console.print("[green]✓ No duplicates[/green]")
+
+
+@cli.command()
+@click.option('--db', type=click.Path(dir_okay=False), default=str(DEFAULT_DB), show_default=True,
+              help='Fingerprint index')
+def stats(db):
+    """Index size"""
+    with FingerprintIndex(db) as index:
+        tracks, hashes = index.track_count(), index.hash_count()
+    size = Path(db).stat().st_size if Path(db).exists() else 0
+    console.print(f"{tracks} tracks, {hashes:,} indexed hashes, {size / 1024 / 1024:.1f} MB → {db}")
+
+
+if __name__ == '__main__':
+    cli()
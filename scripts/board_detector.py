@@ -12,6 +12,8 @@ from rich.panel import Panel
 from rich.text import Text
 from rich import print as rprint
 
+from device_discovery import list_esp32_ports
+
 console = Console()
 
 
@@ -60,6 +62,24 @@ def get_boards_via_cli():
         return []
 
 
+def get_boards_via_usb_ids():
+    """
+    以 USB VID/PID 與快取的晶片識別辨識 ESP32 板子（不呼叫 arduino-cli，幾乎即時）
+    
+    Returns:
+        list: 與 get_boards_via_cli() 相同格式的列表
+    """
+    boards = []
+    for info in list_esp32_ports():
+        name = info['chip'] or f"ESP32 ({info['bridge']})"
+        boards.append({
+            'port': info['device'],
+            'protocol': 'serial',
+            'boards': [{'name': name, 'fqbn': info['fqbn']}]
+        })
+    return boards
+
+
 def get_serial_ports():
     """
     使用 pyserial 列出所有序列埠
@@ -83,15 +103,15 @@ def get_serial_ports():
     return port_list
 
 
-def detect_arduino_boards():
+def detect_arduino_boards(use_cli=False):
     """
     綜合偵測 Arduino 板子
-    結合 Arduino CLI 和 pyserial 的結果
+    預設以 VID/PID 快速辨識 ESP32；use_cli=True 時改用 Arduino CLI（較慢，支援其他板子）
     
     Returns:
         dict: 包含 boards 和 serial_ports 的字典
     """
-    boards = get_boards_via_cli()
+    boards = get_boards_via_cli() if use_cli else get_boards_via_usb_ids()
     serial_ports = get_serial_ports()
     
     return {
@@ -206,6 +226,12 @@ def print_board_info(boards_info):
 
 
 if __name__ == '__main__':
-    # 測試模組
-    info = detect_arduino_boards()
+    import argparse
+
+    # 先解析參數：`--help` 只顯示說明，不掃描裝置
+    parser = argparse.ArgumentParser(description="偵測連接的 Arduino / ESP32 板子")
+    parser.add_argument('--cli', action='store_true', help="同時使用 arduino-cli board list 辨識板子（較慢）")
+    args = parser.parse_args()
+
+    info = detect_arduino_boards(use_cli=args.cli)
     print_board_info(info)
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Boot-Phase Timing Profiler
+Resets the board, timestamps every boot line with host time and breaks cold start into phases.
+Runs are stored per firmware build so regressions can be traced to a commit.
+"""
+
+import hashlib
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import click
+import serial
+from rich.console import Console
+from rich.panel import Panel
+from rich.table import Table
+
+from upload import find_serial_port, reset_board
+
+console = Console()
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+PROFILE_DIR = PROJECT_ROOT / '.boot_profiles'
+
+# The ROM and second-stage bootloader log at 115200; the sketch switches to
+# Serial.begin(460800) in setup(). "entry 0x" is the ROM handing over to the
+# second-stage bootloader, which still logs at 115200, so the reader switches on
+# the bootloader's last line or, with a quiet bootloader, on the first bytes that
+# are not text (the app talking at 460800). That moment is recorded as APP_OUTPUT.
+ROM_BAUD = 115200
+APP_BAUD = 460800
+BOOTLOADER_DONE = re.compile(r'boot: Disabling RNG early entropy source')
+APP_OUTPUT = '<app output at app baud>'
+
+# Ordered boot markers: (name, regex). Each marker is recorded on its first match.
+MARKERS = [
+    ('rom_boot',      re.compile(r'^rst:0x|^ets [A-Z][a-z]{2} |ESP-ROM:')),
+    ('bootloader',    re.compile(r'^entry 0x')),
+    # First line from setup() (or the baud switch it caused): ESP-IDF start-up,
+    # PSRAM init and its memory test are done
+    ('setup_start',   re.compile(r'PSRAM (ready|not found)|' + re.escape(APP_OUTPUT))),
+    ('app_banner',    re.compile(r'Production-Grade WAV Player')),
+    ('sd_init',       re.compile(r'Initializing SD card')),
+    ('sd_mounted',    re.compile(r'SD Card OK')),
+    # Playlist load: /playlist.idx ("Loaded N tracks from") or the scan fallback ("Found N tracks")
+    ('scan_start',    re.compile(r'Loading playlist')),
+    ('scan_done',     re.compile(r'(Found|Loaded) (\d+) tracks')),
+    ('tasks_started', re.compile(r'Tasks started')),
+    ('ready',         re.compile(r"Ready! Type 'help'")),
+    ('i2s_ready',     re.compile(r'AudioOutputWithEQ initialized')),
+]
+
+# Named phases derived from marker pairs: (phase, start marker, end marker)
+PHASES = [
+    ('rom',                 'rom_boot',    'bootloader'),
+    # Second-stage image load + ESP-IDF start-up; PSRAM init and test dominate it
+    ('bootloader_to_setup', 'bootloader',  'setup_start'),
+    ('setup_to_banner',     'setup_start', 'app_banner'),
+    ('sd_mount',            'sd_init',     'sd_mounted'),
+    ('scan',                'scan_start',  'scan_done'),
+    ('task_start',          'scan_done',   'tasks_started'),
+    ('i2s_ready',           'setup_start', 'i2s_ready'),
+    ('cold_start',          'rom_boot',    'ready'),
+]
+
+
+def is_text(data):
+    """Boot log text: printable UTF-8 plus line breaks/tabs/escapes (a baud mismatch produces neither)"""
+    try:
+        data.decode('utf-8')
+    except UnicodeDecodeError:
+        return False
+    return all(b >= 0x20 or b in b'\t\r\n\x1b' for b in data)
+
+
+def firmware_build_id(bin_path=None):
+    """
+    Identify the firmware build being profiled.
+
+    Uses the SHA-256 of the application image when given, otherwise the git
+    commit of the sources (suffixed with -dirty for uncommitted changes).
+    """
+    if bin_path:
+        digest = hashlib.sha256(Path(bin_path).read_bytes()).hexdigest()
+        return f"bin-{digest[:12]}"
+
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short=12', 'HEAD'],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ['git', 'status', '--porcelain', '--', 'src'],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return 'unknown'
+
+
+def capture_boot(port, duration=8.0, rom_baud=ROM_BAUD, app_baud=APP_BAUD, echo=False):
+    """
+    Reset the board and collect timestamped boot lines.
+
+    Returns:
+        list: [(seconds since reset release, line), ...]
+    """
+    lines = []
+    with serial.Serial(port, rom_baud, timeout=0) as ser:
+        ser.reset_input_buffer()
+        reset_board(ser)
+        t0 = time.perf_counter()
+        buffer = bytearray()
+        switched = rom_baud == app_baud
+        in_bootloader = False
+
+        while time.perf_counter() - t0 < duration:
+            waiting = ser.in_waiting
+            if not waiting:
+                time.sleep(0.0005)
+                continue
+            chunk = ser.read(waiting)
+            now = time.perf_counter() - t0
+            if not switched and in_bootloader and not is_text(chunk):
+                # The app is already talking at its own baud: what is buffered is lost either way
+                ser.baudrate = app_baud
+                buffer.clear()
+                switched = True
+                lines.append((now, APP_OUTPUT))
+                if echo:
+                    console.print(f"[dim]{now * 1000:9.2f} ms  (switched to {app_baud} baud)[/dim]")
+                continue
+            buffer.extend(chunk)
+            while b'\n' in buffer:
+                raw, _, rest = bytes(buffer).partition(b'\n')
+                buffer = bytearray(rest)
+                line = raw.decode('utf-8', errors='ignore').strip()
+                if not line:
+                    continue
+                lines.append((now, line))
+                if echo:
+                    console.print(f"[dim]{now * 1000:9.2f} ms[/dim]  {line}")
+                if line.startswith('entry 0x'):
+                    in_bootloader = True
+                if not switched and BOOTLOADER_DONE.search(line):
+                    ser.baudrate = app_baud
+                    buffer.clear()
+                    switched = True
+    return lines
+
+
+def analyze_boot(lines):
+    """
+    Match boot markers and compute phase durations.
+
+    Returns:
+        dict: markers (ms), phases (ms), track count and crash flag
+    """
+    markers = {}
+    track_count = None
+    playlist_source = None
+    crashed = False
+
+    for t, line in lines:
+        if 'Guru Meditation Error' in line:
+            crashed = True
+        for name, pattern in MARKERS:
+            if name in markers:
+                continue
+            match = pattern.search(line)
+            if match:
+                markers[name] = round(t * 1000.0, 3)
+                if name == 'scan_done':
+                    track_count = int(match.group(2))
+                    playlist_source = 'index' if match.group(1) == 'Loaded' else 'scan'
+
+    phases = {}
+    for phase, start, end in PHASES:
+        if start in markers and end in markers:
+            phases[phase] = round(markers[end] - markers[start], 3)
+
+    return {
+        'markers': markers,
+        'phases': phases,
+        'track_count': track_count,
+        'playlist_source': playlist_source,
+        'crashed': crashed,
+    }
+
+
+def save_run(build_id, result):
+    PROFILE_DIR.mkdir(exist_ok=True)
+    path = PROFILE_DIR / f"{build_id}.json"
+    runs = json.loads(path.read_text()) if path.exists() else []
+    runs.append(result)
+    path.write_text(json.dumps(runs, indent=2))
+    return path
+
+
+def load_profiles():
+    """
+    Load all stored runs grouped by build, oldest build first.
+
+    Returns:
+        list: [(build_id, runs), ...]
+    """
+    if not PROFILE_DIR.exists():
+        return []
+    builds = []
+    for path in PROFILE_DIR.glob('*.json'):
+        runs = json.loads(path.read_text())
+        if runs:
+            builds.append((path.stem, runs))
+    builds.sort(key=lambda b: b[1][0]['timestamp'])
+    return builds
+
+
+def median_phases(runs):
+    phases = {}
+    for phase, _, _ in PHASES:
+        values = [r['phases'][phase] for r in runs if phase in r['phases']]
+        if values:
+            phases[phase] = statistics.median(values)
+    return phases
+
+
+def print_breakdown(result):
+    table = Table(show_header=True, header_style="bold cyan", box=None, padding=(0, 2))
+    table.add_column("Marker")
+    table.add_column("t (ms)", justify="right")
+    for name, _ in MARKERS:
+        if name in result['markers']:
+            table.add_row(name, f"{result['markers'][name]:.1f}")
+        else:
+            table.add_row(f"[dim]{name}[/dim]", "[dim]-[/dim]")
+
+    phase_table = Table(show_header=True, header_style="bold cyan", box=None, padding=(0, 2))
+    phase_table.add_column("Phase")
+    phase_table.add_column("Duration (ms)", justify="right")
+    for phase, _, _ in PHASES:
+        if phase in result['phases']:
+            phase_table.add_row(phase, f"{result['phases'][phase]:.1f}")
+
+    console.print(Panel(table, title="[bold]📍 Boot Markers[/bold]", border_style="blue"))
+    console.print(Panel(phase_table, title="[bold]⏱  Phase Breakdown[/bold]", border_style="cyan"))
+    if result['track_count'] is not None:
+        console.print(f"[cyan]Tracks found:[/cyan] {result['track_count']}")
+    if result['crashed']:
+        console.print("[bold red]CRASH DETECTED during boot[/bold red]")
+
+
+@click.group()
+def cli():
+    """
+    ESP32 boot-phase timing profiler
+    """
+
+
+@cli.command()
+@click.option('--port', '-p', help='Serial port (auto-detect if not provided)')
+@click.option('--runs', '-n', default=3, show_default=True, help='Number of resets to profile')
+@click.option('--duration', default=8.0, show_default=True, help='Seconds to capture per run')
+@click.option('--bin', 'bin_path', type=click.Path(exists=True), help='Identify the build by this app image instead of git')
+@click.option('--build-id', help='Explicit build identifier')
+@click.option('--echo', is_flag=True, default=False, help='Print timestamped boot lines')
+def run(port, runs, duration, bin_path, build_id, echo):
+    """Reset the board and record boot phase timings"""
+    port = port or find_serial_port()
+    if not port:
+        console.print("[bold red]✗ Error:[/bold red] No USB serial port found.")
+        sys.exit(1)
+
+    build_id = build_id or firmware_build_id(bin_path)
+    console.print(f"[cyan]Profiling build [bold]{build_id}[/bold] on {port}[/cyan]")
+
+    for i in range(runs):
+        try:
+            lines = capture_boot(port, duration, echo=echo)
+        except serial.SerialException as e:
+            console.print(f"[red]Serial Port Error: {e}[/red]")
+            sys.exit(1)
+
+        result = analyze_boot(lines)
+        result['timestamp'] = datetime.now().isoformat(timespec='seconds')
+        result['build'] = build_id
+        result['lines'] = [[round(t * 1000.0, 3), line] for t, line in lines]
+
+        console.print(f"\n[bold]Run {i + 1}/{runs}[/bold]")
+        print_breakdown(result)
+        path = save_run(build_id, result)
+
+    console.print(f"[green]✓ Saved to {path}[/green]")
+
+
+@cli.command()
+@click.option('--phase', default='cold_start', show_default=True, help='Phase used for the delta column')
+def report(phase):
+    """Compare stored builds and show scan time versus library size"""
+    builds = load_profiles()
+    if not builds:
+        console.print("[yellow]No boot profiles recorded yet.[/yellow]")
+        return
+
+    table = Table(show_header=True, header_style="bold cyan", border_style="cyan")
+    table.add_column("Build")
+    table.add_column("Runs", justify="right")
+    for name, _, _ in PHASES:
+        table.add_column(name, justify="right")
+    table.add_column(f"Δ {phase}", justify="right")
+
+    previous = None
+    for build_id, runs in builds:
+        medians = median_phases(runs)
+        delta = ""
+        if previous is not None and phase in medians and phase in previous:
+            diff = medians[phase] - previous[phase]
+            color = "red" if diff > 0 else "green"
+            delta = f"[{color}]{diff:+.1f}[/{color}]"
+        table.add_row(
+            build_id,
+            str(len(runs)),
+            *[f"{medians[p]:.1f}" if p in medians else "-" for p, _, _ in PHASES],
+            delta,
+        )
+        previous = medians
+    console.print(Panel(table, title="[bold]📊 Boot Phases by Build (median ms)[/bold]", border_style="cyan"))
+
+    scan_by_tracks = {}
+    for _, runs in builds:
+        for r in runs:
+            # Index loads do not walk the card; runs from before the index count as scans
+            if r.get('track_count') is not None and 'scan' in r['phases'] and r.get('playlist_source') != 'index':
+                scan_by_tracks.setdefault(r['track_count'], []).append(r['phases']['scan'])
+
+    if scan_by_tracks:
+        scan_table = Table(show_header=True, header_style="bold cyan", box=None, padding=(0, 2))
+        scan_table.add_column("Tracks", justify="right")
+        scan_table.add_column("Runs", justify="right")
+        scan_table.add_column("Scan median (ms)", justify="right")
+        scan_table.add_column("Per track (ms)", justify="right")
+        for tracks in sorted(scan_by_tracks):
+            med = statistics.median(scan_by_tracks[tracks])
+            scan_table.add_row(
+                str(tracks),
+                str(len(scan_by_tracks[tracks])),
+                f"{med:.1f}",
+                f"{med / tracks:.2f}" if tracks else "-",
+            )
+        console.print(Panel(scan_table, title="[bold]📁 Scan Time vs Library Size[/bold]", border_style="blue"))
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Persistent arduino-cli Build Cache
+One --build-path per (FQBN, build properties, toolchain version), reused across runs
+with size-bounded LRU eviction and hit/time-saved statistics
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+import click
+from rich.console import Console
+from rich.panel import Panel
+from rich.table import Table
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+console = Console()
+
+CACHE_ROOT = Path(os.environ.get('DAP_BUILD_CACHE', Path.home() / '.cache' / 'esp32-hifi-dap' / 'build-cache'))
+DEFAULT_MAX_BYTES = 4 * 1024 ** 3
+INDEX_NAME = 'index.json'
+LOCK_NAME = '.lock'
+LEASE_SECONDS = 2 * 3600   # A build holding an entry longer than this is assumed dead
+
+
+@lru_cache(maxsize=1)
+def toolchain_version():
+    """
+    Version string of arduino-cli plus the installed esp32 core.
+    A core or CLI upgrade therefore starts a fresh cache entry.
+    """
+    parts = []
+    try:
+        result = subprocess.run(['arduino-cli', 'version', '--format', 'json'],
+                                capture_output=True, text=True, check=True)
+        parts.append(f"cli={json.loads(result.stdout).get('VersionString', 'unknown')}")
+    except (subprocess.CalledProcessError, FileNotFoundError, ValueError):
+        parts.append('cli=unknown')
+
+    try:
+        result = subprocess.run(['arduino-cli', 'core', 'list', '--format', 'json'],
+                                capture_output=True, text=True, check=True)
+        data = json.loads(result.stdout)
+        platforms = data.get('platforms', data) if isinstance(data, dict) else data
+        for platform in platforms or []:
+            core_id = platform.get('id') or platform.get('ID')
+            version = platform.get('installed_version') or platform.get('installed') or platform.get('Installed')
+            if core_id and version:
+                parts.append(f"{core_id}={version}")
+    except (subprocess.CalledProcessError, FileNotFoundError, ValueError, AttributeError):
+        parts.append('cores=unknown')
+
+    return ';'.join(sorted(parts))
+
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def lease_alive(pid, since):
+    """An in-use mark left by a process that crashed must not pin its entry forever"""
+    if time.time() - since > LEASE_SECONDS:
+        return False
+    if os.name != 'posix':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class BuildCache:
+    """
+    Managed arduino-cli build directories keyed by FQBN, build properties and toolchain
+    """
+
+    _thread_lock = threading.Lock()
+
+    def __init__(self, root=CACHE_ROOT, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def _locked_index(self):
+        """Read-modify-write the index under a thread + file lock"""
+        with self._thread_lock:
+            with open(self.root / LOCK_NAME, 'w') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                index_path = self.root / INDEX_NAME
+                try:
+                    index = json.loads(index_path.read_text())
+                except (OSError, ValueError):
+                    index = {'entries': {}}
+                yield index
+                tmp = index_path.with_suffix('.tmp')
+                tmp.write_text(json.dumps(index, indent=2, sort_keys=True))
+                tmp.replace(index_path)
+
+    def key_for(self, fqbn, build_properties=(), sketch=None):
+        """
+        Cache key for a build configuration.
+
+        Args:
+            fqbn (str): Fully qualified board name
+            build_properties (list): --build-property values, in command-line order
+            sketch (str): Sketch path; different sketches never share sketch objects
+        """
+        payload = json.dumps({
+            'fqbn': fqbn,
+            'properties': list(build_properties),
+            'toolchain': toolchain_version(),
+            'sketch': str(Path(sketch).resolve()) if sketch else None,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    def acquire(self, fqbn, build_properties=(), sketch=None, label=None):
+        """
+        Get the build directory for a configuration.
+
+        Returns:
+            tuple: (build path, cache key, hit)
+        """
+        key = self.key_for(fqbn, build_properties, sketch)
+        path = self.root / key
+        with self._locked_index() as index:
+            entry = index['entries'].setdefault(key, {
+                'fqbn': fqbn,
+                'properties': list(build_properties),
+                'toolchain': toolchain_version(),
+                'label': label or (f"{Path(sketch).name} @ {fqbn}" if sketch else fqbn),
+                'builds': 0,
+                'hits': 0,
+                'cold_seconds': [],
+                'saved_seconds': 0.0,
+                'size': 0,
+            })
+            hit = path.exists() and entry['builds'] > 0
+            entry['last_used'] = time.time()
+            # In use until record(): other builds' eviction must not delete it mid-compile
+            lease = entry.setdefault('leases', {}).setdefault(str(os.getpid()), {'count': 0})
+            lease['count'] += 1
+            lease['since'] = time.time()
+        path.mkdir(parents=True, exist_ok=True)
+        return path, key, hit
+
+    def record(self, key, seconds, hit, success=True):
+        """
+        Record a finished build, release the entry taken by acquire() and evict old
+        entries if over budget.
+        """
+        path = self.root / key
+        with self._locked_index() as index:
+            entry = index['entries'].get(key)
+            if entry is None:
+                return
+            leases = entry.get('leases', {})
+            lease = leases.get(str(os.getpid()))
+            if lease:
+                lease['count'] -= 1
+                if lease['count'] <= 0:
+                    del leases[str(os.getpid())]
+            if success:
+                # Running totals survive eviction of individual entries
+                totals = index.setdefault('totals', {'builds': 0, 'hits': 0, 'saved_seconds': 0.0})
+                entry['builds'] += 1
+                totals['builds'] += 1
+                if hit:
+                    entry['hits'] += 1
+                    totals['hits'] += 1
+                    cold = entry['cold_seconds'] or [
+                        s for e in index['entries'].values() for s in e['cold_seconds']
+                    ]
+                    if cold:
+                        saved = max(0.0, sum(cold) / len(cold) - seconds)
+                        entry['saved_seconds'] += saved
+                        totals['saved_seconds'] += saved
+                else:
+                    entry['cold_seconds'] = (entry['cold_seconds'] + [round(seconds, 3)])[-5:]
+            entry['last_used'] = time.time()
+            entry['size'] = directory_size(path)
+            self._evict(index, keep=key)
+
+    def _evict(self, index, keep=None):
+        """Drop least-recently-used entries until the cache fits max_bytes (entries in use are skipped)"""
+        entries = index['entries']
+        total = sum(e.get('size', 0) for e in entries.values())
+        for key, entry in sorted(entries.items(), key=lambda kv: kv[1].get('last_used', 0)):
+            if total <= self.max_bytes:
+                break
+            leases = entry.get('leases', {})
+            for pid in [pid for pid, lease in leases.items() if not lease_alive(int(pid), lease['since'])]:
+                del leases[pid]
+            if key == keep or leases:
+                continue
+            shutil.rmtree(self.root / key, ignore_errors=True)
+            total -= entry.get('size', 0)
+            index.setdefault('evicted', 0)
+            index['evicted'] += 1
+            del entries[key]
+
+    def evict(self, max_bytes=None):
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        with self._locked_index() as index:
+            self._evict(index)
+
+    def clear(self):
+        with self._locked_index() as index:
+            for key in list(index['entries']):
+                shutil.rmtree(self.root / key, ignore_errors=True)
+            index['entries'] = {}
+
+    def stats(self):
+        with self._locked_index() as index:
+            entries = dict(index['entries'])
+            evicted = index.get('evicted', 0)
+            totals = dict(index.get('totals', {'builds': 0, 'hits': 0, 'saved_seconds': 0.0}))
+        builds = totals['builds']
+        hits = totals['hits']
+        return {
+            'root': str(self.root),
+            'entries': entries,
+            'builds': builds,
+            'hits': hits,
+            'hit_rate': hits / builds if builds else 0.0,
+            'saved_seconds': totals['saved_seconds'],
+            'size': sum(e.get('size', 0) for e in entries.values()),
+            'max_bytes': self.max_bytes,
+            'evicted': evicted,
+        }
+
+
+def format_size(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{size} B"
+        size /= 1024
+
+
+@click.group()
+def cli():
+    """
+    Manage the persistent arduino-cli build cache
+    """
+
+
+@cli.command()
+def stats():
+    """Show hit rate, size and build time saved"""
+    data = BuildCache().stats()
+
+    table = Table(show_header=True, header_style="bold cyan", border_style="cyan")
+    table.add_column("Key")
+    table.add_column("Configuration")
+    table.add_column("Builds", justify="right")
+    table.add_column("Hits", justify="right")
+    table.add_column("Cold build", justify="right")
+    table.add_column("Saved", justify="right")
+    table.add_column("Size", justify="right")
+    for key, entry in sorted(data['entries'].items(), key=lambda kv: -kv[1].get('last_used', 0)):
+        cold = entry['cold_seconds']
+        table.add_row(
+            key,
+            entry['label'],
+            str(entry['builds']),
+            str(entry['hits']),
+            f"{sum(cold) / len(cold):.1f}s" if cold else "-",
+            f"{entry['saved_seconds']:.1f}s",
+            format_size(entry.get('size', 0)),
+        )
+    console.print(table)
+
+    summary = Table.grid(padding=(0, 2))
+    summary.add_column(style="cyan bold")
+    summary.add_column(style="white")
+    summary.add_row("Location:", data['root'])
+    summary.add_row("Hit rate:", f"{data['hits']}/{data['builds']} ({data['hit_rate'] * 100:.1f}%)")
+    summary.add_row("Time saved:", f"{data['saved_seconds']:.1f}s")
+    summary.add_row("Size:", f"{format_size(data['size'])} / {format_size(data['max_bytes'])}")
+    summary.add_row("Evicted:", str(data['evicted']))
+    console.print(Panel(summary, title="[bold]🗄  Build Cache[/bold]", border_style="cyan"))
+
+
+@cli.command()
+@click.option('--max-size', default=DEFAULT_MAX_BYTES // 1024 ** 2, show_default=True, help='Size budget in MB')
+def evict(max_size):
+    """Evict least-recently-used entries down to the size budget"""
+    cache = BuildCache()
+    cache.evict(max_size * 1024 ** 2)
+    console.print("[green]✓ Eviction complete[/green]")
+
+
+@cli.command()
+@click.confirmation_option(prompt='Delete every cached build directory?')
+def clear():
+    """Delete all cached build directories"""
+    BuildCache().clear()
+    console.print("[green]✓ Build cache cleared[/green]")
+
+
+if __name__ == '__main__':
+    cli()
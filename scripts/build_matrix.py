@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Parallel Multi-Target Build Matrix
+Compiles one sketch for several boards x optimization profiles concurrently,
+each with its own isolated build cache, and tabulates size and timing per target
+"""
+
+import json
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import click
+from rich.console import Console
+from rich.panel import Panel
+from rich.table import Table
+
+from build_cache import BuildCache
+from upload import (
+    BOARD_FQBN,
+    OPTIMIZATION_FLAGS,
+    build_compile_command,
+    build_properties,
+    parse_size_stats,
+    run_build_script,
+)
+
+console = Console()
+
+DEFAULT_BOARDS = ['esp32', 'esp32_with_psram', 'esp32s3']
+
+# Optimization profiles (None = toolchain defaults, no extra build properties)
+OPT_PROFILES = {
+    'O3': OPTIMIZATION_FLAGS,
+    'O2': {'c': '-O2', 'cpp': '-O2', 'elf': '-O2'},
+    'Os': {'c': '-Os', 'cpp': '-Os', 'elf': '-Os'},
+    'default': None,
+}
+
+ARTIFACT_SUFFIXES = ('.bin', '.elf', '.map', '.hex')
+
+
+def compile_target(sketch_path, board, profile, output_root, cache):
+    """
+    Compile a single matrix cell (runs in a worker thread).
+
+    Returns:
+        dict: Result row
+    """
+    fqbn = BOARD_FQBN[board]
+    flags = OPT_PROFILES[profile]
+    optimize = flags is not None
+    name = f"{board}-{profile}"
+    output_dir = Path(output_root) / name
+    if output_dir.exists():
+        shutil.rmtree(output_dir)
+    output_dir.mkdir(parents=True)
+
+    props = build_properties(optimize, flags)
+    cache_dir, cache_key, cache_hit = cache.acquire(fqbn, props, sketch=Path(sketch_path).parent, label=name)
+    cmd = build_compile_command(sketch_path, fqbn, output_dir=output_dir, cache_dir=cache_dir,
+                                optimize=optimize, extra_flags=flags)
+
+    start = time.time()
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        returncode, output = result.returncode, result.stdout + result.stderr
+    except FileNotFoundError:
+        returncode, output = -1, "arduino-cli not found"
+    elapsed = time.time() - start
+    cache.record(cache_key, elapsed, cache_hit, returncode == 0)
+
+    (output_dir / 'compile.log').write_text(output)
+    stats = {}
+    for line in output.splitlines():
+        parse_size_stats(line, stats)
+
+    return {
+        'target': name,
+        'board': board,
+        'profile': profile,
+        'fqbn': fqbn,
+        'success': returncode == 0,
+        'seconds': round(elapsed, 2),
+        'cache_hit': cache_hit,
+        'artifacts': sorted(p.name for p in output_dir.iterdir() if p.suffix in ARTIFACT_SUFFIXES),
+        'output_dir': str(output_dir),
+        'error_tail': None if returncode == 0 else output.strip().splitlines()[-10:],
+        **stats,
+    }
+
+
+def run_matrix(sketch_path, boards, profiles, output_root, jobs):
+    """
+    Compile every board x profile combination with bounded parallelism.
+
+    Returns:
+        list: Result rows in matrix order
+    """
+    cache = BuildCache()
+    cells = [(board, profile) for board in boards for profile in profiles]
+    results = {}
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(compile_target, sketch_path, board, profile, output_root, cache): (board, profile)
+            for board, profile in cells
+        }
+        with console.status(f"[cyan]Compiling {len(cells)} targets ({jobs} parallel)...[/cyan]"):
+            for future in as_completed(futures):
+                row = future.result()
+                results[futures[future]] = row
+                mark = "[green]✓[/green]" if row['success'] else "[red]✗[/red]"
+                console.print(f"{mark} {row['target']} ({row['seconds']:.1f}s)")
+
+    return [results[cell] for cell in cells]
+
+
+def print_matrix(rows, wall):
+    def usage(used, total):
+        if used is None or not total:
+            return "-"
+        pct = used / total * 100
+        color = "green" if pct < 70 else "yellow" if pct < 90 else "red"
+        return f"{used:,} [{color}]({pct:.1f}%)[/{color}]"
+
+    table = Table(show_header=True, header_style="bold cyan", border_style="cyan")
+    table.add_column("Target")
+    table.add_column("Result")
+    table.add_column("Flash", justify="right")
+    table.add_column("RAM", justify="right")
+    table.add_column("Time", justify="right")
+    table.add_column("Cache")
+    table.add_column("Artifacts", style="dim")
+    for row in rows:
+        table.add_row(
+            row['target'],
+            "[bold green]PASS[/bold green]" if row['success'] else "[bold red]FAIL[/bold red]",
+            usage(row.get('flash_used'), row.get('flash_total')),
+            usage(row.get('ram_used'), row.get('ram_total')),
+            f"{row['seconds']:.1f}s",
+            "hit" if row['cache_hit'] else "miss",
+            ", ".join(row['artifacts']),
+        )
+    serial_time = sum(row['seconds'] for row in rows)
+    console.print(Panel(table, title="[bold]🧮 Build Matrix[/bold]", border_style="cyan"))
+    console.print(f"[dim]Wall time {wall:.1f}s (sum of target times {serial_time:.1f}s)[/dim]")
+
+    for row in rows:
+        if row['error_tail']:
+            console.print(Panel("\n".join(row['error_tail']), title=f"[red]{row['target']}[/red]", border_style="red"))
+
+
+@click.command()
+@click.argument('sketch', type=click.Path(exists=True), required=False)
+@click.option('--board', '-b', 'boards', multiple=True, type=click.Choice(sorted(BOARD_FQBN)),
+              help='Board to include (repeatable, default: esp32, esp32_with_psram, esp32s3)')
+@click.option('--opt', '-O', 'profiles', multiple=True, type=click.Choice(sorted(OPT_PROFILES)),
+              help='Optimization profile (repeatable, default: O3)')
+@click.option('--jobs', '-j', default=3, show_default=True, help='Targets compiled in parallel')
+@click.option('--output', '-o', default='build/matrix', show_default=True, help='Artifact root directory')
+@click.option('--json', 'json_path', type=click.Path(), help='Write results as JSON')
+def cli(sketch, boards, profiles, jobs, output, json_path):
+    """
+    Compile a sketch for several boards and optimization profiles concurrently
+    """
+    if sketch is None:
+        if not run_build_script():
+            console.print("[bold red]Aborting: Build step failed.[/bold red]")
+            sys.exit(1)
+        sketch = Path('build/build.ino')
+        if not sketch.exists():
+            sketch = Path('../build/build.ino')
+
+    sketch = Path(sketch).resolve()
+    if sketch.is_dir():
+        ino_files = sorted(sketch.glob('*.ino'))
+        if not ino_files:
+            console.print(f"[bold red]✗ Error:[/bold red] No .ino files found in {sketch}")
+            sys.exit(1)
+        sketch = ino_files[0]
+
+    boards = list(boards) or DEFAULT_BOARDS
+    profiles = list(profiles) or ['O3']
+
+    start = time.time()
+    rows = run_matrix(sketch, boards, profiles, Path(output).resolve(), jobs)
+    wall = time.time() - start
+    print_matrix(rows, wall)
+
+    if json_path:
+        Path(json_path).write_text(json.dumps({'sketch': str(sketch), 'wall_seconds': round(wall, 2), 'targets': rows}, indent=2))
+        console.print(f"[green]✓ Results written to {json_path}[/green]")
+
+    sys.exit(0 if all(row['success'] for row in rows) else 1)
+
+
+if __name__ == '__main__':
+    cli()
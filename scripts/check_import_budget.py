@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for the dap CLI
+Runs dap subcommands under `python -X importtime` and fails when the total import
+time exceeds its budget or a heavy module is imported where it should not be.
+
+Usage: python3 scripts/check_import_budget.py [--runs N] [--scale F]
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+DAP = Path(__file__).resolve().parent / 'dap.py'
+HEAVY = ('rich', 'esptool', 'numpy')
+
+# (arguments, budget in ms, modules that must not be imported)
+CASES = [
+    (['--help'], 120, HEAVY + ('serial',)),
+    (['ping', '--help'], 120, HEAVY + ('serial',)),
+    # A bogus port fails right after the command's own imports have happened
+    (['ping', '--port', '/dev/dap-budget-check'], 160, HEAVY),
+    (['ls', '--port', '/dev/dap-budget-check'], 160, HEAVY),
+]
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\| ( *)(\S+)')
+
+
+def measure(args):
+    """
+    Run dap once with -X importtime.
+
+    Returns:
+        tuple: (total import time in ms, set of imported top-level packages)
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', str(DAP)] + args,
+                            capture_output=True, text=True, cwd=DAP.parent.parent)
+    total_us = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        modules.add(match.group(4).split('.')[0])
+        if not match.group(3):
+            total_us += int(match.group(2))
+    return total_us / 1000, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check dap CLI startup import budget")
+    parser.add_argument('--runs', type=int, default=5, help='Runs per case (median is compared)')
+    parser.add_argument('--scale', type=float, default=1.0, help='Budget multiplier for slow machines')
+    args = parser.parse_args()
+
+    failed = False
+    for case_args, budget, forbidden in CASES:
+        samples = []
+        modules = set()
+        for _ in range(args.runs):
+            ms, imported = measure(case_args)
+            samples.append(ms)
+            modules |= imported
+        median = statistics.median(samples)
+        limit = budget * args.scale
+        leaked = sorted(set(forbidden) & modules)
+        ok = median <= limit and not leaked
+        failed |= not ok
+        status = 'OK  ' if ok else 'FAIL'
+        print(f"{status} dap {' '.join(case_args):<40} {median:7.1f} ms (budget {limit:.0f} ms)"
+              + (f"  imports {', '.join(leaked)}" if leaked else ""))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Command Round-Trip Latency Profiler
+Times every serial command (send, first byte, completion) and builds per-command histograms
+"""
+
+import json
+import math
+import random
+import re
+import sys
+import time
+from collections import defaultdict
+
+import click
+import serial
+from rich.console import Console
+from rich.panel import Panel
+from rich.table import Table
+
+console = Console()
+
+# How to recognise the end of a response, keyed by command keyword.
+# JSON commands complete on the first line that parses as a JSON object (async
+# log lines such as "[EVENT] ..." are skipped); text commands on a known marker.
+JSON_COMMANDS = {
+    'info_json', 'sys_json', 'tasks_json', 'config_json',
+    'status_json', 'list_json', 'storage_json',
+}
+TEXT_COMPLETION = {
+    'ping': re.compile(r'^pong$'),
+    'volume': re.compile(r'Volume set to'),
+    'pause': re.compile(r'Paused'),
+    'resume': re.compile(r'Resumed|restored'),
+    'next': re.compile(r'Next Track'),
+    'prev': re.compile(r'Previous Track'),
+    'delete': re.compile(r'^(SUCCESS|ERROR)'),
+    'rename': re.compile(r'^(SUCCESS|ERROR)'),
+    'bitdepth': re.compile(r'Bit Depth|Invalid bit depth|not initialized'),
+}
+
+DEFAULT_MIX = 'status_json=5,sys_json=2,list_json=1,volume 20=1'
+PERCENTILES = (50, 95, 99)
+
+
+def command_keyword(cmd):
+    return cmd.strip().split(' ', 1)[0].lower()
+
+
+def is_complete(keyword, line):
+    """
+    Check whether a response line completes the given command
+    """
+    if keyword in JSON_COMMANDS:
+        if not line.startswith('{'):
+            return False
+        try:
+            return isinstance(json.loads(line), dict)
+        except ValueError:
+            return False
+    pattern = TEXT_COMPLETION.get(keyword)
+    if pattern is None:
+        # Unknown command: the first non-empty line is the answer
+        return bool(line)
+    return bool(pattern.search(line))
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class LatencyHistogram:
+    """
+    Latency samples for a single command (milliseconds)
+    """
+
+    def __init__(self):
+        self.first_byte = []
+        self.complete = []
+        self.timeouts = 0
+
+    def add(self, first_byte_ms, complete_ms):
+        if complete_ms is None:
+            self.timeouts += 1
+            return
+        self.first_byte.append(first_byte_ms)
+        self.complete.append(complete_ms)
+
+    @staticmethod
+    def _summary(samples):
+        values = sorted(samples)
+        summary = {'count': len(values)}
+        if values:
+            summary['min'] = round(values[0], 3)
+            summary['max'] = round(values[-1], 3)
+            summary['mean'] = round(sum(values) / len(values), 3)
+            for pct in PERCENTILES:
+                summary[f'p{pct}'] = round(percentile(values, pct), 3)
+        return summary
+
+    def summary(self):
+        return {
+            'timeouts': self.timeouts,
+            'first_byte_ms': self._summary(self.first_byte),
+            'complete_ms': self._summary(self.complete),
+        }
+
+
+class CommandTimer:
+    """
+    Sends commands over an open serial connection and records their timing
+    """
+
+    def __init__(self, ser):
+        self.ser = ser
+        self.histograms = defaultdict(LatencyHistogram)
+        self.records = []
+
+    def send(self, cmd, timeout=2.0):
+        """
+        Send a command and wait for its completion line.
+
+        Returns:
+            str: The completing line, or everything received if the command timed out
+        """
+        keyword = command_keyword(cmd)
+        buffer = bytearray()
+        lines = []
+        t_first = None
+        t_done = None
+
+        self.ser.reset_input_buffer()
+        t_send = time.perf_counter()
+        self.ser.write((cmd.strip() + '\n').encode())
+        self.ser.flush()
+
+        deadline = t_send + timeout
+        while t_done is None and time.perf_counter() < deadline:
+            waiting = self.ser.in_waiting
+            if not waiting:
+                time.sleep(0.0005)
+                continue
+            chunk = self.ser.read(waiting)
+            now = time.perf_counter()
+            if t_first is None:
+                t_first = now
+            buffer.extend(chunk)
+            while b'\n' in buffer:
+                raw, _, rest = bytes(buffer).partition(b'\n')
+                buffer = bytearray(rest)
+                line = raw.decode('utf-8', errors='ignore').strip()
+                lines.append(line)
+                if is_complete(keyword, line):
+                    t_done = now
+                    break
+
+        first_ms = (t_first - t_send) * 1000.0 if t_first else None
+        done_ms = (t_done - t_send) * 1000.0 if t_done else None
+        self.histograms[keyword].add(first_ms, done_ms)
+        self.records.append({
+            'cmd': cmd.strip(),
+            't_send': t_send,
+            'first_byte_ms': first_ms,
+            'complete_ms': done_ms,
+        })
+        return lines[-1] if t_done else '\n'.join(lines)
+
+    def report(self):
+        """Per-command histogram summary (JSON-serialisable)"""
+        return {keyword: hist.summary() for keyword, hist in sorted(self.histograms.items())}
+
+    def export_json(self, path, extra=None):
+        data = {'commands': self.report(), 'samples': self.records}
+        if extra:
+            data.update(extra)
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+    def print_report(self, title="⏱  Command Latency"):
+        table = Table(show_header=True, header_style="bold cyan", border_style="cyan")
+        table.add_column("Command")
+        table.add_column("N", justify="right")
+        table.add_column("Timeouts", justify="right")
+        table.add_column("First byte p50", justify="right")
+        for pct in PERCENTILES:
+            table.add_column(f"Done p{pct}", justify="right")
+        table.add_column("Max", justify="right")
+
+        for keyword, summary in self.report().items():
+            done = summary['complete_ms']
+            first = summary['first_byte_ms']
+            timeouts = summary['timeouts']
+            table.add_row(
+                keyword,
+                str(done['count']),
+                f"[red]{timeouts}[/red]" if timeouts else "0",
+                f"{first['p50']:.1f} ms" if first['count'] else "-",
+                *[f"{done[f'p{pct}']:.1f} ms" if done['count'] else "-" for pct in PERCENTILES],
+                f"{done['max']:.1f} ms" if done['count'] else "-",
+            )
+        console.print(Panel(table, title=f"[bold]{title}[/bold]", border_style="cyan"))
+
+
+def parse_mix(mix):
+    """
+    Parse a weighted command mix such as "status_json=5,volume 20=1"
+
+    Returns:
+        list: [(command, weight), ...]
+    """
+    entries = []
+    for part in mix.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        cmd, sep, weight = part.rpartition('=')
+        if not sep:
+            cmd, weight = part, '1'
+        entries.append((cmd.strip(), float(weight)))
+    if not entries:
+        raise click.BadParameter("empty command mix")
+    return entries
+
+
+def run_load(timer, mix, rate, duration, timeout):
+    """
+    Issue commands from the mix at a fixed rate for the given duration.
+
+    Returns:
+        dict: Achieved rate and scheduling lag statistics
+    """
+    commands = [cmd for cmd, _ in mix]
+    weights = [weight for _, weight in mix]
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    next_at = start
+    sent = 0
+    max_lag = 0.0
+
+    while time.perf_counter() - start < duration:
+        now = time.perf_counter()
+        if now < next_at:
+            time.sleep(next_at - now)
+        else:
+            max_lag = max(max_lag, now - next_at)
+        timer.send(random.choices(commands, weights)[0], timeout)
+        sent += 1
+        next_at += interval
+
+    elapsed = time.perf_counter() - start
+    return {
+        'target_rate': rate,
+        'achieved_rate': round(sent / elapsed, 3),
+        'sent': sent,
+        'max_schedule_lag_ms': round(max_lag * 1000.0, 3),
+    }
+
+
+@click.command()
+@click.argument('port')
+@click.option('--baud', '-b', default=460800, show_default=True, help='Serial baud rate')
+@click.option('--command', '-c', 'commands', multiple=True, help='Command to time (repeatable)')
+@click.option('--count', '-n', default=50, show_default=True, help='Repetitions per command (single-shot mode)')
+@click.option('--load', is_flag=True, default=False, help='Run the load generator with --mix')
+@click.option('--mix', default=DEFAULT_MIX, show_default=True, help='Weighted command mix for --load')
+@click.option('--rate', default=5.0, show_default=True, help='Commands per second for --load')
+@click.option('--duration', default=30.0, show_default=True, help='Seconds to run --load')
+@click.option('--timeout', default=2.0, show_default=True, help='Per-command timeout (seconds)')
+@click.option('--json', 'json_path', type=click.Path(), help='Export histograms and samples as JSON')
+def cli(port, baud, commands, count, load, mix, rate, duration, timeout, json_path):
+    """
+    Measure firmware command round-trip latency
+    """
+    try:
+        ser = serial.Serial(port, baud, timeout=0)
+    except serial.SerialException as e:
+        console.print(f"[bold red]✗ Error:[/bold red] {e}")
+        sys.exit(1)
+
+    time.sleep(2)  # DTR reset wait
+    timer = CommandTimer(ser)
+    extra = {'port': port, 'baud': baud}
+
+    try:
+        if load:
+            console.print(f"[cyan]Load: {mix} @ {rate}/s for {duration}s[/cyan]")
+            extra['load'] = run_load(timer, parse_mix(mix), rate, duration, timeout)
+            console.print(f"[dim]Achieved {extra['load']['achieved_rate']}/s, "
+                          f"max schedule lag {extra['load']['max_schedule_lag_ms']} ms[/dim]")
+        else:
+            for cmd in commands or ('ping', 'status_json', 'list_json', 'volume 20'):
+                for _ in range(count):
+                    timer.send(cmd, timeout)
+    except KeyboardInterrupt:
+        console.print("\n[yellow]⚠ Interrupted[/yellow]")
+    finally:
+        ser.close()
+
+    timer.print_report()
+    if json_path:
+        timer.export_json(json_path, extra)
+        console.print(f"[green]✓ Exported:[/green] {json_path}")
+
+
+if __name__ == '__main__':
+    cli()
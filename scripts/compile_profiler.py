@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+arduino-cli Compile Profiler
+Runs a verbose, single-job compile, timestamps every compiler/linker invocation and
+attributes the time to core, each library and each sketch translation unit.
+Prints a sorted breakdown and writes a Chrome trace (chrome://tracing, Perfetto)
+"""
+
+import json
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import click
+from rich.console import Console
+from rich.panel import Panel
+from rich.table import Table
+
+from upload import BOARD_FQBN, build_compile_command, run_build_script
+
+console = Console()
+
+COMMAND_LINE = re.compile(r'^"?(?P<exe>[^"\s]*[/\\][^"\s]+)"?\s')
+OUTPUT_ARG = re.compile(r'\s-o\s+"?([^"\s]+)"?')
+LIBRARY_DIR = re.compile(r'[/\\]libraries[/\\]([^/\\]+)[/\\]')
+REUSED = re.compile(r'^Using (?:previously compiled file|precompiled core|cached library dependencies for file):\s*(.+)$')
+CATEGORY_ORDER = ['prebuild', 'core', 'library', 'sketch', 'link', 'postbuild']
+
+
+def classify(exe, obj, linked):
+    """
+    Attribute one invocation.
+
+    Returns:
+        tuple: (category, unit name)
+    """
+    tool = Path(exe).name
+    if obj:
+        path = obj.replace('\\', '/')
+        name = Path(obj).name
+        if name.endswith('.o'):
+            name = name[:-2]
+        library = LIBRARY_DIR.search(obj)
+        if library:
+            return 'library', f"{library.group(1)}/{name}"
+        if '/sketch/' in path:
+            return 'sketch', name
+        if '/core/' in path:
+            return 'core', name
+        if path.endswith('.elf'):
+            return 'link', name
+    if tool.endswith(('ar', 'gcc-ar')) and not linked:
+        return 'core', 'core.a'
+    return ('postbuild' if linked else 'prebuild'), tool
+
+
+def profile_compile(cmd):
+    """
+    Run the verbose compile and time each step.
+
+    With --jobs 1 steps run one after another, so the time between two printed
+    command lines is the cost of the first one.
+
+    Returns:
+        tuple: (steps, total seconds, returncode, output lines)
+    """
+    steps = []
+    output = []
+    current = None
+    linked = False
+    start = time.perf_counter()
+
+    def close(now):
+        if current is not None:
+            current['end'] = now
+
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+    for line in process.stdout:
+        now = time.perf_counter() - start
+        line = line.rstrip()
+        output.append(line)
+
+        reused = REUSED.match(line)
+        if reused:
+            close(now)
+            current = None
+            category, unit = classify('', reused.group(1).strip(), linked)
+            steps.append({'category': category, 'unit': unit, 'start': now, 'end': now, 'cached': True, 'command': line})
+            continue
+
+        match = COMMAND_LINE.match(line)
+        if not match:
+            continue
+        close(now)
+        obj = OUTPUT_ARG.search(line)
+        category, unit = classify(match.group('exe'), obj.group(1) if obj else None, linked)
+        linked = linked or category == 'link'
+        current = {'category': category, 'unit': unit, 'start': now, 'end': now, 'cached': False, 'command': line}
+        steps.append(current)
+
+    process.wait()
+    total = time.perf_counter() - start
+    close(total)
+    return steps, total, process.returncode, output
+
+
+def chrome_trace(steps):
+    """Chrome trace-event JSON: one track per category, libraries on their own tracks"""
+    tracks = {}
+    events = []
+    for step in steps:
+        track = step['category'] if step['category'] != 'library' else f"library:{step['unit'].split('/')[0]}"
+        tid = tracks.setdefault(track, len(tracks) + 1)
+        events.append({
+            'name': step['unit'] + (' (cached)' if step['cached'] else ''),
+            'cat': step['category'],
+            'ph': 'X',
+            'ts': round(step['start'] * 1e6),
+            'dur': max(1, round((step['end'] - step['start']) * 1e6)),
+            'pid': 1,
+            'tid': tid,
+            'args': {'command': step['command'][:2000]},
+        })
+    events += [
+        {'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': track}}
+        for track, tid in tracks.items()
+    ]
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def print_breakdown(steps, total, top):
+    by_category = defaultdict(float)
+    by_library = defaultdict(float)
+    for step in steps:
+        seconds = step['end'] - step['start']
+        by_category[step['category']] += seconds
+        if step['category'] == 'library':
+            by_library[step['unit'].split('/')[0]] += seconds
+    accounted = sum(by_category.values())
+
+    summary = Table(show_header=True, header_style="bold cyan", box=None, padding=(0, 2))
+    summary.add_column("Phase")
+    summary.add_column("Time", justify="right")
+    summary.add_column("Share", justify="right")
+    summary.add_column("Steps", justify="right")
+    for category in CATEGORY_ORDER:
+        if category not in by_category:
+            continue
+        count = sum(1 for s in steps if s['category'] == category and not s['cached'])
+        cached = sum(1 for s in steps if s['category'] == category and s['cached'])
+        summary.add_row(category, f"{by_category[category]:.2f}s", f"{by_category[category] / total * 100:.1f}%",
+                        f"{count}" + (f" (+{cached} cached)" if cached else ""))
+    summary.add_row("[dim]arduino-cli overhead[/dim]", f"[dim]{total - accounted:.2f}s[/dim]",
+                    f"[dim]{(total - accounted) / total * 100:.1f}%[/dim]", "")
+    console.print(Panel(summary, title=f"[bold]⏱  Compile Profile ({total:.1f}s)[/bold]", border_style="cyan"))
+
+    if by_library:
+        libs = Table(show_header=True, header_style="bold cyan", box=None, padding=(0, 2))
+        libs.add_column("Library")
+        libs.add_column("Time", justify="right")
+        for name, seconds in sorted(by_library.items(), key=lambda kv: -kv[1]):
+            libs.add_row(name, f"{seconds:.2f}s")
+        console.print(Panel(libs, title="[bold]📚 Libraries[/bold]", border_style="blue"))
+
+    units = Table(show_header=True, header_style="bold cyan", box=None, padding=(0, 2))
+    units.add_column("Phase", style="dim")
+    units.add_column("Unit")
+    units.add_column("Time", justify="right")
+    units.add_column("Share", justify="right")
+    for step in sorted((s for s in steps if not s['cached']), key=lambda s: s['start'] - s['end'])[:top]:
+        seconds = step['end'] - step['start']
+        units.add_row(step['category'], step['unit'], f"{seconds:.2f}s", f"{seconds / total * 100:.1f}%")
+    console.print(Panel(units, title=f"[bold]🐢 Slowest {top} Steps[/bold]", border_style="magenta"))
+
+
+@click.command()
+@click.argument('sketch', type=click.Path(exists=True), required=False)
+@click.option('--board', '-b', default='esp32', show_default=True, type=click.Choice(sorted(BOARD_FQBN)), help='Board type')
+@click.option('--warm', is_flag=True, default=False, help='Profile an incremental build in the persistent build cache (default: cold build in a temporary directory)')
+@click.option('--no-optimize', is_flag=True, default=False, help='Compile without the -O3 build properties')
+@click.option('--trace', 'trace_path', default='build/compile_trace.json', show_default=True, help='Chrome trace output')
+@click.option('--top', default=20, show_default=True, help='Number of slowest steps to list')
+def cli(sketch, board, warm, no_optimize, trace_path, top):
+    """
+    Profile where an arduino-cli build spends its time
+    """
+    if sketch is None:
+        if not run_build_script():
+            console.print("[bold red]Aborting: Build step failed.[/bold red]")
+            sys.exit(1)
+        sketch = Path('build/build.ino')
+    sketch = Path(sketch).resolve()
+    if sketch.is_dir():
+        ino_files = sorted(sketch.glob('*.ino'))
+        if not ino_files:
+            console.print(f"[bold red]✗ Error:[/bold red] No .ino files found in {sketch}")
+            sys.exit(1)
+        sketch = ino_files[0]
+
+    fqbn = BOARD_FQBN[board]
+    optimize = not no_optimize
+    cache = cache_key = None
+    cache_hit = False
+    if warm:
+        from build_cache import BuildCache
+        from upload import build_properties
+        cache = BuildCache()
+        build_dir, cache_key, cache_hit = cache.acquire(fqbn, build_properties(optimize), sketch=sketch.parent)
+        temp_dir = None
+    else:
+        temp_dir = tempfile.mkdtemp(prefix='dap-profile-')
+        build_dir = temp_dir
+
+    cmd = build_compile_command(sketch, fqbn, cache_dir=build_dir, optimize=optimize, verbose=True) + ['--jobs', '1']
+    console.print(f"[dim]$ {shlex.join(cmd)}[/dim]")
+    start = time.time()
+    returncode = 1
+    try:
+        with console.status("[cyan]Compiling (verbose, single job)...[/cyan]"):
+            steps, total, returncode, output = profile_compile(cmd)
+    except FileNotFoundError:
+        console.print("[bold red]✗ Error:[/bold red] arduino-cli not found. Please install it first.")
+        sys.exit(1)
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        if cache:
+            # Same bookkeeping as upload.py: LRU time, hit stats, and the entry is released
+            cache.record(cache_key, time.time() - start, cache_hit, returncode == 0)
+
+    if returncode != 0:
+        console.print("[bold red]✗ Compilation Failed![/bold red]")
+        console.print("\n".join(output[-20:]), style="dim red")
+        sys.exit(1)
+
+    print_breakdown(steps, total, top)
+    trace_path = Path(trace_path)
+    trace_path.parent.mkdir(parents=True, exist_ok=True)
+    trace_path.write_text(json.dumps(chrome_trace(steps)))
+    console.print(f"[green]✓ Chrome trace written to {trace_path}[/green] [dim](open in chrome://tracing or ui.perfetto.dev)[/dim]")
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+dap - Unified HiFi-DAP Command Line
+Every subcommand is registered by name and imported only when it runs,
+so `dap ping` or `dap ls` does not pay for rich, esptool or numpy.
+Keep module-level imports here to the standard library and click
+(checked by scripts/check_import_budget.py).
+"""
+
+import importlib
+import runpy
+import sys
+import time
+from pathlib import Path
+
+import click
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+DEFAULT_BAUD = 460800
+
+# name -> (target, short help)
+#   'module:attr'  a click command, imported on use
+#   'path.py'      an argparse/sys.argv script, run as __main__ with the remaining arguments;
+#                  it gets --help too, so it must parse arguments before doing any work
+LAZY_COMMANDS = {
+    'boards':        ('board_detector.py', 'Detect connected boards'),
+    'boot':          ('boot_profiler:cli', 'Boot time profiling'),
+    'bridge':        ('stream_bridge.py', 'Serial monitor with an SSE bridge'),
+    'build':         ('../build.py', 'Stage src/ into the flat build sketch'),
+    'cache':         ('build_cache:cli', 'Manage the arduino-cli build cache'),
+    'convert':       ('audio_converter.py', 'Convert audio for the player'),
+    'dedup':         ('audio_fingerprint:cli', 'Find duplicate recordings by fingerprint'),
+    'dsp-bench':     ('dsp_bench:cli', 'Benchmark the DSP path on the host'),
+    'fleet-flash':   ('fleet_flash:cli', 'Flash every connected board'),
+    'fleet-monitor': ('fleet_monitor:cli', 'Monitor many boards at once'),
+    'index':         ('playlist_index:cli', 'Build / inspect the SD playlist index'),
+    'latency':       ('cmd_latency:cli', 'Command latency / load test'),
+    'matrix':        ('build_matrix:cli', 'Parallel multi-board build matrix'),
+    'overview':      ('track_overview:cli', 'Waveform / seek-table sidecars (.ovw)'),
+    'pcm':           ('pcm_stream:cli', 'Stream live PCM to the player'),
+    'playlist-bench': ('playlist_bench:cli', 'Check the paged playlist on the host'),
+    'ports':         ('device_discovery:cli', 'List / watch ESP32 serial ports'),
+    'profile':       ('compile_profiler:cli', 'Where the compile spends its time'),
+    'push':          ('serial_upload.py', 'Upload a file to the SD card over serial'),
+    'replay':        ('serial_replay:cli', 'Record and replay serial sessions'),
+    'size':          ('size_tracker:cli', 'Firmware size history'),
+    'upload':        ('upload:cli', 'Compile and flash the firmware'),
+}
+
+
+def script_command(name, path, help_text):
+    """Wrap a sys.argv-driven script; every argument (including --help) is passed through"""
+    @click.command(name, help=help_text, add_help_option=False,
+                   context_settings={'ignore_unknown_options': True, 'allow_extra_args': True})
+    @click.pass_context
+    def command(ctx):
+        script = (SCRIPTS_DIR / path).resolve()
+        sys.argv = [str(script)] + ctx.args
+        runpy.run_path(str(script), run_name='__main__')
+
+    return command
+
+
+class LazyGroup(click.Group):
+    """click group that imports a subcommand's module only when it is invoked"""
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(LAZY_COMMANDS))
+
+    def get_command(self, ctx, name):
+        command = super().get_command(ctx, name)
+        if command is not None or name not in LAZY_COMMANDS:
+            return command
+        target, help_text = LAZY_COMMANDS[name]
+        if target.endswith('.py'):
+            return script_command(name, target, help_text)
+        module_name, attr = target.split(':')
+        return getattr(importlib.import_module(module_name), attr)
+
+    def format_commands(self, ctx, formatter):
+        # Help text comes from the registry so `dap --help` imports nothing
+        rows = [(name, cmd.get_short_help_str()) for name, cmd in sorted(self.commands.items())]
+        rows += [(name, help_text) for name, (_, help_text) in LAZY_COMMANDS.items()]
+        with formatter.section('Commands'):
+            formatter.write_dl(sorted(rows))
+
+
+def resolve_port(port):
+    if port:
+        return port
+    from device_discovery import list_esp32_ports
+
+    ports = list_esp32_ports()
+    if not ports:
+        raise click.ClickException("No ESP32 serial port found (use --port)")
+    return ports[0]['device']
+
+
+def open_serial(port, baud):
+    import serial
+
+    try:
+        return serial.Serial(port, baud, timeout=0.05)
+    except serial.SerialException as e:
+        raise click.ClickException(str(e))
+
+
+def send_command(ser, command, done, timeout=3.0):
+    """
+    Send one line and read lines until done(line) is true.
+
+    Returns:
+        tuple: (lines, seconds) ; lines is None on timeout
+    """
+    ser.reset_input_buffer()
+    start = time.perf_counter()
+    ser.write(f"{command}\n".encode())
+    lines = []
+    while time.perf_counter() - start < timeout:
+        raw = ser.readline()
+        if not raw:
+            continue
+        line = raw.decode('utf-8', errors='replace').strip()
+        lines.append(line)
+        if done(line):
+            return lines, time.perf_counter() - start
+    return None, time.perf_counter() - start
+
+
+@click.group(cls=LazyGroup, context_settings={'help_option_names': ['-h', '--help']})
+def cli():
+    """
+    ESP32 HiFi-DAP tools
+    """
+
+
+@cli.command()
+@click.option('--port', '-p', help='Serial port (default: first detected ESP32)')
+@click.option('--baud', '-b', default=DEFAULT_BAUD, show_default=True, help='Baud rate')
+@click.option('--count', '-c', default=1, show_default=True, help='Number of pings')
+def ping(port, baud, count):
+    """Check that the player answers (round-trip time)"""
+    port = resolve_port(port)
+    failures = 0
+    with open_serial(port, baud) as ser:
+        for _ in range(count):
+            lines, seconds = send_command(ser, 'ping', lambda line: line == 'pong')
+            if lines is None:
+                failures += 1
+                click.echo(f"no reply from {port} ({seconds:.1f}s)")
+            else:
+                click.echo(f"pong from {port}: {seconds * 1000:.1f} ms")
+    sys.exit(1 if failures else 0)
+
+
+@cli.command()
+@click.option('--port', '-p', help='Serial port (default: first detected ESP32)')
+@click.option('--baud', '-b', default=DEFAULT_BAUD, show_default=True, help='Baud rate')
+def ls(port, baud):
+    """List files on the player's SD card"""
+    import json
+
+    port = resolve_port(port)
+    with open_serial(port, baud) as ser:
+        lines, _ = send_command(ser, 'list_json', lambda line: line.startswith('{"files"'), timeout=10.0)
+    if lines is None:
+        raise click.ClickException(f"no file list from {port}")
+    files = json.loads(lines[-1])['files']
+    for entry in files:
+        click.echo(f"{entry['size']:>12,}  {entry['name']}")
+    click.echo(f"{len(files)} files, {sum(e['size'] for e in files):,} bytes")
+
+
+@cli.command()
+@click.option('--port', '-p', help='Serial port (default: first detected ESP32)')
+@click.option('--baud', '-b', default=DEFAULT_BAUD, show_default=True, help='Baud rate')
+@click.option('--log', is_flag=True, default=False, help='Also log to a file')
+def monitor(port, baud, log):
+    """Interactive serial monitor"""
+    from monitor import monitor_serial
+
+    monitor_serial(resolve_port(port), baud, enable_input=True, log_to_file=log)
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,303 @@
+"""
+ESP32 裝置探索模組
+以 serial.tools.list_ports 加上 USB VID/PID 對照表即時找出 ESP32 序列埠（macOS / Linux），
+快取每個裝置的晶片識別資訊，並提供插拔事件監看器
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+
+import click
+import serial.tools.list_ports
+
+# rich 只在 CLI 輸出時載入，讓 `dap` 之類的工具 import 本模組時保持輕量
+_console = None
+
+
+def get_console():
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+
+# ESP32 常見 USB 橋接晶片 / 原生 USB
+USB_BRIDGES = {
+    (0x10C4, 0xEA60): 'CP210x',
+    (0x1A86, 0x7523): 'CH340',
+    (0x1A86, 0x55D4): 'CH9102',
+    (0x1A86, 0x55D3): 'CH343',
+    (0x0403, 0x6001): 'FT232R',
+    (0x0403, 0x6010): 'FT2232',
+    (0x0403, 0x6015): 'FT231X',
+    (0x303A, 0x1001): 'USB-JTAG/Serial',
+    (0x303A, 0x0002): 'ESP32-S2 USB CDC',
+}
+
+# 原生 USB 的 PID 只出現在有 USB 控制器的晶片上
+NATIVE_USB_FQBN = {
+    (0x303A, 0x1001): 'esp32:esp32:esp32s3',
+    (0x303A, 0x0002): 'esp32:esp32:esp32s2',
+}
+CHIP_FQBN = {
+    'ESP32-S3': 'esp32:esp32:esp32s3',
+    'ESP32-S2': 'esp32:esp32:esp32s2',
+    'ESP32-C3': 'esp32:esp32:esp32c3',
+    'ESP32': 'esp32:esp32:esp32',
+}
+
+IDENTITY_CACHE = Path.home() / '.cache' / 'esp32-hifi-dap' / 'devices.json'
+
+_cache_lock = threading.Lock()
+
+
+def device_key(info):
+    """
+    裝置的穩定識別鍵：USB 序號優先，其次為 USB 位置（同一個插槽），最後才用裝置路徑
+    """
+    vidpid = f"{info['vid'] or 0:04x}:{info['pid'] or 0:04x}"
+    if info.get('serial_number'):
+        return f"{vidpid}/sn/{info['serial_number']}"
+    if info.get('location'):
+        return f"{vidpid}/loc/{info['location']}"
+    return f"{vidpid}/dev/{info['device']}"
+
+
+def load_identities():
+    try:
+        return json.loads(IDENTITY_CACHE.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def remember_identity(info, chip=None, mac=None):
+    """
+    記錄裝置的晶片識別（例如燒錄或 esptool 探測後取得）
+
+    Args:
+        info (dict): list_esp32_ports() 的項目或只含 device 的字典
+        chip (str): 晶片名稱（如 ESP32-D0WD-V3、ESP32-S3）
+        mac (str): MAC 位址
+    """
+    if 'vid' not in info:
+        info = next((p for p in list_esp32_ports(all_ports=True) if p['device'] == info['device']), None)
+        if info is None:
+            return
+    with _cache_lock:
+        cache = load_identities()
+        entry = cache.setdefault(device_key(info), {})
+        if chip:
+            entry['chip'] = chip
+        if mac:
+            entry['mac'] = mac
+        entry['last_port'] = info['device']
+        entry['updated'] = time.time()
+        try:
+            IDENTITY_CACHE.parent.mkdir(parents=True, exist_ok=True)
+            IDENTITY_CACHE.write_text(json.dumps(cache, indent=2))
+        except OSError:
+            pass
+
+
+def guess_fqbn(info):
+    """由快取的晶片名稱或原生 USB VID/PID 推測 FQBN"""
+    chip = (info.get('chip') or '').upper()
+    for prefix, fqbn in CHIP_FQBN.items():
+        if chip.startswith(prefix):
+            return fqbn
+    return NATIVE_USB_FQBN.get((info['vid'], info['pid']), CHIP_FQBN['ESP32'])
+
+
+def list_esp32_ports(all_ports=False):
+    """
+    列出 ESP32 序列埠（不呼叫任何外部程式）
+
+    Args:
+        all_ports (bool): 也包含不在 VID/PID 對照表中的序列埠
+
+    Returns:
+        list: 序列埠資訊字典，已知橋接晶片在前
+    """
+    identities = load_identities()
+    ports = []
+    for port in serial.tools.list_ports.comports():
+        # macOS 的 /dev/tty.* 與 /dev/cu.* 是同一個裝置，只保留 cu
+        if port.device.startswith('/dev/tty.'):
+            continue
+        bridge = USB_BRIDGES.get((port.vid, port.pid))
+        if bridge is None and not all_ports:
+            continue
+        info = {
+            'device': port.device,
+            'vid': port.vid,
+            'pid': port.pid,
+            'serial_number': port.serial_number,
+            'location': port.location,
+            'description': port.description,
+            'manufacturer': port.manufacturer or 'Unknown',
+            'bridge': bridge,
+            'native_usb': (port.vid, port.pid) in NATIVE_USB_FQBN,
+        }
+        identity = identities.get(device_key(info), {})
+        info['chip'] = identity.get('chip')
+        info['mac'] = identity.get('mac')
+        info['fqbn'] = guess_fqbn(info)
+        ports.append(info)
+    ports.sort(key=lambda p: (p['bridge'] is None, p['device']))
+    return ports
+
+
+def probe_identity(info):
+    """
+    以 esptool 讀取晶片型號與 MAC 並寫入快取（會重置板子，只在快取沒有資料時使用）
+
+    Returns:
+        dict: 更新後的 info
+    """
+    import esptool
+
+    esp = esptool.detect_chip(info['device'])
+    try:
+        chip = esp.get_chip_description()
+        mac = ':'.join(f"{b:02x}" for b in esp.read_mac())
+    finally:
+        esp._port.close()
+    remember_identity(info, chip, mac)
+    info.update(chip=chip, mac=mac, fqbn=guess_fqbn({**info, 'chip': chip}))
+    return info
+
+
+class DeviceWatcher:
+    """
+    輪詢式插拔監看器
+
+    Args:
+        on_attach (callable): 插入回呼 func(info)
+        on_detach (callable): 拔除回呼 func(info)
+        interval (float): 輪詢間隔（秒）
+        all_ports (bool): 也監看未知的序列埠
+    """
+
+    def __init__(self, on_attach=None, on_detach=None, interval=0.5, all_ports=False):
+        self.on_attach = on_attach
+        self.on_detach = on_detach
+        self.interval = interval
+        self.all_ports = all_ports
+        self.known = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """
+        比對一次目前的裝置
+
+        Returns:
+            list: [('attach' | 'detach', info)]
+        """
+        current = {p['device']: p for p in list_esp32_ports(self.all_ports)}
+        events = [('detach', self.known[d]) for d in self.known if d not in current]
+        events += [('attach', current[d]) for d in current if d not in self.known]
+        self.known = current
+        for kind, info in events:
+            callback = self.on_attach if kind == 'attach' else self.on_detach
+            if callback:
+                callback(info)
+        return events
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.poll()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+
+def ports_table(ports):
+    from rich.table import Table
+
+    table = Table(show_header=True, header_style="bold cyan", border_style="cyan")
+    table.add_column("序列埠", style="magenta", no_wrap=True)
+    table.add_column("VID:PID", style="dim")
+    table.add_column("橋接晶片", style="yellow")
+    table.add_column("晶片")
+    table.add_column("MAC", style="dim")
+    table.add_column("FQBN", style="white dim")
+    for p in ports:
+        table.add_row(
+            p['device'],
+            f"{p['vid']:04X}:{p['pid']:04X}" if p['vid'] is not None else "-",
+            p['bridge'] or "-",
+            p['chip'] or "[dim]未知[/dim]",
+            p['mac'] or "-",
+            p['fqbn'],
+        )
+    return table
+
+
+@click.group()
+def cli():
+    """
+    ESP32 裝置探索
+    """
+
+
+@cli.command('list')
+@click.option('--all', 'all_ports', is_flag=True, default=False, help='包含未知的序列埠')
+@click.option('--probe', is_flag=True, default=False, help='用 esptool 探測尚未快取的晶片識別（會重置板子）')
+@click.option('--json', 'as_json', is_flag=True, default=False, help='輸出 JSON')
+def list_command(all_ports, probe, as_json):
+    """列出 ESP32 序列埠"""
+    console = get_console()
+    ports = list_esp32_ports(all_ports)
+    if probe:
+        for info in ports:
+            if not info['chip'] and info['bridge']:
+                try:
+                    probe_identity(info)
+                except Exception as e:
+                    console.print(f"[yellow]⚠[/yellow] {info['device']} 探測失敗: {e}")
+    if as_json:
+        print(json.dumps(ports, indent=2))
+    elif ports:
+        console.print(ports_table(ports))
+    else:
+        console.print("[yellow]⚠ 未偵測到 ESP32 裝置[/yellow]")
+
+
+@cli.command()
+@click.option('--interval', default=0.5, show_default=True, help='輪詢間隔（秒）')
+@click.option('--all', 'all_ports', is_flag=True, default=False, help='包含未知的序列埠')
+def watch(interval, all_ports):
+    """監看裝置插拔"""
+    console = get_console()
+
+    def attach(info):
+        console.print(f"[green]＋[/green] {info['device']}  [yellow]{info['bridge'] or '-'}[/yellow]  {info['chip'] or ''} [dim]{info['fqbn']}[/dim]")
+
+    def detach(info):
+        console.print(f"[red]－[/red] {info['device']}")
+
+    watcher = DeviceWatcher(attach, detach, interval, all_ports)
+    console.print("[cyan]監看中（Ctrl+C 結束）...[/cyan]")
+    try:
+        while True:
+            watcher.poll()
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    cli()
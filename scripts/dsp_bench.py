@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Host DSP Micro-Benchmark
+Builds scripts/host_bench/dsp_harness.cpp natively together with
+src/WavPlayer/AudioProcessor.cpp (ESP32 headers replaced by stubs), feeds it PCM from
+real WAV files and reports throughput, per-buffer latency and an output checksum.
+A saved --json result can be passed back as --baseline to catch output changes and
+throughput regressions in DSP edits without flashing a board.
+Both build-time DSP engines (float / fixed) are benchmarked by default and the
+fixed-point output is checked against the float reference.
+"""
+
+import json
+import math
+import os
+import shlex
+import struct
+import subprocess
+import sys
+import tempfile
+import wave
+from array import array
+from pathlib import Path
+
+import click
+from rich.console import Console
+from rich.table import Table
+
+console = Console()
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SRC_DIR = PROJECT_ROOT / 'src' / 'WavPlayer'
+BENCH_DIR = Path(__file__).resolve().parent / 'host_bench'
+HARNESS = BENCH_DIR / 'dsp_harness.cpp'
+BUILD_DIR = PROJECT_ROOT / 'build' / 'host_bench'
+DSP_SOURCES = [SRC_DIR / 'AudioProcessor.cpp', SRC_DIR / 'HiResWav.cpp']
+ENGINES = {'float': 'DSP_ENGINE_FLOAT', 'fixed': 'DSP_ENGINE_FIXED'}
+
+
+def harness_inputs():
+    return [HARNESS, *DSP_SOURCES, *SRC_DIR.glob('*.h'), *(BENCH_DIR / 'stubs').glob('*.h')]
+
+
+def build_harness(engine='float', cxx=None, cxxflags='-O2', force=False):
+    """
+    Compile the harness for one DSP engine when any source or header is newer than the binary.
+
+    Returns:
+        Path: harness executable
+    """
+    cxx = cxx or os.environ.get('CXX', 'g++')
+    binary = BUILD_DIR / f'dsp_harness_{engine}'
+    flags_file = BUILD_DIR / f'dsp_harness_{engine}.flags'
+    if not force and binary.exists() and flags_file.exists() and flags_file.read_text() == cxxflags:
+        built = binary.stat().st_mtime
+        if all(p.stat().st_mtime <= built for p in harness_inputs()):
+            return binary
+    BUILD_DIR.mkdir(parents=True, exist_ok=True)
+    cmd = [cxx, '-std=c++17', *shlex.split(cxxflags), f'-DDSP_ENGINE={ENGINES[engine]}',
+           '-I', str(BENCH_DIR / 'stubs'), '-I', str(SRC_DIR),
+           str(HARNESS), *map(str, DSP_SOURCES), '-o', str(binary)]
+    console.print(f"[dim]$ {shlex.join(cmd)}[/dim]")
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    except FileNotFoundError:
+        console.print(f"[bold red]✗ Error:[/bold red] {cxx} not found. Install a C++ compiler or set CXX.")
+        sys.exit(1)
+    if result.returncode != 0:
+        console.print("[bold red]✗ Harness build failed[/bold red]")
+        console.print(result.stderr, style="dim red")
+        sys.exit(1)
+    flags_file.write_text(cxxflags)
+    return binary
+
+
+def pack_samples(samples, bits):
+    """Left-justified 32-bit ints -> little-endian PCM of `bits` (24 = packed 3 bytes)"""
+    if bits == 16:
+        return struct.pack(f'<{len(samples)}h', *(s >> 16 for s in samples))
+    if bits == 24:
+        return b''.join(((s >> 8) & 0xFFFFFF).to_bytes(3, 'little') for s in samples)
+    return struct.pack(f'<{len(samples)}i', *samples)
+
+
+def wav_to_pcm(path, bits=16):
+    """
+    Read a WAV file as interleaved stereo PCM of `bits` (16, packed 24, or 32).
+
+    Mono is duplicated to both channels; samples are truncated or zero-extended
+    to the requested width.
+
+    Returns:
+        tuple: (pcm bytes, sample rate)
+    """
+    with wave.open(str(path), 'rb') as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+    if channels not in (1, 2):
+        raise click.ClickException(f"{path}: {channels} channels not supported")
+    if width == 2 and bits == 16:
+        samples = memoryview(frames).cast('h')
+        if channels == 1:
+            samples = [s for s in samples for _ in (0, 1)]
+        return struct.pack(f'<{len(samples)}h', *samples), rate
+    if width not in (2, 3, 4):
+        raise click.ClickException(f"{path}: {width * 8}-bit samples not supported")
+    samples = [int.from_bytes(frames[i:i + width], 'little', signed=True) << (32 - 8 * width)
+               for i in range(0, len(frames), width)]
+    if channels == 1:
+        samples = [s for s in samples for _ in (0, 1)]
+    return pack_samples(samples, bits), rate
+
+
+def synthetic_pcm(seconds, rate=44100, bits=16):
+    """Deterministic test signal: bass + mid + treble tones with a slow level sweep"""
+    total = int(seconds * rate)
+    samples = []
+    for n in range(total):
+        t = n / rate
+        level = 0.2 + 0.75 * n / total
+        left = level * (0.5 * math.sin(2 * math.pi * 60 * t) + 0.3 * math.sin(2 * math.pi * 1000 * t)
+                        + 0.2 * math.sin(2 * math.pi * 8000 * t))
+        right = level * (0.6 * math.sin(2 * math.pi * 110 * t) + 0.4 * math.sin(2 * math.pi * 5000 * t))
+        samples += (left, right)
+    if bits == 16:
+        return struct.pack(f'<{len(samples)}h', *(int(x * 32767) for x in samples))
+    # Hi-res inputs carry 24 significant bits, like a 24-bit master
+    return pack_samples([int(x * 8388607) << 8 for x in samples], bits)
+
+
+def run_harness(binary, pcm_path, buffer, volume, bit_depth, repeat, rate=44100, output=None, input_bits=16):
+    cmd = [str(binary), str(pcm_path), '--buffer', str(buffer), '--volume', str(volume),
+           '--bit-depth', str(bit_depth), '--rate', str(rate), '--repeat', str(repeat),
+           '--input-bits', str(input_bits)]
+    if output:
+        cmd += ['--output', str(output)]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise click.ClickException(f"harness failed: {result.stderr.strip()}")
+    return json.loads(result.stdout)
+
+
+def output_difference(reference_path, candidate_path, bit_depth):
+    """
+    Compare two captured outputs sample by sample.
+
+    Returns:
+        tuple: (max |difference|, RMS difference) in 16-bit LSBs
+    """
+    typecode, shift = ('h', 0) if bit_depth == 16 else ('i', bit_depth - 16 if bit_depth == 24 else 16)
+    reference = array(typecode, Path(reference_path).read_bytes())
+    candidate = array(typecode, Path(candidate_path).read_bytes())
+    worst = 0
+    squares = 0
+    for a, b in zip(reference, candidate):
+        d = abs((a >> shift) - (b >> shift))
+        worst = max(worst, d)
+        squares += d * d
+    return worst, math.sqrt(squares / max(1, len(reference)))
+
+
+def result_key(result):
+    key = f"{result['engine']}|{result['input']}|{result['buffer_bytes']}|{result['volume']}|{result['bit_depth']}"
+    bits = result.get('input_bits', 16)
+    return key if bits == 16 else f"{key}|in{bits}"
+
+
+@click.command()
+@click.argument('wav_files', nargs=-1, type=click.Path(exists=True, dir_okay=False))
+@click.option('--buffer', '-B', 'buffers', multiple=True, type=int, default=[512, 2048, 8192], show_default=True,
+              help='write() buffer size in bytes (repeatable)')
+@click.option('--volume', '-v', default=50, show_default=True, help='Volume percent passed to updateLoudness()')
+@click.option('--bit-depth', type=click.Choice(['16', '24', '32']), default='16', show_default=True, help='Output bit depth')
+@click.option('--input-bits', type=click.Choice(['16', '24', '32']), default='16', show_default=True,
+              help='Input PCM width; 24/32 take the decoder-less hi-res WAV path')
+@click.option('--repeat', '-r', default=5, show_default=True, help='Passes over each input')
+@click.option('--engine', '-e', 'engines', multiple=True, type=click.Choice(sorted(ENGINES)), default=['float', 'fixed'],
+              show_default=True, help='DSP engine build (repeatable)')
+@click.option('--tolerance', default=8, show_default=True, help='Max |fixed - float| output difference in LSBs')
+@click.option('--synthetic', default=10.0, show_default=True, help='Seconds of generated audio when no WAV is given')
+@click.option('--cxxflags', default='-O2', show_default=True, help='Compiler flags for the harness')
+@click.option('--rebuild', is_flag=True, default=False, help='Force a harness rebuild')
+@click.option('--json', 'json_path', type=click.Path(dir_okay=False), help='Write results to a JSON file')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), help='Compare against a previous --json result')
+@click.option('--max-slowdown', default=10.0, show_default=True, help='Allowed throughput drop vs. baseline (%)')
+def cli(wav_files, buffers, volume, bit_depth, input_bits, repeat, engines, tolerance, synthetic, cxxflags, rebuild,
+        json_path, baseline, max_slowdown):
+    """
+    Benchmark the AudioProcessor DSP path natively on the host
+    """
+    engines = [engine for engine in ENGINES if engine in engines]
+    binaries = {engine: build_harness(engine, cxxflags=cxxflags, force=rebuild) for engine in engines}
+    compare = 'float' in engines and len(engines) > 1
+
+    inputs = []
+    with tempfile.TemporaryDirectory(prefix='dap-dsp-') as tmp:
+        if wav_files:
+            for path in wav_files:
+                pcm, rate = wav_to_pcm(path, int(input_bits))
+                inputs.append((Path(path).name, pcm, rate))
+        else:
+            inputs.append((f"synthetic-{synthetic:g}s", synthetic_pcm(synthetic, bits=int(input_bits)), 44100))
+
+        results = []
+        for name, pcm, rate in inputs:
+            pcm_path = Path(tmp) / 'input.pcm'
+            pcm_path.write_bytes(pcm)
+            for buffer in buffers:
+                outputs = {}
+                for engine, binary in binaries.items():
+                    outputs[engine] = Path(tmp) / f'{engine}.pcm' if compare else None
+                    with console.status(f"[cyan]{name} @ {buffer} B ({engine})...[/cyan]"):
+                        result = run_harness(binary, pcm_path, buffer, volume, int(bit_depth), repeat, rate, outputs[engine],
+                                             int(input_bits))
+                    result['input'] = name
+                    results.append(result)
+                if compare:
+                    for result in results[-len(engines):]:
+                        if result['engine'] != 'float':
+                            worst, rms = output_difference(outputs['float'], outputs[result['engine']], int(bit_depth))
+                            result['vs_float'] = {'max_lsb': worst, 'rms_lsb': round(rms, 3)}
+
+    reference = {}
+    if baseline:
+        reference = {result_key(r): r for r in json.loads(Path(baseline).read_text())['results']}
+
+    table = Table(show_header=True, header_style="bold cyan", border_style="cyan")
+    table.add_column("Input")
+    table.add_column("Engine")
+    table.add_column("Buffer", justify="right")
+    table.add_column("Msamples/s", justify="right")
+    table.add_column("× realtime", justify="right")
+    table.add_column("p50 µs", justify="right")
+    table.add_column("p99 µs", justify="right")
+    table.add_column("max µs", justify="right")
+    table.add_column("Deadline µs", justify="right", style="dim")
+    table.add_column("Checksum")
+    if compare:
+        table.add_column("Δ float (max/rms LSB)", justify="right")
+    if reference:
+        table.add_column("vs. baseline", justify="right")
+
+    failed = False
+    for r in results:
+        latency = r['latency_us']
+        row = [r['input'], r['engine'], f"{r['buffer_bytes']}", f"{r['samples_per_sec'] / 1e6:.2f}", f"{r['realtime_factor']:.0f}",
+               f"{latency['p50']:.1f}", f"{latency['p99']:.1f}", f"{latency['max']:.1f}",
+               f"{r['buffer_deadline_us']:.0f}", r['checksum']]
+        if compare:
+            diff = r.get('vs_float')
+            if diff is None:
+                row.append("[dim]reference[/dim]")
+            else:
+                bad = diff['max_lsb'] > tolerance
+                failed |= bad
+                color = 'red' if bad else 'green'
+                row.append(f"[{color}]{diff['max_lsb']} / {diff['rms_lsb']:.2f}[/{color}]")
+        if reference:
+            base = reference.get(result_key(r))
+            if base is None:
+                row.append("[dim]-[/dim]")
+            else:
+                change = (r['samples_per_sec'] / base['samples_per_sec'] - 1) * 100
+                slow = change < -max_slowdown
+                differs = base['checksum'] != r['checksum']
+                failed |= slow or differs
+                color = 'red' if slow else 'green' if change > 0 else 'white'
+                row.append(f"[{color}]{change:+.1f}%[/{color}]" + (" [red]output differs[/red]" if differs else ""))
+        table.add_row(*row)
+    console.print(table)
+
+    if json_path:
+        Path(json_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(json_path).write_text(json.dumps({'cxxflags': cxxflags, 'results': results}, indent=2))
+        console.print(f"[green]✓ Results written to {json_path}[/green]")
+    if failed:
+        console.print("[bold red]✗ Regression (baseline or fixed/float tolerance)[/bold red]")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    cli()
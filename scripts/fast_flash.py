@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Differential ESP32 Flashing
+Compares each image with the flash contents using the stub's on-device MD5,
+writes only the 64 KB blocks that differ, at the highest baud the link sustains
+"""
+
+import hashlib
+import io
+import json
+import threading
+import time
+import zlib
+from pathlib import Path
+
+import esptool
+import serial
+from esptool.loader import DEFAULT_TIMEOUT, ERASE_WRITE_TIMEOUT_PER_MB, timeout_per_mb
+from rich.console import Console
+from rich.panel import Panel
+from rich.progress import BarColumn, Progress, SpinnerColumn, TaskProgressColumn, TextColumn
+from rich.table import Table
+
+console = Console()
+
+ROM_BAUD = 115200
+# Tried from fastest to slowest; the first one that survives a probe is used
+BAUD_CANDIDATES = (2000000, 1500000, 921600, 460800)
+# Diff granularity: flash erase-block size
+BLOCK_SIZE = 0x10000
+# Bootloader header settings of the normal upload path (upload.build_esptool_command)
+FLASH_MODE = 'dio'
+FLASH_FREQ = '40m'
+FLASH_MODES = {'qio': 0, 'qout': 1, 'dio': 2, 'dout': 3}
+BAUD_CACHE = Path.home() / '.cache' / 'esp32-hifi-dap' / 'flash_baud.json'
+
+LINK_ERRORS = (esptool.FatalError, serial.SerialException, OSError)
+
+_baud_cache_lock = threading.Lock()
+
+
+def load_baud_cache():
+    try:
+        return json.loads(BAUD_CACHE.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_baud_cache(port, baud):
+    with _baud_cache_lock:
+        cache = load_baud_cache()
+        cache[port] = baud
+        try:
+            BAUD_CACHE.parent.mkdir(parents=True, exist_ok=True)
+            BAUD_CACHE.write_text(json.dumps(cache, indent=2))
+        except OSError:
+            pass
+
+
+def connect(port):
+    """Reset into the ROM bootloader and start the flasher stub"""
+    esp = esptool.detect_chip(port, ROM_BAUD)
+    return esp.run_stub()
+
+
+def close(esp):
+    try:
+        esp._port.close()
+    except (AttributeError, OSError, serial.SerialException):
+        pass
+
+
+def negotiate_baud(port, candidates=BAUD_CANDIDATES):
+    """
+    Connect and switch to the highest baud that passes a probe.
+    The last good baud per port is tried first next time.
+
+    Returns:
+        tuple: (stub loader, baud)
+    """
+    cached = load_baud_cache().get(port)
+    order = [cached] + [b for b in candidates if b != cached] if cached in candidates else list(candidates)
+
+    esp = connect(port)
+    for baud in order:
+        try:
+            esp.change_baud(baud)
+            # Probe: a few round trips with 16-byte MD5 replies
+            for _ in range(3):
+                esp.flash_md5sum(0, 0x1000)
+            save_baud_cache(port, baud)
+            return esp, baud
+        except LINK_ERRORS:
+            console.print(f"[yellow]⚠ {baud} baud unstable, stepping down[/yellow]")
+            close(esp)
+            time.sleep(0.2)
+            esp = connect(port)
+    return esp, ROM_BAUD
+
+
+def changed_blocks(esp, offset, data):
+    """
+    Compare an image with flash block by block.
+
+    Returns:
+        list: [(offset, bytes)] of contiguous runs that differ
+    """
+    if esp.flash_md5sum(offset, len(data)) == hashlib.md5(data).hexdigest():
+        return []
+
+    runs = []
+    for start in range(0, len(data), BLOCK_SIZE):
+        block = data[start:start + BLOCK_SIZE]
+        if esp.flash_md5sum(offset + start, len(block)) == hashlib.md5(block).hexdigest():
+            continue
+        if runs and runs[-1][0] + len(runs[-1][1]) == offset + start:
+            runs[-1] = (runs[-1][0], runs[-1][1] + block)
+        else:
+            runs.append((offset + start, block))
+    return runs
+
+
+def write_run(esp, offset, size, compressed, on_progress=None):
+    """Compressed write of one contiguous run (stub mode)"""
+    esp.flash_defl_begin(size, len(compressed), offset)
+    timeout = max(DEFAULT_TIMEOUT, timeout_per_mb(ERASE_WRITE_TIMEOUT_PER_MB, 2 * BLOCK_SIZE))
+    for seq, start in enumerate(range(0, len(compressed), esp.FLASH_WRITE_SIZE)):
+        block = compressed[start:start + esp.FLASH_WRITE_SIZE]
+        esp.flash_defl_block(block, seq, timeout=timeout)
+        if on_progress:
+            on_progress(len(block))
+
+
+def read_mac(esp):
+    try:
+        return ':'.join(f"{b:02x}" for b in esp.read_mac())
+    except LINK_ERRORS + (AttributeError, TypeError):
+        return None
+
+
+def detected_flash_size(esp):
+    """Flash size string as `--flash_size detect` resolves it ; None if the chip does not say"""
+    from esptool.cmds import DETECTED_FLASH_SIZES
+
+    try:
+        return DETECTED_FLASH_SIZES.get((esp.flash_id() >> 16) & 0xFF)
+    except LINK_ERRORS:
+        return None
+
+
+def patch_bootloader_header(esp, data, flash_size):
+    """
+    The bootloader as `write_flash --flash_mode dio --flash_freq 40m --flash_size detect`
+    writes it: esptool rewrites the mode/size/frequency header bytes and, when the image
+    carries an appended SHA-256, recomputes it. Diffing the file as it is on disk would
+    see the first block as changed after every normal upload, and write another header.
+    """
+    if len(data) < 24 or data[0] != esp.ESP_IMAGE_MAGIC:
+        return data
+    size = esp.parse_flash_size_arg(flash_size) if flash_size else data[3] & 0xF0
+    header = bytes([FLASH_MODES[FLASH_MODE], size + esp.parse_flash_freq_arg(FLASH_FREQ)])
+    if header == data[2:4]:
+        return data
+    data = data[:2] + header + data[4:]
+    if data[8 + 15] == 1:  # Extended header: SHA-256 appended
+        length = esp.BOOTLOADER_IMAGE(io.BytesIO(data)).data_length
+        data = data[:length] + hashlib.sha256(data[:length]).digest() + data[length + 32:]
+    return data
+
+
+def fast_flash(port, images, bauds=BAUD_CANDIDATES, reset=True, on_progress=None):
+    """
+    Flash only what changed.
+
+    Args:
+        port (str): Serial port
+        images (list): [(name, offset, path)]; offset None means the chip's bootloader offset
+        bauds (tuple): Candidate baud rates, fastest first
+        reset (bool): Hard reset into the application afterwards
+        on_progress (callable): func(percent) instead of the console progress bar
+
+    Returns:
+        dict: Per-image results and timing
+    """
+    start = time.time()
+    esp, baud = negotiate_baud(port, bauds)
+    result = {'chip': esp.CHIP_NAME, 'mac': read_mac(esp), 'baud': baud, 'images': [], 'written': 0, 'skipped': 0}
+
+    try:
+        plan = []
+        flash_size = detected_flash_size(esp)
+        for name, offset, path in images:
+            data = Path(path).read_bytes()
+            offset = esp.BOOTLOADER_FLASH_OFFSET if offset is None else offset
+            if offset == esp.BOOTLOADER_FLASH_OFFSET:
+                data = patch_bootloader_header(esp, data, flash_size)
+            runs = changed_blocks(esp, offset, data)
+            changed = sum(len(run) for _, run in runs)
+            result['images'].append({'name': name, 'offset': offset, 'size': len(data), 'changed': changed})
+            if runs:
+                result['written'] += changed
+            else:
+                result['skipped'] += len(data)
+            for run_offset, run in runs:
+                run += b'\xff' * (-len(run) % 4)
+                plan.append((name, run_offset, run, zlib.compress(run, 9)))
+
+        if plan:
+            total = sum(len(c) for *_, c in plan)
+            if on_progress:
+                sent = 0
+
+                def advance(n):
+                    nonlocal sent
+                    sent += n
+                    on_progress(sent * 100 / total)
+
+                for _, run_offset, run, compressed in plan:
+                    write_run(esp, run_offset, len(run), compressed, advance)
+            else:
+                with Progress(
+                    SpinnerColumn(),
+                    TextColumn("[progress.description]{task.description}"),
+                    BarColumn(),
+                    TaskProgressColumn(),
+                    console=console
+                ) as progress:
+                    task = progress.add_task("[green]Writing...[/green]", total=total)
+                    for name, run_offset, run, compressed in plan:
+                        progress.update(task, description=f"[green]{name} @ {run_offset:#08x}[/green]")
+                        write_run(esp, run_offset, len(run), compressed, lambda n: progress.update(task, advance=n))
+            # Not acknowledged until the last block has actually reached flash
+            esp.flash_defl_finish(reboot=False)
+
+            for name, run_offset, run, _ in plan:
+                if esp.flash_md5sum(run_offset, len(run)) != hashlib.md5(run).hexdigest():
+                    raise esptool.FatalError(f"Verify failed for {name} at {run_offset:#x}")
+
+        if reset:
+            esp.hard_reset()
+    finally:
+        close(esp)
+
+    result['seconds'] = time.time() - start
+    return result
+
+
+def print_result(result):
+    table = Table(show_header=True, header_style="bold cyan", box=None, padding=(0, 2))
+    table.add_column("Image")
+    table.add_column("Offset", justify="right")
+    table.add_column("Size", justify="right")
+    table.add_column("Written", justify="right")
+    for image in result['images']:
+        written = f"[yellow]{image['changed']:,}[/yellow]" if image['changed'] else "[green]unchanged[/green]"
+        table.add_row(image['name'], f"{image['offset']:#07x}", f"{image['size']:,}", written)
+    console.print(Panel(
+        table,
+        title=f"[bold green]⚡ Fast Flash ({result['chip']} @ {result['baud']} baud, {result['seconds']:.1f}s)[/bold green]",
+        border_style="green"
+    ))
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Production-Line Fleet Flashing
+Compiles once, flashes every connected board concurrently with per-port progress,
+runs the boot diagnostic on each and writes a per-device pass/fail report
+"""
+
+import csv
+import json
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import click
+from rich.console import Console
+from rich.panel import Panel
+from rich.progress import BarColumn, Progress, TaskProgressColumn, TextColumn, TimeElapsedColumn
+from rich.table import Table
+
+from device_discovery import remember_identity
+from upload import (
+    BOARD_FQBN,
+    build_esptool_command,
+    capture_boot_log,
+    compile_sketch,
+    diagnose_boot,
+    esp32_images,
+    find_esptool,
+    find_serial_ports,
+    parse_esptool_line,
+    run_build_script,
+)
+
+console = Console()
+
+REPORT_FIELDS = [
+    'port', 'mac', 'chip', 'result', 'flash_ok', 'flash_seconds', 'baud',
+    'bytes_written', 'booted', 'crash', 'psram', 'boot_seconds', 'total_seconds', 'error',
+]
+
+
+def flash_with_esptool(port, images, baud, on_progress):
+    """
+    Flash all images through the esptool executable, parsing its progress.
+
+    Returns:
+        dict: flash_ok, mac, chip, error
+    """
+    esptool = find_esptool()
+    if esptool is None:
+        return {'flash_ok': False, 'error': 'esptool not found'}
+
+    state = {}
+    tail = []
+    process = subprocess.Popen(build_esptool_command(esptool, port, baud, images),
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    for line in process.stdout:
+        parse_esptool_line(line, state, len(images))
+        on_progress(state.get('progress', 0))
+        tail = (tail + [line.strip()])[-5:]
+    process.wait()
+
+    ok = process.returncode == 0
+    return {
+        'flash_ok': ok,
+        'mac': state.get('mac'),
+        'chip': state.get('chip'),
+        'baud': baud,
+        'bytes_written': sum(Path(path).stat().st_size for _, _, path in images) if ok else 0,
+        'error': None if ok else ' | '.join(line for line in tail if line),
+    }
+
+
+def flash_differential(port, images, on_progress):
+    """Flash only changed blocks via fast_flash (esptool library)"""
+    import fast_flash
+
+    try:
+        result = fast_flash.fast_flash(port, images, on_progress=on_progress)
+    except fast_flash.LINK_ERRORS as e:
+        return {'flash_ok': False, 'error': str(e)}
+    return {
+        'flash_ok': True,
+        'mac': result['mac'],
+        'chip': result['chip'],
+        'baud': result['baud'],
+        'bytes_written': result['written'],
+        'error': None,
+    }
+
+
+def flash_device(port, images, baud, fast, diag_duration, progress, task):
+    """
+    Flash one board and run its boot diagnostic (runs in a worker thread).
+
+    Returns:
+        dict: Report row
+    """
+    start = time.time()
+    row = {'port': port}
+
+    def on_progress(pct):
+        progress.update(task, completed=pct)
+
+    progress.update(task, description=f"[cyan]{port}[/cyan] flashing")
+    if fast:
+        row.update(flash_differential(port, images, on_progress))
+    else:
+        row.update(flash_with_esptool(port, images, baud, on_progress))
+    row['flash_seconds'] = round(time.time() - start, 2)
+    if row.get('mac'):
+        remember_identity({'device': port}, row.get('chip'), row['mac'])
+
+    if row['flash_ok'] and diag_duration > 0:
+        progress.update(task, completed=100, description=f"[cyan]{port}[/cyan] boot check")
+        boot_start = time.time()
+        try:
+            row.update(diagnose_boot(capture_boot_log(port, duration=diag_duration, echo=False)))
+        except Exception as e:
+            row.update({'booted': False, 'crash': False, 'psram': False, 'passed': False, 'error': f"boot check: {e}"})
+        row['boot_seconds'] = round(time.time() - boot_start, 2)
+        passed = row.pop('passed')
+    else:
+        passed = row['flash_ok']
+
+    row['result'] = 'PASS' if passed else 'FAIL'
+    row['total_seconds'] = round(time.time() - start, 2)
+    color = "green" if passed else "red"
+    progress.update(task, completed=100, description=f"[{color}]{port} {row['result']}[/{color}]")
+    return row
+
+
+def fleet_flash(ports, images, baud=921600, fast=False, jobs=4, diag_duration=5):
+    """
+    Flash every port with bounded parallelism.
+
+    Returns:
+        list: Report rows in port order
+    """
+    results = {}
+    with Progress(
+        TextColumn("{task.description}", justify="left"),
+        BarColumn(),
+        TaskProgressColumn(),
+        TimeElapsedColumn(),
+        console=console,
+    ) as progress:
+        tasks = {port: progress.add_task(f"[dim]{port} queued[/dim]", total=100) for port in ports}
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                pool.submit(flash_device, port, images, baud, fast, diag_duration, progress, tasks[port]): port
+                for port in ports
+            }
+            for future in as_completed(futures):
+                port = futures[future]
+                try:
+                    results[port] = future.result()
+                except Exception as e:
+                    results[port] = {'port': port, 'result': 'FAIL', 'flash_ok': False, 'error': str(e)}
+    return [results[port] for port in ports]
+
+
+def write_report(rows, path):
+    """Write the report as CSV or JSON depending on the file suffix"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix.lower() == '.csv':
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        path.write_text(json.dumps({'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'devices': rows}, indent=2))
+
+
+def print_report(rows, wall):
+    def flag(value, bad=False):
+        if value is None:
+            return "-"
+        if value:
+            return "[red]yes[/red]" if bad else "[green]yes[/green]"
+        return "[green]no[/green]" if bad else "[dim]no[/dim]"
+
+    table = Table(show_header=True, header_style="bold cyan", border_style="cyan")
+    table.add_column("Port")
+    table.add_column("MAC")
+    table.add_column("Chip", style="dim")
+    table.add_column("Flash", justify="right")
+    table.add_column("Booted")
+    table.add_column("Crash")
+    table.add_column("PSRAM")
+    table.add_column("Result")
+    for row in rows:
+        table.add_row(
+            row['port'],
+            row.get('mac') or "-",
+            row.get('chip') or "-",
+            f"{row['flash_seconds']:.1f}s" if 'flash_seconds' in row else "-",
+            flag(row.get('booted')),
+            flag(row.get('crash'), bad=True),
+            flag(row.get('psram')),
+            "[bold green]PASS[/bold green]" if row['result'] == 'PASS' else "[bold red]FAIL[/bold red]",
+        )
+    passed = sum(row['result'] == 'PASS' for row in rows)
+    console.print(Panel(table, title=f"[bold]🏭 Fleet Flash — {passed}/{len(rows)} passed in {wall:.1f}s[/bold]", border_style="cyan"))
+    for row in rows:
+        if row.get('error'):
+            console.print(f"[red]{row['port']}:[/red] {row['error']}")
+
+
+@click.command()
+@click.argument('sketch', type=click.Path(exists=True), required=False)
+@click.option('--board', '-b', default='esp32', show_default=True, type=click.Choice(sorted(BOARD_FQBN)), help='Board type')
+@click.option('--port', '-p', 'ports', multiple=True, help='Port to flash (repeatable, default: every detected port)')
+@click.option('--jobs', '-j', default=4, show_default=True, help='Boards flashed in parallel')
+@click.option('--baud', default=921600, show_default=True, help='Upload baud rate (esptool mode)')
+@click.option('--fast-flash', 'fast', is_flag=True, default=False, help='Write only blocks that differ from flash')
+@click.option('--diag-duration', default=5, show_default=True, help='Seconds of boot log per board (0 = skip)')
+@click.option('--report', 'report_path', type=click.Path(), default=None,
+              help='Report file (.json or .csv, default: build/fleet/report_<time>.json)')
+@click.option('--no-build', is_flag=True, default=False, help='Skip build.py and compile (reuse build/)')
+def cli(sketch, board, ports, jobs, baud, fast, diag_duration, report_path, no_build):
+    """
+    Compile once and flash every connected board concurrently
+    """
+    ports = list(ports) or find_serial_ports()
+    if not ports:
+        console.print("[bold red]✗ Error:[/bold red] No USB serial port found.")
+        sys.exit(1)
+    console.print(f"[green]✓ {len(ports)} device(s):[/green] {', '.join(ports)}")
+
+    build_dir = Path("build").resolve()
+    if sketch is None:
+        if not no_build and not run_build_script():
+            console.print("[bold red]Aborting: Build step failed.[/bold red]")
+            sys.exit(1)
+        sketch = build_dir / "build.ino"
+
+    if not no_build and not compile_sketch(sketch, BOARD_FQBN[board], build_path=str(build_dir)):
+        sys.exit(1)
+
+    images = esp32_images(sketch, build_dir)
+    if images is None:
+        console.print(f"[bold red]✗ Error:[/bold red] Missing build artifacts in {build_dir}")
+        sys.exit(1)
+
+    start = time.time()
+    rows = fleet_flash(ports, images, baud=baud, fast=fast, jobs=jobs, diag_duration=diag_duration)
+    print_report(rows, time.time() - start)
+
+    report_path = report_path or build_dir / 'fleet' / time.strftime('report_%Y%m%d_%H%M%S.json')
+    write_report(rows, report_path)
+    console.print(f"[green]✓ Report written to {report_path}[/green]")
+
+    sys.exit(0 if all(row['result'] == 'PASS' for row in rows) else 1)
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,433 @@
+"""
+多埠序列監測模組（機隊模式）
+以單一 selector 事件迴圈同時監看多台播放器（不為每個埠建立執行緒），
+輸出加上裝置前綴與顏色，並合併寫入以裝置索引的記錄資料庫
+"""
+
+import glob
+import os
+import re
+import selectors
+import sqlite3
+import sys
+import time
+from collections import deque
+from datetime import datetime
+
+import click
+import serial
+from rich.console import Console
+from rich.panel import Panel
+from rich.table import Table
+from rich.text import Text
+
+from device_discovery import list_esp32_ports
+
+console = Console()
+
+# 預設掃描的序列埠樣式（macOS 與 Linux）
+DEFAULT_PORT_PATTERNS = [
+    '/dev/cu.usbserial-*',
+    '/dev/cu.SLAB_USBtoUART',
+    '/dev/cu.usbmodem*',
+    '/dev/cu.wchusbserial*',
+    '/dev/ttyUSB*',
+    '/dev/ttyACM*',
+]
+
+# 每台裝置輪流使用的顏色
+DEVICE_COLORS = [
+    'cyan', 'magenta', 'green', 'yellow', 'blue', 'red',
+    'bright_cyan', 'bright_magenta', 'bright_green', 'bright_yellow', 'bright_blue', 'bright_red',
+]
+
+# 當機／重啟特徵（ESP32 panic、看門狗、brownout）
+CRASH_PATTERN = re.compile(
+    r"Guru Meditation Error"
+    r"|abort\(\) was called"
+    r"|Brownout detector was triggered"
+    r"|Task watchdog got triggered"
+    r"|rst:0x\w+ \((?:TG\dWDT_SYS_RESET|RTCWDT_RTC_RESET|SW_CPU_RESET|TGWDT_CPU_RESET)"
+)
+
+# 訊息速率的滑動視窗（秒）
+RATE_WINDOW = 10.0
+
+# 讀取失敗後重新連線的間隔（秒）
+RECONNECT_INTERVAL = 2.0
+
+
+class FleetLogStore:
+    """以裝置索引的合併記錄庫（SQLite）"""
+
+    def __init__(self, path, commit_interval=1.0):
+        """
+        初始化記錄庫
+
+        Args:
+            path (str): SQLite 檔案路徑
+            commit_interval (float): 批次寫入間隔（秒）
+        """
+        self.path = path
+        self.commit_interval = commit_interval
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS logs (
+                id       INTEGER PRIMARY KEY,
+                session  TEXT    NOT NULL,
+                device   TEXT    NOT NULL,
+                port     TEXT    NOT NULL,
+                seq      INTEGER NOT NULL,
+                ts       REAL    NOT NULL,
+                message  TEXT    NOT NULL,
+                is_crash INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_logs_device_seq ON logs (device, seq);
+            CREATE INDEX IF NOT EXISTS idx_logs_device_ts  ON logs (device, ts);
+            CREATE INDEX IF NOT EXISTS idx_logs_crash      ON logs (device) WHERE is_crash = 1;
+        """)
+        self.session = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.pending = []
+        self.last_commit = time.monotonic()
+
+    def append(self, device, port, seq, ts, message, is_crash):
+        """加入一筆記錄（延後批次寫入）"""
+        self.pending.append((self.session, device, port, seq, ts, message, int(is_crash)))
+
+    def flush(self, force=False):
+        """將暫存記錄寫入資料庫"""
+        now = time.monotonic()
+        if not self.pending or (not force and now - self.last_commit < self.commit_interval):
+            return
+        self.conn.executemany(
+            "INSERT INTO logs (session, device, port, seq, ts, message, is_crash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            self.pending,
+        )
+        self.conn.commit()
+        self.pending.clear()
+        self.last_commit = now
+
+    def close(self):
+        """寫入剩餘記錄並關閉資料庫"""
+        self.flush(force=True)
+        self.conn.close()
+
+
+class DeviceStream:
+    """單一裝置的連線、行緩衝與統計"""
+
+    def __init__(self, port, label, color, baudrate):
+        self.port = port
+        self.label = label
+        self.color = color
+        self.baudrate = baudrate
+        self.serial_conn = None
+        self.buffer = bytearray()
+        self.message_count = 0
+        self.byte_count = 0
+        self.crash_count = 0
+        self.reconnect_count = 0
+        self.recent = deque()
+        self.last_message_time = None
+        self.last_attempt = 0.0
+
+    @property
+    def connected(self):
+        return self.serial_conn is not None and self.serial_conn.is_open
+
+    def open(self):
+        """以非阻塞模式開啟序列埠"""
+        self.last_attempt = time.monotonic()
+        try:
+            self.serial_conn = serial.Serial(port=self.port, baudrate=self.baudrate, timeout=0)
+            return True
+        except serial.SerialException:
+            self.serial_conn = None
+            return False
+
+    def close(self):
+        if self.serial_conn:
+            try:
+                self.serial_conn.close()
+            except serial.SerialException:
+                pass
+        self.serial_conn = None
+
+    def read_lines(self):
+        """
+        讀取目前可用的資料並切成完整的行
+
+        Returns:
+            list: 解碼後的訊息（不含換行）
+        """
+        data = self.serial_conn.read(self.serial_conn.in_waiting or 1)
+        if not data:
+            return []
+        self.byte_count += len(data)
+        self.buffer.extend(data)
+
+        lines = []
+        while True:
+            newline = self.buffer.find(b'\n')
+            if newline < 0:
+                break
+            raw = bytes(self.buffer[:newline])
+            del self.buffer[:newline + 1]
+            lines.append(raw.decode('utf-8', errors='replace').rstrip('\r'))
+        return lines
+
+    def record(self, now, is_crash):
+        """更新訊息速率與當機統計"""
+        self.message_count += 1
+        self.last_message_time = now
+        if is_crash:
+            self.crash_count += 1
+        self.recent.append(now)
+        while self.recent and now - self.recent[0] > RATE_WINDOW:
+            self.recent.popleft()
+
+    def rate(self, now):
+        """最近 RATE_WINDOW 秒內的訊息速率（條/秒）"""
+        while self.recent and now - self.recent[0] > RATE_WINDOW:
+            self.recent.popleft()
+        return len(self.recent) / RATE_WINDOW
+
+
+class FleetMonitor:
+    """多埠監測器：單一事件迴圈處理所有裝置"""
+
+    def __init__(self, ports, baudrate=460800, log_db='fleet_logs.db', echo=True, stats_interval=0):
+        """
+        初始化機隊監測器
+
+        Args:
+            ports (list): 序列埠位置列表
+            baudrate (int): 鮑率
+            log_db (str): 合併記錄資料庫路徑（None 表示不記錄）
+            echo (bool): 是否即時輸出每一行
+            stats_interval (float): 定期顯示統計的間隔（秒，0 表示只在結束時顯示）
+        """
+        self.selector = selectors.DefaultSelector()
+        self.devices = [
+            DeviceStream(port, f"dev{i:02d}", DEVICE_COLORS[i % len(DEVICE_COLORS)], baudrate)
+            for i, port in enumerate(ports)
+        ]
+        self.store = FleetLogStore(log_db) if log_db else None
+        self.echo = echo
+        self.stats_interval = stats_interval
+        self.running = False
+        self.start_time = None
+
+    def _attach(self, device):
+        if device.open():
+            self.selector.register(device.serial_conn.fileno(), selectors.EVENT_READ, device)
+            console.print(f"[green]✓[/green] [{device.color}]{device.label}[/{device.color}] 已連接 [magenta]{device.port}[/magenta]")
+            return True
+        return False
+
+    def _detach(self, device, reason):
+        try:
+            self.selector.unregister(device.serial_conn.fileno())
+        except (KeyError, ValueError):
+            pass
+        device.close()
+        device.reconnect_count += 1
+        console.print(f"[red]✗[/red] [{device.color}]{device.label}[/{device.color}] 連線中斷: {reason}")
+
+    def _retry_disconnected(self, now):
+        for device in self.devices:
+            if not device.connected and now - device.last_attempt >= RECONNECT_INTERVAL:
+                self._attach(device)
+
+    def _handle_line(self, device, message):
+        now = time.time()
+        is_crash = bool(CRASH_PATTERN.search(message))
+        device.record(now, is_crash)
+
+        if self.store:
+            self.store.append(device.label, device.port, device.message_count, now, message, is_crash)
+
+        if self.echo or is_crash:
+            timestamp = datetime.fromtimestamp(now).strftime("%H:%M:%S.%f")[:-3]
+            output_text = Text()
+            output_text.append(f"[{timestamp}] ", style="dim cyan")
+            output_text.append(f"{device.label} │ ", style=f"bold {device.color}")
+            output_text.append(message, style="bold red" if is_crash else "white")
+            console.print(output_text)
+
+    def _handle_stdin(self):
+        """
+        處理使用者輸入：`dev03: cmd` 傳給指定裝置，其餘廣播給所有裝置
+        """
+        line = sys.stdin.readline()
+        if not line:
+            self.selector.unregister(sys.stdin)
+            return
+        line = line.strip()
+        if not line:
+            return
+
+        targets = self.devices
+        label, sep, rest = line.partition(':')
+        if sep and any(d.label == label.strip() for d in self.devices):
+            targets = [d for d in self.devices if d.label == label.strip()]
+            line = rest.strip()
+
+        for device in targets:
+            if device.connected:
+                try:
+                    device.serial_conn.write((line + '\n').encode('utf-8'))
+                except serial.SerialException as e:
+                    self._detach(device, e)
+        console.print(f"[bold green]➤[/bold green] [green]已傳送給 {len(targets)} 台: {line}[/green]")
+
+    def stats_table(self):
+        """建立每台裝置的統計表格"""
+        now = time.time()
+        table = Table(show_header=True, header_style="bold cyan", border_style="cyan")
+        table.add_column("裝置")
+        table.add_column("序列埠", style="magenta")
+        table.add_column("狀態")
+        table.add_column("訊息數", justify="right")
+        table.add_column("速率 (條/秒)", justify="right")
+        table.add_column("位元組", justify="right")
+        table.add_column("當機", justify="right")
+        table.add_column("重連", justify="right")
+
+        for device in self.devices:
+            state = "[green]連線[/green]" if device.connected else "[red]離線[/red]"
+            crash = f"[bold red]{device.crash_count}[/bold red]" if device.crash_count else "0"
+            table.add_row(
+                f"[{device.color}]{device.label}[/{device.color}]",
+                device.port,
+                state,
+                f"{device.message_count:,}",
+                f"{device.rate(now):.1f}",
+                f"{device.byte_count:,}",
+                crash,
+                str(device.reconnect_count),
+            )
+        return table
+
+    def run(self, enable_input=True):
+        """執行事件迴圈直到 Ctrl+C"""
+        for device in self.devices:
+            if not self._attach(device):
+                console.print(f"[yellow]⚠[/yellow] {device.label} 無法開啟 {device.port}，稍後重試")
+
+        if enable_input and sys.stdin.isatty():
+            self.selector.register(sys.stdin, selectors.EVENT_READ, None)
+
+        info_text = Text()
+        info_text.append("裝置數: ", style="cyan")
+        info_text.append(f"{len(self.devices)}\n", style="magenta")
+        if self.store:
+            info_text.append("記錄庫: ", style="cyan")
+            info_text.append(f"{self.store.path}\n", style="yellow")
+        if enable_input:
+            info_text.append("\n💡 ", style="yellow")
+            info_text.append("輸入指令廣播給所有裝置，或用 `dev03: cmd` 指定裝置\n", style="white")
+        info_text.append("⚠️  ", style="red")
+        info_text.append("按 Ctrl+C 結束監測", style="white dim")
+        console.print(Panel(info_text, title="[bold green]🔍 機隊監測中[/bold green]", border_style="green"))
+
+        self.running = True
+        self.start_time = time.time()
+        last_stats = time.monotonic()
+
+        try:
+            while self.running:
+                for key, _ in self.selector.select(timeout=0.5):
+                    device = key.data
+                    if device is None:
+                        self._handle_stdin()
+                        continue
+                    try:
+                        for message in device.read_lines():
+                            self._handle_line(device, message)
+                    except (serial.SerialException, OSError) as e:
+                        self._detach(device, e)
+
+                now = time.monotonic()
+                self._retry_disconnected(now)
+                if self.store:
+                    self.store.flush()
+                if self.stats_interval and now - last_stats >= self.stats_interval:
+                    console.print(self.stats_table())
+                    last_stats = now
+
+        except KeyboardInterrupt:
+            console.print("\n[yellow]⚠[/yellow] 收到中斷訊號，正在關閉...")
+
+        finally:
+            self.running = False
+            for device in self.devices:
+                if device.connected:
+                    try:
+                        self.selector.unregister(device.serial_conn.fileno())
+                    except (KeyError, ValueError):
+                        pass
+                    device.close()
+            self.selector.close()
+            if self.store:
+                self.store.close()
+
+            console.print(Panel(self.stats_table(), title="[bold]📊 機隊統計[/bold]", border_style="cyan"))
+
+
+def discover_ports(patterns=None):
+    """
+    列出所有 ESP32 序列埠：未指定樣式時先以 VID/PID 辨識（device_discovery），
+    找不到才退回 glob 樣式
+
+    Args:
+        patterns (list): glob 樣式列表
+
+    Returns:
+        list: 序列埠路徑（不重複）
+    """
+    if patterns is None:
+        found = [p['device'] for p in list_esp32_ports()]
+        if found:
+            return found
+    found = []
+    for pattern in patterns or DEFAULT_PORT_PATTERNS:
+        for port in sorted(glob.glob(pattern)):
+            if port not in found:
+                found.append(port)
+    return found
+
+
+@click.command()
+@click.argument('ports', nargs=-1)
+@click.option('--baud', '-b', default=460800, show_default=True, help='鮑率')
+@click.option('--db', default='fleet_logs.db', show_default=True, help='合併記錄資料庫（SQLite）')
+@click.option('--no-db', is_flag=True, default=False, help='不寫入記錄資料庫')
+@click.option('--quiet', '-q', is_flag=True, default=False, help='只顯示當機訊息與統計')
+@click.option('--stats-interval', default=0.0, show_default=True, help='定期顯示統計的間隔（秒）')
+@click.option('--no-input', is_flag=True, default=False, help='停用鍵盤輸入')
+def cli(ports, baud, db, no_db, quiet, stats_interval, no_input):
+    """
+    同時監看多台播放器（未指定埠時自動掃描）
+    """
+    ports = list(ports) or discover_ports()
+    if not ports:
+        console.print("[red]✗[/red] 找不到任何序列埠")
+        sys.exit(1)
+
+    if os.name == 'nt':
+        console.print("[red]✗[/red] 機隊模式需要 POSIX 的 select()，Windows 不支援")
+        sys.exit(1)
+
+    monitor = FleetMonitor(
+        ports,
+        baudrate=baud,
+        log_db=None if no_db else db,
+        echo=not quiet,
+        stats_interval=stats_interval,
+    )
+    monitor.run(enable_input=not no_input)
+
+
+if __name__ == '__main__':
+    cli()
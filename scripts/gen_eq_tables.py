@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Loudness-EQ Table Generator
+Precomputes the loudness-compensation gains for every volume step and the shelving
+filter coefficients for every supported sample rate, for both DSP engines (float and
+Q30/Q31 fixed point), and writes them to src/WavPlayer/EqTables.h so the firmware
+switches volume and sample rate with a table lookup.
+
+Filter cutoffs are read from AudioProcessor.h; the loudness curve lives here.
+
+Usage: python3 scripts/gen_eq_tables.py [--check]
+"""
+
+import argparse
+import math
+import re
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+PROCESSOR_HEADER = PROJECT_ROOT / 'src' / 'WavPlayer' / 'AudioProcessor.h'
+OUTPUT = PROJECT_ROOT / 'src' / 'WavPlayer' / 'EqTables.h'
+
+SAMPLE_RATES = [22050, 32000, 44100, 48000, 88200, 96000]
+DEFAULT_RATE = 44100
+VOLUME_STEPS = 101  # 0..100 %
+
+# Loudness curve (Fletcher-Munson inspired): lower volume = more boost,
+# clamped so the V-shape is kept at full volume
+BASS_MAX_DB, BASS_MIN_DB = 8.0, 2.0
+TREB_MAX_DB, TREB_MIN_DB = 4.0, 1.0
+
+
+def read_define(name, text):
+    match = re.search(rf'^#define\s+{name}\s+([0-9.]+)f?', text, re.MULTILINE)
+    if not match:
+        sys.exit(f"{name} not found in {PROCESSOR_HEADER}")
+    return float(match.group(1))
+
+
+def loudness_gains(volume):
+    """Linear (bass, treble) shelf gains for a volume percent"""
+    vol = volume / 100.0
+    bass_db = max(BASS_MAX_DB * (1.0 - vol), BASS_MIN_DB)
+    treb_db = max(TREB_MAX_DB * (1.0 - vol), TREB_MIN_DB)
+    return 10 ** (bass_db / 20.0), 10 ** (treb_db / 20.0)
+
+
+def shelf_alphas(rate, bass_hz, treb_hz):
+    """One-pole (low-pass, high-pass) coefficients, same form as the filters in AudioProcessor.cpp"""
+    dt = 1.0 / rate
+    wl = 2.0 * math.pi * dt * bass_hz
+    wh = 2.0 * math.pi * dt * treb_hz
+    return wl / (1.0 + wl), 1.0 / (1.0 + wh)
+
+
+def q(value, bits):
+    scaled = round(value * (1 << bits))
+    limit = (1 << 31) - 1
+    if not -limit - 1 <= scaled <= limit:
+        sys.exit(f"{value} does not fit in Q{bits}")
+    return scaled
+
+
+def c_array(ctype, name, values, fmt, per_line=8):
+    rows = [', '.join(fmt(v) for v in values[i:i + per_line]) for i in range(0, len(values), per_line)]
+    body = ',\n    '.join(rows)
+    return f"static const {ctype} {name}[{len(values)}] = {{\n    {body}\n}};\n"
+
+
+def float_literal(value):
+    return f"{value:.9g}f" if 'e' in f"{value:.9g}" or '.' in f"{value:.9g}" else f"{value:.9g}.0f"
+
+
+def generate():
+    header = PROCESSOR_HEADER.read_text()
+    bass_hz = read_define('BASS_CUTOFF_HZ', header)
+    treb_hz = read_define('TREB_CUTOFF_HZ', header)
+
+    gains = [loudness_gains(v) for v in range(VOLUME_STEPS)]
+    alphas = [shelf_alphas(rate, bass_hz, treb_hz) for rate in SAMPLE_RATES]
+
+    out = [
+        "/**",
+        " * Loudness-EQ Tables",
+        " * Generated by scripts/gen_eq_tables.py - do not edit, re-run the generator",
+        f" * Bass shelf {bass_hz:g} Hz ({BASS_MAX_DB:g}..{BASS_MIN_DB:g} dB), "
+        f"treble shelf {treb_hz:g} Hz ({TREB_MAX_DB:g}..{TREB_MIN_DB:g} dB)",
+        " */",
+        "",
+        "#ifndef EQ_TABLES_H",
+        "#define EQ_TABLES_H",
+        "",
+        "#include <stdint.h>",
+        "",
+        f"#define EQ_VOLUME_STEPS {VOLUME_STEPS}",
+        f"#define EQ_RATE_COUNT {len(SAMPLE_RATES)}",
+        f"#define EQ_DEFAULT_RATE_INDEX {SAMPLE_RATES.index(DEFAULT_RATE)}",
+        "",
+        "// ========== Sample Rates ==========",
+        c_array('uint32_t', 'EQ_SAMPLE_RATES', SAMPLE_RATES, str),
+        "// ========== Loudness Gains (index = volume %) ==========",
+        "// Float engine: linear gain",
+        c_array('float', 'EQ_BASS_GAIN', [g[0] for g in gains], float_literal, 6),
+        c_array('float', 'EQ_TREB_GAIN', [g[1] for g in gains], float_literal, 6),
+        "// Fixed engine: (gain - 1) in Q30",
+        c_array('int32_t', 'EQ_BASS_GAIN_Q30', [q(g[0] - 1.0, 30) for g in gains], str, 6),
+        c_array('int32_t', 'EQ_TREB_GAIN_Q30', [q(g[1] - 1.0, 30) for g in gains], str, 6),
+        "// ========== Shelf Coefficients (index = sample rate) ==========",
+        "// Float engine",
+        c_array('float', 'EQ_ALPHA_LOW', [a[0] for a in alphas], float_literal, 6),
+        c_array('float', 'EQ_ALPHA_HIGH', [a[1] for a in alphas], float_literal, 6),
+        "// Fixed engine: Q31",
+        c_array('int32_t', 'EQ_ALPHA_LOW_Q31', [q(a[0], 31) for a in alphas], str, 6),
+        c_array('int32_t', 'EQ_ALPHA_HIGH_Q31', [q(a[1], 31) for a in alphas], str, 6),
+        "#endif // EQ_TABLES_H",
+        "",
+    ]
+    return '\n'.join(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate src/WavPlayer/EqTables.h")
+    parser.add_argument('--check', action='store_true', help='Fail if EqTables.h is out of date instead of writing it')
+    parser.add_argument('--output', type=Path, default=OUTPUT, help='Output header')
+    args = parser.parse_args()
+
+    text = generate()
+    if args.check:
+        if not args.output.exists() or args.output.read_text() != text:
+            print(f"{args.output} is out of date, run: python3 scripts/gen_eq_tables.py")
+            sys.exit(1)
+        print(f"{args.output} is up to date")
+        return
+    args.output.write_text(text)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
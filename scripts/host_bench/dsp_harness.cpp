@@ -0,0 +1,157 @@
+/**
+ * Host DSP Benchmark Harness
+ * Compiles src/WavPlayer/AudioProcessor.cpp natively against the stubs in
+ * stubs/ and pushes raw PCM through AudioOutputWithEQ::write() buffer by buffer.
+ *
+ * Usage: dsp_harness <input.pcm> [--buffer BYTES] [--volume 0-100]
+ *                    [--bit-depth 16|24|32] [--rate HZ] [--repeat N] [--output out.pcm]
+ *                    [--input-bits 16|24|32]
+ *
+ * Input is interleaved stereo little-endian PCM. 16-bit input is what the WAV
+ * decoder hands to audioOut()->write(); 24-bit (packed) and 32-bit input take the
+ * decoder-less path of 24/32-bit WAVs (expandHiResFrames + writeHiRes), with
+ * --buffer counting file bytes. Prints one JSON object on stdout. The engine is
+ * chosen at build time with -DDSP_ENGINE=DSP_ENGINE_FLOAT / DSP_ENGINE_FIXED.
+ */
+
+#include <Arduino.h>
+#include <ESP32I2SAudio.h>
+#include "AudioProcessor.h"
+#include "HiResWav.h"
+
+#include <algorithm>
+#include <chrono>
+#include <cstdlib>
+#include <vector>
+
+HostSerial Serial;
+HostFsStats hostFsStats;
+
+static double percentile(const std::vector<double>& sorted, double p) {
+    if (sorted.empty()) return 0;
+    size_t idx = (size_t)(p / 100.0 * (sorted.size() - 1) + 0.5);
+    return sorted[idx];
+}
+
+int main(int argc, char** argv) {
+    if (argc < 2) {
+        fprintf(stderr, "usage: %s <input.pcm> [--buffer BYTES] [--volume N] [--bit-depth 16|24|32] [--rate HZ] [--repeat N] [--output out.pcm] [--input-bits 16|24|32]\n", argv[0]);
+        return 2;
+    }
+
+    const char* path = argv[1];
+    size_t bufferBytes = 2048;
+    int volume = 50;
+    int bitDepth = 16;
+    int rate = (int)SAMPLE_RATE;
+    int repeat = 1;
+    const char* outputPath = NULL;
+    int inputBits = 16;
+    for (int i = 2; i + 1 < argc; i += 2) {
+        if (!strcmp(argv[i], "--buffer")) bufferBytes = strtoul(argv[i + 1], NULL, 10);
+        else if (!strcmp(argv[i], "--volume")) volume = atoi(argv[i + 1]);
+        else if (!strcmp(argv[i], "--bit-depth")) bitDepth = atoi(argv[i + 1]);
+        else if (!strcmp(argv[i], "--rate")) rate = atoi(argv[i + 1]);
+        else if (!strcmp(argv[i], "--repeat")) repeat = atoi(argv[i + 1]);
+        else if (!strcmp(argv[i], "--output")) outputPath = argv[i + 1];
+        else if (!strcmp(argv[i], "--input-bits")) inputBits = atoi(argv[i + 1]);
+        else {
+            fprintf(stderr, "unknown option: %s\n", argv[i]);
+            return 2;
+        }
+    }
+    if (inputBits != 16 && inputBits != 24 && inputBits != 32) {
+        fprintf(stderr, "input bits must be 16, 24 or 32\n");
+        return 2;
+    }
+    const size_t frameBytes = inputBits / 8 * 2;
+    bufferBytes -= bufferBytes % frameBytes; // whole stereo frames
+    if (bufferBytes == 0 || repeat < 1) {
+        fprintf(stderr, "buffer and repeat must be positive\n");
+        return 2;
+    }
+
+    // ========== Load PCM ==========
+    FILE* f = fopen(path, "rb");
+    if (!f) {
+        fprintf(stderr, "cannot open %s\n", path);
+        return 1;
+    }
+    std::vector<uint8_t> pcm;
+    uint8_t chunk[65536];
+    size_t n;
+    while ((n = fread(chunk, 1, sizeof(chunk), f)) > 0) pcm.insert(pcm.end(), chunk, chunk + n);
+    fclose(f);
+    pcm.resize(pcm.size() - pcm.size() % frameBytes);
+    if (pcm.empty()) {
+        fprintf(stderr, "no samples in %s\n", path);
+        return 1;
+    }
+
+    // ========== Run ==========
+    AudioOutputWithEQ out(0, 0, 0);
+    out.setFrequency(rate);
+    out.updateLoudness(volume);
+    if (bitDepth != 16) out.setBitDepth((BitDepth)bitDepth);
+    if (outputPath) {
+        out.capture = fopen(outputPath, "wb");
+        if (!out.capture) {
+            fprintf(stderr, "cannot open %s\n", outputPath);
+            return 1;
+        }
+    }
+
+    // Hi-res input unpacks in place to int32 stereo: room for 8 bytes per frame
+    std::vector<int32_t> work(bufferBytes / frameBytes * 2 + 1);
+    uint8_t* workBytes = (uint8_t*)work.data();
+    const float gain = powf(volume / 100.0f, 3.0f);
+    std::vector<double> latencies; // microseconds per write()
+    latencies.reserve((pcm.size() / bufferBytes + 1) * repeat);
+    double totalSeconds = 0;
+    uint64_t samples = 0;
+
+    for (int r = 0; r < repeat; r++) {
+        for (size_t pos = 0; pos < pcm.size(); pos += bufferBytes) {
+            size_t len = std::min(bufferBytes, pcm.size() - pos);
+            // write() processes in place, so every call gets a fresh copy
+            int frames = len / frameBytes;
+            std::chrono::steady_clock::time_point t0;
+            if (inputBits == 16) {
+                memcpy(workBytes, &pcm[pos], len);
+                t0 = std::chrono::steady_clock::now();
+                out.write(workBytes, len);
+            } else {
+                // Raw frames at the end of the buffer, as readHiResFrames() leaves them
+                memcpy(workBytes + frames * 8 - len, &pcm[pos], len);
+                t0 = std::chrono::steady_clock::now();
+                expandHiResFrames(work.data(), frames, inputBits, 2);
+                out.writeHiRes(work.data(), frames, gain);
+            }
+            auto t1 = std::chrono::steady_clock::now();
+            double us = std::chrono::duration<double, std::micro>(t1 - t0).count();
+            latencies.push_back(us);
+            totalSeconds += us / 1e6;
+            samples += frames * 2;
+        }
+    }
+
+    if (out.capture) fclose(out.capture);
+
+    std::vector<double> sorted(latencies);
+    std::sort(sorted.begin(), sorted.end());
+    double frames = samples / 2.0;
+    double bufferFrames = bufferBytes / (double)frameBytes;
+
+    printf("{\"engine\": \"%s\", \"input_bits\": %d, \"input_bytes\": %zu, \"buffer_bytes\": %zu, \"volume\": %d, \"bit_depth\": %d, \"rate\": %u, \"repeat\": %d, "
+           "\"buffers\": %zu, \"samples\": %llu, \"seconds\": %.6f, \"samples_per_sec\": %.1f, "
+           "\"realtime_factor\": %.2f, \"buffer_deadline_us\": %.1f, "
+           "\"latency_us\": {\"min\": %.3f, \"p50\": %.3f, \"p90\": %.3f, \"p99\": %.3f, \"max\": %.3f, \"mean\": %.3f}, "
+           "\"output_bytes\": %llu, \"checksum\": \"%016llx\"}\n",
+           DSP_ENGINE == DSP_ENGINE_FIXED ? "fixed" : "float", inputBits, pcm.size(), bufferBytes, volume, bitDepth, (unsigned)out.getSampleRate(), repeat,
+           latencies.size(), (unsigned long long)samples, totalSeconds, samples / totalSeconds,
+           frames / out.getSampleRate() / totalSeconds, bufferFrames / out.getSampleRate() * 1e6,
+           sorted.front(), percentile(sorted, 50), percentile(sorted, 90), percentile(sorted, 99),
+           sorted.back(), totalSeconds * 1e6 / latencies.size(),
+           (unsigned long long)out.bytesOut, (unsigned long long)out.checksum);
+    return 0;
+}
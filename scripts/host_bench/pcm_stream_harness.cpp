@@ -0,0 +1,97 @@
+/**
+ * Host PCM Stream Harness
+ * Compiles src/WavPlayer/PcmStream.cpp natively and plays the device side of a live
+ * stream: stdin is the serial link, the loop thread runs handlePcmStream() every
+ * 10 ms like loop(), and the audio thread drains the jitter buffer at the real
+ * sample clock the way I2S DMA would. Every millisecond the clock wanted audio
+ * that the buffer could not supply after playback started counts as a gap.
+ *
+ * Usage: pcm_stream_harness <rate> <channels>
+ *
+ * Status lines ("STREAM READY/fill=/END") go to stderr exactly as the firmware
+ * prints them, COMMAND packets are echoed as "COMMAND <line>"; one JSON summary is
+ * printed on stdout once the stream ends.
+ */
+
+#include <Arduino.h>
+#include "PcmStream.h"
+
+#include <atomic>
+#include <chrono>
+#include <thread>
+
+HostSerial Serial;
+
+static std::atomic<bool> done(false);
+
+static void audioThread(uint32_t rate, uint8_t channels, double* gapMs, double* playedMs) {
+    using namespace std::chrono;
+    const size_t frame = 2u * channels;
+    const double bytesPerMs = rate * frame / 1000.0;
+    uint8_t block[512];
+    bool started = false;
+    uint64_t consumed = 0;
+    steady_clock::time_point t0 = steady_clock::now();
+
+    while (!done) {
+        std::this_thread::sleep_for(milliseconds(2));
+        uint64_t due = (uint64_t)(duration<double, std::milli>(steady_clock::now() - t0).count() * bytesPerMs);
+        due -= due % frame;
+        while (consumed < due) {
+            size_t want = due - consumed < sizeof(block) ? due - consumed : sizeof(block);
+            size_t got = pcmStreamRead(block, want);
+            if (got > 0) {
+                started = true;
+                *playedMs += got / bytesPerMs;
+                consumed += got;
+            } else {
+                // DMA plays silence for what is missing; only a gap once audio has begun
+                if (started && !pcmStreamFinished()) *gapMs += (due - consumed) / bytesPerMs;
+                consumed = due;
+            }
+        }
+    }
+}
+
+int main(int argc, char** argv) {
+    if (argc != 3) {
+        fprintf(stderr, "usage: %s <rate> <channels>\n", argv[0]);
+        return 2;
+    }
+    uint32_t rate = (uint32_t)atoi(argv[1]);
+    uint8_t channels = (uint8_t)atoi(argv[2]);
+    if (!pcmStreamBegin(rate, channels)) {
+        Serial.println("ERROR: Usage stream <8000-96000> <1|2>");
+        return 1;
+    }
+    Serial.printf("STREAM READY cap=%u\n", (unsigned)pcmStreamCapacity());
+
+    double gapMs = 0, playedMs = 0;
+    std::thread audio(audioThread, rate, channels, &gapMs, &playedMs);
+
+    while (!pcmStreamFinished()) {
+        handlePcmStream();
+        char line[PCM_MAX_COMMAND + 1];
+        if (pcmStreamTakeCommand(line, sizeof(line))) {
+            // Stands in for handleSerialCommand(): only stop acts on the stream itself
+            Serial.printf("COMMAND %s\n", line);
+            if (strcmp(line, "stop") == 0) pcmStreamStop();
+        }
+        std::this_thread::sleep_for(std::chrono::milliseconds(10));
+    }
+    done = true;
+    audio.join();
+
+    PcmStreamStats st = pcmStreamStats();
+    Serial.printf("STREAM END rx=%lu under=%lu lost=%lu bad=%lu over=%lu\n",
+                  (unsigned long)st.received, (unsigned long)st.underruns, (unsigned long)st.lost,
+                  (unsigned long)st.bad, (unsigned long)st.overflows);
+    printf("{\"capacity\":%u,\"packets\":%lu,\"received\":%lu,\"underruns\":%lu,\"lost\":%lu,"
+           "\"bad\":%lu,\"overflows\":%lu,\"gap_ms\":%.1f,\"played_ms\":%.1f}\n",
+           (unsigned)pcmStreamCapacity(), (unsigned long)st.packets, (unsigned long)st.received,
+           (unsigned long)st.underruns, (unsigned long)st.lost, (unsigned long)st.bad,
+           (unsigned long)st.overflows, gapMs, playedMs);
+    pcmStreamEnd();      // As the audio task does; the loop side frees the buffer
+    handlePcmStream();
+    return pcmStreamCapacity() == 0 ? 0 : 1;
+}
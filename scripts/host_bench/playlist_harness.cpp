@@ -0,0 +1,151 @@
+/**
+ * Host Playlist Harness
+ * Compiles src/WavPlayer/PlaylistManager.cpp natively with an SD stub that maps the
+ * card onto a host directory, then checks the paged playlist against the expected
+ * track list: load, forward/backward walks with prefetch (as next/previous do),
+ * random access, lookup by path, stale detection and resident memory.
+ *
+ * Usage: playlist_harness <sd_dir> <expected.txt> [--ordered] [--random N]
+ *
+ * expected.txt has one card path per line. With --ordered the playlist order must
+ * match it (host-built index); without, only the set of tracks is compared
+ * (scan order is directory order). Prints one JSON object on stdout; exit 1 on failure.
+ */
+
+#include <Arduino.h>
+#include <SD.h>
+#include "PlaylistManager.h"
+
+#include <algorithm>
+#include <chrono>
+#include <fstream>
+#include <set>
+#include <string>
+#include <vector>
+
+HostSerial Serial;
+SDClass SD;
+HostFsStats hostFsStats;
+int playlistSize = 0;
+
+static std::vector<std::string> failures;
+
+static void check(bool ok, const std::string& what) {
+    if (!ok && failures.size() < 20) failures.push_back(what);
+}
+
+static double elapsedMs(std::chrono::steady_clock::time_point start) {
+    return std::chrono::duration<double, std::milli>(std::chrono::steady_clock::now() - start).count();
+}
+
+static std::string pathAt(int index) {
+    char path[MAX_FILENAME];
+    return playlistGetPath(index, path, sizeof(path)) ? std::string(path) : std::string();
+}
+
+int main(int argc, char** argv) {
+    if (argc < 3) {
+        fprintf(stderr, "usage: %s <sd_dir> <expected.txt> [--ordered] [--random N]\n", argv[0]);
+        return 2;
+    }
+    bool ordered = false;
+    int randomLookups = 1000;
+    for (int i = 3; i < argc; i++) {
+        if (!strcmp(argv[i], "--ordered")) ordered = true;
+        else if (!strcmp(argv[i], "--random") && i + 1 < argc) randomLookups = atoi(argv[++i]);
+    }
+
+    std::vector<std::string> expected;
+    std::ifstream list(argv[2]);
+    for (std::string line; std::getline(list, line);) {
+        if (!line.empty()) expected.push_back(line);
+    }
+    SD.setRoot(argv[1]);
+    int n = (int)expected.size();
+
+    // ========== Load ==========
+    auto start = std::chrono::steady_clock::now();
+    loadPlaylist();
+    double loadMs = elapsedMs(start);
+    HostFsStats loadIo = hostFsStats;
+    check(playlistSize == n, "playlistSize " + std::to_string(playlistSize) + " != " + std::to_string(n));
+
+    // ========== Forward walk (next) ==========
+    hostFsStats = HostFsStats();
+    PlaylistStats before = playlistStats();
+    start = std::chrono::steady_clock::now();
+    std::vector<std::string> seen;
+    seen.reserve(playlistSize);
+    for (int i = 0; i < playlistSize; i++) {
+        std::string path = pathAt(i);
+        playlistPrefetch(i);
+        seen.push_back(path);
+        if (ordered && i < n) check(path == expected[i], "track " + std::to_string(i) + ": " + path + " != " + expected[i]);
+    }
+    double forwardMs = elapsedMs(start);
+    uint32_t forwardLoads = playlistStats().pageLoads - before.pageLoads;
+    HostFsStats forwardIo = hostFsStats;
+    if (!ordered) {
+        std::vector<std::string> a(seen), b(expected);
+        std::sort(a.begin(), a.end());
+        std::sort(b.begin(), b.end());
+        check(a == b, "scanned track set differs from the expected list");
+    }
+
+    // ========== Backward walk (previous) ==========
+    before = playlistStats();
+    for (int i = playlistSize - 1; i >= 0; i--) {
+        std::string path = pathAt(i);
+        playlistPrefetch(i);
+        check(path == seen[i], "backward track " + std::to_string(i) + " differs");
+    }
+    uint32_t backwardLoads = playlistStats().pageLoads - before.pageLoads;
+
+    // ========== Random access ==========
+    uint32_t lcg = 12345;
+    start = std::chrono::steady_clock::now();
+    for (int k = 0; k < randomLookups && playlistSize > 0; k++) {
+        lcg = lcg * 1103515245u + 12345u;
+        int i = (int)((lcg >> 8) % (uint32_t)playlistSize);
+        check(pathAt(i) == seen[i], "random track " + std::to_string(i) + " differs");
+    }
+    double randomUs = randomLookups ? elapsedMs(start) * 1000.0 / randomLookups : 0;
+    check(pathAt(playlistSize).empty() && pathAt(-1).empty(), "out-of-range index returned a path");
+
+    // ========== Lookup by path ==========
+    start = std::chrono::steady_clock::now();
+    if (playlistSize > 0) {
+        int probes[] = {0, playlistSize / 2, playlistSize - 1};
+        for (int i : probes) check(playlistFind(seen[i].c_str()) == i, "playlistFind(" + seen[i] + ")");
+    }
+    check(playlistFind("/no such track.wav") == -1, "playlistFind found a missing track");
+    double findMs = elapsedMs(start);
+
+    // ========== Stale detection ==========
+    if (playlistSize > 0) {
+        PlaylistTrackInfo info;
+        check(playlistGetInfo(0, &info), "playlistGetInfo(0)");
+        check(playlistTrackMatches(0, info.fileSize), "track 0 size should match");
+        check(!playlistTrackMatches(0, info.fileSize + 1), "size change not detected");
+    }
+
+    // ========== Report ==========
+    printf("{\"tracks\": %d, \"from_index\": %s, \"load_ms\": %.2f, \"load_reads\": %u, \"load_opens\": %u, "
+           "\"forward_ms\": %.2f, \"forward_page_loads\": %u, \"forward_seeks\": %u, \"backward_page_loads\": %u, "
+           "\"random_lookup_us\": %.2f, \"find_ms\": %.2f, \"memory_bytes\": %zu, "
+           "\"page_tracks\": %d, \"pages\": %d, \"failures\": [",
+           playlistSize, isPlaylistFromIndex() ? "true" : "false", loadMs, loadIo.reads, loadIo.opens,
+           forwardMs, forwardLoads, forwardIo.seeks, backwardLoads,
+           randomUs, findMs, playlistMemoryBytes(),
+           PLAYLIST_PAGE_TRACKS, PLAYLIST_PAGES);
+    for (size_t i = 0; i < failures.size(); i++) {
+        std::string escaped;
+        for (char c : failures[i]) {
+            if (c == '"' || c == '\\') escaped += '\\';
+            escaped += c;
+        }
+        printf("%s\"%s\"", i ? ", " : "", escaped.c_str());
+    }
+    printf("]}\n");
+    return failures.empty() ? 0 : 1;
+}
@@ -0,0 +1,92 @@
+/**
+ * Host Stub - Arduino.h
+ * Minimal Arduino core surface needed to compile the DSP modules natively
+ */
+
+#ifndef HOST_STUB_ARDUINO_H
+#define HOST_STUB_ARDUINO_H
+
+#include <stdint.h>
+#include <stddef.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <stdarg.h>
+#include <string.h>
+#include <strings.h>
+#include <math.h>
+#include <chrono>
+#include <string>
+
+typedef void* SemaphoreHandle_t;
+typedef void* TaskHandle_t;
+
+// FreeRTOS: the harnesses are single-threaded, mutexes only need to exist
+#define portMAX_DELAY 0xFFFFFFFFu
+inline SemaphoreHandle_t xSemaphoreCreateMutex() { static int mutex; return &mutex; }
+inline int xSemaphoreTake(SemaphoreHandle_t, uint32_t) { return 1; }
+inline int xSemaphoreGive(SemaphoreHandle_t) { return 1; }
+
+inline unsigned long millis() {
+    using namespace std::chrono;
+    static const steady_clock::time_point start = steady_clock::now();
+    return (unsigned long)duration_cast<milliseconds>(steady_clock::now() - start).count();
+}
+
+// Arduino String: only what the sketch modules use
+class String : public std::string {
+public:
+    String(const char* s = "") : std::string(s) {}
+    String(const std::string& s) : std::string(s) {}
+};
+
+// No PSRAM on the host: large buffers come from the normal heap
+inline bool psramFound() { return false; }
+inline void* ps_malloc(size_t size) { return malloc(size); }
+
+// Serial: log output goes to stderr so stdout stays machine-readable;
+// input is stdin, read without blocking like a UART RX buffer
+class HostSerial {
+public:
+    void begin(unsigned long) {}
+
+    int available() {
+        if (rxHave == rxPos) {
+            if (!rxNonBlocking) {
+                fcntl(0, F_SETFL, fcntl(0, F_GETFL) | O_NONBLOCK);
+                rxNonBlocking = true;
+            }
+            ssize_t n = ::read(0, rx, sizeof(rx));
+            rxPos = 0;
+            rxHave = n > 0 ? (size_t)n : 0;
+        }
+        return (int)(rxHave - rxPos);
+    }
+    int read() { return available() > 0 ? rx[rxPos++] : -1; }
+    size_t readBytes(uint8_t* dst, size_t len) {
+        size_t n = (size_t)available() < len ? (size_t)available() : len;
+        memcpy(dst, rx + rxPos, n);
+        rxPos += n;
+        return n;
+    }
+
+    int printf(const char* fmt, ...) {
+        va_list args;
+        va_start(args, fmt);
+        int n = vfprintf(stderr, fmt, args);
+        va_end(args);
+        return n;
+    }
+    void print(const char* s) { fputs(s, stderr); }
+    void println(const char* s = "") { fputs(s, stderr); fputc('\n', stderr); }
+
+private:
+    uint8_t rx[8192];  // Same size as the firmware's Serial.setRxBufferSize()
+    size_t rxPos = 0, rxHave = 0;
+    bool rxNonBlocking = false;
+};
+
+extern HostSerial Serial;
+
+#endif // HOST_STUB_ARDUINO_H
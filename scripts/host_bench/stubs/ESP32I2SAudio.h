@@ -0,0 +1,39 @@
+/**
+ * Host Stub - ESP32I2SAudio.h
+ * Instead of driving I2S, write() folds every output byte into a checksum
+ * so DSP changes can be regression-checked on the host; set capture to also
+ * keep the raw output
+ */
+
+#ifndef HOST_STUB_ESP32_I2S_AUDIO_H
+#define HOST_STUB_ESP32_I2S_AUDIO_H
+
+#include <Arduino.h>
+
+class ESP32I2SAudio {
+public:
+    ESP32I2SAudio(int, int, int, int = -1) {}
+    virtual ~ESP32I2SAudio() {}
+
+    bool begin() { return true; }
+    void end() {}
+    virtual bool setFrequency(int) { return true; }
+    virtual int availableForWrite() { return 1 << 16; }
+
+    virtual size_t write(const uint8_t *buffer, size_t size) {
+        // FNV-1a 64
+        for (size_t i = 0; i < size; i++) {
+            checksum ^= buffer[i];
+            checksum *= 1099511628211ULL;
+        }
+        bytesOut += size;
+        if (capture) fwrite(buffer, 1, size, capture);
+        return size;
+    }
+
+    uint64_t checksum = 14695981039346656037ULL;
+    uint64_t bytesOut = 0;
+    FILE* capture = NULL;
+};
+
+#endif // HOST_STUB_ESP32_I2S_AUDIO_H
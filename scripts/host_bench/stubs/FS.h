@@ -0,0 +1,128 @@
+/**
+ * Host Stub - FS.h
+ * File backed by the host filesystem; paths are resolved under SD.setRoot()
+ */
+
+#ifndef HOST_STUB_FS_H
+#define HOST_STUB_FS_H
+
+#include <Arduino.h>
+#include <dirent.h>
+#include <sys/stat.h>
+#include <memory>
+#include <string>
+
+#define FILE_READ  "r"
+#define FILE_WRITE "w"
+
+// I/O counters for the host harnesses
+struct HostFsStats {
+    uint32_t opens;
+    uint32_t seeks;
+    uint32_t reads;
+    uint64_t bytesRead;
+};
+extern HostFsStats hostFsStats;
+
+class File {
+public:
+    File() {}
+    File(const std::string& hostPath, const std::string& name, const char* mode) {
+        struct stat st;
+        bool isDir = stat(hostPath.c_str(), &st) == 0 && S_ISDIR(st.st_mode);
+        if (isDir && mode[0] == 'r') {
+            DIR* dir = opendir(hostPath.c_str());
+            if (dir) impl.reset(new Impl(hostPath, name, NULL, dir));
+        } else if (!isDir) {
+            FILE* fp = fopen(hostPath.c_str(), mode[0] == 'w' ? "w+b" : "rb");
+            if (fp) impl.reset(new Impl(hostPath, name, fp, NULL));
+        }
+        if (impl) hostFsStats.opens++;
+    }
+
+    operator bool() const { return impl != nullptr; }
+    bool isDirectory() const { return impl && impl->dir; }
+    const char* name() const { return impl ? impl->name.c_str() : ""; }
+    const char* path() const { return impl ? impl->path.c_str() : ""; }
+
+    size_t size() const {
+        if (!impl || !impl->fp) return 0;
+        long pos = ftell(impl->fp);
+        fseek(impl->fp, 0, SEEK_END);
+        long end = ftell(impl->fp);
+        fseek(impl->fp, pos, SEEK_SET);
+        return (size_t)end;
+    }
+    size_t position() const { return impl && impl->fp ? (size_t)ftell(impl->fp) : 0; }
+    bool seek(uint32_t pos) {
+        if (!impl || !impl->fp) return false;
+        hostFsStats.seeks++;
+        return fseek(impl->fp, pos, SEEK_SET) == 0;
+    }
+    int available() { return (int)(size() - position()); }
+
+    int read(uint8_t* buf, size_t len) {
+        if (!impl || !impl->fp) return -1;
+        size_t n = fread(buf, 1, len, impl->fp);
+        hostFsStats.reads++;
+        hostFsStats.bytesRead += n;
+        return (int)n;
+    }
+    int read() {
+        uint8_t c;
+        return read(&c, 1) == 1 ? c : -1;
+    }
+    size_t readBytesUntil(char terminator, char* buf, size_t len) {
+        size_t n = 0;
+        while (n < len) {
+            int c = read();
+            if (c < 0 || c == terminator) break;
+            buf[n++] = (char)c;
+        }
+        return n;
+    }
+    size_t write(const uint8_t* buf, size_t len) {
+        return impl && impl->fp ? fwrite(buf, 1, len, impl->fp) : 0;
+    }
+
+    File openNextFile() {
+        if (!impl || !impl->dir) return File();
+        while (struct dirent* entry = readdir(impl->dir)) {
+            if (!strcmp(entry->d_name, ".") || !strcmp(entry->d_name, "..")) continue;
+            return File(impl->hostPath + "/" + entry->d_name, entry->d_name, FILE_READ);
+        }
+        return File();
+    }
+
+    // Name of the next entry without opening it (arduino-esp32 3.x); empty at the end
+    String getNextFileName(bool* isDir) {
+        if (!impl || !impl->dir) return String();
+        while (struct dirent* entry = readdir(impl->dir)) {
+            if (!strcmp(entry->d_name, ".") || !strcmp(entry->d_name, "..")) continue;
+            struct stat st;
+            std::string hostPath = impl->hostPath + "/" + entry->d_name;
+            if (isDir) *isDir = stat(hostPath.c_str(), &st) == 0 && S_ISDIR(st.st_mode);
+            return String(impl->path == "/" ? "/" + std::string(entry->d_name)
+                                            : impl->path + "/" + entry->d_name);
+        }
+        return String();
+    }
+
+    void close() { impl.reset(); }
+
+private:
+    struct Impl {
+        Impl(const std::string& h, const std::string& n, FILE* f, DIR* d)
+            : hostPath(h), name(n), path("/" + n), fp(f), dir(d) {}
+        ~Impl() {
+            if (fp) fclose(fp);
+            if (dir) closedir(dir);
+        }
+        std::string hostPath, name, path;
+        FILE* fp;
+        DIR* dir;
+    };
+    std::shared_ptr<Impl> impl;
+};
+
+#endif // HOST_STUB_FS_H
@@ -0,0 +1,10 @@
+/**
+ * Host Stub - Preferences.h
+ */
+
+#ifndef HOST_STUB_PREFERENCES_H
+#define HOST_STUB_PREFERENCES_H
+
+class Preferences {};
+
+#endif // HOST_STUB_PREFERENCES_H
@@ -0,0 +1,37 @@
+/**
+ * Host Stub - SD.h
+ * SD card mapped onto a host directory (SD.setRoot)
+ */
+
+#ifndef HOST_STUB_SD_H
+#define HOST_STUB_SD_H
+
+#include "FS.h"
+#include <stdio.h>
+#include <unistd.h>
+
+class SDClass {
+public:
+    void setRoot(const char* dir) { root = dir; }
+
+    File open(const char* path, const char* mode = FILE_READ) {
+        std::string p(path);
+        std::string name = p.substr(p.find_last_of('/') + 1);
+        return File(hostPath(path), name, mode);
+    }
+    bool exists(const char* path) { return access(hostPath(path).c_str(), F_OK) == 0; }
+    bool remove(const char* path) { return ::remove(hostPath(path).c_str()) == 0; }
+    bool rename(const char* from, const char* to) { return ::rename(hostPath(from).c_str(), hostPath(to).c_str()) == 0; }
+
+private:
+    std::string hostPath(const char* path) {
+        std::string p(path);
+        if (p == "/") return root;
+        return root + (p[0] == '/' ? "" : "/") + p;
+    }
+    std::string root = ".";
+};
+
+extern SDClass SD;
+
+#endif // HOST_STUB_SD_H
@@ -97,6 +97,7 @@ class SerialMonitor:
                         self.message_count += 1
                         
                         # 呼叫回調函式（這對 Web 介面很重要）
+                        # 回調在讀取執行緒內同步執行，較慢的消費者請透過 stream_bridge.StreamBridge.publish 接入
                         if self.data_callback:
                             try:
                                 self.data_callback(message)
@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""
+Live PCM Streaming
+Plays any file the host can decode on the device without copying it to the SD
+card first: ffmpeg decodes to 16-bit PCM, which goes over serial in framed,
+sequence-numbered, CRC-checked packets into the firmware's jitter buffer
+(src/WavPlayer/PcmStream.cpp) and from there through the EQ to I2S.
+
+The device reports its buffer fill every 50 ms; the sender aims for a half-full
+buffer and scales its send rate between 0.5x and 1.5x real time to stay there.
+While the stream owns the link, serial commands (volume, pause, resume, stop) go
+in COMMAND packets; `play` sends each line typed on stdin.
+
+`emulate` runs the same sender against scripts/host_bench/pcm_stream_harness.cpp,
+the firmware's stream module compiled natively and drained at the real sample
+clock, over an emulated link with limited throughput, stalls and packet loss,
+and reports underruns.
+"""
+
+import binascii
+import json
+import os
+import queue
+import random
+import re
+import shlex
+import shutil
+import struct
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import click
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+from playlist_index import wav_info
+from track_overview import wav_samples
+
+console = Console()
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SRC_DIR = PROJECT_ROOT / 'src' / 'WavPlayer'
+BENCH_DIR = Path(__file__).resolve().parent / 'host_bench'
+HARNESS = BENCH_DIR / 'pcm_stream_harness.cpp'
+BUILD_DIR = PROJECT_ROOT / 'build' / 'host_bench'
+BINARY = BUILD_DIR / 'pcm_stream_harness'
+SOURCES = [SRC_DIR / 'PcmStream.cpp']
+
+# Wire format (must match PcmStream.h)
+MAGIC = b'\xA5\x5A'
+HEADER = struct.Struct('<2sBBHH')
+PACKET_PCM = 0
+PACKET_END = 1
+PACKET_COMMAND = 2
+PAYLOAD = 2048
+MAX_COMMAND = 64
+
+TARGET_FILL = 0.5      # Same as PCM_STREAM_PREFILL_PCT
+MAX_FILL = 0.9         # Never put more than this in flight + buffered
+RATE_MIN, RATE_MAX = 0.5, 1.5
+TICK_S = 0.005
+
+STATUS_RE = re.compile(r'STREAM fill=(\d+) cap=(\d+) rx=(\d+) under=(\d+) lost=(\d+) bad=(\d+)')
+READY_RE = re.compile(r'STREAM READY cap=(\d+)')
+END_RE = re.compile(r'STREAM END rx=(\d+) under=(\d+) lost=(\d+) bad=(\d+) over=(\d+)')
+
+
+def encode_packet(seq, payload=b'', kind=PACKET_PCM):
+    body = HEADER.pack(MAGIC, kind, 0, seq & 0xFFFF, len(payload)) + payload
+    return body + struct.pack('<H', binascii.crc_hqx(body, 0xFFFF))
+
+
+# ========== Sources ==========
+
+def ffmpeg_source(path, rate, channels):
+    """Decode any format to interleaved s16le at rate/channels, streamed as ffmpeg produces it"""
+    proc = subprocess.Popen(['ffmpeg', '-v', 'error', '-i', str(path), '-f', 's16le', '-acodec', 'pcm_s16le',
+                             '-ac', str(channels), '-ar', str(rate), '-'], stdout=subprocess.PIPE)
+    try:
+        for block in iter(lambda: proc.stdout.read(PAYLOAD), b''):
+            yield block
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def wav_source(path, rate, channels):
+    """WAV already at the stream rate, for hosts without ffmpeg"""
+    info = wav_info(path)
+    if info is None or info['sample_rate'] != rate:
+        raise click.ClickException(f"ffmpeg not found; without it only WAV files at {rate} Hz can be streamed")
+    samples = wav_samples(path, info)
+    if channels == 1:
+        samples = samples.mean(axis=1, keepdims=True)
+    elif samples.shape[1] == 1:
+        samples = np.repeat(samples, 2, axis=1)
+    frames = PAYLOAD // (2 * channels)
+    for start in range(0, len(samples), frames):
+        block = np.clip(samples[start:start + frames, :channels] * 32768.0, -32768, 32767)
+        yield block.astype('<i2').tobytes()
+
+
+def synthetic_source(seconds, rate, channels):
+    """Logarithmic sweep with a little noise: every block is non-trivial"""
+    frames = PAYLOAD // (2 * channels)
+    total = int(seconds * rate)
+    rng = np.random.default_rng(1)
+    phase = 0.0
+    for start in range(0, total, frames):
+        t = np.arange(start, min(start + frames, total)) / rate
+        freq = 100.0 * (80.0 ** (t / max(seconds, 1e-3)))
+        ph = phase + np.cumsum(2 * np.pi * freq / rate)
+        phase = ph[-1]
+        mono = 0.5 * np.sin(ph) + 0.01 * rng.standard_normal(len(t))
+        block = np.repeat(mono[:, None], channels, axis=1) * 32767.0
+        yield block.astype('<i2').tobytes()
+
+
+def open_source(path, synthetic, rate, channels):
+    if synthetic:
+        return synthetic_source(synthetic, rate, channels)
+    path = Path(path)
+    if shutil.which('ffmpeg'):
+        return ffmpeg_source(path, rate, channels)
+    return wav_source(path, rate, channels)
+
+
+# ========== Links ==========
+
+class SerialLink:
+    """The device over a serial port"""
+
+    def __init__(self, port, baud, rate, channels):
+        import serial
+
+        try:
+            self.ser = serial.Serial(port, baud, timeout=0)
+        except serial.SerialException as e:
+            raise click.ClickException(str(e))
+        time.sleep(2)  # DTR reset wait
+        self.ser.reset_input_buffer()
+        self.buffer = bytearray()
+        self.ser.write(f"stream {rate} {channels}\n".encode())
+
+    def write(self, data):
+        self.ser.write(data)
+
+    def lines(self):
+        waiting = self.ser.in_waiting
+        if waiting:
+            self.buffer.extend(self.ser.read(waiting))
+        out = []
+        while b'\n' in self.buffer:
+            raw, _, rest = bytes(self.buffer).partition(b'\n')
+            self.buffer = bytearray(rest)
+            out.append(raw.decode('utf-8', errors='ignore').strip())
+        return out
+
+    def summary(self, timeout):
+        return None
+
+    def close(self):
+        self.ser.close()
+
+
+class EmulatedLink:
+    """
+    The stream harness behind an emulated serial link: packets pass through a queue
+    drained at link_kbps (0 = unlimited), with random stalls of up to jitter_ms
+    (one every 500 ms on average), dropped packets and corrupted bytes
+    """
+
+    def __init__(self, binary, rate, channels, link_kbps=0.0, jitter_ms=0.0, loss=0.0, corrupt=0.0, seed=0):
+        self.proc = subprocess.Popen([str(binary), str(rate), str(channels)], stdin=subprocess.PIPE,
+                                     stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.bytes_per_s = link_kbps * 1000 / 10 if link_kbps else 0  # 8N1: 10 bits per byte
+        self.jitter_s = jitter_ms / 1000
+        self.loss, self.corrupt = loss, corrupt
+        self.rng = random.Random(seed)
+        self.outgoing = queue.Queue()
+        self.incoming = queue.Queue()
+        self.injected = {'dropped': 0, 'corrupted': 0, 'stalls': 0}
+        threading.Thread(target=self._send, daemon=True).start()
+        threading.Thread(target=self._receive, daemon=True).start()
+
+    def _send(self):
+        next_free = time.perf_counter()
+        next_stall = next_free + self.rng.expovariate(2)
+        while True:
+            packet = self.outgoing.get()
+            if packet is None:
+                break
+            wire_s = len(packet) / self.bytes_per_s if self.bytes_per_s else 0
+            if self.jitter_s and time.perf_counter() >= next_stall:
+                next_free = max(next_free, time.perf_counter()) + self.rng.uniform(0, self.jitter_s)
+                next_stall = next_free + self.rng.expovariate(2)
+                self.injected['stalls'] += 1
+            next_free = max(next_free, time.perf_counter()) + wire_s
+            delay = next_free - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if self.rng.random() < self.loss:
+                self.injected['dropped'] += 1
+                continue
+            if self.rng.random() < self.corrupt:
+                packet = bytearray(packet)
+                packet[self.rng.randrange(HEADER.size, len(packet))] ^= 0xFF
+                self.injected['corrupted'] += 1
+            try:
+                self.proc.stdin.write(packet)
+                self.proc.stdin.flush()
+            except (BrokenPipeError, ValueError):
+                break
+
+    def _receive(self):
+        for raw in self.proc.stderr:
+            self.incoming.put(raw.decode('utf-8', errors='ignore').strip())
+
+    def write(self, data):
+        self.outgoing.put(bytes(data))
+
+    def lines(self):
+        out = []
+        while not self.incoming.empty():
+            out.append(self.incoming.get_nowait())
+        return out
+
+    def summary(self, timeout):
+        try:
+            stdout, _ = self.proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            return None
+        return json.loads(stdout) if stdout.strip() else None
+
+    def close(self):
+        self.outgoing.put(None)
+        if self.proc.poll() is None:
+            self.proc.kill()
+            self.proc.wait()
+
+
+# ========== Sender ==========
+
+class StreamSender:
+    """
+    Packetizes a PCM source and paces it by the device's buffer reports.
+
+    The buffer level the sender steers on is the last reported fill plus what has been
+    sent but not yet reported received (minus what the device reported lost), so
+    bytes in the OS / USB / link queues are accounted for.
+    """
+
+    def __init__(self, link, rate, channels, on_message=None):
+        self.link = link
+        self.on_message = on_message
+        self.commands = queue.Queue()
+        self.bytes_per_s = rate * channels * 2
+        self.capacity = 0
+        self.seq = 0
+        self.sent = 0
+        self.status = {'fill': 0, 'rx': 0, 'under': 0, 'lost': 0, 'bad': 0}
+        self.end = None
+        self.factor = RATE_MAX
+        self.fills = []
+        self.playing = False
+        self.draining = False
+        self.factors = []
+
+    def _poll(self):
+        for line in self.link.lines():
+            if m := STATUS_RE.match(line):
+                fill, cap, rx, under, lost, bad = map(int, m.groups())
+                self.capacity = cap
+                self.status = {'fill': fill, 'rx': rx, 'under': under, 'lost': lost, 'bad': bad}
+                # Fill statistics cover steady playback: after the prefill, before the drain
+                self.playing = self.playing or rx >= TARGET_FILL * cap
+                if self.playing and not self.draining:
+                    self.fills.append(fill / cap)
+            elif m := READY_RE.match(line):
+                self.capacity = int(m.group(1))
+            elif m := END_RE.match(line):
+                self.end = dict(zip(('rx', 'under', 'lost', 'bad', 'over'), map(int, m.groups())))
+            elif (line.startswith('ERROR') and not self.capacity) or line == 'STREAM TIMEOUT':
+                raise click.ClickException(f"device: {line}")
+            elif line and self.on_message:
+                # Replies to commands, or anything else the firmware prints
+                self.on_message(line)
+
+    def command(self, line):
+        """Queue a serial command line; it goes out between PCM packets (any thread)"""
+        self.commands.put(line)
+
+    def _send_commands(self):
+        while not self.commands.empty():
+            line = self.commands.get_nowait().encode()[:MAX_COMMAND]
+            self.link.write(encode_packet(self.seq, line, PACKET_COMMAND))
+            self.seq += 1
+
+    def predicted_fill(self):
+        s = self.status
+        in_flight = max(0, self.sent - s['rx'] - s['lost'] * PAYLOAD)
+        return s['fill'] + in_flight
+
+    def wait_ready(self, timeout=5.0):
+        deadline = time.perf_counter() + timeout
+        while not self.capacity:
+            if time.perf_counter() > deadline:
+                raise click.ClickException("device did not answer 'stream' with STREAM READY")
+            self._poll()
+            time.sleep(0.01)
+
+    def run(self, source, progress=None):
+        self.wait_ready()
+        pending = bytearray()
+        budget = 0.0
+        last = time.perf_counter()
+        last_progress = last
+        for block in source:
+            pending.extend(block)
+            while len(pending) >= PAYLOAD:
+                while True:
+                    self._poll()
+                    self._send_commands()
+                    if self.end is not None:
+                        return self.end  # Stopped by a command: the device is back to line mode
+                    now = time.perf_counter()
+                    predicted = self.predicted_fill()
+                    error = (TARGET_FILL * self.capacity - predicted) / self.capacity
+                    self.factor = min(RATE_MAX, max(RATE_MIN, 1.0 + 2.0 * error))
+                    budget = min(budget + self.bytes_per_s * self.factor * (now - last), 2 * PAYLOAD)
+                    last = now
+                    if progress and now - last_progress > 0.25:
+                        progress(self)
+                        last_progress = now
+                    if budget >= PAYLOAD and predicted + PAYLOAD <= MAX_FILL * self.capacity:
+                        break
+                    time.sleep(TICK_S)
+                self._send(pending[:PAYLOAD])
+                del pending[:PAYLOAD]
+                budget -= PAYLOAD
+                self.factors.append(self.factor)
+        if pending:
+            self._send(pending)
+        self.link.write(encode_packet(self.seq, kind=PACKET_END))
+        self.draining = True
+
+        # Device drains the buffer, then reports the totals
+        deadline = time.perf_counter() + self.predicted_fill() / self.bytes_per_s + 5.0
+        while self.end is None and time.perf_counter() < deadline:
+            self._poll()
+            self._send_commands()
+            time.sleep(0.01)
+        return self.end
+
+    def _send(self, payload):
+        self.link.write(encode_packet(self.seq, bytes(payload)))
+        self.seq += 1
+        self.sent += len(payload)
+
+
+def status_text(sender):
+    s = sender.status
+    fill = s['fill'] / sender.capacity * 100 if sender.capacity else 0
+    return (f"buffer {fill:4.0f}%  rate {sender.factor:.2f}x  sent {sender.sent / sender.bytes_per_s:6.1f}s  "
+            f"underruns {s['under']}  lost {s['lost']}  bad {s['bad']}")
+
+
+def build_harness(force=False):
+    cxx = os.environ.get('CXX', 'g++')
+    inputs = [HARNESS, *SOURCES, *SRC_DIR.glob('*.h'), *(BENCH_DIR / 'stubs').glob('*.h')]
+    if not force and BINARY.exists() and all(p.stat().st_mtime <= BINARY.stat().st_mtime for p in inputs):
+        return BINARY
+    BUILD_DIR.mkdir(parents=True, exist_ok=True)
+    cmd = [cxx, '-std=c++17', '-O2', '-pthread', '-I', str(BENCH_DIR / 'stubs'), '-I', str(SRC_DIR),
+           str(HARNESS), *map(str, SOURCES), '-o', str(BINARY)]
+    console.print(f"[dim]$ {shlex.join(cmd)}[/dim]")
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    except FileNotFoundError:
+        console.print(f"[bold red]✗ Error:[/bold red] {cxx} not found. Install a C++ compiler or set CXX.")
+        sys.exit(1)
+    if result.returncode != 0:
+        console.print("[bold red]✗ Harness build failed[/bold red]")
+        console.print(result.stderr, style="dim red")
+        sys.exit(1)
+    return BINARY
+
+
+# ========== CLI ==========
+
+@click.group()
+def cli():
+    """
+    Stream live PCM from the host to the player
+    """
+
+
+@cli.command()
+@click.argument('input_file', type=click.Path(exists=True, dir_okay=False))
+@click.argument('port')
+@click.option('--baud', '-b', default=460800, show_default=True, help='Serial baud rate')
+@click.option('--rate', '-r', default=44100, show_default=True, help='Stream sample rate')
+@click.option('--mono', is_flag=True, help='Stream one channel (half the bandwidth)')
+def play(input_file, port, baud, rate, mono):
+    """
+    Decode INPUT_FILE and play it live on the device at PORT
+    """
+    channels = 1 if mono else 2
+    needed = rate * channels * 2 * (PAYLOAD + HEADER.size + 2) / PAYLOAD
+    if needed > baud / 10:
+        # Native USB CDC ignores the baud rate; UART bridges do not
+        console.print(f"[yellow]⚠ {needed / 1000:.0f} KB/s needed, {baud / 10000:.0f} KB/s at {baud} baud: "
+                      f"over a UART bridge use --rate 22050 --mono[/yellow]")
+    source = open_source(input_file, None, rate, channels)
+    link = SerialLink(port, baud, rate, channels)
+    sender = StreamSender(link, rate, channels, lambda line: console.print(f"[dim]device: {line}[/dim]"))
+    if sys.stdin.isatty():
+        console.print("[dim]Type a command + Enter while it plays: volume <0-100>, pause, resume, stop[/dim]")
+
+        def read_commands():
+            for line in sys.stdin:
+                if line.strip():
+                    sender.command(line.strip())
+
+        threading.Thread(target=read_commands, daemon=True).start()
+    try:
+        with console.status("Streaming...") as status:
+            end = sender.run(source, lambda s: status.update(status_text(s)))
+    except KeyboardInterrupt:
+        link.write(encode_packet(sender.seq, kind=PACKET_END))
+        console.print("\n[yellow]⚠ Interrupted[/yellow]")
+        end = None
+    finally:
+        link.close()
+    if end:
+        console.print(f"[green]✓ Done[/green]  underruns {end['under']}, lost {end['lost']}, "
+                      f"bad {end['bad']}, overflows {end['over']}")
+
+
+@cli.command()
+@click.argument('input_file', required=False, type=click.Path(exists=True, dir_okay=False))
+@click.option('--synthetic', type=float, help='Stream a generated sweep of this many seconds instead of a file')
+@click.option('--rate', '-r', default=44100, show_default=True, help='Stream sample rate')
+@click.option('--mono', is_flag=True, help='Stream one channel')
+@click.option('--link-kbps', default=0.0, show_default=True, help='Link speed in kbit/s, 8N1 (0 = unlimited, like USB CDC)')
+@click.option('--jitter-ms', default=0.0, show_default=True, help='Longest random link stall')
+@click.option('--loss', default=0.0, show_default=True, help='Fraction of packets dropped')
+@click.option('--corrupt', default=0.0, show_default=True, help='Fraction of packets with a flipped byte')
+@click.option('--seed', default=0, show_default=True, help='Random seed for the link impairments')
+@click.option('--command', 'commands', multiple=True, metavar='SECONDS:LINE',
+              help='Send command LINE SECONDS into the stream, e.g. 3:stop (repeatable)')
+@click.option('--json', 'json_path', type=click.Path(), help='Write the results as JSON')
+def emulate(input_file, synthetic, rate, mono, link_kbps, jitter_ms, loss, corrupt, seed, commands, json_path):
+    """
+    Stream into the host-built firmware stream module and count underruns
+    """
+    if not input_file and not synthetic:
+        raise click.UsageError("give INPUT_FILE or --synthetic SECONDS")
+    scheduled = []
+    for spec in commands:
+        at, _, line = spec.partition(':')
+        try:
+            scheduled.append((float(at), line))
+        except ValueError:
+            raise click.BadParameter(f"{spec!r} is not SECONDS:LINE", param_hint='--command')
+    channels = 1 if mono else 2
+    binary = build_harness()
+    source = open_source(input_file, synthetic, rate, channels)
+    link = EmulatedLink(binary, rate, channels, link_kbps, jitter_ms, loss, corrupt, seed)
+    sender = StreamSender(link, rate, channels, lambda line: console.print(f"[dim]harness: {line}[/dim]"))
+    timers = [threading.Timer(at, sender.command, [line]) for at, line in scheduled]
+    t0 = time.perf_counter()
+    try:
+        for timer in timers:
+            timer.start()
+        with console.status("Streaming...") as status:
+            sender.run(source, lambda s: status.update(status_text(s)))
+        result = link.summary(timeout=5.0)
+    finally:
+        for timer in timers:
+            timer.cancel()
+        link.close()
+    if result is None:
+        raise click.ClickException("harness did not finish the stream")
+
+    fills = np.array(sender.fills or [0.0])
+    factors = np.array(sender.factors or [1.0])
+    result.update({
+        'rate': rate, 'channels': channels, 'link_kbps': link_kbps, 'jitter_ms': jitter_ms,
+        'loss': loss, 'corrupt': corrupt, 'wall_s': round(time.perf_counter() - t0, 2),
+        'fill_min': round(float(fills.min()), 3), 'fill_mean': round(float(fills.mean()), 3),
+        'rate_factor_min': round(float(factors.min()), 3), 'rate_factor_max': round(float(factors.max()), 3),
+        **link.injected,
+    })
+
+    table = Table(title=f"PCM stream: {rate} Hz x {channels}, link "
+                        f"{f'{link_kbps:g} kbit/s' if link_kbps else 'unlimited'}")
+    table.add_column("Metric", style="cyan")
+    table.add_column("Value", justify="right")
+    table.add_row("Played", f"{result['played_ms'] / 1000:.2f} s")
+    table.add_row("Underruns", str(result['underruns']))
+    table.add_row("Silence gaps", f"{result['gap_ms']:.0f} ms")
+    table.add_row("Buffer fill min / mean", f"{result['fill_min']:.0%} / {result['fill_mean']:.0%}")
+    table.add_row("Send rate", f"{result['rate_factor_min']:.2f}x – {result['rate_factor_max']:.2f}x")
+    table.add_row("Lost / bad packets", f"{result['lost']} / {result['bad']}")
+    table.add_row("Injected drop / corrupt / stalls",
+                  f"{result['dropped']} / {result['corrupted']} / {result['stalls']}")
+    table.add_row("Overflows", str(result['overflows']))
+    console.print(table)
+
+    if json_path:
+        Path(json_path).write_text(json.dumps(result, indent=2))
+    if result['underruns']:
+        console.print(f"[bold red]✗ {result['underruns']} underrun(s)[/bold red]")
+        sys.exit(1)
+    console.print("[green]✓ No underruns[/green]")
+
+
+if __name__ == '__main__':
+    cli()
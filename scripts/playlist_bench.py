@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Host Playlist Check
+Builds scripts/host_bench/playlist_harness.cpp natively together with
+src/WavPlayer/PlaylistManager.cpp (SD card stubbed onto a temporary directory),
+fills the fake card with thousands of tracks and verifies the paged playlist:
+host-built index, scan fallback, reload of the scan-written index and a card
+changed behind the index's back.
+Reports load time, page loads per walk and the playlist's resident RAM.
+"""
+
+import json
+import os
+import shlex
+import struct
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import click
+from rich.console import Console
+from rich.table import Table
+
+from playlist_index import write_index
+
+console = Console()
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SRC_DIR = PROJECT_ROOT / 'src' / 'WavPlayer'
+BENCH_DIR = Path(__file__).resolve().parent / 'host_bench'
+HARNESS = BENCH_DIR / 'playlist_harness.cpp'
+BUILD_DIR = PROJECT_ROOT / 'build' / 'host_bench'
+BINARY = BUILD_DIR / 'playlist_harness'
+SOURCES = [SRC_DIR / 'PlaylistManager.cpp']
+
+# RAM of the fixed playlist[32][256] array the pager replaced
+LEGACY_PLAYLIST_BYTES = 32 * 256
+PLAYLIST_SUMMARY = ("{pages} resident pages x {page_tracks} tracks; "
+                    "the old playlist[32][256] array used {legacy:,} B for at most 32 tracks")
+
+
+def build_harness(force=False):
+    cxx = os.environ.get('CXX', 'g++')
+    inputs = [HARNESS, *SOURCES, *SRC_DIR.glob('*.h'), *(BENCH_DIR / 'stubs').glob('*.h')]
+    if not force and BINARY.exists() and all(p.stat().st_mtime <= BINARY.stat().st_mtime for p in inputs):
+        return BINARY
+    BUILD_DIR.mkdir(parents=True, exist_ok=True)
+    cmd = [cxx, '-std=c++17', '-O2', '-I', str(BENCH_DIR / 'stubs'), '-I', str(SRC_DIR),
+           str(HARNESS), *map(str, SOURCES), '-o', str(BINARY)]
+    console.print(f"[dim]$ {shlex.join(cmd)}[/dim]")
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    except FileNotFoundError:
+        console.print(f"[bold red]✗ Error:[/bold red] {cxx} not found. Install a C++ compiler or set CXX.")
+        sys.exit(1)
+    if result.returncode != 0:
+        console.print("[bold red]✗ Harness build failed[/bold red]")
+        console.print(result.stderr, style="dim red")
+        sys.exit(1)
+    return BINARY
+
+
+def tiny_wav(frames=4):
+    data = b'\0' * frames * 4
+    fmt = struct.pack('<HHIIHH', 1, 2, 44100, 44100 * 4, 4, 16)
+    return (b'RIFF' + struct.pack('<I', 36 + len(data)) + b'WAVE'
+            + b'fmt ' + struct.pack('<I', len(fmt)) + fmt + b'data' + struct.pack('<I', len(data)) + data)
+
+
+def make_card(root, tracks):
+    """
+    Fill a directory like a music card: mostly WAV, some MP3, long and Unicode names,
+    plus files the player must ignore.
+
+    Returns:
+        list: card paths of the audio tracks
+    """
+    names = []
+    for i in range(tracks):
+        if i % 10 == 3:
+            name = f"{i:05d} アーティスト - 曲名 {'x' * (i % 40)}.mp3"
+        elif i % 10 == 7:
+            name = f"{i:05d} A rather long artist name - An even longer track title (Remastered).WAV"
+        else:
+            name = f"track_{i:05d}.wav"
+        # Vary the size so stale-size checks have something to compare
+        (root / name).write_bytes(tiny_wav(1 + i % 5) if name.lower().endswith('.wav') else b'\xff\xfb\x90\x64' + b'\0' * (i % 7))
+        names.append('/' + name)
+    (root / '._track_00000.wav').write_bytes(b'AppleDouble')
+    (root / 'cover.jpg').write_bytes(b'\xff\xd8')
+    (root / 'notes.txt').write_text('not audio')
+    return names
+
+
+def run_harness(binary, card, expected, ordered):
+    list_path = card.parent / 'expected.txt'
+    list_path.write_text('\n'.join(expected) + '\n', encoding='utf-8')
+    cmd = [str(binary), str(card), str(list_path)] + (['--ordered'] if ordered else [])
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    try:
+        report = json.loads(result.stdout)
+    except ValueError:
+        raise click.ClickException(f"harness crashed (exit {result.returncode}): {result.stderr[-500:]}")
+    return report
+
+
+@click.command()
+@click.option('--tracks', '-n', default=10000, show_default=True, help='Tracks on the fake card')
+@click.option('--rebuild', is_flag=True, default=False, help='Force a harness rebuild')
+@click.option('--json', 'json_path', type=click.Path(dir_okay=False), help='Write results to a JSON file')
+def cli(tracks, rebuild, json_path):
+    """
+    Verify the paged playlist on the host with a large fake SD card
+    """
+    binary = build_harness(rebuild)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='dap-playlist-') as tmp:
+        card = Path(tmp) / 'sd'
+        card.mkdir()
+        with console.status(f"[cyan]Creating {tracks} tracks...[/cyan]"):
+            names = make_card(card, tracks)
+
+        with console.status("[cyan]Host index...[/cyan]"):
+            records = write_index(card)
+            results['host index'] = run_harness(binary, card, [r['path'] for r in records], ordered=True)
+
+        (card / 'playlist.idx').unlink()
+        with console.status("[cyan]Scan fallback...[/cyan]"):
+            results['scan fallback'] = run_harness(binary, card, names, ordered=False)
+
+        with console.status("[cyan]Reload scan-written index...[/cyan]"):
+            results['device index'] = run_harness(binary, card, names, ordered=False)
+
+        # Copied on by a PC: the boot count of the root no longer matches the index
+        (card / 'added from pc.wav').write_bytes(tiny_wav())
+        with console.status("[cyan]Card changed since the index...[/cyan]"):
+            results['files added'] = run_harness(binary, card, names + ['/added from pc.wav'], ordered=False)
+
+    table = Table(show_header=True, header_style="bold cyan", border_style="cyan")
+    table.add_column("Case")
+    table.add_column("Tracks", justify="right")
+    table.add_column("Load", justify="right")
+    table.add_column("SD reads", justify="right")
+    table.add_column("Page loads →/←", justify="right")
+    table.add_column("Random µs", justify="right")
+    table.add_column("Find ms", justify="right")
+    table.add_column("RAM", justify="right")
+    table.add_column("Result")
+    failed = False
+    for case, r in results.items():
+        ok = not r['failures'] and r['memory_bytes'] < LEGACY_PLAYLIST_BYTES
+        failed |= not ok
+        table.add_row(case, f"{r['tracks']:,}", f"{r['load_ms']:.1f} ms", f"{r['load_reads']:,}",
+                      f"{r['forward_page_loads']}/{r['backward_page_loads']}", f"{r['random_lookup_us']:.1f}",
+                      f"{r['find_ms']:.1f}", f"{r['memory_bytes']:,} B",
+                      "[green]PASS[/green]" if ok else "[red]FAIL[/red]")
+    console.print(table)
+    console.print(f"[dim]{PLAYLIST_SUMMARY.format(**next(iter(results.values())), legacy=LEGACY_PLAYLIST_BYTES)}[/dim]")
+    for case, r in results.items():
+        for failure in r['failures']:
+            console.print(f"[red]✗ {case}:[/red] {failure}")
+
+    if json_path:
+        Path(json_path).write_text(json.dumps(results, indent=2))
+        console.print(f"[green]✓ Results written to {json_path}[/green]")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    cli()
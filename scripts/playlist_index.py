@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Playlist Index Builder
+Writes /playlist.idx for an SD card (or a directory that will be copied to one) so the
+player loads its playlist from one small file at boot instead of walking the card.
+
+The layout matches PlaylistIndexHeader / PlaylistIndexRecord in
+src/WavPlayer/PlaylistManager.h. All values are little-endian.
+"""
+
+import math
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+import click
+from rich.console import Console
+from rich.table import Table
+
+console = Console()
+
+INDEX_NAME = 'playlist.idx'
+MAGIC = 0x49504144  # "DAPI"
+VERSION = 2
+FLAG_DEVICE = 0x01
+
+HEADER = struct.Struct('<IHHIIIII')   # magic, version, record size, count, strings offset, strings size, flags,
+                                      # audio files directly in the card root (the player's boot staleness check)
+RECORD = struct.Struct('<IIIIIBBh')   # path offset, file size, data offset, duration ms, rate, format, bits, gain cdB
+
+# AudioFormat in Config.h
+FORMATS = {'.wav': 0, '.mp3': 1}
+FORMAT_NAMES = {0: 'WAV', 1: 'MP3'}
+
+# MPEG audio: bitrate (kbps) by [version_is_mpeg1][layer][index], sample rate by version
+MP3_BITRATES = {
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+}
+MP3_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def wav_info(path):
+    """
+    Walk the RIFF chunks of a WAV file.
+
+    Returns:
+        dict: data_offset, data_size, sample_rate, channels, bits ; None if not a PCM WAV
+    """
+    with open(path, 'rb') as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+            return None
+        info = {}
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, size = chunk[:4], struct.unpack('<I', chunk[4:])[0]
+            if chunk_id == b'fmt ':
+                fmt = f.read(size + (size & 1))
+                _, channels, rate, _, _, bits = struct.unpack('<HHIIHH', fmt[:16])
+                info.update(sample_rate=rate, channels=channels, bits=bits)
+            elif chunk_id == b'data':
+                info.update(data_offset=f.tell(), data_size=size)
+                return info if 'sample_rate' in info else None
+            else:
+                f.seek(size + (size & 1), 1)
+
+
+def mp3_info(path):
+    """
+    Find the first MPEG audio frame (after any ID3v2 tag) and estimate the duration,
+    from the Xing/Info frame count when present, otherwise from the first frame's bitrate.
+
+    Returns:
+        dict: data_offset, duration_ms, sample_rate ; None if no frame is found
+    """
+    size = path.stat().st_size
+    with open(path, 'rb') as f:
+        head = f.read(10)
+        offset = 0
+        if head[:3] == b'ID3' and len(head) == 10:
+            tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+            offset = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+        f.seek(offset)
+        data = f.read(65536)
+
+    for i in range(len(data) - 4):
+        if data[i] != 0xFF or (data[i + 1] & 0xE0) != 0xE0:
+            continue
+        version = (data[i + 1] >> 3) & 0x03  # 3 = MPEG1, 2 = MPEG2, 0 = MPEG2.5
+        layer = (data[i + 1] >> 1) & 0x03     # 1 = III, 2 = II, 3 = I
+        bitrate_index = data[i + 2] >> 4
+        rate_index = (data[i + 2] >> 2) & 0x03
+        if version == 1 or layer == 0 or bitrate_index in (0, 15) or rate_index == 3:
+            continue
+        mpeg1 = version == 3
+        layer_number = 4 - layer
+        bitrate = MP3_BITRATES[(mpeg1, layer_number)][bitrate_index] * 1000
+        rate = MP3_RATES[version][rate_index]
+        samples_per_frame = 384 if layer_number == 1 else (1152 if mpeg1 or layer_number == 2 else 576)
+
+        duration = (size - offset - i) * 8 / bitrate
+        channel_mode = data[i + 3] >> 6
+        side_info = (17 if channel_mode == 3 else 32) if mpeg1 else (9 if channel_mode == 3 else 17)
+        xing = data[i + 4 + side_info:i + 4 + side_info + 12]
+        if xing[:4] in (b'Xing', b'Info') and struct.unpack('>I', xing[4:8])[0] & 0x01:
+            frames = struct.unpack('>I', xing[8:12])[0]
+            duration = frames * samples_per_frame / rate
+        return {'data_offset': offset + i, 'duration_ms': round(duration * 1000), 'sample_rate': rate}
+    return None
+
+
+def track_gain(path, info, target_dbfs=-18.0, limit_db=12.0):
+    """Gain in 1/100 dB that brings a 16-bit WAV's RMS level to target_dbfs"""
+    if info.get('bits') != 16:
+        return 0
+    squares = 0
+    count = 0
+    with open(path, 'rb') as f:
+        f.seek(info['data_offset'])
+        remaining = info['data_size']
+        while remaining > 0:
+            block = f.read(min(remaining, 1 << 20))
+            if not block:
+                break
+            remaining -= len(block)
+            samples = array('h', block[:len(block) & ~1])
+            squares += sum(s * s for s in samples)
+            count += len(samples)
+    if not count or not squares:
+        return 0
+    rms_dbfs = 10 * math.log10(squares / count / 32768.0 ** 2)
+    gain = max(-limit_db, min(limit_db, target_dbfs - rms_dbfs))
+    return round(gain * 100)
+
+
+def track_record(root, path, analyze=False):
+    """
+    Returns:
+        dict: record fields plus 'path' (card path starting with '/')
+    """
+    fmt = FORMATS[path.suffix.lower()]
+    record = {
+        'path': '/' + path.relative_to(root).as_posix(),
+        'file_size': path.stat().st_size,
+        'data_offset': 0,
+        'duration_ms': 0,
+        'sample_rate': 0,
+        'format': fmt,
+        'bits': 0,
+        'gain_cdb': 0,
+    }
+    if fmt == FORMATS['.wav']:
+        info = wav_info(path)
+        if info:
+            bytes_per_second = info['sample_rate'] * info['channels'] * info['bits'] // 8
+            record.update(data_offset=info['data_offset'], sample_rate=info['sample_rate'], bits=info['bits'],
+                          duration_ms=info['data_size'] * 1000 // bytes_per_second if bytes_per_second else 0)
+            if analyze:
+                record['gain_cdb'] = track_gain(path, info)
+    else:
+        info = mp3_info(path)
+        if info:
+            record.update(info, bits=16)
+    return record
+
+
+def find_tracks(root, recursive=False):
+    """Audio files the player would list, in name order (hidden and macOS ._ files skipped)"""
+    pattern = '**/*' if recursive else '*'
+    tracks = [p for p in root.glob(pattern)
+              if p.is_file() and p.suffix.lower() in FORMATS
+              and not any(part.startswith('.') for part in p.relative_to(root).parts)]
+    return sorted(tracks, key=lambda p: p.relative_to(root).as_posix().lower())
+
+
+def count_root_tracks(root):
+    """Audio files directly in root by the player's scan rule (only macOS ._ files skipped)"""
+    return sum(1 for p in Path(root).iterdir()
+               if p.is_file() and p.suffix.lower() in FORMATS and not p.name.startswith('._'))
+
+
+def encode_index(records, flags=0, root_tracks=0):
+    strings = bytearray()
+    body = bytearray()
+    for r in records:
+        body += RECORD.pack(len(strings), r['file_size'], r['data_offset'], r['duration_ms'], r['sample_rate'],
+                            r['format'], r['bits'], r['gain_cdb'])
+        strings += r['path'].encode('utf-8') + b'\0'
+    strings_offset = HEADER.size + len(body)
+    header = HEADER.pack(MAGIC, VERSION, RECORD.size, len(records), strings_offset, len(strings), flags, root_tracks)
+    return bytes(header + body + strings)
+
+
+def decode_index(data):
+    """
+    Returns:
+        tuple: (flags, records) ; raises ValueError on a malformed index
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("file too short")
+    magic, version, record_size, count, strings_offset, strings_size, flags, _ = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a version {VERSION} playlist index")
+    if record_size < RECORD.size or strings_offset != HEADER.size + count * record_size \
+            or strings_offset + strings_size != len(data):
+        raise ValueError("inconsistent header")
+    records = []
+    for i in range(count):
+        fields = RECORD.unpack_from(data, HEADER.size + i * record_size)
+        start = strings_offset + fields[0]
+        end = data.index(b'\0', start)
+        records.append(dict(zip(('path_offset', 'file_size', 'data_offset', 'duration_ms', 'sample_rate',
+                                 'format', 'bits', 'gain_cdb'), fields),
+                            path=data[start:end].decode('utf-8')))
+    return flags, records
+
+
+def write_index(root, recursive=False, analyze=False):
+    """
+    Build and write <root>/playlist.idx.
+
+    Returns:
+        list: the records written
+    """
+    root = Path(root)
+    records = [track_record(root, p, analyze) for p in find_tracks(root, recursive)]
+    target = root / INDEX_NAME
+    tmp = target.with_suffix('.idx.tmp')
+    tmp.write_bytes(encode_index(records, root_tracks=count_root_tracks(root)))
+    tmp.replace(target)
+    return records
+
+
+def records_table(records):
+    table = Table(show_header=True, header_style="bold cyan", border_style="cyan")
+    table.add_column("#", justify="right", style="dim")
+    table.add_column("Path")
+    table.add_column("Format")
+    table.add_column("Size", justify="right")
+    table.add_column("Duration", justify="right")
+    table.add_column("Rate", justify="right")
+    table.add_column("Data @", justify="right", style="dim")
+    table.add_column("Gain", justify="right")
+    for i, r in enumerate(records, 1):
+        seconds = r['duration_ms'] // 1000
+        table.add_row(str(i), r['path'], FORMAT_NAMES.get(r['format'], '?'), f"{r['file_size']:,}",
+                      f"{seconds // 60}:{seconds % 60:02d}" if r['duration_ms'] else "-",
+                      f"{r['sample_rate']}" if r['sample_rate'] else "-",
+                      f"{r['data_offset']}" if r['data_offset'] else "-",
+                      f"{r['gain_cdb'] / 100:+.1f} dB" if r['gain_cdb'] else "-")
+    return table
+
+
+@click.group()
+def cli():
+    """
+    Build / inspect the player's /playlist.idx
+    """
+
+
+@cli.command()
+@click.argument('root', type=click.Path(exists=True, file_okay=False))
+@click.option('--recursive', '-r', is_flag=True, default=False, help='Include sub-directories')
+@click.option('--analyze', is_flag=True, default=False, help='Measure WAV loudness and store a track gain (slow)')
+@click.option('--quiet', '-q', is_flag=True, default=False, help='Only print the summary')
+def build(root, recursive, analyze, quiet):
+    """Write ROOT/playlist.idx (ROOT = mounted SD card or sync folder)"""
+    with console.status("[cyan]Indexing...[/cyan]"):
+        records = write_index(root, recursive, analyze)
+    if not quiet and records:
+        console.print(records_table(records))
+    total_ms = sum(r['duration_ms'] for r in records)
+    console.print(f"[green]✓ {len(records)} tracks[/green] ({total_ms // 60000} min) → {Path(root) / INDEX_NAME}")
+
+
+@cli.command()
+@click.argument('index', type=click.Path(exists=True))
+def show(index):
+    """Print an existing index (file or directory containing playlist.idx)"""
+    path = Path(index)
+    if path.is_dir():
+        path = path / INDEX_NAME
+    try:
+        flags, records = decode_index(path.read_bytes())
+    except (OSError, ValueError) as e:
+        console.print(f"[bold red]✗ Error:[/bold red] {path}: {e}")
+        sys.exit(1)
+    source = "device (scan fallback)" if flags & FLAG_DEVICE else "host"
+    console.print(records_table(records))
+    console.print(f"[dim]{len(records)} tracks, written by {source}[/dim]")
+
+
+if __name__ == '__main__':
+    cli()
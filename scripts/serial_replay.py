@@ -0,0 +1,303 @@
+"""
+序列工作階段錄製／重播模組
+把裝置的原始序列位元組（含時間戳記）錄成精簡的二進位檔，
+再透過 pty 以原速、N 倍速或最快速度重播，不需要硬體即可測試主機端解析流程
+"""
+
+import json
+import os
+import struct
+import sys
+import time
+import tty
+
+import click
+import serial
+from rich.console import Console
+from rich.panel import Panel
+from rich.table import Table
+
+console = Console()
+
+# 檔案格式：
+#   標頭  MAGIC(8) + <IQ 鮑率, 開始時間 (epoch ns)
+#   區塊  <IH 與前一區塊的間隔 (µs), 長度 + 原始位元組
+MAGIC = b'DAPSREC\x01'
+HEADER = struct.Struct('<IQ')
+CHUNK = struct.Struct('<IH')
+MAX_CHUNK = 0xFFFF
+
+
+class SessionWriter:
+    """錄製檔寫入器"""
+
+    def __init__(self, path, baudrate):
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC)
+        self.file.write(HEADER.pack(baudrate, time.time_ns()))
+        self.last = time.perf_counter()
+        self.bytes = 0
+        self.chunks = 0
+
+    def write(self, data, now=None):
+        """
+        寫入一段收到的資料
+
+        Args:
+            data (bytes): 原始位元組
+            now (float): perf_counter 時間（預設為目前時間）
+        """
+        now = time.perf_counter() if now is None else now
+        delta_us = min(int((now - self.last) * 1e6), 0xFFFFFFFF)
+        self.last = now
+        for i in range(0, len(data), MAX_CHUNK):
+            part = data[i:i + MAX_CHUNK]
+            self.file.write(CHUNK.pack(delta_us, len(part)))
+            self.file.write(part)
+            delta_us = 0
+            self.chunks += 1
+        self.bytes += len(data)
+
+    def close(self):
+        self.file.close()
+
+
+class SessionReader:
+    """錄製檔讀取器"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} 不是序列錄製檔")
+            self.baudrate, self.start_ns = HEADER.unpack(f.read(HEADER.size))
+            self.data_offset = f.tell()
+
+    def __iter__(self):
+        """
+        逐一產生 (相對時間秒數, 位元組)
+        """
+        with open(self.path, 'rb') as f:
+            f.seek(self.data_offset)
+            t = 0.0
+            while True:
+                head = f.read(CHUNK.size)
+                if len(head) < CHUNK.size:
+                    return
+                delta_us, length = CHUNK.unpack(head)
+                t += delta_us / 1e6
+                yield t, f.read(length)
+
+    def summary(self):
+        total = 0
+        chunks = 0
+        duration = 0.0
+        for t, data in self:
+            total += len(data)
+            chunks += 1
+            duration = t
+        return {'bytes': total, 'chunks': chunks, 'duration': duration, 'baudrate': self.baudrate}
+
+
+def record_session(port, path, baudrate=460800, duration=None):
+    """
+    從序列埠錄製原始位元組直到逾時或 Ctrl+C
+
+    Returns:
+        SessionWriter: 已關閉的寫入器（含統計）
+    """
+    writer = SessionWriter(path, baudrate)
+    start = time.perf_counter()
+    try:
+        with serial.Serial(port, baudrate, timeout=0.05) as ser:
+            console.print(f"[green]✓[/green] 錄製 [magenta]{port}[/magenta] → [cyan]{path}[/cyan]（Ctrl+C 停止）")
+            while duration is None or time.perf_counter() - start < duration:
+                data = ser.read(ser.in_waiting or 1)
+                if data:
+                    writer.write(data)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close()
+    return writer
+
+
+def open_pty():
+    """
+    建立原始模式的 pty
+
+    Returns:
+        tuple: (master_fd, slave 路徑, slave_fd)
+    """
+    master_fd, slave_fd = os.openpty()
+    tty.setraw(slave_fd)
+    return master_fd, os.ttyname(slave_fd), slave_fd
+
+
+def write_all(fd, data):
+    """寫入全部位元組（pty 可能只接受部分資料）"""
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def replay_session(reader, write, speed=1.0):
+    """
+    依錄製時間重播
+
+    Args:
+        reader (SessionReader): 錄製檔
+        write (callable): 輸出函式 func(bytes)
+        speed (float): 播放倍速（0 表示不等待，盡可能快）
+
+    Returns:
+        tuple: (位元組數, 實際耗時秒數)
+    """
+    start = time.perf_counter()
+    total = 0
+    for t, data in reader:
+        if speed > 0:
+            wait = start + t / speed - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+        write(data)
+        total += len(data)
+    return total, time.perf_counter() - start
+
+
+def bench_parse(reader, repeat=1):
+    """
+    以最快速度把錄製資料餵給與 SerialMonitor 相同的行切割 + JSON 解析流程
+
+    Returns:
+        dict: 吞吐量統計
+    """
+    chunks = [data for _, data in reader]
+    lines = 0
+    json_ok = 0
+    json_err = 0
+    total = 0
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        buffer = bytearray()
+        for data in chunks:
+            total += len(data)
+            buffer.extend(data)
+            while True:
+                newline = buffer.find(b'\n')
+                if newline < 0:
+                    break
+                message = buffer[:newline].decode('utf-8', errors='replace').rstrip()
+                del buffer[:newline + 1]
+                lines += 1
+                if message.startswith('{'):
+                    try:
+                        json.loads(message)
+                        json_ok += 1
+                    except ValueError:
+                        json_err += 1
+    elapsed = time.perf_counter() - start
+
+    return {
+        'bytes': total,
+        'lines': lines,
+        'json_ok': json_ok,
+        'json_err': json_err,
+        'seconds': elapsed,
+        'mb_per_s': total / elapsed / 1e6 if elapsed else 0.0,
+        'lines_per_s': lines / elapsed if elapsed else 0.0,
+    }
+
+
+@click.group()
+def cli():
+    """
+    序列工作階段錄製與重播
+    """
+
+
+@cli.command()
+@click.argument('port')
+@click.option('--output', '-o', default=None, help='錄製檔路徑（預設使用時間戳記）')
+@click.option('--baud', '-b', default=460800, show_default=True, help='鮑率')
+@click.option('--duration', '-d', type=float, default=None, help='錄製秒數（預設直到 Ctrl+C）')
+def record(port, output, baud, duration):
+    """錄製序列埠原始資料"""
+    output = output or time.strftime("session_%Y%m%d_%H%M%S.dsr")
+    try:
+        writer = record_session(port, output, baud, duration)
+    except serial.SerialException as e:
+        console.print(f"[red]✗[/red] 無法連接到 {port}: {e}")
+        sys.exit(1)
+    console.print(f"[green]✓[/green] 已錄製 {writer.bytes:,} bytes（{writer.chunks:,} 區塊）")
+
+
+@cli.command()
+@click.argument('path', type=click.Path(exists=True))
+@click.option('--speed', '-s', default=1.0, show_default=True, help='播放倍速（0 = 盡可能快）')
+@click.option('--loop', 'loops', default=1, show_default=True, help='重播次數')
+@click.option('--wait/--no-wait', default=True, show_default=True, help='開始前等待使用者按 Enter')
+def replay(path, speed, loops, wait):
+    """透過 pty 重播錄製檔"""
+    reader = SessionReader(path)
+    master_fd, slave_path, slave_fd = open_pty()
+
+    console.print(Panel(
+        f"[cyan]虛擬序列埠:[/cyan] [magenta]{slave_path}[/magenta]\n"
+        f"[cyan]倍速:[/cyan] [yellow]{'max' if speed <= 0 else f'{speed}x'}[/yellow]",
+        title="[bold green]▶ 重播[/bold green]", border_style="green"
+    ))
+    if wait:
+        input("用你的工具開啟上述序列埠後按 Enter 開始...")
+
+    try:
+        for i in range(loops):
+            total, elapsed = replay_session(reader, lambda data: write_all(master_fd, data), speed)
+            console.print(f"[green]✓[/green] 第 {i + 1} 次：{total:,} bytes / {elapsed:.3f} 秒"
+                          f"（{total / elapsed / 1024 if elapsed else 0:.1f} KB/s）")
+    except KeyboardInterrupt:
+        console.print("\n[yellow]⚠[/yellow] 中斷重播")
+    finally:
+        os.close(master_fd)
+        os.close(slave_fd)
+
+
+@cli.command()
+@click.argument('path', type=click.Path(exists=True))
+def info(path):
+    """顯示錄製檔資訊"""
+    summary = SessionReader(path).summary()
+    table = Table(show_header=False, box=None, padding=(0, 2))
+    table.add_column(style="cyan")
+    table.add_column(style="white")
+    table.add_row("鮑率", str(summary['baudrate']))
+    table.add_row("長度", f"{summary['duration']:.3f} 秒")
+    table.add_row("資料量", f"{summary['bytes']:,} bytes")
+    table.add_row("區塊數", f"{summary['chunks']:,}")
+    if summary['duration']:
+        table.add_row("平均速率", f"{summary['bytes'] / summary['duration'] / 1024:.1f} KB/s")
+    console.print(Panel(table, title=f"[bold]📼 {path}[/bold]", border_style="cyan"))
+
+
+@cli.command()
+@click.argument('path', type=click.Path(exists=True))
+@click.option('--repeat', '-n', default=10, show_default=True, help='重複次數')
+def bench(path, repeat):
+    """以最快速度測量行切割與 JSON 解析吞吐量"""
+    result = bench_parse(SessionReader(path), repeat)
+    table = Table(show_header=False, box=None, padding=(0, 2))
+    table.add_column(style="cyan")
+    table.add_column(style="white", justify="right")
+    table.add_row("資料量", f"{result['bytes']:,} bytes")
+    table.add_row("行數", f"{result['lines']:,}")
+    table.add_row("JSON 成功／失敗", f"{result['json_ok']:,} / {result['json_err']:,}")
+    table.add_row("耗時", f"{result['seconds']:.3f} 秒")
+    table.add_row("吞吐量", f"{result['mb_per_s']:.2f} MB/s")
+    table.add_row("行速率", f"{result['lines_per_s']:,.0f} 行/秒")
+    console.print(Panel(table, title="[bold]⚡ 解析效能[/bold]", border_style="cyan"))
+
+
+if __name__ == '__main__':
+    cli()
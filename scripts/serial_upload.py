@@ -2,12 +2,14 @@ import serial
 import time
 import sys
 import os
+import shutil
 import argparse
+import tempfile
 
 def upload_file(port, local_path, remote_path, baudrate=460800):
     if not os.path.exists(local_path):
         print(f"Error: Local file not found: {local_path}")
-        return
+        return False
 
     file_size = os.path.getsize(local_path)
     print(f"Connecting to {port}...")
@@ -22,11 +24,11 @@ def upload_file(port, local_path, remote_path, baudrate=460800):
         print(f"Sending command: {cmd.strip()}")
         ser.write(cmd.encode())
         
-        # Step 2: Wait for READY
+        # Step 2: Wait for READY (the device preallocates the whole file first)
         print("Waiting for READY...")
         start_wait = time.time()
         ready = False
-        while time.time() - start_wait < 3.0:
+        while time.time() - start_wait < 10.0:
             if ser.in_waiting:
                 line = ser.readline().decode(errors='ignore').strip()
                 print(f"Device: {line}")
@@ -36,7 +38,8 @@ def upload_file(port, local_path, remote_path, baudrate=460800):
         
         if not ready:
             print("Error: Device did not respond with READY")
-            return
+            ser.close()
+            return False
 
         # Step 3: Stream Binary Data
         print(f"Uploading {file_size} bytes...")
@@ -73,9 +76,67 @@ def upload_file(port, local_path, remote_path, baudrate=460800):
             print("❌ Upload validation failed.")
 
         ser.close()
+        return success
 
     except Exception as e:
         print(f"Error: {e}")
+        return False
+
+def upload_aligned(port, local_path, remote_path, baudrate=460800, boundary=512):
+    """Upload a WAV with its PCM data moved to a `boundary`-byte offset (the local file is left untouched)"""
+    from audio_converter import align_wav
+
+    with tempfile.TemporaryDirectory() as tmp:
+        aligned = os.path.join(tmp, os.path.basename(local_path))
+        shutil.copyfile(local_path, aligned)
+        offset = align_wav(aligned, boundary)
+        if offset is None:
+            print(f"Warning: {local_path} is not a PCM WAV, uploading unchanged")
+        else:
+            print(f"Aligned: PCM data at offset {offset}")
+        return upload_file(port, aligned, remote_path, baudrate)
+
+def query_bit_depth(port, baudrate=460800):
+    """The player's I2S output bit depth (`bitdepth`); None if it does not answer"""
+    try:
+        with serial.Serial(port, baudrate, timeout=1) as ser:
+            time.sleep(2) # Wait for DTR
+            ser.reset_input_buffer()
+            ser.write(b"bitdepth\n")
+            start_wait = time.time()
+            while time.time() - start_wait < 3.0:
+                line = ser.readline().decode(errors='ignore').strip()
+                if line.startswith("BITDEPTH "):
+                    return int(line.split()[1])
+    except (serial.SerialException, ValueError) as e:
+        print(f"Error: {e}")
+    return None
+
+def match_bit_depth(port, local_path, remote_path, baudrate, tmp):
+    """
+    Convert an audio file to a WAV at the player's I2S bit depth, unless it already is one.
+
+    Returns:
+        tuple: (file to upload, remote path)
+    """
+    from audio_converter import convert_to_wav
+    from playlist_index import wav_info
+
+    depth = query_bit_depth(port, baudrate)
+    if depth is None:
+        print("Warning: player did not report its bit depth, uploading unchanged")
+        return local_path, remote_path
+    info = wav_info(local_path) if local_path.lower().endswith(".wav") else None
+    if info and info['bits'] == depth:
+        print(f"Already {depth}-bit, matches the player")
+        return local_path, remote_path
+
+    converted = os.path.join(tmp, os.path.splitext(os.path.basename(local_path))[0] + ".wav")
+    print(f"Converting to {depth}-bit WAV for the player...")
+    if not convert_to_wav(local_path, converted, bit_depth=depth):
+        print("Error: conversion failed (is ffmpeg installed?)")
+        sys.exit(1)
+    return converted, os.path.splitext(remote_path)[0] + ".wav"
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Upload file to ESP32 via Serial")
@@ -83,7 +144,37 @@ if __name__ == "__main__":
     parser.add_argument("local_file", help="Path to local file")
     parser.add_argument("remote_path", help="Path on SD card (e.g., /song.mp3)")
     parser.add_argument("--baud", type=int, default=460800, help="Baud rate")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Skip the upload if the same recording was uploaded before (acoustic fingerprint)")
+    parser.add_argument("--align", type=int, nargs="?", const=512, metavar="BYTES",
+                        help="WAV: align PCM data to BYTES (default 512) and strip metadata before uploading")
+    parser.add_argument("--match-bit-depth", action="store_true",
+                        help="Convert to a WAV at the player's I2S bit depth (16/24/32) before uploading")
     
     args = parser.parse_args()
     
-    upload_file(args.port, args.local_file, args.remote_path, args.baud)
+    index = None
+    if args.dedup:
+        # Own index: the converter's holds the sources these uploads were made from
+        from audio_fingerprint import UPLOADS_DB, FingerprintIndex
+        index = FingerprintIndex(UPLOADS_DB)
+        matches = index.check(args.local_file, add=False)
+        if matches:
+            print(f"Skipped: same recording as {matches[0]['path']} ({matches[0]['score']:.0%} match)")
+            index.close()
+            sys.exit(0)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        local_file, remote_path = args.local_file, args.remote_path
+        if args.match_bit_depth:
+            local_file, remote_path = match_bit_depth(args.port, local_file, remote_path, args.baud, tmp)
+        
+        if args.align and local_file.lower().endswith(".wav"):
+            ok = upload_aligned(args.port, local_file, remote_path, args.baud, args.align)
+        else:
+            ok = upload_file(args.port, local_file, remote_path, args.baud)
+    
+    if index is not None:
+        if ok:
+            index.record(args.local_file)
+        index.close()
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Firmware Size Regression Tracker
+Records every build's memory usage per git commit and FQBN, and reports the largest
+symbols and per-object size deltas against a baseline from the ELF and linker map
+"""
+
+import re
+import sqlite3
+import struct
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import click
+from rich.console import Console
+from rich.panel import Panel
+from rich.table import Table
+
+console = Console()
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+HISTORY_DB = PROJECT_ROOT / '.size_history.db'
+
+# Memory regions by output section name prefix (ESP32 / ESP32-S3 linker scripts,
+# with generic fallbacks for plain ELF layouts)
+REGIONS = [
+    ('iram',         ('.iram0.', '.iram.')),
+    ('dram',         ('.dram0.', '.noinit', '.data', '.bss')),
+    ('rtc',          ('.rtc.', '.rtc_')),
+    ('flash_text',   ('.flash.text', '.text')),
+    ('flash_rodata', ('.flash.', '.rodata')),
+]
+
+SHF_ALLOC = 0x2
+SHT_SYMTAB = 2
+STT_OBJECT = 1
+STT_FUNC = 2
+
+
+def region_of(section):
+    for region, prefixes in REGIONS:
+        if section.startswith(prefixes):
+            return region
+    return None
+
+
+def git_revision():
+    """Short commit hash of HEAD, suffixed with -dirty when src has local changes"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short=12', 'HEAD'], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--', 'src'], cwd=PROJECT_ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return 'unknown'
+
+
+# ========== ELF / Map Parsing ==========
+
+def read_elf(path):
+    """
+    Minimal ELF reader (32/64-bit little-endian): allocated sections and sized symbols.
+
+    Returns:
+        tuple: ({section: size}, [(symbol, size, section), ...])
+    """
+    data = Path(path).read_bytes()
+    if data[:4] != b'\x7fELF':
+        raise ValueError(f"{path} is not an ELF file")
+    is64 = data[4] == 2
+
+    if is64:
+        (_, _, _, _, _, e_shoff, _, _, _, _, e_shentsize, e_shnum, e_shstrndx) = struct.unpack_from('<HHIQQQIHHHHHH', data, 16)
+        sh_fmt, sym_fmt = '<IIQQQQIIQQ', '<IBBHQQ'
+    else:
+        (_, _, _, _, _, e_shoff, _, _, _, _, e_shentsize, e_shnum, e_shstrndx) = struct.unpack_from('<HHIIIIIHHHHHH', data, 16)
+        sh_fmt, sym_fmt = '<IIIIIIIIII', '<IIIBBH'
+
+    sections = []
+    for i in range(e_shnum):
+        fields = struct.unpack_from(sh_fmt, data, e_shoff + i * e_shentsize)
+        sh_name, sh_type, sh_flags, _, sh_offset, sh_size, sh_link = fields[:7]
+        sh_entsize = fields[9]
+        sections.append((sh_name, sh_type, sh_flags, sh_offset, sh_size, sh_link, sh_entsize))
+
+    def cstr(offset):
+        end = data.index(b'\0', offset)
+        return data[offset:end].decode('utf-8', errors='replace')
+
+    shstr_offset = sections[e_shstrndx][3]
+    names = [cstr(shstr_offset + s[0]) for s in sections]
+
+    section_sizes = {}
+    for name, (_, sh_type, sh_flags, _, sh_size, _, _) in zip(names, sections):
+        if sh_flags & SHF_ALLOC and sh_size:
+            section_sizes[name] = sh_size
+
+    symbols = []
+    sym_size = struct.calcsize(sym_fmt)
+    for _, sh_type, _, sh_offset, sh_size, sh_link, _ in sections:
+        if sh_type != SHT_SYMTAB:
+            continue
+        str_offset = sections[sh_link][3]
+        for off in range(sh_offset, sh_offset + sh_size, sym_size):
+            if is64:
+                st_name, st_info, _, st_shndx, _, st_size = struct.unpack_from(sym_fmt, data, off)
+            else:
+                st_name, _, st_size, st_info, _, st_shndx = struct.unpack_from(sym_fmt, data, off)
+            if st_size == 0 or (st_info & 0xF) not in (STT_OBJECT, STT_FUNC) or not 0 < st_shndx < len(names):
+                continue
+            symbols.append((cstr(str_offset + st_name), st_size, names[st_shndx]))
+
+    return section_sizes, symbols
+
+
+MAP_OUTPUT_SECTION = re.compile(r'^(\.\S+)(?:\s+0x[0-9a-f]+\s+0x[0-9a-f]+)?\s*$')
+MAP_INPUT_FULL = re.compile(r'^ (\.\S+)\s+0x([0-9a-f]+)\s+0x([0-9a-f]+)\s+(\S.*)$')
+MAP_INPUT_NAME = re.compile(r'^ (\.\S+)$')
+MAP_INPUT_CONT = re.compile(r'^\s+0x([0-9a-f]+)\s+0x([0-9a-f]+)\s+(\S.*)$')
+
+
+def object_name(path):
+    """Shorten 'lib/.../libfoo.a(bar.c.obj)' and '/tmp/.../sketch/x.cpp.o' for display"""
+    match = re.search(r'([^/\\]+\.a)\(([^)]+)\)$', path)
+    if match:
+        return f"{match.group(1)}({match.group(2)})"
+    return Path(path).name
+
+
+def read_map(path):
+    """
+    Attribute linked input-section sizes to object files per memory region.
+
+    Returns:
+        dict: {(region, object): size}
+    """
+    sizes = defaultdict(int)
+    output_section = None
+    pending_input = None
+    in_memory_map = False
+
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not in_memory_map:
+                in_memory_map = line.startswith('Linker script and memory map')
+                continue
+
+            match = MAP_OUTPUT_SECTION.match(line)
+            if match:
+                output_section = match.group(1)
+                pending_input = None
+                continue
+
+            match = MAP_INPUT_FULL.match(line)
+            if match:
+                size, obj = int(match.group(3), 16), match.group(4).strip()
+            elif pending_input and MAP_INPUT_CONT.match(line):
+                match = MAP_INPUT_CONT.match(line)
+                size, obj = int(match.group(2), 16), match.group(3).strip()
+            else:
+                pending_input = MAP_INPUT_NAME.match(line)
+                continue
+            pending_input = None
+
+            region = region_of(output_section or '')
+            if region and size and not obj.startswith('0x'):
+                sizes[(region, object_name(obj))] += size
+
+    return dict(sizes)
+
+
+def find_artifacts(path):
+    """Locate the .elf and .map of a build (file or build directory)"""
+    path = Path(path)
+    if path.is_file():
+        elf = path
+        map_file = path.with_suffix('.map')
+    else:
+        elfs = sorted(path.glob('*.elf'), key=lambda p: p.stat().st_mtime, reverse=True)
+        elf = elfs[0] if elfs else None
+        map_file = elf.with_suffix('.map') if elf else None
+    if map_file is not None and not map_file.exists():
+        map_file = None
+    return elf, map_file
+
+
+# ========== History Database ==========
+
+def open_db(path=HISTORY_DB):
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS builds (
+            id          INTEGER PRIMARY KEY,
+            revision    TEXT NOT NULL,
+            fqbn        TEXT NOT NULL,
+            timestamp   REAL NOT NULL,
+            flash_used  INTEGER, flash_total INTEGER,
+            ram_used    INTEGER, ram_total   INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_builds_rev ON builds (fqbn, revision);
+        CREATE TABLE IF NOT EXISTS regions (
+            build_id INTEGER NOT NULL, region TEXT NOT NULL, size INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS objects (
+            build_id INTEGER NOT NULL, region TEXT NOT NULL, object TEXT NOT NULL, size INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS symbols (
+            build_id INTEGER NOT NULL, region TEXT NOT NULL, symbol TEXT NOT NULL, size INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_regions_build ON regions (build_id);
+        CREATE INDEX IF NOT EXISTS idx_objects_build ON objects (build_id);
+        CREATE INDEX IF NOT EXISTS idx_symbols_build ON symbols (build_id);
+    """)
+    return conn
+
+
+def record_build(build_path, fqbn, stats=None, revision=None, db_path=HISTORY_DB):
+    """
+    Store a build's size stats, region totals, per-object and per-symbol sizes.
+
+    Args:
+        build_path (str): ELF file or directory containing it (and ideally the .map)
+        fqbn (str): Board FQBN
+        stats (dict): flash/ram numbers parsed from arduino-cli output
+        revision (str): Commit identifier (default: current git revision)
+
+    Returns:
+        int: Build id, or None when no ELF was found
+    """
+    elf, map_file = find_artifacts(build_path)
+    if elf is None:
+        return None
+
+    section_sizes, symbols = read_elf(elf)
+    regions = defaultdict(int)
+    for section, size in section_sizes.items():
+        region = region_of(section)
+        if region:
+            regions[region] += size
+
+    stats = stats or {}
+    conn = open_db(db_path)
+    with conn:
+        cur = conn.execute(
+            "INSERT INTO builds (revision, fqbn, timestamp, flash_used, flash_total, ram_used, ram_total) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (revision or git_revision(), fqbn, time.time(),
+             stats.get('flash_used'), stats.get('flash_total'), stats.get('ram_used'), stats.get('ram_total')),
+        )
+        build_id = cur.lastrowid
+        conn.executemany("INSERT INTO regions VALUES (?, ?, ?)", [(build_id, r, s) for r, s in regions.items()])
+        conn.executemany(
+            "INSERT INTO symbols VALUES (?, ?, ?, ?)",
+            [(build_id, region_of(section) or section, name, size) for name, size, section in symbols],
+        )
+        if map_file:
+            conn.executemany(
+                "INSERT INTO objects VALUES (?, ?, ?, ?)",
+                [(build_id, region, obj, size) for (region, obj), size in read_map(map_file).items()],
+            )
+    conn.close()
+    return build_id
+
+
+def find_build(conn, fqbn, revision=None, before_id=None):
+    """Latest build for an FQBN, optionally at a revision prefix or older than a build id"""
+    query = "SELECT id, revision, timestamp FROM builds WHERE fqbn = ?"
+    args = [fqbn]
+    if revision:
+        query += " AND revision LIKE ?"
+        args.append(f"{revision}%")
+    if before_id:
+        query += " AND id < ?"
+        args.append(before_id)
+    return conn.execute(query + " ORDER BY id DESC LIMIT 1", args).fetchone()
+
+
+def keyed_sizes(conn, table, key_column, build_id):
+    rows = conn.execute(f"SELECT region, {key_column}, SUM(size) FROM {table} WHERE build_id = ? GROUP BY region, {key_column}", (build_id,))
+    return {(region, key): size for region, key, size in rows}
+
+
+def region_sizes(conn, build_id):
+    return dict(conn.execute("SELECT region, size FROM regions WHERE build_id = ?", (build_id,)).fetchall())
+
+
+def parse_budgets(budgets):
+    result = {}
+    for item in budgets:
+        region, _, value = item.partition('=')
+        if not value:
+            raise click.BadParameter(f"expected region=bytes, got '{item}'")
+        result[region.strip()] = int(value, 0)
+    return result
+
+
+def delta_text(delta):
+    if delta == 0:
+        return "0"
+    color = "red" if delta > 0 else "green"
+    return f"[{color}]{delta:+,}[/{color}]"
+
+
+# ========== CLI ==========
+
+@click.group()
+def cli():
+    """
+    Firmware size history and per-symbol diffs
+    """
+
+
+@cli.command()
+@click.argument('build_path', type=click.Path(exists=True))
+@click.option('--fqbn', required=True, help='FQBN the build was made for')
+@click.option('--revision', help='Commit identifier (default: current git revision)')
+def record(build_path, fqbn, revision):
+    """Record a build directory or ELF into the history database"""
+    build_id = record_build(build_path, fqbn, revision=revision)
+    if build_id is None:
+        console.print(f"[bold red]✗ Error:[/bold red] No .elf found in {build_path}")
+        sys.exit(1)
+    console.print(f"[green]✓ Recorded build #{build_id}[/green]")
+
+
+@cli.command()
+@click.option('--fqbn', required=True, help='FQBN to report on')
+@click.option('--revision', help='Build to inspect (default: latest)')
+@click.option('--baseline', help='Baseline revision (default: previous build)')
+@click.option('--top', default=15, show_default=True, help='Rows per table')
+@click.option('--budget', 'budgets', multiple=True, help='Region budget, e.g. iram=131072 (repeatable)')
+def report(fqbn, revision, baseline, top, budgets):
+    """Region totals, largest symbols and per-object deltas against a baseline"""
+    conn = open_db()
+    current = find_build(conn, fqbn, revision)
+    if current is None:
+        console.print("[yellow]No matching build recorded.[/yellow]")
+        sys.exit(1)
+    base = find_build(conn, fqbn, baseline) if baseline else find_build(conn, fqbn, before_id=current[0])
+
+    cur_regions = region_sizes(conn, current[0])
+    base_regions = region_sizes(conn, base[0]) if base else {}
+    budget_map = parse_budgets(budgets)
+
+    title = f"{current[1]}" + (f" vs {base[1]}" if base else "")
+    table = Table(show_header=True, header_style="bold cyan", box=None, padding=(0, 2))
+    table.add_column("Region")
+    table.add_column("Size", justify="right")
+    table.add_column("Δ", justify="right")
+    table.add_column("Budget", justify="right")
+    over_budget = []
+    for region, _ in REGIONS:
+        if region not in cur_regions and region not in budget_map:
+            continue
+        size = cur_regions.get(region, 0)
+        budget = budget_map.get(region)
+        budget_text = "-"
+        if budget:
+            pct = size / budget * 100
+            color = "green" if pct < 90 else "yellow" if pct <= 100 else "red"
+            budget_text = f"[{color}]{pct:.1f}% of {budget:,}[/{color}]"
+            if size > budget:
+                over_budget.append(region)
+        table.add_row(region, f"{size:,}", delta_text(size - base_regions.get(region, size)) if base else "-", budget_text)
+    console.print(Panel(table, title=f"[bold]📦 Regions {title}[/bold]", border_style="cyan"))
+
+    symbols = keyed_sizes(conn, 'symbols', 'symbol', current[0])
+    sym_table = Table(show_header=True, header_style="bold cyan", box=None, padding=(0, 2))
+    sym_table.add_column("Region")
+    sym_table.add_column("Symbol")
+    sym_table.add_column("Size", justify="right")
+    for (region, name), size in sorted(symbols.items(), key=lambda kv: -kv[1])[:top]:
+        sym_table.add_row(region, name, f"{size:,}")
+    console.print(Panel(sym_table, title="[bold]🔝 Largest Symbols[/bold]", border_style="blue"))
+
+    if base:
+        for table_name, key_column, label in (('objects', 'object', 'Object'), ('symbols', 'symbol', 'Symbol')):
+            now = keyed_sizes(conn, table_name, key_column, current[0])
+            before = keyed_sizes(conn, table_name, key_column, base[0])
+            deltas = [(k, now.get(k, 0) - before.get(k, 0)) for k in set(now) | set(before)]
+            deltas = [d for d in deltas if d[1]]
+            if not deltas:
+                continue
+            delta_table = Table(show_header=True, header_style="bold cyan", box=None, padding=(0, 2))
+            delta_table.add_column("Region")
+            delta_table.add_column(label)
+            delta_table.add_column("Δ", justify="right")
+            for (region, name), delta in sorted(deltas, key=lambda kv: -abs(kv[1]))[:top]:
+                delta_table.add_row(region, name, delta_text(delta))
+            console.print(Panel(delta_table, title=f"[bold]Δ per {label.lower()}[/bold]", border_style="magenta"))
+
+    conn.close()
+    if over_budget:
+        console.print(f"[bold red]✗ Over budget: {', '.join(over_budget)}[/bold red]")
+        sys.exit(1)
+
+
+@cli.command()
+@click.option('--fqbn', help='Only show this FQBN')
+@click.option('--limit', default=20, show_default=True, help='Number of builds to show')
+def history(fqbn, limit):
+    """Size history per commit"""
+    conn = open_db()
+    query = "SELECT id, revision, fqbn, timestamp, flash_used, ram_used FROM builds"
+    args = []
+    if fqbn:
+        query += " WHERE fqbn = ?"
+        args.append(fqbn)
+    rows = conn.execute(query + " ORDER BY id DESC LIMIT ?", args + [limit]).fetchall()
+
+    table = Table(show_header=True, header_style="bold cyan", border_style="cyan")
+    table.add_column("#", style="dim")
+    table.add_column("Revision")
+    table.add_column("FQBN", style="dim")
+    table.add_column("Date")
+    table.add_column("Flash", justify="right")
+    table.add_column("RAM", justify="right")
+    for region, _ in REGIONS:
+        table.add_column(region, justify="right")
+    for build_id, rev, build_fqbn, ts, flash, ram in reversed(rows):
+        regions = region_sizes(conn, build_id)
+        table.add_row(
+            str(build_id), rev, build_fqbn, time.strftime('%Y-%m-%d %H:%M', time.localtime(ts)),
+            f"{flash:,}" if flash else "-", f"{ram:,}" if ram else "-",
+            *[f"{regions[r]:,}" if r in regions else "-" for r, _ in REGIONS],
+        )
+    console.print(table)
+    conn.close()
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,352 @@
+"""
+序列資料串流橋接模組
+把 SerialMonitor.data_callback 接到有界佇列，再分送給多個訂閱者（含本機 SSE 端點），
+序列讀取執行緒永遠不會因為消費者太慢而被阻塞
+"""
+
+import json
+import sys
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rich.console import Console
+
+console = Console()
+
+# 佇列滿載時的處理策略
+POLICY_DROP_OLDEST = 'drop_oldest'    # 丟掉最舊的訊息，保留最新的
+POLICY_DROP_NEWEST = 'drop_newest'    # 丟掉新進的訊息
+POLICY_COALESCE = 'coalesce'          # 同類訊息只保留最新一筆，其餘同 drop_oldest
+POLICIES = [POLICY_DROP_OLDEST, POLICY_DROP_NEWEST, POLICY_COALESCE]
+
+
+def message_kind(message):
+    """
+    預設的合併鍵：JSON 物件以其欄位集合分類（例如連續的 status_json 回應），
+    其他文字訊息不合併
+
+    Args:
+        message (str): 訊息
+
+    Returns:
+        tuple | None: 合併鍵
+    """
+    if not message.startswith('{'):
+        return None
+    try:
+        data = json.loads(message)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    return tuple(sorted(data.keys()))
+
+
+class Subscriber:
+    """單一訂閱者：有界佇列 + 統計（可選擇以背景執行緒呼叫 handler）"""
+
+    def __init__(self, name, handler=None, maxsize=256, policy=POLICY_DROP_OLDEST, key_func=message_kind):
+        """
+        初始化訂閱者
+
+        Args:
+            name (str): 訂閱者名稱
+            handler (callable): 處理函式 func(message)，None 表示由呼叫端自行 get()
+            maxsize (int): 佇列上限
+            policy (str): 滿載策略（drop_oldest / drop_newest / coalesce）
+            key_func (callable): coalesce 使用的合併鍵函式
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy: {policy}")
+        self.name = name
+        self.handler = handler
+        self.maxsize = maxsize
+        self.policy = policy
+        self.key_func = key_func
+
+        self.queue = deque()
+        self.pending_keys = {}
+        self.cond = threading.Condition()
+        self.closed = False
+
+        self.received = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.errors = 0
+
+        self.worker = None
+        if handler is not None:
+            self.worker = threading.Thread(target=self._run, name=f"bridge-{name}", daemon=True)
+            self.worker.start()
+
+    def offer(self, message):
+        """
+        放入一筆訊息（不阻塞）
+
+        Args:
+            message (str): 訊息
+        """
+        with self.cond:
+            if self.closed:
+                return
+            self.received += 1
+
+            key = self.key_func(message) if self.policy == POLICY_COALESCE and self.key_func else None
+            if key is not None and key in self.pending_keys:
+                # 佇列中已有同類訊息：原地替換為最新內容
+                self.pending_keys[key][1] = message
+                self.coalesced += 1
+                return
+
+            if len(self.queue) >= self.maxsize:
+                if self.policy == POLICY_DROP_NEWEST:
+                    self.dropped += 1
+                    return
+                old_key, _ = self.queue.popleft()
+                if old_key is not None:
+                    self.pending_keys.pop(old_key, None)
+                self.dropped += 1
+
+            item = [key, message]
+            self.queue.append(item)
+            if key is not None:
+                self.pending_keys[key] = item
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        """
+        取出一筆訊息
+
+        Args:
+            timeout (float): 等待秒數
+
+        Returns:
+            str | None: 訊息，逾時或已關閉時為 None
+        """
+        with self.cond:
+            if not self.queue and not self.closed:
+                self.cond.wait(timeout)
+            if not self.queue:
+                return None
+            key, message = self.queue.popleft()
+            if key is not None:
+                self.pending_keys.pop(key, None)
+            self.delivered += 1
+            return message
+
+    def _run(self):
+        while True:
+            message = self.get(timeout=0.5)
+            if message is None:
+                if self.closed:
+                    return
+                continue
+            try:
+                self.handler(message)
+            except Exception as e:
+                self.errors += 1
+                console.print(f"[red]✗[/red] 訂閱者 {self.name} 處理失敗: {e}")
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        if self.worker and self.worker is not threading.current_thread():
+            self.worker.join(timeout=2)
+
+    def stats(self):
+        with self.cond:
+            return {
+                'name': self.name,
+                'policy': self.policy,
+                'maxsize': self.maxsize,
+                'queued': len(self.queue),
+                'received': self.received,
+                'delivered': self.delivered,
+                'dropped': self.dropped,
+                'coalesced': self.coalesced,
+                'errors': self.errors,
+            }
+
+
+class StreamBridge:
+    """把序列訊息分送給多個訂閱者"""
+
+    def __init__(self, maxsize=256, policy=POLICY_DROP_OLDEST):
+        """
+        初始化橋接器
+
+        Args:
+            maxsize (int): 訂閱者預設佇列上限
+            policy (str): 訂閱者預設滿載策略
+        """
+        self.maxsize = maxsize
+        self.policy = policy
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, name, handler=None, maxsize=None, policy=None, key_func=message_kind):
+        """
+        新增訂閱者
+
+        Returns:
+            Subscriber: 訂閱者物件
+        """
+        sub = Subscriber(
+            name,
+            handler=handler,
+            maxsize=maxsize or self.maxsize,
+            policy=policy or self.policy,
+            key_func=key_func,
+        )
+        with self.lock:
+            self.subscribers = self.subscribers + [sub]
+        return sub
+
+    def unsubscribe(self, sub):
+        with self.lock:
+            self.subscribers = [s for s in self.subscribers if s is not sub]
+        sub.close()
+
+    def publish(self, message):
+        """
+        分送訊息（可直接當作 SerialMonitor 的 data_callback，永不阻塞）
+
+        Args:
+            message (str): 訊息
+        """
+        self.published += 1
+        for sub in self.subscribers:
+            sub.offer(message)
+
+    def stats(self):
+        return {
+            'published': self.published,
+            'subscribers': [sub.stats() for sub in self.subscribers],
+        }
+
+    def close(self):
+        with self.lock:
+            subs, self.subscribers = self.subscribers, []
+        for sub in subs:
+            sub.close()
+
+
+class _SSEHandler(BaseHTTPRequestHandler):
+    """/events 以 Server-Sent Events 推送訊息，/stats 回傳橋接統計"""
+
+    bridge = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == '/stats':
+            body = json.dumps(self.bridge.stats()).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if self.path != '/events':
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+
+        sub = self.bridge.subscribe(f"sse-{self.client_address[0]}:{self.client_address[1]}")
+        try:
+            while not sub.closed:
+                message = sub.get(timeout=15)
+                if message is None:
+                    # 保持連線
+                    self.wfile.write(b": keepalive\n\n")
+                else:
+                    self.wfile.write(f"data: {message}\n\n".encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.bridge.unsubscribe(sub)
+
+
+def serve_sse(bridge, host='127.0.0.1', port=8765):
+    """
+    在背景啟動本機 SSE 伺服器
+
+    Args:
+        bridge (StreamBridge): 橋接器
+        host (str): 綁定位址（預設只接受本機連線）
+        port (int): 連接埠
+
+    Returns:
+        ThreadingHTTPServer: 伺服器物件（呼叫 shutdown() 停止）
+    """
+    handler = type('SSEHandler', (_SSEHandler,), {'bridge': bridge})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="bridge-sse", daemon=True).start()
+    return server
+
+
+def print_bridge_stats(bridge):
+    """顯示各訂閱者的丟棄／合併統計"""
+    from rich.table import Table
+
+    table = Table(show_header=True, header_style="bold cyan", border_style="cyan")
+    table.add_column("訂閱者")
+    table.add_column("策略")
+    table.add_column("收到", justify="right")
+    table.add_column("送出", justify="right")
+    table.add_column("丟棄", justify="right")
+    table.add_column("合併", justify="right")
+    for stats in bridge.stats()['subscribers']:
+        table.add_row(
+            stats['name'],
+            stats['policy'],
+            f"{stats['received']:,}",
+            f"{stats['delivered']:,}",
+            f"[yellow]{stats['dropped']:,}[/yellow]" if stats['dropped'] else "0",
+            f"{stats['coalesced']:,}",
+        )
+    console.print(table)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from monitor import SerialMonitor
+
+    parser = argparse.ArgumentParser(description="Serial monitor with a non-blocking SSE bridge")
+    parser.add_argument("port", help="Serial port")
+    parser.add_argument("baudrate", nargs='?', type=int, default=460800, help="Baud rate")
+    parser.add_argument("--http-port", type=int, default=8765, help="SSE port (serves /events and /stats)")
+    parser.add_argument("--queue", type=int, default=256, help="Per-subscriber queue size")
+    parser.add_argument("--policy", choices=POLICIES, default=POLICY_COALESCE, help="Overflow policy")
+    args = parser.parse_args()
+
+    bridge = StreamBridge(maxsize=args.queue, policy=args.policy)
+    try:
+        server = serve_sse(bridge, port=args.http_port)
+    except OSError as e:
+        console.print(f"[red]✗[/red] 無法啟動 SSE 伺服器: {e}")
+        sys.exit(1)
+    console.print(f"[green]✓[/green] SSE 端點: [cyan]http://127.0.0.1:{args.http_port}/events[/cyan]")
+
+    monitor = SerialMonitor(args.port, args.baudrate, data_callback=bridge.publish)
+    try:
+        monitor.start(enable_input=True, log_to_file=False)
+    finally:
+        server.shutdown()
+        print_bridge_stats(bridge)
+        bridge.close()
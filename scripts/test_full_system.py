@@ -7,21 +7,19 @@ import os
 import random
 import string
 
+from cmd_latency import CommandTimer
+
+# Every command sent through send_cmd() is timed here
+TIMER = None
+
 # ========== UTILS ==========
 def send_cmd(ser, cmd, timeout=2.0):
+    global TIMER
+    if TIMER is None or TIMER.ser is not ser:
+        TIMER = CommandTimer(ser)
+
     print(f"\n> Sending: {cmd.strip()}")
-    ser.write((cmd + "\n").encode())
-    
-    start = time.time()
-    response = ""
-    while time.time() - start < timeout:
-        if ser.in_waiting:
-            chunk = ser.read_all().decode(errors='ignore')
-            response += chunk
-            if "\n" in chunk:
-                break
-        time.sleep(0.05)
-    
+    response = TIMER.send(cmd, timeout)
     print(f"  Response: {response.strip()}")
     return response.strip()
 
@@ -145,6 +143,7 @@ def test_full_system(port, baud=460800):
              print("❌ Delete Verification Failed (File still exists)")
 
         print("\n=== ALL TESTS COMPLETED ===")
+        TIMER.print_report()
         ser.close()
         os.remove("temp_test_payload.bin")
 
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Track Overview Sidecars
+Writes <track>.ovw next to each track: a min/max peak envelope for the desktop
+app's waveform and a byte-offset seek table the player uses to jump to a time
+with one lookup. Computed with NumPy and cached by content hash, so unchanged
+tracks are never decoded twice.
+
+The layout matches OverviewHeader in src/WavPlayer/TrackOverview.h.
+All values are little-endian:
+    header
+    uint32 seek[seek_count]        file offset of the audio at k * seek_interval_ms
+    int8   peaks[peak_count][2]    (min, max) per bucket, full scale = 127
+"""
+
+import hashlib
+import os
+import shutil
+import struct
+import subprocess
+import sys
+from pathlib import Path
+
+import click
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+from playlist_index import FORMATS, MP3_BITRATES, MP3_RATES, find_tracks, mp3_info, wav_info
+
+console = Console()
+
+SUFFIX = '.ovw'
+MAGIC = 0x4F504144  # "DAPO"
+VERSION = 2
+
+# magic, version, header size, duration ms, sample rate, data offset, seek interval ms,
+# seek count, peak count, content hash, track size (the player ignores a sidecar whose track changed)
+HEADER = struct.Struct('<IHHIIIIII8sI')
+
+DEFAULT_PEAKS = 1024
+DEFAULT_INTERVAL_MS = 500
+
+CACHE_DIR = Path(os.environ.get('DAP_CACHE_DIR', Path.home() / '.cache' / 'dap')) / 'overview'
+
+
+def content_hash(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.digest()
+
+
+def wav_samples(path, info):
+    """
+    Map the PCM data of a WAV file.
+
+    Returns:
+        ndarray: (frames, channels) normalized to [-1, 1]
+    """
+    bits, channels = info['bits'], info['channels']
+    width = bits // 8
+    frames = min(info['data_size'], path.stat().st_size - info['data_offset']) // (width * channels)
+    raw = np.memmap(path, dtype=np.uint8, mode='r', offset=info['data_offset'], shape=(frames * width * channels,))
+    if bits == 8:
+        samples = raw.astype(np.float32) - 128.0
+    elif bits == 16:
+        samples = raw.view('<i2').astype(np.float32)
+    elif bits == 24:
+        b = raw.reshape(-1, 3).astype(np.int32)
+        samples = ((b[:, 0] << 8 | b[:, 1] << 16 | b[:, 2] << 24) >> 8).astype(np.float32)
+    elif bits == 32:
+        samples = raw.view('<i4').astype(np.float32)
+    else:
+        raise ValueError(f"unsupported bit depth {bits}")
+    return samples.reshape(frames, channels) / float(1 << (bits - 1))
+
+
+def decoded_samples(path):
+    """Decode any format to 16-bit PCM with ffmpeg; None if ffmpeg is unavailable or fails"""
+    try:
+        result = subprocess.run(['ffmpeg', '-v', 'error', '-i', str(path), '-f', 's16le', '-acodec', 'pcm_s16le', '-'],
+                                capture_output=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return (np.frombuffer(result.stdout, dtype='<i2').astype(np.float32) / 32768.0).reshape(-1, 1)
+
+
+def peak_envelope(samples, count):
+    """
+    Min/max of each of `count` equal buckets (fewer for very short tracks).
+
+    Returns:
+        ndarray: (buckets, 2) int8
+    """
+    frames = len(samples)
+    count = min(count, frames)
+    if count == 0:
+        return np.zeros((0, 2), dtype=np.int8)
+    starts = (np.arange(count, dtype=np.int64) * frames) // count
+    lows = np.minimum.reduceat(samples.min(axis=1), starts)
+    highs = np.maximum.reduceat(samples.max(axis=1), starts)
+    peaks = np.stack([lows, highs], axis=1)
+    return np.clip(np.round(peaks * 127), -127, 127).astype(np.int8)
+
+
+def mp3_frames(path, data_offset):
+    """
+    Walk the MPEG frame headers from data_offset.
+
+    Returns:
+        tuple: (frame offsets ndarray, samples per frame, sample rate)
+    """
+    data = np.fromfile(path, dtype=np.uint8)
+    n = len(data)
+    # Candidate sync words, with every header field decoded for all candidates at once
+    pos = np.flatnonzero((data[:-3] == 0xFF) & ((data[1:-2] & 0xE0) == 0xE0))
+    pos = pos[pos >= data_offset]
+    b1, b2 = data[pos + 1], data[pos + 2]
+    version = (b1 >> 3) & 0x03
+    layer = (b1 >> 1) & 0x03
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 0x03
+    padding = (b2 >> 1) & 0x01
+    valid = (version != 1) & (layer != 0) & (bitrate_index != 0) & (bitrate_index != 15) & (rate_index != 3)
+    pos, version, layer, bitrate_index, rate_index, padding = (
+        a[valid] for a in (pos, version, layer, bitrate_index, rate_index, padding))
+    if len(pos) == 0:
+        return np.zeros(0, dtype=np.int64), 1152, 0
+
+    mpeg1 = version == 3
+    layer_number = 4 - layer.astype(np.int64)
+    bitrate_table = np.zeros((2, 4, 16), dtype=np.int64)
+    for (is_mpeg1, layer_n), rates in MP3_BITRATES.items():
+        bitrate_table[int(is_mpeg1), layer_n, :15] = rates
+    rate_table = np.zeros((4, 4), dtype=np.int64)
+    for v, rates in MP3_RATES.items():
+        rate_table[v, :3] = rates
+    bitrate = bitrate_table[mpeg1.astype(np.int64), layer_number, bitrate_index] * 1000
+    rate = rate_table[version, rate_index]
+    length = np.where(layer_number == 1, (12 * bitrate // rate + padding) * 4,
+                      np.where(mpeg1 | (layer_number == 2), 144, 72) * bitrate // rate + padding)
+
+    # Follow the chain of frame lengths from the first candidate
+    next_of = dict(zip(pos.tolist(), (pos + length).tolist()))
+    offsets = []
+    p = int(pos[0])
+    while p in next_of and p < n:
+        offsets.append(p)
+        p = next_of[p]
+    spf = 384 if layer_number[0] == 1 else (1152 if mpeg1[0] or layer_number[0] == 2 else 576)
+    return np.array(offsets, dtype=np.int64), spf, int(rate[0])
+
+
+def build_overview(path, peaks=DEFAULT_PEAKS, interval_ms=DEFAULT_INTERVAL_MS, digest=None):
+    """
+    Compute the sidecar for one track.
+
+    Returns:
+        bytes: encoded sidecar ; None if the track cannot be parsed
+    """
+    path = Path(path)
+    digest = digest or content_hash(path)
+    fmt = FORMATS.get(path.suffix.lower())
+    if fmt == FORMATS['.wav']:
+        info = wav_info(path)
+        if not info or info['bits'] not in (8, 16, 24, 32):
+            return None
+        rate = info['sample_rate']
+        block = info['channels'] * info['bits'] // 8
+        frames = min(info['data_size'], path.stat().st_size - info['data_offset']) // block
+        duration_ms = frames * 1000 // rate
+        data_offset = info['data_offset']
+        times = np.arange(0, max(duration_ms, 1), interval_ms, dtype=np.int64)
+        seek = data_offset + (times * rate // 1000) * block
+        envelope = peak_envelope(wav_samples(path, info), peaks)
+    elif fmt == FORMATS['.mp3']:
+        info = mp3_info(path)
+        if not info:
+            return None
+        offsets, spf, rate = mp3_frames(path, info['data_offset'])
+        if len(offsets) == 0:
+            return None
+        duration_ms = len(offsets) * spf * 1000 // rate
+        data_offset = int(offsets[0])
+        times = np.arange(0, max(duration_ms, 1), interval_ms, dtype=np.int64)
+        seek = offsets[np.minimum(times * rate // (1000 * spf), len(offsets) - 1)]
+        samples = decoded_samples(path)
+        envelope = peak_envelope(samples, peaks) if samples is not None else np.zeros((0, 2), dtype=np.int8)
+    else:
+        return None
+
+    header = HEADER.pack(MAGIC, VERSION, HEADER.size, duration_ms, rate, data_offset, interval_ms,
+                         len(seek), len(envelope), digest[:8], path.stat().st_size)
+    return header + seek.astype('<u4').tobytes() + envelope.tobytes()
+
+
+def decode_overview(data):
+    """
+    Returns:
+        dict: header fields plus 'seek' and 'peaks' arrays ; raises ValueError on a malformed sidecar
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("file too short")
+    fields = HEADER.unpack_from(data)
+    magic, version, header_size, duration_ms, rate, data_offset, interval_ms, seek_count, peak_count, digest, \
+        track_size = fields
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a version {VERSION} overview")
+    if header_size + seek_count * 4 + peak_count * 2 != len(data):
+        raise ValueError("inconsistent header")
+    seek = np.frombuffer(data, dtype='<u4', count=seek_count, offset=header_size)
+    peaks = np.frombuffer(data, dtype=np.int8, count=peak_count * 2, offset=header_size + seek_count * 4)
+    return {'duration_ms': duration_ms, 'sample_rate': rate, 'data_offset': data_offset,
+            'seek_interval_ms': interval_ms, 'seek': seek, 'peaks': peaks.reshape(-1, 2), 'hash': digest.hex(),
+            'track_size': track_size}
+
+
+def write_overview(path, peaks=DEFAULT_PEAKS, interval_ms=DEFAULT_INTERVAL_MS, cache=True):
+    """
+    Write <path>.ovw, reusing the cached sidecar when the track's content hash is known.
+
+    Returns:
+        tuple: (sidecar path or None, True if it came from the cache)
+    """
+    path = Path(path)
+    digest = content_hash(path)
+    cached = CACHE_DIR / f"{digest.hex()}-{peaks}-{interval_ms}-v{VERSION}{SUFFIX}"
+    target = path.with_name(path.name + SUFFIX)
+    if cache and cached.exists():
+        shutil.copyfile(cached, target)
+        return target, True
+
+    data = build_overview(path, peaks, interval_ms, digest)
+    if data is None:
+        return None, False
+    target.write_bytes(data)
+    if cache:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_suffix('.tmp')
+        tmp.write_bytes(data)
+        tmp.replace(cached)
+    return target, False
+
+
+def sparkline(peaks, width=64):
+    """One-line text rendering of a peak envelope"""
+    if len(peaks) == 0:
+        return ''
+    blocks = ' ▁▂▃▄▅▆▇█'
+    levels = np.abs(peaks.astype(np.int16)).max(axis=1)
+    edges = (np.arange(min(width, len(levels))) * len(levels)) // min(width, len(levels))
+    columns = np.maximum.reduceat(levels, edges)
+    return ''.join(blocks[int(v) * (len(blocks) - 1) // 127] for v in columns)
+
+
+@click.group()
+def cli():
+    """
+    Build / inspect track overview sidecars (<track>.ovw)
+    """
+
+
+@cli.command()
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--peaks', default=DEFAULT_PEAKS, show_default=True, help='Envelope buckets per track')
+@click.option('--interval', 'interval_ms', default=DEFAULT_INTERVAL_MS, show_default=True,
+              help='Seek table resolution (ms)')
+@click.option('--recursive', '-r', is_flag=True, default=False, help='Include sub-directories')
+@click.option('--no-cache', is_flag=True, default=False, help=f'Ignore the cache in {CACHE_DIR}')
+def build(paths, peaks, interval_ms, recursive, no_cache):
+    """Write a sidecar next to each track (files or directories)"""
+    tracks = []
+    for p in map(Path, paths):
+        tracks.extend(find_tracks(p, recursive) if p.is_dir() else [p])
+
+    built = cached = failed = 0
+    with console.status("[cyan]Computing overviews...[/cyan]") as status:
+        for track in tracks:
+            status.update(f"[cyan]{track.name}[/cyan]")
+            target, hit = write_overview(track, peaks, interval_ms, cache=not no_cache)
+            if target is None:
+                failed += 1
+                console.print(f"[yellow]⚠️  Skipped (unreadable): {track}[/yellow]")
+            elif hit:
+                cached += 1
+            else:
+                built += 1
+    console.print(f"[green]✓ {built + cached} sidecars[/green] ({built} computed, {cached} from cache)")
+    if failed:
+        sys.exit(1)
+
+
+@cli.command()
+@click.argument('sidecars', nargs=-1, required=True, type=click.Path(exists=True))
+def show(sidecars):
+    """Print sidecars (the .ovw file or its track)"""
+    table = Table(show_header=True, header_style="bold cyan", border_style="cyan")
+    table.add_column("Track")
+    table.add_column("Duration", justify="right")
+    table.add_column("Seek", justify="right")
+    table.add_column("Peaks", justify="right")
+    table.add_column("Waveform")
+    for item in map(Path, sidecars):
+        path = item if item.suffix == SUFFIX else item.with_name(item.name + SUFFIX)
+        try:
+            o = decode_overview(path.read_bytes())
+        except (OSError, ValueError) as e:
+            console.print(f"[bold red]✗ Error:[/bold red] {path}: {e}")
+            sys.exit(1)
+        seconds = o['duration_ms'] // 1000
+        table.add_row(path.name[:-len(SUFFIX)], f"{seconds // 60}:{seconds % 60:02d}",
+                      f"{len(o['seek'])} × {o['seek_interval_ms']} ms", str(len(o['peaks'])), sparkline(o['peaks']))
+    console.print(table)
+
+
+if __name__ == '__main__':
+    cli()
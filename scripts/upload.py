@@ -4,6 +4,8 @@ Arduino 程式編譯與燒入模組（美化版）
 支援 .ino 檔案的編譯和上傳，使用 Rich 美化終端輸出
 """
 
+import glob
+import sqlite3
 import subprocess
 import os
 import sys
@@ -35,6 +37,50 @@ BOARD_FQBN = {
     'esp32s3': 'esp32:esp32:esp32s3',
 }
 
+# Default performance flags passed as build properties
+OPTIMIZATION_FLAGS = {
+    'c': '-O3 -funroll-loops -finline-functions',
+    'cpp': '-O3 -funroll-loops -finline-functions -ffast-math',
+    'elf': '-O3',
+}
+
+
+# USB-serial device nodes (macOS, Linux), fallback for bridges missing from the VID/PID table
+PORT_PATTERNS = [
+    '/dev/cu.usbserial-*',
+    '/dev/cu.SLAB_USBtoUART',
+    '/dev/cu.usbmodem*',
+    '/dev/cu.wchusbserial*',
+    '/dev/ttyUSB*',
+    '/dev/ttyACM*',
+]
+
+
+def find_serial_ports():
+    """
+    Detect every ESP32 serial port.
+
+    Known ESP32 USB bridges are matched by VID/PID (device_discovery);
+    device-node patterns are only used when none is found.
+
+    Returns:
+        list: Serial port paths
+    """
+    try:
+        from device_discovery import list_esp32_ports
+        ports = [p['device'] for p in list_esp32_ports()]
+        if ports:
+            return ports
+    except ImportError:
+        pass
+
+    ports = []
+    for pattern in PORT_PATTERNS:
+        for port in sorted(glob.glob(pattern)):
+            if port not in ports:
+                ports.append(port)
+    return ports
+
 
 def find_serial_port():
     """
@@ -43,28 +89,8 @@ def find_serial_port():
     Returns:
         str: Serial port path or None
     """
-    port_patterns = [
-        '/dev/cu.usbserial-*',
-        '/dev/cu.SLAB_USBtoUART',
-        '/dev/cu.usbmodem*',
-        '/dev/cu.wchusbserial*',
-    ]
-    
-    for pattern in port_patterns:
-        try:
-            result = subprocess.run(
-                f'ls {pattern} 2>/dev/null',
-                shell=True,
-                capture_output=True,
-                text=True
-            )
-            if result.stdout.strip():
-                port = result.stdout.strip().split('\n')[0]
-                return port
-        except Exception:
-            continue
-    
-    return None
+    ports = find_serial_ports()
+    return ports[0] if ports else None
 
 
 def run_build_script():
@@ -99,7 +125,60 @@ def run_build_script():
         console.print(f"[bold red]✗ Build Script Error:[/bold red] {e}")
         return False
 
-def compile_sketch(sketch_path, fqbn='esp32:esp32:esp32', build_path=None, verbose=False, optimize=True):
+# Regex patterns for arduino-cli size stats
+FLASH_PATTERN = re.compile(r"Sketch uses (\d+) bytes.*Maximum is (\d+) bytes")
+RAM_PATTERN = re.compile(r"Global variables use (\d+) bytes.*Maximum is (\d+) bytes")
+
+
+def parse_size_stats(line, stats):
+    """
+    Update stats with flash/RAM usage if the compiler output line reports it.
+    """
+    flash_match = FLASH_PATTERN.search(line)
+    if flash_match:
+        stats['flash_used'] = int(flash_match.group(1))
+        stats['flash_total'] = int(flash_match.group(2))
+    
+    ram_match = RAM_PATTERN.search(line)
+    if ram_match:
+        stats['ram_used'] = int(ram_match.group(1))
+        stats['ram_total'] = int(ram_match.group(2))
+
+
+def build_compile_command(sketch_path, fqbn, output_dir=None, cache_dir=None, optimize=True, verbose=False, extra_flags=None):
+    """
+    Assemble the arduino-cli compile command line.
+
+    Returns:
+        list: Command arguments
+    """
+    cmd = ['arduino-cli', 'compile', '--fqbn', fqbn, str(sketch_path)]
+    if cache_dir:
+        cmd.extend(['--build-path', str(cache_dir)])
+    if output_dir:
+        cmd.extend(['--output-dir', str(output_dir)])
+    cmd.extend(build_properties(optimize, extra_flags))
+    if verbose:
+        cmd.append('--verbose')
+    return cmd
+
+
+def build_properties(optimize=True, extra_flags=None):
+    """
+    --build-property arguments for the given optimization settings.
+    These also form part of the build cache key.
+    """
+    if not optimize:
+        return []
+    flags = extra_flags or OPTIMIZATION_FLAGS
+    return [
+        '--build-property', f'compiler.c.extra_flags={flags["c"]}',
+        '--build-property', f'compiler.cpp.extra_flags={flags["cpp"]}',
+        '--build-property', f'compiler.c.elf.extra_flags={flags["elf"]}',
+    ]
+
+
+def compile_sketch(sketch_path, fqbn='esp32:esp32:esp32', build_path=None, verbose=False, optimize=True, use_cache=True):
     """
     Compile Arduino sketch.
     """
@@ -130,29 +209,29 @@ def compile_sketch(sketch_path, fqbn='esp32:esp32:esp32', build_path=None, verbo
 
     console.print(Panel(grid, title="[bold blue]🚀 Build Configuration[/bold blue]", border_style="blue"))
     
-    cmd = ['arduino-cli', 'compile', '--fqbn', fqbn, str(sketch_path)]
-    
-    # Auto-clean and disable optimize for sensitive configs
+    # Disable optimize for sensitive configs. A clean build is no longer forced:
+    # the FQBN is part of the cache key, so PSRAM=disabled gets its own build directory.
     if 'PSRAM=disabled' in fqbn:
-        cmd.append('--clean')
         optimize = False
-        console.print("[yellow]🧹 Clean build forced & Optimizations disabled (PSRAM disabled)[/yellow]")
+        console.print("[yellow]🧹 Optimizations disabled (PSRAM disabled)[/yellow]")
     
     if build_path:
         Path(build_path).mkdir(parents=True, exist_ok=True)
-        cmd.extend(['--output-dir', str(build_path)])
+    
+    cache = cache_dir = cache_key = None
+    cache_hit = False
+    if use_cache:
+        from build_cache import BuildCache
+        cache = BuildCache()
+        cache_dir, cache_key, cache_hit = cache.acquire(fqbn, build_properties(optimize), sketch=sketch_path.parent)
+        console.print(f"[dim]🗄  Build cache {'hit' if cache_hit else 'miss'}: {cache_dir}[/dim]")
         
     if optimize:
-        optimization_flags = [
-            '--build-property', 'compiler.c.extra_flags=-O3 -funroll-loops -finline-functions',
-            '--build-property', 'compiler.cpp.extra_flags=-O3 -funroll-loops -finline-functions -ffast-math',
-            '--build-property', 'compiler.c.elf.extra_flags=-O3',
-        ]
-        cmd.extend(optimization_flags)
         console.print("[yellow]⚡ Performance Optimizations Enabled (-O3, LTO)[/yellow]")
     
-    if verbose:
-        cmd.append('--verbose')
+    cmd = build_compile_command(sketch_path, fqbn, output_dir=build_path, cache_dir=cache_dir,
+                                optimize=optimize, verbose=verbose)
+    compile_start = time.time()
     
     try:
         with Progress(
@@ -173,10 +252,6 @@ def compile_sketch(sketch_path, fqbn='esp32:esp32:esp32', build_path=None, verbo
             
             stdout_full = []
             
-            # Regex patterns for stats
-            flash_pattern = re.compile(r"Sketch uses (\d+) bytes.*Maximum is (\d+) bytes")
-            ram_pattern = re.compile(r"Global variables use (\d+) bytes.*Maximum is (\d+) bytes")
-            
             stats = {}
             current_progress = 0
 
@@ -188,15 +263,7 @@ def compile_sketch(sketch_path, fqbn='esp32:esp32:esp32', build_path=None, verbo
                     console.print(line_str, style="dim")
                 
                 # Parse Stats
-                flash_match = flash_pattern.search(line_str)
-                if flash_match:
-                    stats['flash_used'] = int(flash_match.group(1))
-                    stats['flash_total'] = int(flash_match.group(2))
-                
-                ram_match = ram_pattern.search(line_str)
-                if ram_match:
-                    stats['ram_used'] = int(ram_match.group(1))
-                    stats['ram_total'] = int(ram_match.group(2))
+                parse_size_stats(line_str, stats)
 
                 # Update progress
                 if current_progress < 95:
@@ -206,6 +273,9 @@ def compile_sketch(sketch_path, fqbn='esp32:esp32:esp32', build_path=None, verbo
             process.wait()
             progress.update(task, completed=100)
             
+            if cache:
+                cache.record(cache_key, time.time() - compile_start, cache_hit, process.returncode == 0)
+            
             if process.returncode == 0:
                 console.print("[bold green]✓ Compilation Successful![/bold green]")
                 
@@ -243,7 +313,18 @@ def compile_sketch(sketch_path, fqbn='esp32:esp32:esp32', build_path=None, verbo
                     )
                                         
                     console.print(Panel(stat_table, title="[bold]📊 Resource Usage[/bold]", border_style="cyan"))
-                
+
+                # Record size history (per commit + FQBN) for regression tracking
+                artifacts = build_path or cache_dir
+                if artifacts:
+                    try:
+                        from size_tracker import record_build
+                        build_id = record_build(artifacts, fqbn, stats)
+                        if build_id:
+                            console.print(f"[dim]📦 Size history: build #{build_id} recorded (size_tracker.py report --fqbn {fqbn})[/dim]")
+                    except (OSError, ValueError, sqlite3.Error) as e:
+                        console.print(f"[dim yellow]⚠ Size history not recorded: {e}[/dim yellow]")
+
                 return True
             else:
                 console.print("[bold red]✗ Compilation Failed![/bold red]")
@@ -260,83 +341,112 @@ def compile_sketch(sketch_path, fqbn='esp32:esp32:esp32', build_path=None, verbo
         return False
 
 
+def reset_board(ser):
+    """
+    Hardware-reset the board through the DTR/RTS auto-reset circuit
+    """
+    ser.dtr = False
+    ser.rts = False
+    time.sleep(0.1)
+    ser.dtr = True
+    ser.rts = True
+    time.sleep(0.1)
+    ser.dtr = False
+    ser.rts = False
+
+
+def capture_boot_log(port, baud=115200, duration=5, echo=True):
+    """
+    Reset the board and collect its serial output for a few seconds.
+
+    Returns:
+        str: Captured boot log
+    """
+    import serial
+
+    buffer = ""
+    with serial.Serial(port, baud, timeout=0.1) as ser:
+        reset_board(ser)
+        start_time = time.time()
+        while time.time() - start_time < duration:
+            if ser.in_waiting:
+                c = ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
+                buffer += c
+                # Only print if not just whitespace/newlines to keep output clean
+                if echo and c.strip():
+                    sys.stdout.write(c)
+            time.sleep(0.01)
+    return buffer
+
+
+def diagnose_boot(buffer):
+    """
+    Evaluate a boot log.
+
+    Returns:
+        dict: psram / crash / booted flags and overall pass
+    """
+    psram = "PSRAM" in buffer or "SPIRAM" in buffer
+    crash = "Guru Meditation Error" in buffer
+    booted = bool(buffer.strip())
+    return {'psram': psram, 'crash': crash, 'booted': booted, 'passed': booted and not crash}
+
+
 def monitor_boot_status(port, baud=115200, duration=5):
     """
     Monitor serial for boot messages
-    """
-    try:
-        import serial
-    except ImportError:
-        console.print("[yellow]⚠️  pyserial not found, skipping boot check[/yellow]")
-        return
 
+    Returns:
+        dict: Diagnostic result (see diagnose_boot), or None if the port could not be read
+    """
     console.print(f"\n[cyan]Connecting to {port} for Boot Diagnostic...[/cyan]")
     
     try:
-        with serial.Serial(port, baud, timeout=0.1) as ser:
-            # Reset Sequence
-            ser.dtr = False
-            ser.rts = False
-            time.sleep(0.1)
-            ser.dtr = True
-            ser.rts = True
-            time.sleep(0.1)
-            ser.dtr = False
-            ser.rts = False
-            
-            start_time = time.time()
-            buffer = ""
-            
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                console=console
-            ) as progress:
-                task = progress.add_task("Listening for boot log...", total=None)
-                
-                while time.time() - start_time < duration:
-                    if ser.in_waiting:
-                        try:
-                            c = ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
-                            buffer += c
-                            # Only print if not just whitespace/newlines to keep output clean
-                            if c.strip():
-                                sys.stdout.write(c) 
-                        except Exception:
-                            pass
-                    time.sleep(0.01)
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            console=console
+        ) as progress:
+            progress.add_task("Listening for boot log...", total=None)
+            buffer = capture_boot_log(port, baud, duration)
             
-            # Analyze
-            from rich.table import Table
-            diag_table = Table(show_header=False, box=None, padding=(0,2))
-            diag_table.add_column("Item")
-            diag_table.add_column("Status")
+        # Analyze
+        diag = diagnose_boot(buffer)
+        from rich.table import Table
+        diag_table = Table(show_header=False, box=None, padding=(0,2))
+        diag_table.add_column("Item")
+        diag_table.add_column("Status")
+        
+        if diag['psram']:
+            diag_table.add_row("PSRAM", "[bold green]DETECTED[/bold green]")
+        else:
+            diag_table.add_row("PSRAM", "[yellow]NOT DETECTED[/yellow]")
             
-            if "PSRAM" in buffer or "SPIRAM" in buffer:
-                diag_table.add_row("PSRAM", "[bold green]DETECTED[/bold green]")
-            else:
-                diag_table.add_row("PSRAM", "[yellow]NOT DETECTED[/yellow]")
-                
-            if "Guru Meditation Error" in buffer:
-                diag_table.add_row("System Integrity", "[bold red]CRASH DETECTED[/bold red]")
-            else:
-                diag_table.add_row("System Integrity", "[green]STABLE[/green]")
+        if diag['crash']:
+            diag_table.add_row("System Integrity", "[bold red]CRASH DETECTED[/bold red]")
+        else:
+            diag_table.add_row("System Integrity", "[green]STABLE[/green]")
 
-            console.print(Panel(diag_table, title="[bold]🔍 System Diagnostics[/bold]", border_style="blue"))
+        console.print(Panel(diag_table, title="[bold]🔍 System Diagnostics[/bold]", border_style="blue"))
+        return diag
             
+    except ImportError:
+        console.print("[yellow]⚠️  pyserial not found, skipping boot check[/yellow]")
+        return None
     except Exception as e:
         console.print(f"[red]Serial Port Error: {e}[/red]")
+        return None
 
 
-def upload_sketch_esp32(sketch_path, port, build_path, verbose=False, baud=115200):
+def esp32_images(sketch_path, build_dir):
     """
-    ESP32 Upload
+    Locate the four ESP32 flash images of a build.
+
+    Returns:
+        list: [(name, offset, path)], bootloader offset None = chip default; None if any is missing
     """
-    sketch_path = Path(sketch_path).resolve()
-    build_dir = Path(build_path).resolve()
-    sketch_name = sketch_path.stem
-    
-    # Check Binaries
+    sketch_name = Path(sketch_path).stem
+    build_dir = Path(build_dir)
     bin_file = build_dir / f'{sketch_name}.ino.bin'
     bootloader = build_dir / f'{sketch_name}.ino.bootloader.bin'
     partitions = build_dir / f'{sketch_name}.ino.partitions.bin'
@@ -349,27 +459,53 @@ def upload_sketch_esp32(sketch_path, port, build_path, verbose=False, baud=11520
             boot_app0 = esp32_versions[0] / 'tools' / 'partitions' / 'boot_app0.bin'
     
     if not all([bin_file.exists(), bootloader.exists(), partitions.exists(), boot_app0.exists()]):
-        console.print(f"[bold red]✗ Error:[/bold red] Missing build artifacts in {build_dir}")
-        return False
+        return None
+    return [
+        ('bootloader', None, bootloader),  # chip-specific offset (0x1000 on ESP32, 0x0 on S3)
+        ('partitions', 0x8000, partitions),
+        ('boot_app0', 0xe000, boot_app0),
+        ('app', 0x10000, bin_file),
+    ]
+
+
+# esptool output: per-image write progress, identity
+ESPTOOL_WRITING = re.compile(r"Writing at 0x[0-9a-fA-F]+.*?(\d+)(?:\.\d+)?\s*%")
+ESPTOOL_WROTE = re.compile(r"Wrote \d+ bytes")
+ESPTOOL_MAC = re.compile(r"MAC:\s*((?:[0-9a-fA-F]{2}:){5}[0-9a-fA-F]{2})")
+ESPTOOL_CHIP = re.compile(r"Chip (?:is|type:)\s*(.+?)\s*$")
+
+
+def parse_esptool_line(line, state, image_count=4):
+    """
+    Update state with progress (0-100 across all images), MAC and chip from one esptool line.
+    """
+    match = ESPTOOL_WRITING.search(line)
+    if match:
+        state['progress'] = (state.get('images_done', 0) * 100 + int(match.group(1))) / image_count
+    elif ESPTOOL_WROTE.search(line):
+        state['images_done'] = state.get('images_done', 0) + 1
+        state['progress'] = state['images_done'] * 100 / image_count
+    match = ESPTOOL_MAC.search(line)
+    if match:
+        state['mac'] = match.group(1).lower()
+    match = ESPTOOL_CHIP.search(line)
+    if match:
+        state['chip'] = match.group(1)
+    return state
+
 
-    # Find esptool
+def find_esptool():
     esptool_path = Path.home() / 'Library' / 'Arduino15' / 'packages' / 'esp32' / 'tools' / 'esptool_py'
     esptool_versions = list(esptool_path.glob('*'))
     if not esptool_versions:
-        console.print('[bold red]✗ Error:[/bold red] esptool not found')
-        return False
-    esptool = esptool_versions[0] / 'esptool'
+        return None
+    return esptool_versions[0] / 'esptool'
 
-    # Upload Info Panel
-    from rich.table import Table
-    grid = Table.grid(expand=True)
-    grid.add_column(style="green")
-    grid.add_column(style="white")
-    grid.add_row("Target:", str(sketch_name))
-    grid.add_row("Port:", port)
-    
-    console.print(Panel(grid, title="[bold green]📤 Starting Upload[/bold green]", border_style="green"))
 
+def build_esptool_command(esptool, port, baud, images):
+    """
+    esptool write_flash command for the given images (classic ESP32 layout).
+    """
     cmd = [
         str(esptool),
         '--chip', 'esp32',
@@ -378,14 +514,62 @@ def upload_sketch_esp32(sketch_path, port, build_path, verbose=False, baud=11520
         '--before', 'default_reset',
         '--after', 'hard_reset',
         'write_flash', '-z',
-        '--flash_mode', 'dio',
+        '--flash_mode', 'dio',  # fast_flash.patch_bootloader_header() mirrors these three
         '--flash_freq', '40m',
         '--flash_size', 'detect',
-        '0x1000', str(bootloader),
-        '0x8000', str(partitions),
-        '0xe000', str(boot_app0),
-        '0x10000', str(bin_file)
     ]
+    for _, offset, path in images:
+        cmd.extend([hex(0x1000 if offset is None else offset), str(path)])
+    return cmd
+
+
+def upload_sketch_esp32(sketch_path, port, build_path, verbose=False, baud=115200, fast=False):
+    """
+    ESP32 Upload
+
+    With fast=True, images are compared with flash via the stub's MD5 and only
+    changed blocks are written, at the highest stable baud (see fast_flash.py).
+    """
+    sketch_path = Path(sketch_path).resolve()
+    build_dir = Path(build_path).resolve()
+    sketch_name = sketch_path.stem
+    
+    images = esp32_images(sketch_path, build_dir)
+    if images is None:
+        console.print(f"[bold red]✗ Error:[/bold red] Missing build artifacts in {build_dir}")
+        return False
+
+    if fast:
+        try:
+            import fast_flash
+        except ImportError:
+            console.print("[bold red]✗ Error:[/bold red] --fast-flash requires esptool (pip install esptool)")
+            return False
+        try:
+            result = fast_flash.fast_flash(port, images)
+        except fast_flash.LINK_ERRORS as e:
+            console.print(f"[bold red]✗ Upload Failed![/bold red] {e}")
+            return False
+        fast_flash.print_result(result)
+        console.print("[bold green]✓ Upload Complete![/bold green]")
+        return True
+
+    esptool = find_esptool()
+    if esptool is None:
+        console.print('[bold red]✗ Error:[/bold red] esptool not found')
+        return False
+
+    # Upload Info Panel
+    from rich.table import Table
+    grid = Table.grid(expand=True)
+    grid.add_column(style="green")
+    grid.add_column(style="white")
+    grid.add_row("Target:", str(sketch_name))
+    grid.add_row("Port:", port)
+    
+    console.print(Panel(grid, title="[bold green]📤 Starting Upload[/bold green]", border_style="green"))
+
+    cmd = build_esptool_command(esptool, port, baud, images)
     
     try:
         with Progress(
@@ -399,14 +583,12 @@ def upload_sketch_esp32(sketch_path, port, build_path, verbose=False, baud=11520
             
             process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
             
-            current_progress = 0
+            state = {}
             for line in process.stdout:
                 if verbose:
                     console.print(line.rstrip(), style="dim")
-                # Progress simulation/parsing is tricky for esptool, simple advance for now
-                if current_progress < 95:
-                    progress.update(task, advance=2)
-                    current_progress += 2
+                parse_esptool_line(line, state, len(images))
+                progress.update(task, completed=state.get('progress', 0))
             
             process.wait()
             progress.update(task, completed=100)
@@ -422,7 +604,7 @@ def upload_sketch_esp32(sketch_path, port, build_path, verbose=False, baud=11520
         return False
 
 
-def compile_and_upload(sketch_path, port=None, fqbn='esp32:esp32:esp32', verbose=False, monitor=True, baud=115200):
+def compile_and_upload(sketch_path, port=None, fqbn='esp32:esp32:esp32', verbose=False, monitor=True, baud=115200, use_cache=True, fast_flash=False):
     """
     Orchestrate Compile and Upload
     """
@@ -439,7 +621,8 @@ def compile_and_upload(sketch_path, port=None, fqbn='esp32:esp32:esp32', verbose
         fqbn, 
         build_path=str(build_dir), 
         verbose=verbose,
-        optimize=True
+        optimize=True,
+        use_cache=use_cache
     )
     
     if not success:
@@ -457,7 +640,7 @@ def compile_and_upload(sketch_path, port=None, fqbn='esp32:esp32:esp32', verbose
     # Upload
     upload_success = False
     if 'esp32' in fqbn.lower():
-        upload_success = upload_sketch_esp32(sketch_path, port, str(build_dir), verbose, baud)
+        upload_success = upload_sketch_esp32(sketch_path, port, str(build_dir), verbose, baud, fast=fast_flash)
     else:
         cmd = ['arduino-cli', 'upload', '-p', port, '--fqbn', fqbn, '--input-dir', str(build_dir)]
         try:
@@ -486,7 +669,9 @@ def get_fqbn_from_board_name(board_name):
 @click.option('--verbose', '-v', is_flag=True, default=True, help='Show verbose output')
 @click.option('--monitor/--no-monitor', default=True, show_default=True, help='Monitor serial output after upload')
 @click.option('--no-build', is_flag=True, default=False, help='Skip build.py step (for test sketches)')
-def cli(sketch, port, board, baud, verbose, monitor, no_build):
+@click.option('--no-cache', is_flag=True, default=False, help='Do not reuse the persistent build cache')
+@click.option('--fast-flash', is_flag=True, default=False, help='ESP32: write only regions that differ from flash, at the highest stable baud')
+def cli(sketch, port, board, baud, verbose, monitor, no_build, no_cache, fast_flash):
     """
     ESP32 Professional Build & Upload Tool
     
@@ -522,7 +707,7 @@ def cli(sketch, port, board, baud, verbose, monitor, no_build):
     else:
         console.print("[yellow]⚠  Skipping build step (--no-build)[/yellow]")
     
-    success = compile_and_upload(sketch, port, fqbn, verbose, monitor, baud)
+    success = compile_and_upload(sketch, port, fqbn, verbose, monitor, baud, use_cache=not no_cache, fast_flash=fast_flash)
     sys.exit(0 if success else 1)
 
 if __name__ == '__main__':
@@ -6,10 +6,7 @@
 #include "AudioProcessor.h"
 
 // Constants
-const float PI_F = 3.14159265359f;
-const float dt = 1.0f / SAMPLE_RATE;
-const float ALPHA_LOW = (2.0f * PI_F * dt * BASS_CUTOFF_HZ) / (1.0f + 2.0f * PI_F * dt * BASS_CUTOFF_HZ);
-const float ALPHA_HIGH = 1.0f / (1.0f + 2.0f * PI_F * dt * TREB_CUTOFF_HZ);
+const int32_t HEADROOM_Q15 = (int32_t)(HEADROOM_SCALER * 32768.0f + 0.5f);
 
 // Global instance
 AudioOutputWithEQ *audioOut = NULL;
@@ -22,32 +19,51 @@ AudioOutputWithEQ::AudioOutputWithEQ(int bck, int ws, int data, int mclk)
     // Initialize Gains (Default to flat or updated immediately)
     current_bass_gain = 1.0f; 
     current_treb_gain = 1.0f;
+    bass_gain_q30 = 0;
+    treb_gain_q30 = 0;
+    // Default sample rate
+    setSampleRate((uint32_t)SAMPLE_RATE);
     // Default bit depth
     currentBitDepth = BIT_DEPTH_16;
 }
 
 // ========== Dynamic Loudness Compensation ==========
+// Inverse relationship: Lower volume = Higher boost
+// Bass +8dB .. +2dB, Treble +4dB .. +1dB (curve in scripts/gen_eq_tables.py)
 void AudioOutputWithEQ::updateLoudness(int volume_percent) {
-    float vol = (float)volume_percent / 100.0f;
-    
-    // Inverse relationship: Lower volume = Higher boost
-    // Max Bass Boost (at low vol): +8dB
-    // Min Bass Boost (at max vol): +2dB
-    float target_bass_db = 8.0f * (1.0f - vol); 
-    float target_treb_db = 4.0f * (1.0f - vol);
-    
-    // Clamp minimums (Keep V-Shape character even at max volume)
-    if (target_bass_db < 2.0f) target_bass_db = 2.0f; 
-    if (target_treb_db < 1.0f) target_treb_db = 1.0f;
+    if (volume_percent < 0) volume_percent = 0;
+    if (volume_percent >= EQ_VOLUME_STEPS) volume_percent = EQ_VOLUME_STEPS - 1;
+
+    current_bass_gain = EQ_BASS_GAIN[volume_percent];
+    current_treb_gain = EQ_TREB_GAIN[volume_percent];
+    bass_gain_q30 = EQ_BASS_GAIN_Q30[volume_percent];
+    treb_gain_q30 = EQ_TREB_GAIN_Q30[volume_percent];
+}
+
+// ========== Sample Rate ==========
+void AudioOutputWithEQ::setSampleRate(uint32_t rate) {
+    // Nearest tabulated rate
+    int best = EQ_DEFAULT_RATE_INDEX;
+    uint32_t bestDiff = UINT32_MAX;
+    for (int i = 0; i < EQ_RATE_COUNT; i++) {
+        uint32_t diff = rate > EQ_SAMPLE_RATES[i] ? rate - EQ_SAMPLE_RATES[i] : EQ_SAMPLE_RATES[i] - rate;
+        if (diff < bestDiff) { best = i; bestDiff = diff; }
+    }
+    rateIndex = best;
+    alpha_low = EQ_ALPHA_LOW[best];
+    alpha_high = EQ_ALPHA_HIGH[best];
+    alpha_low_q31 = EQ_ALPHA_LOW_Q31[best];
+    alpha_high_q31 = EQ_ALPHA_HIGH_Q31[best];
+}
 
-    current_bass_gain = pow(10.0f, target_bass_db / 20.0f);
-    current_treb_gain = pow(10.0f, target_treb_db / 20.0f);
+bool AudioOutputWithEQ::setFrequency(int freq) {
+    if (freq > 0) setSampleRate((uint32_t)freq);
+    return ESP32I2SAudio::setFrequency(freq);
 }
 
 // ========== Bit Depth Control ==========
 void AudioOutputWithEQ::setBitDepth(BitDepth depth) {
     currentBitDepth = depth;
-    Serial.printf("🎚️ I2S Bit Depth set to: %d-bit\n", (int)depth);
 }
 
 // ========== Audio Processing Write Override ==========
@@ -55,6 +71,24 @@ size_t AudioOutputWithEQ::write(const uint8_t *buffer, size_t size) {
     int16_t* samples = (int16_t*)buffer;
     int count = size / 2; // Number of samples
 
+#if DSP_ENGINE == DSP_ENGINE_FIXED
+    processFixed(samples, count);
+#else
+    processFloat(samples, count);
+#endif
+
+    // Apply bit depth conversion if needed
+    if (currentBitDepth != BIT_DEPTH_16) {
+        writeWithBitDepth(samples, count);
+        return size; // Already written
+    }
+
+    // Pass the processed buffer to the actual I2S driver
+    return ESP32I2SAudio::write(buffer, size);
+}
+
+// ========== Float Engine (per frame) ==========
+void AudioOutputWithEQ::processFloat(int16_t* samples, int count) {
     for (int i = 0; i < count; i+=2) { // Stereo Interleaved
         // 1. Headroom Management (-3dB Pre-attenuation)
         float L = (float)samples[i] * HEADROOM_SCALER;
@@ -81,15 +115,137 @@ size_t AudioOutputWithEQ::write(const uint8_t *buffer, size_t size) {
         samples[i] = (int16_t)outL;
         if (i+1 < count) samples[i+1] = (int16_t)outR;
     }
+}
 
-    // Apply bit depth conversion if needed
-    if (currentBitDepth != BIT_DEPTH_16) {
-        writeWithBitDepth(samples, count);
-        return size; // Already written
+// ========== Fixed-Point Engine (block) ==========
+static inline int16_t saturate16(int32_t x) {
+    return (int16_t)(x < -32768 ? -32768 : (x > 32767 ? 32767 : x));
+}
+
+void AudioOutputWithEQ::processFixed(int16_t* samples, int count) {
+    int32_t left[DSP_BLOCK_FRAMES];
+    int32_t right[DSP_BLOCK_FRAMES];
+    int8_t dither[DSP_BLOCK_FRAMES * 2];
+    const int32_t round = 1 << (DSP_FRAC_BITS - 1);
+    int frames = count / 2; // Decoders always write whole frames
+
+    for (int base = 0; base < frames; base += DSP_BLOCK_FRAMES) {
+        int n = (frames - base < DSP_BLOCK_FRAMES) ? frames - base : DSP_BLOCK_FRAMES;
+        int16_t* block = samples + base * 2;
+
+        // 1. De-interleave + Headroom (int16 -> Q27)
+        for (int i = 0; i < n; i++) {
+            left[i] = ((int32_t)block[2 * i] * HEADROOM_Q15) >> (15 - DSP_FRAC_BITS);
+            right[i] = ((int32_t)block[2 * i + 1] * HEADROOM_Q15) >> (15 - DSP_FRAC_BITS);
+        }
+
+        // 2. EQ, one channel at a time (state stays in registers)
+        processChannelFixed(left, n, 0);
+        processChannelFixed(right, n, 1);
+
+        // 3. TPDF Dither for the whole block
+        fillDither(dither, n * 2);
+
+        // 4. Round, Dither, Saturate, Re-interleave
+        for (int i = 0; i < n; i++) {
+            block[2 * i] = saturate16(((left[i] + round) >> DSP_FRAC_BITS) + dither[2 * i]);
+            block[2 * i + 1] = saturate16(((right[i] + round) >> DSP_FRAC_BITS) + dither[2 * i + 1]);
+        }
     }
+}
 
-    // Pass the processed buffer to the actual I2S driver
-    return ESP32I2SAudio::write(buffer, size);
+// ========== Hi-Res Path (24/32-bit WAV) ==========
+static inline int32_t saturateQ27(int32_t x) {
+    const int32_t lim = 1 << (15 + DSP_FRAC_BITS);
+    return x < -lim ? -lim : (x > lim - 1 ? lim - 1 : x);
+}
+
+size_t AudioOutputWithEQ::writeHiRes(int32_t* samples, int frames, float gain) {
+    int32_t left[DSP_BLOCK_FRAMES];
+    int32_t right[DSP_BLOCK_FRAMES];
+    int8_t dither[DSP_BLOCK_FRAMES * 2];
+    // Headroom and volume in one Q30 factor; Q31 input * Q30 >> 34 lands on Q27
+    const int32_t scale = (int32_t)(HEADROOM_SCALER * gain * (float)(1 << 30));
+    const int shift = 31 - (15 + DSP_FRAC_BITS) + 30;
+    const int32_t round16 = 1 << (DSP_FRAC_BITS - 1);
+    const int outShift = 15 + DSP_FRAC_BITS - (currentBitDepth == BIT_DEPTH_24 ? 23 : 31);
+    int16_t* out16 = (int16_t*)samples;
+
+    for (int base = 0; base < frames; base += DSP_BLOCK_FRAMES) {
+        int n = (frames - base < DSP_BLOCK_FRAMES) ? frames - base : DSP_BLOCK_FRAMES;
+        int32_t* block = samples + base * 2;
+
+        for (int i = 0; i < n; i++) {
+            left[i] = (int32_t)(((int64_t)block[2 * i] * scale) >> shift);
+            right[i] = (int32_t)(((int64_t)block[2 * i + 1] * scale) >> shift);
+        }
+
+        processChannelFixed(left, n, 0);
+        processChannelFixed(right, n, 1);
+
+        if (currentBitDepth == BIT_DEPTH_16) {
+            // Requantize with dither, packed toward the front of the buffer (already consumed)
+            fillDither(dither, n * 2);
+            int16_t* out = out16 + base * 2;
+            for (int i = 0; i < n; i++) {
+                out[2 * i] = saturate16(((left[i] + round16) >> DSP_FRAC_BITS) + dither[2 * i]);
+                out[2 * i + 1] = saturate16(((right[i] + round16) >> DSP_FRAC_BITS) + dither[2 * i + 1]);
+            }
+        } else if (outShift > 0) {
+            // 24-bit: right-justified in the 32-bit slot, like writeWithBitDepth()
+            const int32_t r = 1 << (outShift - 1);
+            for (int i = 0; i < n; i++) {
+                block[2 * i] = (saturateQ27(left[i]) + r) >> outShift;
+                block[2 * i + 1] = (saturateQ27(right[i]) + r) >> outShift;
+            }
+        } else {
+            for (int i = 0; i < n; i++) {
+                block[2 * i] = (int32_t)((uint32_t)saturateQ27(left[i]) << -outShift);
+                block[2 * i + 1] = (int32_t)((uint32_t)saturateQ27(right[i]) << -outShift);
+            }
+        }
+    }
+
+    size_t bytes = (size_t)frames * (currentBitDepth == BIT_DEPTH_16 ? 4 : 8);
+    return ESP32I2SAudio::write((const uint8_t*)samples, bytes);
+}
+
+void AudioOutputWithEQ::processChannelFixed(int32_t* x, int n, int ch) {
+    const int32_t a_low = alpha_low_q31;
+    const int32_t a_high = alpha_high_q31;
+    int32_t lp = fx_bass_lp[ch];
+    int32_t hp = fx_treb_hp[ch];
+    int32_t prev = fx_treb_in[ch];
+
+    for (int i = 0; i < n; i++) {
+        int32_t in = x[i];
+        // Bass shelf: one-pole low-pass, out = in + (gain - 1) * lp
+        lp += (int32_t)(((int64_t)a_low * (in - lp)) >> 31);
+        int32_t bass = in + (int32_t)(((int64_t)bass_gain_q30 * lp) >> 30);
+        // Treble shelf: one-pole high-pass on the bass stage output
+        hp = (int32_t)(((int64_t)a_high * (hp + bass - prev)) >> 31);
+        prev = bass;
+        x[i] = bass + (int32_t)(((int64_t)treb_gain_q30 * hp) >> 30);
+    }
+
+    fx_bass_lp[ch] = lp;
+    fx_treb_hp[ch] = hp;
+    fx_treb_in[ch] = prev;
+}
+
+// One xorshift step yields 16 two-bit TPDF values in {-1, 0, +1}.
+// n is rounded up to a multiple of 16, the buffer must have room for it.
+void AudioOutputWithEQ::fillDither(int8_t* dither, int n) {
+    for (int i = 0; i < n; i += 16) {
+        rand_state ^= (rand_state << 13);
+        rand_state ^= (rand_state >> 17);
+        rand_state ^= (rand_state << 5);
+        uint32_t bits = (uint32_t)rand_state;
+        for (int k = 0; k < 16; k++) {
+            dither[i + k] = (int8_t)((int)(bits & 0x01) - (int)((bits >> 1) & 0x01));
+            bits >>= 2;
+        }
+    }
 }
 
 // ========== Shelving Filter ==========
@@ -100,12 +256,12 @@ int16_t AudioOutputWithEQ::applyShelving(int16_t sample, float& prev_in, float&
     float gain;
 
     if (highpass) {
-        alpha = ALPHA_HIGH; gain = current_treb_gain;
+        alpha = alpha_high; gain = current_treb_gain;
         float hp = alpha * (prev_out + in - prev_in);
         out = in + (gain - 1.0f) * hp;
         prev_out = hp;
     } else {
-        alpha = ALPHA_LOW; gain = current_bass_gain;
+        alpha = alpha_low; gain = current_bass_gain;
         float lp = alpha * in + (1.0f - alpha) * prev_out;
         out = in + (gain - 1.0f) * lp;
         prev_out = lp;
@@ -9,9 +9,12 @@
 #include <Arduino.h>
 #include <ESP32I2SAudio.h>
 #include "Config.h"
+#include "EqTables.h"
 
 // ========== EQ Settings ==========
-#define SAMPLE_RATE 44100.0f
+// Gains and filter coefficients are precomputed in EqTables.h
+// (scripts/gen_eq_tables.py reads the cutoffs below, re-run it after changing them)
+#define SAMPLE_RATE 44100.0f   // Default until the decoder reports the stream rate
 
 // Gain Settings
 #define TARGET_BASS_DB  4.5f   // Bass Boost
@@ -24,6 +27,18 @@
 // Headroom (Crucial for V-Shape EQ to prevent clipping)
 #define HEADROOM_SCALER 0.707f // -3dB
 
+// ========== DSP Engine (build-time) ==========
+// DSP_ENGINE_FLOAT: per-frame float reference path
+// DSP_ENGINE_FIXED: de-interleaved Q31 block path, batched dither, no per-sample branches
+#define DSP_ENGINE_FLOAT 0
+#define DSP_ENGINE_FIXED 1
+#ifndef DSP_ENGINE
+#define DSP_ENGINE DSP_ENGINE_FLOAT
+#endif
+
+#define DSP_BLOCK_FRAMES 128   // Frames per fixed-point block (stack: 2 x 512B + 256B)
+#define DSP_FRAC_BITS    12    // Fixed-point samples are int16 << 12 (Q27, 12dB+ of EQ headroom)
+
 // ========== AudioOutputWithEQ Class ==========
 class AudioOutputWithEQ : public ESP32I2SAudio {
 public:
@@ -31,6 +46,13 @@ public:
     
     // Dynamic Loudness Compensation (Fletcher-Munson inspired)
     void updateLoudness(int volume_percent);
+
+    // Sample Rate (selects the precomputed shelf coefficients)
+    void setSampleRate(uint32_t rate);
+    uint32_t getSampleRate() const { return EQ_SAMPLE_RATES[rateIndex]; }
+
+    // Decoders report the stream rate here before writing audio
+    virtual bool setFrequency(int freq) override;
     
     // Bit Depth Control
     void setBitDepth(BitDepth depth);
@@ -39,6 +61,11 @@ public:
     // Override the raw write function to intercept ALL audio data (MP3 & WAV)
     virtual size_t write(const uint8_t *buffer, size_t size) override;
 
+    // 24/32-bit WAV path: interleaved stereo, left-justified int32, processed in place.
+    // Always the fixed-point engine, entered with 24 significant bits; in 24/32-bit
+    // output the frames go to I2S from the same buffer, with no widening pass.
+    size_t writeHiRes(int32_t* samples, int frames, float gain);
+
 private:
     unsigned long rand_state;
     BitDepth currentBitDepth;
@@ -47,15 +74,31 @@ private:
     float current_bass_gain;
     float current_treb_gain;
 
+    // Shelf Coefficients (from EqTables.h)
+    int rateIndex;
+    float alpha_low, alpha_high;
+    int32_t alpha_low_q31, alpha_high_q31;
+
     // EQ State Variables
     float bass_l_prev_in = 0, bass_l_prev_out = 0;
     float bass_r_prev_in = 0, bass_r_prev_out = 0;
     float treb_l_prev_in = 0, treb_l_prev_out = 0;
     float treb_r_prev_in = 0, treb_r_prev_out = 0;
 
+    // Fixed-Point Engine State ([0] = L, [1] = R)
+    int32_t bass_gain_q30;       // (gain - 1) in Q30
+    int32_t treb_gain_q30;
+    int32_t fx_bass_lp[2] = {0, 0};
+    int32_t fx_treb_hp[2] = {0, 0};
+    int32_t fx_treb_in[2] = {0, 0};
+
     // Internal Helpers
     int16_t applyShelving(int16_t sample, float& prev_in, float& prev_out, bool highpass);
     inline int16_t get_tpdf_dither();
+    void processFloat(int16_t* samples, int count);
+    void processFixed(int16_t* samples, int count);
+    void processChannelFixed(int32_t* x, int n, int ch);
+    void fillDither(int8_t* dither, int n);
     void writeWithBitDepth(int16_t* samples, int count);
 };
 
@@ -53,6 +53,7 @@ void savePlaybackState() {
   prefs.putInt("volume", currentVolume);
   prefs.putBool("playing", playbackState == STATE_PLAYING);
   prefs.putInt("loopMode", (int)loopMode);
+  prefs.putInt("bitDepth", (int)outputBitDepth);
   
   // If track just changed, force position to 0 (don't save old track's position)
   if (trackChanged) {
@@ -72,6 +73,7 @@ void loadPlaybackState() {
   bool wasPlaying = prefs.getBool("playing", false);
   currentPosition = prefs.getUInt("position", 0);  // Load playback position
   loopMode = (LoopMode)prefs.getInt("loopMode", LOOP_ALL);
+  outputBitDepth = (BitDepth)prefs.getInt("bitDepth", BIT_DEPTH_16);
   prefs.end();
   
   if (wasPlaying || currentPosition > 0) {
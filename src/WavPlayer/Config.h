@@ -45,7 +45,7 @@
 // ========== Configuration Constants ==========
 #define I2S_NUM         I2S_NUM_0
 #define BUFFER_SIZE     32768  // 32KB - Large buffer for MP3 decoder stability
-#define MAX_TRACKS      32
+#define MAX_TRACKS      65535  // Playlist is paged in from /playlist.idx (see PlaylistManager.h)
 #define MAX_FILENAME    256    // Increased for long Unicode filenames (日本語対応)
 #define DEBOUNCE_MS     200
 #define LONG_PRESS_MS   500
@@ -88,9 +88,10 @@ extern volatile bool trackChanged;
 extern volatile uint32_t currentPosition;
 extern volatile uint32_t totalDataSize;
 extern volatile LoopMode loopMode;
+extern volatile int32_t seekRequestMs;   // -1 = none; set by `seek`, applied by the audio task
+extern volatile BitDepth outputBitDepth; // I2S frame format, re-applied to every new audioOut
 
-// Playlist
-extern char playlist[MAX_TRACKS][MAX_FILENAME];
+// Playlist (entries: playlistGetPath() in PlaylistManager.h)
 extern int playlistSize;
 
 // File Upload State
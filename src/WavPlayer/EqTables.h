@@ -0,0 +1,123 @@
+/**
+ * Loudness-EQ Tables
+ * Generated by scripts/gen_eq_tables.py - do not edit, re-run the generator
+ * Bass shelf 100 Hz (8..2 dB), treble shelf 3000 Hz (4..1 dB)
+ */
+
+#ifndef EQ_TABLES_H
+#define EQ_TABLES_H
+
+#include <stdint.h>
+
+#define EQ_VOLUME_STEPS 101
+#define EQ_RATE_COUNT 6
+#define EQ_DEFAULT_RATE_INDEX 2
+
+// ========== Sample Rates ==========
+static const uint32_t EQ_SAMPLE_RATES[6] = {
+    22050, 32000, 44100, 48000, 88200, 96000
+};
+
+// ========== Loudness Gains (index = volume %) ==========
+// Float engine: linear gain
+static const float EQ_BASS_GAIN[101] = {
+    2.51188643f, 2.48885732f, 2.46603934f, 2.44343055f, 2.42102905f, 2.39883292f,
+    2.37684029f, 2.35504928f, 2.33345806f, 2.31206479f, 2.29086765f, 2.26986485f,
+    2.24905461f, 2.22843515f, 2.20800473f, 2.18776162f, 2.1677041f, 2.14783047f,
+    2.12813905f, 2.10862815f, 2.08929613f, 2.07014135f, 2.05116218f, 2.03235701f,
+    2.01372425f, 1.99526231f, 1.97696964f, 1.95884467f, 1.94088588f, 1.92309173f,
+    1.90546072f, 1.88799135f, 1.87068214f, 1.85353162f, 1.83653834f, 1.81970086f,
+    1.80301774f, 1.78648757f, 1.77010896f, 1.7538805f, 1.73780083f, 1.72186857f,
+    1.70608239f, 1.69044093f, 1.67494288f, 1.65958691f, 1.64437172f, 1.62929603f,
+    1.61435856f, 1.59955803f, 1.58489319f, 1.5703628f, 1.55596563f, 1.54170045f,
+    1.52756606f, 1.51356125f, 1.49968484f, 1.48593564f, 1.4723125f, 1.45881426f,
+    1.44543977f, 1.4321879f, 1.41905752f, 1.40604752f, 1.3931568f, 1.38038426f,
+    1.36772883f, 1.35518941f, 1.34276496f, 1.33045442f, 1.31825674f, 1.30617089f,
+    1.29419584f, 1.28233058f, 1.27057411f, 1.25892541f, 1.25892541f, 1.25892541f,
+    1.25892541f, 1.25892541f, 1.25892541f, 1.25892541f, 1.25892541f, 1.25892541f,
+    1.25892541f, 1.25892541f, 1.25892541f, 1.25892541f, 1.25892541f, 1.25892541f,
+    1.25892541f, 1.25892541f, 1.25892541f, 1.25892541f, 1.25892541f, 1.25892541f,
+    1.25892541f, 1.25892541f, 1.25892541f, 1.25892541f, 1.25892541f
+};
+
+static const float EQ_TREB_GAIN[101] = {
+    1.58489319f, 1.57761127f, 1.5703628f, 1.56314764f, 1.55596563f, 1.54881662f,
+    1.54170045f, 1.53461698f, 1.52756606f, 1.52054753f, 1.51356125f, 1.50660707f,
+    1.49968484f, 1.49279441f, 1.48593564f, 1.47910839f, 1.4723125f, 1.46554784f,
+    1.45881426f, 1.45211162f, 1.44543977f, 1.43879858f, 1.4321879f, 1.42560759f,
+    1.41905752f, 1.41253754f, 1.40604752f, 1.39958732f, 1.3931568f, 1.38675583f,
+    1.38038426f, 1.37404198f, 1.36772883f, 1.36144468f, 1.35518941f, 1.34896288f,
+    1.34276496f, 1.33659552f, 1.33045442f, 1.32434154f, 1.31825674f, 1.3121999f,
+    1.30617089f, 1.30016958f, 1.29419584f, 1.28824955f, 1.28233058f, 1.27643881f,
+    1.27057411f, 1.26473635f, 1.25892541f, 1.25314117f, 1.24738351f, 1.24165231f,
+    1.23594743f, 1.23026877f, 1.2246162f, 1.2189896f, 1.21338885f, 1.20781384f,
+    1.20226443f, 1.19674053f, 1.19124201f, 1.18576875f, 1.18032064f, 1.17489755f,
+    1.16949939f, 1.16412603f, 1.15877736f, 1.15345326f, 1.14815362f, 1.14287833f,
+    1.13762729f, 1.13240036f, 1.12719746f, 1.12201845f, 1.12201845f, 1.12201845f,
+    1.12201845f, 1.12201845f, 1.12201845f, 1.12201845f, 1.12201845f, 1.12201845f,
+    1.12201845f, 1.12201845f, 1.12201845f, 1.12201845f, 1.12201845f, 1.12201845f,
+    1.12201845f, 1.12201845f, 1.12201845f, 1.12201845f, 1.12201845f, 1.12201845f,
+    1.12201845f, 1.12201845f, 1.12201845f, 1.12201845f, 1.12201845f
+};
+
+// Fixed engine: (gain - 1) in Q30
+static const int32_t EQ_BASS_GAIN_Q30[101] = {
+    1623375695, 1598648373, 1574147752, 1549871754, 1525818321, 1501985410,
+    1478371001, 1454973090, 1431789692, 1408818841, 1386058588, 1363507002,
+    1341162171, 1319022198, 1297085205, 1275349333, 1253812735, 1232473587,
+    1211330077, 1190380412, 1169622814, 1149055524, 1128676795, 1108484900,
+    1088478125, 1068654773, 1049013163, 1029551629, 1010268518, 991162197,
+    972231043, 953473451, 934887830, 916472602, 898226207, 880147095,
+    862233734, 844484603, 826898198, 809473025, 792207608, 775100480,
+    758150192, 741355305, 724714395, 708226049, 691888869, 675701470,
+    659662477, 643770531, 628024283, 612422398, 596963551, 581646432,
+    566469742, 551432192, 536532507, 521769423, 507141688, 492648061,
+    478287312, 464058223, 449959588, 435990209, 422148903, 408434494,
+    394845820, 381381727, 368041075, 354822730, 341725571, 328748488,
+    315890379, 303150155, 290526733, 278019044, 278019044, 278019044,
+    278019044, 278019044, 278019044, 278019044, 278019044, 278019044,
+    278019044, 278019044, 278019044, 278019044, 278019044, 278019044,
+    278019044, 278019044, 278019044, 278019044, 278019044, 278019044,
+    278019044, 278019044, 278019044, 278019044, 278019044
+};
+
+static const int32_t EQ_TREB_GAIN_Q30[101] = {
+    628024283, 620205378, 612422398, 604675177, 596963551, 589287357,
+    581646432, 574040614, 566469742, 558933654, 551432192, 543965195,
+    536532507, 529133968, 521769423, 514438715, 507141688, 499878188,
+    492648061, 485451153, 478287312, 471156386, 464058223, 456992674,
+    449959588, 442958816, 435990209, 429053621, 422148903, 415275909,
+    408434494, 401624513, 394845820, 388098273, 381381727, 374696042,
+    368041075, 361416684, 354822730, 348259072, 341725571, 335222089,
+    328748488, 322304630, 315890379, 309505599, 303150155, 296823911,
+    290526733, 284258489, 278019044, 271808267, 265626026, 259472190,
+    253346628, 247249210, 241179807, 235138291, 229124534, 223138406,
+    217179783, 211248537, 205344543, 199467674, 193617808, 187794820,
+    181998585, 176228982, 170485888, 164769181, 159078740, 153414444,
+    147776173, 142163808, 136577229, 131016318, 131016318, 131016318,
+    131016318, 131016318, 131016318, 131016318, 131016318, 131016318,
+    131016318, 131016318, 131016318, 131016318, 131016318, 131016318,
+    131016318, 131016318, 131016318, 131016318, 131016318, 131016318,
+    131016318, 131016318, 131016318, 131016318, 131016318
+};
+
+// ========== Shelf Coefficients (index = sample rate) ==========
+// Float engine
+static const float EQ_ALPHA_LOW[6] = {
+    0.027705693f, 0.0192568468f, 0.0140474436f, 0.012920836f, 0.0070734034f, 0.00650242641f
+};
+
+static const float EQ_ALPHA_HIGH[6] = {
+    0.539125658f, 0.629307364f, 0.700560939f, 0.7180302f, 0.823917477f, 0.83587611f
+};
+
+// Fixed engine: Q31
+static const int32_t EQ_ALPHA_LOW_Q31[6] = {
+    59497523, 41353764, 30166655, 27747284, 15190018, 13963854
+};
+
+static const int32_t EQ_ALPHA_HIGH_Q31[6] = {
+    1157763535, 1351427274, 1504443161, 1541958113, 1769349309, 1795030277
+};
+
+#endif // EQ_TABLES_H
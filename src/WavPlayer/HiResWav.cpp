@@ -0,0 +1,103 @@
+/**
+ * Hi-Res WAV Module - Implementation
+ * Header parsing and frame unpacking for the decoder-less 24/32-bit path
+ */
+
+#include "HiResWav.h"
+
+#define WAVE_FORMAT_PCM        0x0001
+#define WAVE_FORMAT_EXTENSIBLE 0xFFFE
+
+static uint16_t le16(const uint8_t* p) { return p[0] | (p[1] << 8); }
+static uint32_t le32(const uint8_t* p) { return p[0] | (p[1] << 8) | (p[2] << 16) | ((uint32_t)p[3] << 24); }
+
+// ========== Header ==========
+bool readWavFormat(File& file, WavFormat* fmt) {
+  uint8_t hdr[40];
+  if (!file.seek(0) || file.read(hdr, 12) != 12 ||
+      memcmp(hdr, "RIFF", 4) != 0 || memcmp(hdr + 8, "WAVE", 4) != 0) {
+    return false;
+  }
+
+  bool haveFmt = false;
+  while (file.read(hdr, 8) == 8) {
+    uint32_t size = le32(hdr + 4);
+    uint32_t next = file.position() + size + (size & 1);
+    if (memcmp(hdr, "fmt ", 4) == 0 && size >= 16) {
+      size_t n = size < sizeof(hdr) ? size : sizeof(hdr);
+      if (file.read(hdr, n) != (int)n) return false;
+      fmt->formatTag = le16(hdr);
+      fmt->channels = le16(hdr + 2);
+      fmt->sampleRate = le32(hdr + 4);
+      fmt->blockAlign = le16(hdr + 12);
+      fmt->bitsPerSample = le16(hdr + 14);
+      // Extensible (ffmpeg writes it above 16 bits): the subformat GUID starts with the real tag
+      if (fmt->formatTag == WAVE_FORMAT_EXTENSIBLE && n >= 26) fmt->formatTag = le16(hdr + 24);
+      haveFmt = true;
+    } else if (memcmp(hdr, "data", 4) == 0) {
+      if (!haveFmt) return false;
+      fmt->dataOffset = file.position();
+      // Streamed ffmpeg output can leave the size unset
+      uint32_t avail = file.size() - fmt->dataOffset;
+      fmt->dataSize = (size == 0 || size > avail) ? avail : size;
+      return true;
+    }
+    if (!file.seek(next)) return false;
+  }
+  return false;
+}
+
+bool isHiResWav(const WavFormat& fmt) {
+  return fmt.formatTag == WAVE_FORMAT_PCM &&
+         (fmt.bitsPerSample == 24 || fmt.bitsPerSample == 32) &&
+         (fmt.channels == 1 || fmt.channels == 2) &&
+         fmt.blockAlign == fmt.channels * fmt.bitsPerSample / 8;
+}
+
+// ========== Frames ==========
+void expandHiResFrames(int32_t* buf, int frames, uint16_t bitsPerSample, uint16_t channels) {
+  const int width = bitsPerSample / 8;
+  const int blockAlign = width * channels;
+  // 32-bit stereo is already the output layout
+  if (width == 4 && channels == 2) return;
+
+  // Raw frames sit at the end of the buffer; expanding front to back never
+  // overwrites a frame before it is read (an output frame is never smaller)
+  const uint8_t* src = (const uint8_t*)buf + frames * 8 - frames * blockAlign;
+  for (int i = 0; i < frames; i++, src += blockAlign) {
+    int32_t l, r;
+    if (width == 3) {
+      l = (int32_t)((uint32_t)src[0] << 8 | (uint32_t)src[1] << 16 | (uint32_t)src[2] << 24);
+      r = channels == 2 ? (int32_t)((uint32_t)src[3] << 8 | (uint32_t)src[4] << 16 | (uint32_t)src[5] << 24) : l;
+    } else {
+      l = (int32_t)le32(src);
+      r = channels == 2 ? (int32_t)le32(src + 4) : l;
+    }
+    buf[2 * i] = l;
+    buf[2 * i + 1] = r;
+  }
+}
+
+int readHiResFrames(File& file, const WavFormat& fmt, int32_t* dst, int frames) {
+  uint32_t end = fmt.dataOffset + fmt.dataSize;
+  uint32_t pos = file.position();
+  if (pos >= end) return 0;
+  uint32_t bytes = (uint32_t)frames * fmt.blockAlign;
+  if (bytes > end - pos) bytes = end - pos;
+  bytes -= bytes % fmt.blockAlign;
+  if (bytes == 0) return 0;
+
+  int n = bytes / fmt.blockAlign;
+  uint8_t* tail = (uint8_t*)dst + n * 8 - bytes;
+  int got = file.read(tail, bytes);
+  if (got <= 0) return 0;
+  if ((uint32_t)got < bytes) {
+    // Short read: keep whole frames, moved to where the unpack expects them, and put
+    // the partial frame back so the next read starts on a frame boundary
+    n = got / fmt.blockAlign;
+    if (got % fmt.blockAlign) file.seek(pos + n * fmt.blockAlign);
+    memmove((uint8_t*)dst + n * 8 - n * fmt.blockAlign, tail, n * fmt.blockAlign);
+  }
+  expandHiResFrames(dst, n, fmt.bitsPerSample, fmt.channels);
+  return n * fmt.blockAlign;
+}
@@ -0,0 +1,43 @@
+/**
+ * Hi-Res WAV Module - Header
+ * 24-bit (packed) and 32-bit WAVs skip the 16-bit WAV decoder: frames are read
+ * straight from the card as left-justified int32 and handed to
+ * AudioOutputWithEQ::writeHiRes()
+ */
+
+#ifndef HIRES_WAV_H
+#define HIRES_WAV_H
+
+#include <Arduino.h>
+#include <SD.h>
+#include "Config.h"
+
+#define HIRES_BLOCK_FRAMES 256   // Frames per read (2 KB of int32 stereo)
+
+struct WavFormat {
+  uint16_t formatTag;       // 1 = PCM (WAVE_FORMAT_EXTENSIBLE is resolved to its subformat)
+  uint16_t channels;
+  uint16_t bitsPerSample;   // Container size: 24 = packed 3 bytes
+  uint16_t blockAlign;
+  uint32_t sampleRate;
+  uint32_t dataOffset;
+  uint32_t dataSize;
+};
+
+// ========== Functions ==========
+// Walks the RIFF chunks; on success the file is positioned at the first PCM byte
+bool readWavFormat(File& file, WavFormat* fmt);
+
+// Integer PCM, 24 or 32 bits, mono or stereo
+bool isHiResWav(const WavFormat& fmt);
+
+// Reads up to `frames` frames into dst (room for frames * 2 int32) as interleaved
+// stereo, left-justified int32; stops at the end of the data chunk.
+// Returns the number of file bytes consumed, always whole frames (0 at the end).
+int readHiResFrames(File& file, const WavFormat& fmt, int32_t* dst, int frames);
+
+// In-place unpack: the last frames * blockAlign bytes of buf hold raw frames,
+// buf has room for frames * 2 int32
+void expandHiResFrames(int32_t* buf, int frames, uint16_t bitsPerSample, uint16_t channels);
+
+#endif // HIRES_WAV_H
@@ -0,0 +1,248 @@
+/**
+ * PCM Stream Module - Implementation
+ * Packet parser (loop task) and jitter buffer (single producer / single consumer ring)
+ */
+
+#include "PcmStream.h"
+
+static uint8_t* ring = NULL;
+static size_t ringSize = 0;
+static volatile size_t ringHead = 0;   // Written by the parser only
+static volatile size_t ringTail = 0;   // Written by the audio task only
+
+static volatile bool active = false;   // Ring allocated; only loop() allocates and frees it
+static volatile bool drained = false;  // Audio task is done with the ring (pcmStreamEnd)
+static volatile bool ended = false;
+static volatile bool stopped = false;  // pcmStreamStop(): the buffered audio is discarded
+static bool playing = false;           // Audio task: past the prefill
+static uint32_t streamRate = 44100;
+static uint8_t streamChannels = 2;
+static PcmStreamStats stats;
+
+static uint8_t packet[sizeof(PcmPacketHeader) + PCM_MAX_PAYLOAD + 2];
+static size_t packetHave = 0;
+static uint16_t expectedSeq = 0;
+static unsigned long lastPacket = 0;
+static unsigned long lastReport = 0;
+static char command[PCM_MAX_COMMAND + 1];
+static bool commandPending = false;
+
+static size_t ringFill() {
+  return ringSize ? (ringHead + ringSize - ringTail) % ringSize : 0;
+}
+
+static void releaseRing() {
+  active = false;
+  drained = false;
+  ended = false;
+  stopped = false;
+  commandPending = false;
+  ringSize = 0;
+  free(ring);
+  ring = NULL;
+  EVENT_LOG("PCM stream ended");
+}
+
+// ========== Lifecycle ==========
+bool pcmStreamBegin(uint32_t rate, uint8_t channels) {
+  if (active && drained) releaseRing();
+  if (active || rate < 8000 || rate > 96000 || channels < 1 || channels > 2) return false;
+
+  size_t size = (size_t)rate * channels * 2 * PCM_STREAM_BUFFER_MS / 1000;
+  if (size > PCM_STREAM_MAX_BUFFER) size = PCM_STREAM_MAX_BUFFER;
+  size -= size % 4;
+  ring = (uint8_t*)(psramFound() ? ps_malloc(size) : malloc(size));
+  if (ring == NULL) return false;
+
+  ringSize = size;
+  ringHead = ringTail = 0;
+  streamRate = rate;
+  streamChannels = channels;
+  memset(&stats, 0, sizeof(stats));
+  packetHave = 0;
+  expectedSeq = 0;
+  playing = false;
+  ended = false;
+  stopped = false;
+  commandPending = false;
+  lastPacket = lastReport = millis();
+  active = true;
+  EVENT_LOG("PCM stream started");
+  return true;
+}
+
+// The audio task only hands the ring back: handlePcmStream() may be mid-report
+// on the other core, so freeing it is left to the next loop() pass
+void pcmStreamEnd() {
+  drained = true;
+}
+
+// Only flags are set: the ring tail belongs to the audio task, which stops reading
+// once pcmStreamFinished() is true
+void pcmStreamStop() {
+  if (!pcmStreamActive()) return;
+  stopped = true;
+  ended = true;
+}
+
+bool pcmStreamActive() {
+  return active && !drained;
+}
+
+bool pcmStreamFinished() {
+  return pcmStreamActive() && ended && (stopped || ringFill() < 2u * streamChannels);
+}
+
+uint32_t pcmStreamRate() {
+  return streamRate;
+}
+
+uint8_t pcmStreamChannels() {
+  return streamChannels;
+}
+
+size_t pcmStreamCapacity() {
+  return ringSize;
+}
+
+PcmStreamStats pcmStreamStats() {
+  return stats;
+}
+
+// ========== Jitter Buffer ==========
+static void ringWrite(const uint8_t* data, size_t len) {
+  if (len >= ringSize - ringFill()) {
+    stats.overflows++;
+    return;
+  }
+  size_t head = ringHead;
+  size_t first = ringSize - head < len ? ringSize - head : len;
+  memcpy(ring + head, data, first);
+  memcpy(ring, data + first, len - first);
+  __sync_synchronize();
+  ringHead = (head + len) % ringSize;
+  stats.received += len;
+}
+
+size_t pcmStreamRead(uint8_t* dst, size_t size) {
+  if (!pcmStreamActive() || stopped) return 0;
+  size_t fill = ringFill();
+  if (!playing) {
+    if (!ended && fill < ringSize * PCM_STREAM_PREFILL_PCT / 100) return 0;
+    playing = true;
+  }
+  size_t frame = 2u * streamChannels;
+  size_t len = (fill < size ? fill : size) / frame * frame;
+  if (len == 0) {
+    if (!ended) {
+      stats.underruns++;
+      playing = false;  // Refill before resuming
+    }
+    return 0;
+  }
+  size_t tail = ringTail;
+  size_t first = ringSize - tail < len ? ringSize - tail : len;
+  memcpy(dst, ring + tail, first);
+  memcpy(dst + first, ring, len - first);
+  __sync_synchronize();
+  ringTail = (tail + len) % ringSize;
+  return len;
+}
+
+// ========== Packet Parser ==========
+uint16_t crc16Ccitt(const uint8_t* data, size_t len, uint16_t crc) {
+  for (size_t i = 0; i < len; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (int b = 0; b < 8; b++) crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+  }
+  return crc;
+}
+
+static void handlePacket() {
+  const PcmPacketHeader* h = (const PcmPacketHeader*)packet;
+  size_t total = sizeof(PcmPacketHeader) + h->length;
+  uint16_t crc = packet[total] | (packet[total + 1] << 8);
+  if (crc16Ccitt(packet, total) != crc) {
+    stats.bad++;
+    return;
+  }
+
+  if (stats.packets > 0 && h->seq != expectedSeq) stats.lost += (uint16_t)(h->seq - expectedSeq);
+  expectedSeq = h->seq + 1;
+  stats.packets++;
+  lastPacket = millis();
+
+  if (h->type == PCM_PACKET_PCM) {
+    ringWrite(packet + sizeof(PcmPacketHeader), h->length);
+  } else if (h->type == PCM_PACKET_END) {
+    ended = true;
+  } else if (h->type == PCM_PACKET_COMMAND && h->length <= PCM_MAX_COMMAND) {
+    memcpy(command, packet + sizeof(PcmPacketHeader), h->length);
+    command[h->length] = '\0';
+    commandPending = true;
+  }
+}
+
+bool pcmStreamTakeCommand(char* line, size_t size) {
+  if (!commandPending) return false;
+  snprintf(line, size, "%s", command);
+  commandPending = false;
+  return true;
+}
+
+void handlePcmStream() {
+  if (!active) return;
+  if (drained) {
+    releaseRing();
+    return;
+  }
+
+  // One command at a time: parsing resumes once loop() has taken it
+  while (!ended && !commandPending && Serial.available() > 0) {
+    // Sync on the magic bytes
+    if (packetHave < 2) {
+      int b = Serial.read();
+      if (b < 0) break;
+      if (b == (packetHave == 0 ? PCM_MAGIC0 : PCM_MAGIC1)) {
+        packet[packetHave++] = b;
+      } else {
+        if (packetHave == 1) stats.bad++;
+        packetHave = (b == PCM_MAGIC0) ? 1 : 0;
+        if (packetHave) packet[0] = b;
+      }
+      continue;
+    }
+
+    size_t need = sizeof(PcmPacketHeader);
+    if (packetHave >= need) {
+      uint16_t length = ((const PcmPacketHeader*)packet)->length;
+      if (length > PCM_MAX_PAYLOAD) {
+        stats.bad++;
+        packetHave = 0;
+        continue;
+      }
+      need += length + 2;
+    }
+    size_t avail = Serial.available();
+    size_t chunk = need - packetHave < avail ? need - packetHave : avail;
+    packetHave += Serial.readBytes(packet + packetHave, chunk);
+    if (packetHave == need && need > sizeof(PcmPacketHeader)) {
+      handlePacket();
+      packetHave = 0;
+    }
+  }
+
+  unsigned long now = millis();
+  // A full buffer is the host holding off (paused playback), not a dead link
+  if (!ended && now - lastPacket > PCM_STREAM_TIMEOUT_MS &&
+      ringFill() < ringSize * PCM_STREAM_PREFILL_PCT / 100) {
+    Serial.println("STREAM TIMEOUT");
+    ended = true;
+  }
+  if (now - lastReport >= PCM_STREAM_REPORT_MS) {
+    lastReport = now;
+    Serial.printf("STREAM fill=%u cap=%u rx=%lu under=%lu lost=%lu bad=%lu\n",
+                  (unsigned)ringFill(), (unsigned)ringSize, (unsigned long)stats.received,
+                  (unsigned long)stats.underruns, (unsigned long)stats.lost, (unsigned long)stats.bad);
+  }
+}
@@ -0,0 +1,68 @@
+/**
+ * PCM Stream Module - Header
+ * Live PCM from the host over serial (scripts/pcm_stream.py):
+ * framed packets -> jitter buffer -> audio task -> AudioOutputWithEQ
+ */
+
+#ifndef PCM_STREAM_H
+#define PCM_STREAM_H
+
+#include <Arduino.h>
+#include "Config.h"
+
+// ========== Wire Format ==========
+// Host -> device, after "stream <rate> <channels>" is answered with "STREAM READY cap=<bytes>":
+//   PcmPacketHeader, payload[length] (int16 LE PCM), uint16_t crc
+//   crc = CRC-16/CCITT-FALSE over header + payload
+//   Serial commands (volume, pause, resume, stop...) travel as COMMAND packets while
+//   the stream owns the link
+// Device -> host, every PCM_STREAM_REPORT_MS:
+//   STREAM fill=<bytes> cap=<bytes> rx=<payload bytes> under=<n> lost=<n> bad=<n>
+#define PCM_MAGIC0             0xA5
+#define PCM_MAGIC1             0x5A
+#define PCM_PACKET_PCM         0
+#define PCM_PACKET_END         1     // No payload: drain the buffer, then stop
+#define PCM_PACKET_COMMAND     2     // Payload: one command line, no newline
+#define PCM_MAX_PAYLOAD        2048
+#define PCM_MAX_COMMAND        64
+
+#define PCM_STREAM_BUFFER_MS   500   // Jitter buffer capacity
+#define PCM_STREAM_MAX_BUFFER  (128 * 1024)
+#define PCM_STREAM_PREFILL_PCT 50    // Start (and restart after an underrun) at this fill
+#define PCM_STREAM_REPORT_MS   50
+#define PCM_STREAM_TIMEOUT_MS  2000  // No packet for this long ends the stream
+
+struct __attribute__((packed)) PcmPacketHeader {
+  uint8_t  magic[2];
+  uint8_t  type;
+  uint8_t  flags;
+  uint16_t seq;
+  uint16_t length;
+};
+
+struct PcmStreamStats {
+  uint32_t received;    // Payload bytes accepted
+  uint32_t packets;
+  uint32_t lost;        // Sequence gaps
+  uint32_t bad;         // CRC / framing errors
+  uint32_t underruns;   // Buffer ran dry while playing
+  uint32_t overflows;   // Packets dropped on a full buffer
+};
+
+// ========== Functions ==========
+bool pcmStreamBegin(uint32_t rate, uint8_t channels);
+void pcmStreamEnd();                   // Audio task: done playing; the next handlePcmStream() frees the buffer
+void pcmStreamStop();                  // loop(): drop what is buffered and finish now
+bool pcmStreamActive();
+bool pcmStreamFinished();              // END (or timeout) seen and the buffer is drained
+uint32_t pcmStreamRate();
+uint8_t pcmStreamChannels();
+size_t pcmStreamCapacity();             // Jitter buffer size in bytes
+PcmStreamStats pcmStreamStats();
+
+void handlePcmStream();                // loop(): parse serial input, report buffer fill
+bool pcmStreamTakeCommand(char* line, size_t size);  // loop(): next COMMAND packet's line
+size_t pcmStreamRead(uint8_t* dst, size_t size);  // Audio task; 0 while prefilling
+uint16_t crc16Ccitt(const uint8_t* data, size_t len, uint16_t crc = 0xFFFF);
+
+#endif // PCM_STREAM_H
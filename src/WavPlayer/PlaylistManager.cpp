@@ -5,60 +5,383 @@
 
 #include "PlaylistManager.h"
 
+#define PLAYLIST_INDEX_TMP   "/playlist.idx.tmp"
+#define PLAYLIST_STRINGS_TMP "/playlist.str.tmp"
+
+struct PlaylistPage {
+  int first;        // First track index, -1 = empty slot
+  int count;
+  uint32_t lastUse;
+  PlaylistTrackInfo info[PLAYLIST_PAGE_TRACKS];
+  char paths[PLAYLIST_PAGE_TRACKS][MAX_FILENAME];
+};
+
+static PlaylistPage pages[PLAYLIST_PAGES];
+static PlaylistIndexHeader indexHeader;
+static File indexFile;          // Kept open: opening by name walks the (possibly huge) root directory
+static bool indexOpen = false;
+static bool fromIndex = false;
+static uint32_t useCounter = 0;
+static PlaylistStats stats = {0, 0};
+static SemaphoreHandle_t playlistMutex = NULL;
+static volatile bool rescanRequested = false;
+
+static void lockPlaylist() {
+  xSemaphoreTake(playlistMutex, portMAX_DELAY);
+}
+
+static void unlockPlaylist() {
+  xSemaphoreGive(playlistMutex);
+}
+
+static void clearPages() {
+  for (int i = 0; i < PLAYLIST_PAGES; i++) pages[i].first = -1;
+}
+
+// Names only: one pass over the directory without opening each entry (a scan opens
+// and sizes every file), so it is cheap enough to run on every boot
+static uint32_t countRootTracks() {
+  File root = SD.open("/");
+  if (!root) return 0;
+  uint32_t count = 0;
+  bool isDir = false;
+  String name = root.getNextFileName(&isDir);
+  while (name.length() > 0) {
+    const char* slash = strrchr(name.c_str(), '/');
+    if (!isDir && isPlaylistTrack(slash ? slash + 1 : name.c_str())) count++;
+    name = root.getNextFileName(&isDir);
+  }
+  root.close();
+  return count;
+}
+
 // ========== Playlist Management ==========
+void loadPlaylist() {
+  // Created here, in setup(), before the tasks that share it start
+  if (playlistMutex == NULL) playlistMutex = xSemaphoreCreateMutex();
+  unsigned long start = millis();
+  Serial.println("📋 Loading playlist...");
+  if (openPlaylistIndex()) {
+    // Files copied onto / deleted from the card by a PC change the root count;
+    // replaced and renamed tracks are caught when they are opened
+    uint32_t onCard = countRootTracks();
+    if (onCard == indexHeader.rootTracks) {
+      fromIndex = true;
+      Serial.printf("\n✅ Loaded %d tracks from %s (%lu ms)\n", playlistSize, PLAYLIST_INDEX_PATH, millis() - start);
+      return;
+    }
+    Serial.printf("⚠️  Playlist index is stale (%lu audio files in /, index has %lu), scanning instead\n",
+                  (unsigned long)onCard, (unsigned long)indexHeader.rootTracks);
+  }
+
+  scanPlaylist();
+  Serial.printf("   Scan took %lu ms\n", millis() - start);
+}
+
+// Streams the root directory into a new index: records go straight to the index file,
+// paths to a side file that is appended once the count is known.
+// Scans share the temp files, so they only run on the loop task (and in setup());
+// other tasks use requestPlaylistRescan().
 void scanPlaylist() {
   EVENT_LOG("Scanning SD card");
   Serial.println("\n📁 Scanning SD card for audio files (WAV/MP3)...");
-  
+
   File root = SD.open("/");
   if (!root) {
     Serial.println("❌ Failed to open root directory");
     return;
   }
-  
-  playlistSize = 0;
+
+  if (SD.exists(PLAYLIST_INDEX_TMP)) SD.remove(PLAYLIST_INDEX_TMP);
+  if (SD.exists(PLAYLIST_STRINGS_TMP)) SD.remove(PLAYLIST_STRINGS_TMP);
+  File records = SD.open(PLAYLIST_INDEX_TMP, FILE_WRITE);
+  File strings = SD.open(PLAYLIST_STRINGS_TMP, FILE_WRITE);
+  if (!records || !strings) {
+    Serial.println("❌ Failed to create playlist index");
+    return;
+  }
+
+  PlaylistIndexHeader header;
+  memset(&header, 0, sizeof(header));
+  header.magic = PLAYLIST_INDEX_MAGIC;
+  header.version = PLAYLIST_INDEX_VERSION;
+  header.recordSize = sizeof(PlaylistIndexRecord);
+  header.flags = INDEX_FLAG_DEVICE;
+  records.write((const uint8_t*)&header, sizeof(header));
+
+  char path[MAX_FILENAME];
   File file = root.openNextFile();
-  
-  while (file && playlistSize < MAX_TRACKS) {
+  while (file) {
     if (!file.isDirectory()) {
-      String fullname = String(file.name());
-      String filename = fullname;
-      int lastSlash = fullname.lastIndexOf('/');
-      if (lastSlash >= 0) {
-        filename = fullname.substring(lastSlash + 1);
-      }
-      
-      DEBUG_PRINTF("  Checking: %s\n", filename.c_str());
-      
+      const char* fullname = file.name();
+      const char* slash = strrchr(fullname, '/');
+      const char* filename = slash ? slash + 1 : fullname;
+
       // Skip hidden files and filter WAV/MP3
-      if ((filename.endsWith(".wav") || filename.endsWith(".WAV") ||
-           filename.endsWith(".mp3") || filename.endsWith(".MP3")) 
-          && !filename.startsWith("._")) {
-        // Use fixed array instead of String
-        if (fullname.startsWith("/")) {
-          snprintf(playlist[playlistSize], MAX_FILENAME, "%s", fullname.c_str());
-        } else {
-          snprintf(playlist[playlistSize], MAX_FILENAME, "/%s", fullname.c_str());
-        }
-        playlistSize++;
-        Serial.printf("  [%d] %s\n", playlistSize, filename.c_str());
-        EVENT_LOG(("Added: " + filename).c_str());
+      if (isPlaylistTrack(filename)) {
+        snprintf(path, sizeof(path), fullname[0] == '/' ? "%s" : "/%s", fullname);
+        size_t len = strlen(path) + 1;
+
+        PlaylistIndexRecord rec;
+        memset(&rec, 0, sizeof(rec));
+        rec.pathOffset = header.stringsSize;
+        rec.fileSize = file.size();
+        rec.format = detectAudioFormat(filename);
+        records.write((const uint8_t*)&rec, sizeof(rec));
+        strings.write((const uint8_t*)path, len);
+
+        header.stringsSize += len;
+        header.trackCount++;
+        DEBUG_PRINTF("  [%lu] %s\n", (unsigned long)header.trackCount, filename);
       } else {
-        DEBUG_PRINTF("  Skipped: %s\n", filename.c_str());
+        DEBUG_PRINTF("  Skipped: %s\n", filename);
       }
     }
     file = root.openNextFile();
   }
-  
+  root.close();
+  strings.close();
+
+  // Append the paths, then fill in the header
+  strings = SD.open(PLAYLIST_STRINGS_TMP, FILE_READ);
+  uint8_t buf[512];
+  int n;
+  while (strings && (n = strings.read(buf, sizeof(buf))) > 0) {
+    records.write(buf, n);
+  }
+  if (strings) strings.close();
+  SD.remove(PLAYLIST_STRINGS_TMP);
+
+  header.stringsOffset = sizeof(header) + header.trackCount * sizeof(PlaylistIndexRecord);
+  header.rootTracks = header.trackCount;
+  records.seek(0);
+  records.write((const uint8_t*)&header, sizeof(header));
+  records.close();
+
+  // Swap in the new index
+  lockPlaylist();
+  if (indexOpen) {
+    indexFile.close();
+    indexOpen = false;
+  }
+  if (SD.exists(PLAYLIST_INDEX_PATH)) SD.remove(PLAYLIST_INDEX_PATH);
+  bool renamed = SD.rename(PLAYLIST_INDEX_TMP, PLAYLIST_INDEX_PATH);
+  unlockPlaylist();
+
+  if (!renamed || !openPlaylistIndex()) {
+    Serial.println("❌ Failed to write playlist index");
+    playlistSize = 0;
+    return;
+  }
+  fromIndex = false;
+
   Serial.printf("\n✅ Found %d tracks\n", playlistSize);
   EVENT_LOG("Scan complete");
 }
 
+void rescanPlaylist() {
+  invalidatePlaylistIndex();
+  scanPlaylist();
+}
+
+void requestPlaylistRescan() {
+  rescanRequested = true;
+}
+
+bool playlistRescanPending() {
+  return rescanRequested;
+}
+
+void handlePlaylistRescan() {
+  if (!rescanRequested) return;
+  rescanPlaylist();
+  rescanRequested = false;
+}
+
+// ========== Playlist Index ==========
+bool openPlaylistIndex() {
+  lockPlaylist();
+  if (indexOpen) {
+    indexFile.close();
+    indexOpen = false;
+  }
+  clearPages();
+
+  indexFile = SD.open(PLAYLIST_INDEX_PATH, FILE_READ);
+  if (!indexFile) {
+    unlockPlaylist();
+    return false;
+  }
+
+  PlaylistIndexHeader& h = indexHeader;
+  size_t size = indexFile.size();
+  bool valid = indexFile.read((uint8_t*)&h, sizeof(h)) == sizeof(h) &&
+               h.magic == PLAYLIST_INDEX_MAGIC &&
+               h.version == PLAYLIST_INDEX_VERSION &&
+               h.recordSize >= sizeof(PlaylistIndexRecord) &&
+               h.stringsOffset == sizeof(h) + h.trackCount * h.recordSize &&
+               h.stringsOffset + h.stringsSize == size;
+  if (!valid) {
+    Serial.println("⚠️  Playlist index invalid, scanning instead");
+    indexFile.close();
+    unlockPlaylist();
+    return false;
+  }
+
+  indexOpen = true;
+  playlistSize = h.trackCount;
+  unlockPlaylist();
+  return true;
+}
+
+void invalidatePlaylistIndex() {
+  // Resident pages stay usable so playback continues until the rescan
+  lockPlaylist();
+  if (indexOpen) {
+    indexFile.close();
+    indexOpen = false;
+  }
+  if (SD.exists(PLAYLIST_INDEX_PATH)) {
+    SD.remove(PLAYLIST_INDEX_PATH);
+    EVENT_LOG("Playlist index invalidated");
+  }
+  fromIndex = false;
+  unlockPlaylist();
+}
+
+bool isPlaylistFromIndex() {
+  return fromIndex;
+}
+
+// ========== Page Cache (caller holds the mutex) ==========
+static bool readRecord(int index, PlaylistIndexRecord* rec) {
+  indexFile.seek(sizeof(PlaylistIndexHeader) + (uint32_t)index * indexHeader.recordSize);
+  return indexFile.read((uint8_t*)rec, sizeof(*rec)) == sizeof(*rec) &&
+         rec->pathOffset < indexHeader.stringsSize;
+}
+
+static bool readPath(const PlaylistIndexRecord& rec, char* path) {
+  indexFile.seek(indexHeader.stringsOffset + rec.pathOffset);
+  size_t len = indexFile.readBytesUntil('\0', path, MAX_FILENAME - 1);
+  path[len] = '\0';
+  return len > 0 && path[0] == '/';
+}
+
+static PlaylistPage* loadPage(int first) {
+  if (!indexOpen) return NULL;
+
+  // Least recently used slot
+  PlaylistPage* page = &pages[0];
+  for (int i = 1; i < PLAYLIST_PAGES; i++) {
+    if (pages[i].first < 0 || (page->first >= 0 && pages[i].lastUse < page->lastUse)) page = &pages[i];
+  }
+
+  int count = playlistSize - first;
+  if (count > PLAYLIST_PAGE_TRACKS) count = PLAYLIST_PAGE_TRACKS;
+  page->first = -1;
+  for (int i = 0; i < count; i++) {
+    PlaylistIndexRecord rec;
+    if (!readRecord(first + i, &rec) || !readPath(rec, page->paths[i])) {
+      Serial.printf("⚠️  Playlist index read failed at track %d\n", first + i);
+      return NULL;
+    }
+    PlaylistTrackInfo& info = page->info[i];
+    info.fileSize = rec.fileSize;
+    info.dataOffset = rec.dataOffset;
+    info.durationMs = rec.durationMs;
+    info.sampleRate = rec.sampleRate;
+    info.format = rec.format;
+    info.bitsPerSample = rec.bitsPerSample;
+    info.gainCdB = rec.gainCdB;
+  }
+  page->first = first;
+  page->count = count;
+  stats.pageLoads++;
+  return page;
+}
+
+static PlaylistPage* findPage(int index) {
+  if (index < 0 || index >= playlistSize) return NULL;
+  int first = index - index % PLAYLIST_PAGE_TRACKS;
+
+  PlaylistPage* page = NULL;
+  for (int i = 0; i < PLAYLIST_PAGES; i++) {
+    if (pages[i].first == first) {
+      page = &pages[i];
+      stats.pageHits++;
+      break;
+    }
+  }
+  if (page == NULL) page = loadPage(first);
+  if (page) page->lastUse = ++useCounter;
+  return page;
+}
+
+// ========== Playlist Access ==========
+bool playlistGetPath(int index, char* path, size_t size) {
+  lockPlaylist();
+  PlaylistPage* page = findPage(index);
+  if (page) snprintf(path, size, "%s", page->paths[index - page->first]);
+  unlockPlaylist();
+  return page != NULL;
+}
+
+bool playlistGetInfo(int index, PlaylistTrackInfo* info) {
+  lockPlaylist();
+  PlaylistPage* page = findPage(index);
+  if (page) *info = page->info[index - page->first];
+  unlockPlaylist();
+  return page != NULL;
+}
+
+void playlistPrefetch(int index) {
+  if (playlistSize == 0) return;
+  lockPlaylist();
+  findPage(index);
+  findPage((index + 1) % playlistSize);
+  findPage((index - 1 + playlistSize) % playlistSize);
+  unlockPlaylist();
+}
+
+// Linear scan of the index; does not disturb the page cache. The mutex is taken per
+// record, so the audio task's page loads wait for one read, not the whole walk.
+// Runs on the loop task, which also owns scans: the index cannot change underneath it.
+int playlistFind(const char* path) {
+  char candidate[MAX_FILENAME];
+  for (int i = 0; i < playlistSize; i++) {
+    PlaylistIndexRecord rec;
+    lockPlaylist();
+    bool ok = indexOpen && readRecord(i, &rec) && readPath(rec, candidate);
+    unlockPlaylist();
+    if (!ok) break;
+    if (strcmp(candidate, path) == 0) return i;
+  }
+  return -1;
+}
+
+// A size mismatch means the card was changed without updating the index
+bool playlistTrackMatches(int index, size_t fileSize) {
+  PlaylistTrackInfo info;
+  return playlistGetInfo(index, &info) && info.fileSize == fileSize;
+}
+
+PlaylistStats playlistStats() {
+  return stats;
+}
+
+size_t playlistMemoryBytes() {
+  return sizeof(pages) + sizeof(indexHeader) + sizeof(indexFile) + sizeof(stats);
+}
+
 // ========== Audio Format Detection ==========
 AudioFormat detectAudioFormat(const char* filename) {
-  String fn = String(filename);
-  fn.toLowerCase();
-  if (fn.endsWith(".wav")) return FORMAT_WAV;
-  if (fn.endsWith(".mp3")) return FORMAT_MP3;
+  const char* dot = strrchr(filename, '.');
+  if (dot == NULL) return FORMAT_UNKNOWN;
+  if (strcasecmp(dot, ".wav") == 0) return FORMAT_WAV;
+  if (strcasecmp(dot, ".mp3") == 0) return FORMAT_MP3;
   return FORMAT_UNKNOWN;
 }
+
+bool isPlaylistTrack(const char* filename) {
+  return detectAudioFormat(filename) != FORMAT_UNKNOWN && strncmp(filename, "._", 2) != 0;
+}
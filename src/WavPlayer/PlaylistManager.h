@@ -10,8 +10,81 @@
 #include <SD.h>
 #include "Config.h"
 
+// ========== Playlist Index (/playlist.idx) ==========
+// Written by scripts/playlist_index.py (or by scanPlaylist()).
+// Little-endian layout:
+//   PlaylistIndexHeader
+//   PlaylistIndexRecord[trackCount]
+//   NUL-terminated UTF-8 paths (record.pathOffset is relative to stringsOffset)
+#define PLAYLIST_INDEX_PATH    "/playlist.idx"
+#define PLAYLIST_INDEX_MAGIC   0x49504144  // "DAPI"
+#define PLAYLIST_INDEX_VERSION 2
+#define INDEX_FLAG_DEVICE      0x01        // Written by scanPlaylist(): only size/format are known
+
+struct __attribute__((packed)) PlaylistIndexHeader {
+  uint32_t magic;
+  uint16_t version;
+  uint16_t recordSize;
+  uint32_t trackCount;
+  uint32_t stringsOffset;
+  uint32_t stringsSize;
+  uint32_t flags;
+  uint32_t rootTracks;     // Audio files directly in "/" when written: boot staleness check
+};
+
+struct __attribute__((packed)) PlaylistIndexRecord {
+  uint32_t pathOffset;
+  uint32_t fileSize;
+  uint32_t dataOffset;   // Start of the WAV data chunk / first MP3 frame (0 = unknown)
+  uint32_t durationMs;   // 0 = unknown
+  uint32_t sampleRate;   // 0 = unknown
+  uint8_t  format;       // AudioFormat
+  uint8_t  bitsPerSample;
+  int16_t  gainCdB;      // Track gain in 1/100 dB
+};
+
+// ========== Paged Playlist ==========
+// The index on the card is the playlist; only a few pages of it are kept in RAM.
+// Entries are copied out under a mutex, so callers never hold pointers into a page.
+#define PLAYLIST_PAGE_TRACKS 8     // Tracks per page
+#define PLAYLIST_PAGES       3     // Resident pages (current + previous + next)
+
+// Per-track metadata (from the index record)
+struct PlaylistTrackInfo {
+  uint32_t fileSize;
+  uint32_t dataOffset;
+  uint32_t durationMs;
+  uint32_t sampleRate;
+  uint8_t  format;
+  uint8_t  bitsPerSample;
+  int16_t  gainCdB;
+};
+
+struct PlaylistStats {
+  uint32_t pageHits;
+  uint32_t pageLoads;
+};
+
 // ========== Functions ==========
-void scanPlaylist();
+void loadPlaylist();                 // Boot: index first (if still current), scan as fallback
+void scanPlaylist();                 // Walk the card and write a fresh index
+void rescanPlaylist();               // Invalidate + scan
+void requestPlaylistRescan();        // Any task: the loop task runs the rescan
+bool playlistRescanPending();
+void handlePlaylistRescan();         // loop(): run a requested rescan
+bool openPlaylistIndex();
+void invalidatePlaylistIndex();      // Call when the SD card's audio files change
+bool isPlaylistFromIndex();          // Index came from the card (not built by a scan this session)
+
+bool playlistGetPath(int index, char* path, size_t size);
+bool playlistGetInfo(int index, PlaylistTrackInfo* info);
+void playlistPrefetch(int index);    // Make the neighbours of index resident
+int playlistFind(const char* path);  // -1 if not in the playlist
+bool playlistTrackMatches(int index, size_t fileSize);
+PlaylistStats playlistStats();
+size_t playlistMemoryBytes();
+
 AudioFormat detectAudioFormat(const char* filename);
+bool isPlaylistTrack(const char* filename);  // Listed by a scan: audio, not a macOS ._ file
 
 #endif // PLAYLIST_MANAGER_H
@@ -5,15 +5,44 @@
 
 #include "SerialCommands.h"
 #include "PlaylistManager.h"
+#include "TrackOverview.h"
+#include "PcmStream.h"
 #include "ButtonHandler.h"
 
+// Copies a playlist entry's path into buf ("" if unavailable)
+static const char* trackPath(int index, char* buf, size_t size) {
+  if (!playlistGetPath(index, buf, size)) buf[0] = '\0';
+  return buf;
+}
+
 // File upload constants
 #define UPLOAD_BUF_SIZE 8192
 
+static size_t uploadSize = 0;
+static char uploadPath[MAX_FILENAME];
+
+// Reserves the whole file before any data arrives, so FAT allocates the cluster
+// chain in one run instead of growing it 8 KB at a time; the file ends up
+// contiguous and playback reads never hop between scattered clusters.
+static bool preallocateFile(File& file, size_t size) {
+  if (size == 0) return true;
+  uint8_t zero = 0;
+  if (!file.seek(size - 1) || file.write(&zero, 1) != 1) return false;
+  file.flush();
+  return file.seek(0);
+}
+
 // ========== Serial Command Handler ==========
 void handleSerialCommand() {
-  if (Serial.available()) {
-    String cmd = Serial.readStringUntil('\n');
+  // Binary payloads belong to the upload / stream handlers, not the line parser;
+  // during a stream commands arrive as COMMAND packets instead
+  if (isReceivingFile) return;
+  char streamed[PCM_MAX_COMMAND + 1];
+  bool fromStream = pcmStreamActive() && pcmStreamTakeCommand(streamed, sizeof(streamed));
+  if (pcmStreamActive() && !fromStream) return;
+
+  if (fromStream || Serial.available()) {
+    String cmd = fromStream ? String(streamed) : Serial.readStringUntil('\n');
     cmd.trim();
     
     // Extract command keyword (before first space) and lowercase ONLY that
@@ -24,7 +53,26 @@ void handleSerialCommand() {
     }
     cmdKeyword.toLowerCase();
     
-    if (cmdKeyword == "mem" || cmdKeyword == "memory") {
+    if (fromStream && cmdKeyword == "upload") {
+      // The file data would have to share the link with the stream
+      Serial.println("ERROR: upload is not available during a stream");
+    }
+    else if (fromStream && cmdKeyword == "resume") {
+      // Nothing to restore mid-stream: resume undoes pause
+      xSemaphoreTake(stateMutex, portMAX_DELAY);
+      playbackState = STATE_PLAYING;
+      xSemaphoreGive(stateMutex);
+      Serial.println("▶️ Resumed");
+    }
+    else if (cmdKeyword == "stop") {
+      if (pcmStreamActive()) {
+        pcmStreamStop();
+        Serial.println("⏹️ Stream stopped");
+      } else {
+        Serial.println("ERROR: No stream to stop");
+      }
+    }
+    else if (cmdKeyword == "mem" || cmdKeyword == "memory") {
       uint32_t freeHeap = ESP.getFreeHeap();
       uint32_t heapSize = ESP.getHeapSize();
       uint32_t usedHeap = heapSize - freeHeap;
@@ -114,20 +162,21 @@ void handleSerialCommand() {
                                     playbackState == STATE_PAUSED ? "⏸️  Paused" : "⏹️  Stopped");
       Serial.printf("Track:   %d/%d\n", currentTrack + 1, playlistSize);
       if (playlistSize > 0) {
+        char path[MAX_FILENAME];
         const char* formatStr = (currentFormat == FORMAT_WAV) ? "WAV" :
                                 (currentFormat == FORMAT_MP3) ? "MP3" : "???";
-        Serial.printf("File:    %s (%s)\n", playlist[currentTrack], formatStr);
+        Serial.printf("File:    %s (%s)\n", trackPath(currentTrack, path, sizeof(path)), formatStr);
         
         // Show next song based on loop mode
         if (loopMode == LOOP_SINGLE) {
-          Serial.printf("Next:    🔁 %s (Loop)\n", playlist[currentTrack]);
+          Serial.printf("Next:    🔁 %s (Loop)\n", trackPath(currentTrack, path, sizeof(path)));
         } else if (loopMode == LOOP_ALL) {
           int nextTrack = (currentTrack + 1) % playlistSize;
-          Serial.printf("Next:    %s\n", playlist[nextTrack]);
+          Serial.printf("Next:    %s\n", trackPath(nextTrack, path, sizeof(path)));
         } else {
           // LOOP_NONE
           if (currentTrack + 1 < playlistSize) {
-            Serial.printf("Next:    %s\n", playlist[currentTrack + 1]);
+            Serial.printf("Next:    %s\n", trackPath(currentTrack + 1, path, sizeof(path)));
           } else {
             Serial.printf("Next:    ⏹️  (End of playlist)\n");
           }
@@ -284,7 +333,8 @@ void handleSerialCommand() {
       } else {
         Serial.printf("  Track Index:   %d\n", storedTrack);
         if (storedTrack < playlistSize && playlistSize > 0) {
-          Serial.printf("  Track File:    %s\n", playlist[storedTrack]);
+          char path[MAX_FILENAME];
+          Serial.printf("  Track File:    %s\n", trackPath(storedTrack, path, sizeof(path)));
         }
         Serial.printf("  Volume:        %d%%\n", storedVolume);
         Serial.printf("  Was Playing:   %s\n", storedPlaying ? "Yes" : "No");
@@ -296,7 +346,8 @@ void handleSerialCommand() {
       xSemaphoreTake(stateMutex, portMAX_DELAY);
       Serial.printf("  Track Index:   %d\n", currentTrack);
       if (playlistSize > 0 && currentTrack < playlistSize) {
-        Serial.printf("  Track File:    %s\n", playlist[currentTrack]);
+        char path[MAX_FILENAME];
+        Serial.printf("  Track File:    %s\n", trackPath(currentTrack, path, sizeof(path)));
       }
       Serial.printf("  Volume:        %d%%\n", currentVolume);
       Serial.printf("  State:         %s\n", 
@@ -338,8 +389,12 @@ void handleSerialCommand() {
       Serial.println("\n🔧 System Parameters:");
       Serial.printf("  Buffer Size:   %d bytes\n", BUFFER_SIZE);
       Serial.printf("  Max Tracks:    %d\n", MAX_TRACKS);
+      PlaylistStats pstats = playlistStats();
+      Serial.printf("  Playlist RAM:  %u bytes (%d pages x %d tracks, %lu loads / %lu hits)\n",
+                    (unsigned)playlistMemoryBytes(), PLAYLIST_PAGES, PLAYLIST_PAGE_TRACKS,
+                    (unsigned long)pstats.pageLoads, (unsigned long)pstats.pageHits);
       Serial.printf("  Sample Rate:   44100 Hz\n");
-      Serial.printf("  Bit Depth:     16-bit\n");
+      Serial.printf("  Bit Depth:     %d-bit\n", (int)outputBitDepth);
       Serial.printf("  Channels:      Stereo (2)\n");
       Serial.printf("  APLL:          Enabled\n");
       Serial.printf("  SPI Speed:     20 MHz\n");
@@ -369,11 +424,15 @@ void handleSerialCommand() {
       Serial.println("  cpu, tasks   - Show FreeRTOS task status");
       Serial.println("  nvs, read    - Show NVS stored state");
       Serial.println("  tree, ls     - List SD card files");
+      Serial.println("  rescan       - Rebuild the playlist from the card");
       Serial.println("  cat <file>   - Show file info/content");
       Serial.println("  save         - Save playback state");
       Serial.println("  clear        - Clear NVS saved state");
       Serial.println("  resume       - Restore playback state");
-      Serial.println("  bitdepth <n> - Set I2S bit depth (16/24/32)");
+      Serial.println("  seek <s|m:ss>- Jump to a time in the current track");
+      Serial.println("  bitdepth [n] - Show / set I2S bit depth (16/24/32)");
+      Serial.println("  stream <rate> <ch> - Play live PCM from the host (pcm_stream.py)");
+      Serial.println("  stop         - End a live stream now");
       Serial.println("  help, h, ?   - Show this help\n");
     }
 
@@ -501,9 +560,11 @@ void handleSerialCommand() {
        
        // Escape filename manually if needed (simple quote check)
        // For now assuming clean filenames
+       char path[MAX_FILENAME] = "";
+       if (playlistSize > 0) trackPath(currentTrack, path, sizeof(path));
        Serial.printf("{\"state\":\"%s\",\"track_index\":%d,\"track_total\":%d,\"volume\":%d,\"loop\":\"%s\",\"file\":\"%s\",\"position\":%lu}\n",
                      stateStr, currentTrack, playlistSize, currentVolume, loopStr, 
-                     (playlistSize > 0) ? playlist[currentTrack] : "", currentPosition);
+                     path, currentPosition);
        xSemaphoreGive(stateMutex);
     }
     else if (cmdKeyword == "list_json") {
@@ -526,13 +587,30 @@ void handleSerialCommand() {
        }
        Serial.println("]}");
     }
+    // Files copied onto the card by a PC next to the ones already indexed
+    // (same count in /, or in sub-directories) are only picked up by a rescan
+    else if (cmdKeyword == "rescan") {
+       rescanPlaylist();
+       xSemaphoreTake(stateMutex, portMAX_DELAY);
+       if (currentTrack >= playlistSize) currentTrack = 0;
+       xSemaphoreGive(stateMutex);
+       Serial.printf("RESCAN %d\n", playlistSize);
+    }
     else if (cmd.startsWith("delete ")) {
        String path = cmd.substring(7);
        if (!path.startsWith("/")) path = "/" + path;
        
        if (SD.exists(path)) {
-         if (SD.remove(path)) Serial.println("SUCCESS");
-         else Serial.println("ERROR: Delete failed");
+         if (SD.remove(path)) {
+           Serial.println("SUCCESS");
+           if (detectAudioFormat(path.c_str()) != FORMAT_UNKNOWN) {
+             String sidecar = path + OVERVIEW_SUFFIX;
+             if (SD.exists(sidecar)) SD.remove(sidecar);
+             rescanPlaylist();
+           }
+         } else {
+           Serial.println("ERROR: Delete failed");
+         }
        } else {
          Serial.println("ERROR: File not found");
        }
@@ -548,26 +626,46 @@ void handleSerialCommand() {
        Serial.printf("DEBUG: Playlist size: %d\n", playlistSize);
        
        // Find the file in playlist
-       bool found = false;
-       for (int i = 0; i < playlistSize; i++) {
-           Serial.printf("DEBUG: Comparing with playlist[%d]: '%s'\n", i, playlist[i]);
-           if (String(playlist[i]) == filename) {
-               xSemaphoreTake(stateMutex, portMAX_DELAY);
-               currentTrack = i;
-               trackChanged = true;
-               currentPosition = 0;
-               playbackState = STATE_PLAYING;
-               xSemaphoreGive(stateMutex);
-               found = true;
-               Serial.printf("✅ Match found! Playing track %d\n", i);
-               break;
-           }
+       int index = playlistFind(filename.c_str());
+       bool found = index >= 0;
+       if (found) {
+           xSemaphoreTake(stateMutex, portMAX_DELAY);
+           currentTrack = index;
+           trackChanged = true;
+           currentPosition = 0;
+           playbackState = STATE_PLAYING;
+           xSemaphoreGive(stateMutex);
+           Serial.printf("✅ Match found! Playing track %d\n", index);
        }
        
        if (!found) {
            Serial.println("ERROR: File not in playlist");
        }
     }
+    // Command: seek <seconds | m:ss>
+    else if (cmd.startsWith("seek ")) {
+       String arg = cmd.substring(5);
+       arg.trim();
+       int colon = arg.indexOf(':');
+       long seconds = colon >= 0 ? arg.substring(0, colon).toInt() * 60 + arg.substring(colon + 1).toInt()
+                                 : arg.toInt();
+       if (seconds < 0 || playlistSize == 0) {
+           Serial.println("ERROR: Usage seek <seconds | m:ss>");
+       } else {
+           xSemaphoreTake(stateMutex, portMAX_DELAY);
+           seekRequestMs = seconds * 1000;
+           xSemaphoreGive(stateMutex);
+           Serial.printf("SEEK %ld\n", seconds);
+       }
+    }
+    else if (cmd.startsWith("overview_json ")) {
+       String filename = cmd.substring(14);
+       filename.trim();
+       if (!filename.startsWith("/")) filename = "/" + filename;
+       if (!printOverviewJson(filename.c_str())) {
+           Serial.println("ERROR: No overview for this file");
+       }
+    }
     else if (cmdKeyword == "pause") {
        xSemaphoreTake(stateMutex, portMAX_DELAY);
        playbackState = STATE_PAUSED;
@@ -642,8 +740,17 @@ void handleSerialCommand() {
          if (!newName.startsWith("/")) newName = "/" + newName;
          
          if (SD.exists(oldName)) {
-           if (SD.rename(oldName, newName)) Serial.println("SUCCESS");
-           else Serial.println("ERROR: Rename failed");
+           if (SD.rename(oldName, newName)) {
+             Serial.println("SUCCESS");
+             String sidecar = oldName + OVERVIEW_SUFFIX;
+             if (SD.exists(sidecar)) SD.rename(sidecar, newName + OVERVIEW_SUFFIX);
+             if (detectAudioFormat(oldName.c_str()) != FORMAT_UNKNOWN ||
+                 detectAudioFormat(newName.c_str()) != FORMAT_UNKNOWN) {
+               rescanPlaylist();
+             }
+           } else {
+             Serial.println("ERROR: Rename failed");
+           }
          } else {
            Serial.println("ERROR: File not found");
          }
@@ -690,18 +797,20 @@ void handleSerialCommand() {
 
 
     // ========== BIT DEPTH CONTROL COMMAND ==========
+    // Query: the converter / uploader match WAV bit depth to this
+    else if (cmd == "bitdepth") {
+        Serial.printf("BITDEPTH %d\n", (int)outputBitDepth);
+    }
     else if (cmd.startsWith("bitdepth ")) {
         String depthStr = cmd.substring(9);
         int depth = depthStr.toInt();
         
         if (depth == 16 || depth == 24 || depth == 32) {
             BitDepth newDepth = (BitDepth)depth;
-            if (audioOut) {
-                audioOut->setBitDepth(newDepth);
-                Serial.printf("✅ I2S Bit Depth set to: %d-bit\n", depth);
-            } else {
-                Serial.println("❌ Audio output not initialized");
-            }
+            outputBitDepth = newDepth;  // Kept across tracks, saved with the playback state
+            savePlaybackState();
+            if (audioOut) audioOut->setBitDepth(newDepth);
+            Serial.printf("✅ I2S Bit Depth set to: %d-bit\n", depth);
         } else {
             Serial.println("❌ Invalid bit depth. Use: 16, 24, or 32");
         }
@@ -720,22 +829,47 @@ void handleSerialCommand() {
            
            Serial.printf("Preparing upload: %s (%d bytes)\n", filename.c_str(), size);
            
-           // Clean up old file
+           // Clean up old file (and its sidecar: the seek table would not fit the new data)
+           bool audio = detectAudioFormat(filename.c_str()) != FORMAT_UNKNOWN;
            if (SD.exists(filename)) SD.remove(filename);
+           if (audio) {
+               String sidecar = filename + OVERVIEW_SUFFIX;
+               if (SD.exists(sidecar)) SD.remove(sidecar);
+               invalidatePlaylistIndex();
+           }
            
            uploadFile = SD.open(filename, FILE_WRITE);
-           if (uploadFile) {
+           if (uploadFile && !preallocateFile(uploadFile, size)) {
+               uploadFile.close();
+               SD.remove(filename);
+               Serial.println("ERROR: Not enough space on SD card");
+               if (audio) rescanPlaylist();  // The old file is gone either way
+           } else if (uploadFile) {
+               snprintf(uploadPath, sizeof(uploadPath), "%s", filename.c_str());
+               uploadSize = size;
                isReceivingFile = true;
                uploadRemaining = size;
                lastUploadActivity = millis();
                Serial.println("READY"); // Signal to script to start sending
            } else {
                Serial.println("ERROR: Create file failed");
+               if (audio) rescanPlaylist();
            }
        } else {
            Serial.println("ERROR: Usage upload <file> <size>");
        }
     }
+    // Command: stream <rate> <channels>
+    else if (cmdKeyword == "stream") {
+       int secondSpace = cmd.lastIndexOf(' ');
+       long rate = firstSpace > 0 ? cmd.substring(firstSpace + 1, secondSpace).toInt() : 0;
+       long channels = secondSpace > firstSpace ? cmd.substring(secondSpace + 1).toInt() : 0;
+       if (!pcmStreamBegin(rate, channels)) {
+           Serial.println("ERROR: Usage stream <8000-96000> <1|2>");
+       } else {
+           Serial.printf("STREAM READY cap=%u\n", (unsigned)pcmStreamCapacity());
+       }
+    }
     else if (cmd.length() > 0) {
       Serial.printf("❌ Unknown command: '%s'\n", cmd.c_str());
       Serial.println("Type 'help' for available commands\n");
@@ -753,7 +887,11 @@ void handleFileUpload() {
     if (millis() - lastUploadActivity > 30000) {
       Serial.println("\nERROR: Upload timeout");
       uploadFile.close();
+      // Preallocated: a partial file would already have its final size
+      SD.remove(uploadPath);
       isReceivingFile = false;
+      // The index was invalidated when the upload started
+      if (detectAudioFormat(uploadPath) != FORMAT_UNKNOWN) rescanPlaylist();
       return;
     }
     
@@ -773,7 +911,7 @@ void handleFileUpload() {
         
         // Progress feedback every 64KB
         static size_t lastReport = 0;
-        size_t written = uploadFile.size();
+        size_t written = uploadSize - uploadRemaining;
         if (written - lastReport >= 65536) {
           Serial.printf("Progress: %d bytes\n", written);
           lastReport = written;
@@ -789,7 +927,7 @@ void handleFileUpload() {
           String fname = String(uploadFile.name());
           if (fname.endsWith(".wav") || fname.endsWith(".WAV") ||
               fname.endsWith(".mp3") || fname.endsWith(".MP3")) {
-            scanPlaylist();
+            rescanPlaylist();
           }
         }
       }
@@ -0,0 +1,103 @@
+/**
+ * Track Overview Module - Implementation
+ * Sidecar lookups for seek-to-time and the desktop app's waveform
+ */
+
+#include "TrackOverview.h"
+#include "PlaylistManager.h"
+
+static File openOverview(const char* trackPath) {
+  char path[MAX_FILENAME];
+  if (snprintf(path, sizeof(path), "%s%s", trackPath, OVERVIEW_SUFFIX) >= (int)sizeof(path)) return File();
+  if (!SD.exists(path)) return File();
+  return SD.open(path, FILE_READ);
+}
+
+static bool readHeader(File& file, OverviewHeader* h) {
+  return file.read((uint8_t*)h, sizeof(*h)) == sizeof(*h) &&
+         h->magic == OVERVIEW_MAGIC &&
+         h->version == OVERVIEW_VERSION &&
+         h->headerSize >= sizeof(*h) &&
+         h->headerSize + h->seekCount * 4 + h->peakCount * 2 == file.size();
+}
+
+bool readOverviewHeader(const char* trackPath, OverviewHeader* header) {
+  File file = openOverview(trackPath);
+  if (!file) return false;
+  bool ok = readHeader(file, header);
+  file.close();
+  return ok;
+}
+
+// ========== Seek ==========
+SeekResult trackSeekOffset(int track, const char* trackPath, uint32_t trackSize, uint32_t ms,
+                           uint32_t* offset, uint32_t* dataOffset) {
+  // Sidecar: one table lookup
+  File file = openOverview(trackPath);
+  if (file) {
+    OverviewHeader h;
+    bool ok = readHeader(file, &h) && h.seekIntervalMs > 0;
+    if (ok && (h.trackSize != trackSize || h.dataOffset >= trackSize)) {
+      // Left over from before the track was replaced: its offsets would land mid-frame
+      Serial.printf("⚠️  %s%s does not match the track, ignoring it\n", trackPath, OVERVIEW_SUFFIX);
+      ok = false;
+    }
+    if (ok && ms / h.seekIntervalMs >= h.seekCount) {
+      file.close();
+      return SEEK_OUT_OF_RANGE;
+    }
+    ok = ok && file.seek(h.headerSize + ms / h.seekIntervalMs * 4) &&
+         file.read((uint8_t*)offset, 4) == 4 &&
+         *offset >= h.dataOffset && *offset < trackSize;
+    file.close();
+    if (ok) {
+      *dataOffset = h.dataOffset;
+      return SEEK_OK;
+    }
+  }
+
+  // No sidecar: proportional estimate from the index record (exact for CBR)
+  PlaylistTrackInfo info;
+  if (!playlistGetInfo(track, &info) || info.durationMs == 0 || info.dataOffset == 0 ||
+      info.fileSize <= info.dataOffset) {
+    return SEEK_NO_TABLE;
+  }
+  if (ms >= info.durationMs) return SEEK_OUT_OF_RANGE;
+  uint32_t pos = (uint32_t)((uint64_t)(info.fileSize - info.dataOffset) * ms / info.durationMs);
+  if (info.format == FORMAT_WAV && info.bitsPerSample >= 8) {
+    uint32_t block = info.bitsPerSample / 8 * 2;  // Converter output is stereo
+    pos -= pos % block;
+  }
+  *offset = info.dataOffset + pos;
+  *dataOffset = info.dataOffset;
+  return SEEK_OK;
+}
+
+// ========== Peaks ==========
+bool printOverviewJson(const char* trackPath) {
+  File file = openOverview(trackPath);
+  OverviewHeader h;
+  if (!file || !readHeader(file, &h)) {
+    if (file) file.close();
+    return false;
+  }
+
+  Serial.printf("{\"overview\":{\"file\":\"%s\",\"duration_ms\":%lu,\"sample_rate\":%lu,\"peaks\":[",
+                trackPath, (unsigned long)h.durationMs, (unsigned long)h.sampleRate);
+  file.seek(h.headerSize + h.seekCount * 4);
+  int8_t buf[128];
+  uint32_t remaining = h.peakCount * 2;
+  bool first = true;
+  while (remaining > 0) {
+    int n = file.read((uint8_t*)buf, remaining < sizeof(buf) ? remaining : sizeof(buf));
+    if (n <= 0) break;
+    for (int i = 0; i < n; i++) {
+      Serial.printf(first ? "%d" : ",%d", buf[i]);
+      first = false;
+    }
+    remaining -= n;
+  }
+  Serial.println("]}}");
+  file.close();
+  return true;
+}
@@ -0,0 +1,55 @@
+/**
+ * Track Overview Module - Header
+ * Reads the <track>.ovw sidecars written by scripts/track_overview.py:
+ * O(1) seek-to-time and the peak envelope for the desktop app
+ */
+
+#ifndef TRACK_OVERVIEW_H
+#define TRACK_OVERVIEW_H
+
+#include <Arduino.h>
+#include <SD.h>
+#include "Config.h"
+
+// ========== Sidecar (<track>.ovw) ==========
+// Little-endian layout:
+//   OverviewHeader
+//   uint32_t seek[seekCount]       File offset of the audio at k * seekIntervalMs
+//   int8_t   peaks[peakCount][2]   (min, max) per bucket, full scale = 127
+#define OVERVIEW_SUFFIX  ".ovw"
+#define OVERVIEW_MAGIC   0x4F504144  // "DAPO"
+#define OVERVIEW_VERSION 2
+
+struct __attribute__((packed)) OverviewHeader {
+  uint32_t magic;
+  uint16_t version;
+  uint16_t headerSize;
+  uint32_t durationMs;
+  uint32_t sampleRate;
+  uint32_t dataOffset;
+  uint32_t seekIntervalMs;
+  uint32_t seekCount;
+  uint32_t peakCount;
+  uint8_t  contentHash[8];
+  uint32_t trackSize;        // Size of the track it was built from: a re-uploaded track no longer matches
+};
+
+enum SeekResult {
+  SEEK_OK,
+  SEEK_OUT_OF_RANGE,         // Past the end of the track
+  SEEK_NO_TABLE              // No matching sidecar, and the index has no timing to estimate from
+};
+
+// ========== Functions ==========
+bool readOverviewHeader(const char* trackPath, OverviewHeader* header);
+
+// File offset to continue playback at ms, and where the audio data starts.
+// Uses the sidecar when it matches the open track (trackSize), otherwise estimates
+// from the playlist index record (host-built index only: a scan does not time tracks).
+SeekResult trackSeekOffset(int track, const char* trackPath, uint32_t trackSize, uint32_t ms,
+                           uint32_t* offset, uint32_t* dataOffset);
+
+// {"overview":{"file":...,"duration_ms":...,"peaks":[min,max,...]}}
+bool printOverviewJson(const char* trackPath);
+
+#endif // TRACK_OVERVIEW_H
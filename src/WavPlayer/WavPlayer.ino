@@ -22,6 +22,9 @@
 #include "Config.h"
 #include "AudioProcessor.h"
 #include "PlaylistManager.h"
+#include "TrackOverview.h"
+#include "PcmStream.h"
+#include "HiResWav.h"
 #include "ButtonHandler.h"
 #include "SerialCommands.h"
 
@@ -36,8 +39,9 @@ volatile bool trackChanged = false;
 volatile uint32_t currentPosition = 0;
 volatile uint32_t totalDataSize = 0;
 volatile LoopMode loopMode = LOOP_ALL;
+volatile int32_t seekRequestMs = -1;
+volatile BitDepth outputBitDepth = BIT_DEPTH_16;
 
-char playlist[MAX_TRACKS][MAX_FILENAME];
 int playlistSize = 0;
 
 volatile bool isReceivingFile = false;
@@ -61,12 +65,18 @@ BackgroundAudioMP3 *mp3Decoder = NULL;
 BackgroundAudioWAV *wavDecoder = NULL;
 File audioFile;
 
+// 24/32-bit WAVs bypass the decoder (HiResWav.h)
+bool hiResActive = false;
+WavFormat wavFormat;
+static int32_t hiResBuffer[HIRES_BLOCK_FRAMES * 2];
+
 // ========== Audio Playback Task (Core 1) ==========
 void audioPlaybackTask(void* parameter) {
   Serial.printf("🎵 Audio Task started on Core %d\n", xPortGetCoreID());
   
   bool needNewFile = true;
   uint8_t buffer[512];
+  char path[MAX_FILENAME] = "";
   
   // Initialize I2S Audio Output
   if (!audioOut) {
@@ -75,6 +85,78 @@ void audioPlaybackTask(void* parameter) {
   }
 
   while (true) {
+    // === Live PCM Stream (host -> jitter buffer -> EQ -> I2S) ===
+    if (pcmStreamActive()) {
+      static bool streaming = false;
+      if (!streaming) {
+        if (mp3Decoder) { delete mp3Decoder; mp3Decoder = NULL; }
+        if (wavDecoder) { delete wavDecoder; wavDecoder = NULL; }
+        if (audioFile) audioFile.close();
+        hiResActive = false;
+        if (audioOut) {
+          audioOut->end();
+          delete audioOut;
+        }
+        audioOut = new AudioOutputWithEQ(I2S_BCK, I2S_WS, I2S_DATA);
+        audioOut->begin();
+        audioOut->setBitDepth(outputBitDepth);
+        audioOut->setFrequency(pcmStreamRate());
+        audioOut->updateLoudness(currentVolume);
+        streaming = true;
+        xSemaphoreTake(stateMutex, portMAX_DELAY);
+        playbackState = STATE_PLAYING;  // Starting a stream plays it; pause applies from here on
+        xSemaphoreGive(stateMutex);
+      }
+
+      if (pcmStreamFinished()) {
+        PcmStreamStats st = pcmStreamStats();
+        Serial.printf("STREAM END rx=%lu under=%lu lost=%lu bad=%lu over=%lu\n",
+                      (unsigned long)st.received, (unsigned long)st.underruns, (unsigned long)st.lost,
+                      (unsigned long)st.bad, (unsigned long)st.overflows);
+        pcmStreamEnd();
+        streaming = false;
+        xSemaphoreTake(stateMutex, portMAX_DELAY);
+        playbackState = STATE_PAUSED;
+        trackChanged = true;  // Back to the playlist, reloaded but paused
+        xSemaphoreGive(stateMutex);
+        continue;
+      }
+
+      if (playbackState != STATE_PLAYING) {
+        vTaskDelay(10 / portTICK_PERIOD_MS);  // Buffer fills up and the host holds off
+        continue;
+      }
+
+      if (audioOut->availableForWrite() < (int)sizeof(buffer)) {
+        vTaskDelay(2 / portTICK_PERIOD_MS);
+        continue;
+      }
+
+      // Mono is expanded in place, so read at most half a buffer of it
+      bool mono = pcmStreamChannels() == 1;
+      size_t got = pcmStreamRead(buffer, mono ? sizeof(buffer) / 2 : sizeof(buffer));
+      if (got == 0) {
+        vTaskDelay(2 / portTICK_PERIOD_MS);  // Prefilling, or underrun
+        continue;
+      }
+      int16_t* samples = (int16_t*)buffer;
+      int count = got / 2;
+      if (mono) {
+        for (int i = count - 1; i >= 0; i--) samples[2 * i] = samples[2 * i + 1] = samples[i];
+        count *= 2;
+      }
+      static int lastStreamVolume = -1;
+      if (currentVolume != lastStreamVolume) {
+        audioOut->updateLoudness(currentVolume);
+        lastStreamVolume = currentVolume;
+      }
+      float lin_vol = currentVolume / 100.0f;
+      int32_t gain = (int32_t)(lin_vol * lin_vol * lin_vol * 65536.0f);
+      for (int i = 0; i < count; i++) samples[i] = (int16_t)(((int32_t)samples[i] * gain) >> 16);
+      audioOut->write(buffer, count * 2);
+      continue;
+    }
+
     if (playlistSize == 0) {
       vTaskDelay(100 / portTICK_PERIOD_MS);
       continue;
@@ -92,8 +174,10 @@ void audioPlaybackTask(void* parameter) {
           audioOut = NULL; 
       } 
       if (audioFile) { audioFile.close(); }
+      hiResActive = false;
       
       currentPosition = 0;
+      seekRequestMs = -1;
       needNewFile = true;
       savePlaybackState();
     }
@@ -112,6 +196,7 @@ void audioPlaybackTask(void* parameter) {
       if (audioOut == NULL) {
           audioOut = new AudioOutputWithEQ(I2S_BCK, I2S_WS, I2S_DATA);
           audioOut->begin();
+          audioOut->setBitDepth(outputBitDepth);
           
           float gain = pow((float)currentVolume / 20.0f, 3.0f);
           audioOut->updateLoudness(currentVolume); 
@@ -121,23 +206,45 @@ void audioPlaybackTask(void* parameter) {
       int track = currentTrack;
       xSemaphoreGive(stateMutex);
       
-      Serial.printf("\n▶️  Playing: %s\n", playlist[track]);
-      currentFormat = detectAudioFormat(playlist[track]);
+      path[0] = '\0';
+      playlistGetPath(track, path, sizeof(path));
+      Serial.printf("\n▶️  Playing: %s\n", path);
+      currentFormat = detectAudioFormat(path);
       
-      audioFile = SD.open(playlist[track], FILE_READ);
+      audioFile = SD.open(path, FILE_READ);
+      if ((!audioFile || !playlistTrackMatches(track, audioFile.size())) && isPlaylistFromIndex()) {
+        // Card changed outside the player: the index is stale. The loop task
+        // rescans (it owns scans); wait for the new playlist before going on
+        Serial.println("⚠️  Playlist index is stale, rescanning...");
+        if (audioFile) audioFile.close();
+        requestPlaylistRescan();
+        while (playlistRescanPending()) vTaskDelay(50 / portTICK_PERIOD_MS);
+        xSemaphoreTake(stateMutex, portMAX_DELAY);
+        if (currentTrack >= playlistSize) currentTrack = 0;
+        xSemaphoreGive(stateMutex);
+        continue;
+      }
       if (!audioFile) {
-        Serial.printf("❌ Failed to open: %s\n", playlist[track]);
+        Serial.printf("❌ Failed to open: %s\n", path);
         currentTrack = (currentTrack + 1) % playlistSize;
         trackChanged = true;
         vTaskDelay(500 / portTICK_PERIOD_MS);
         continue;
       }
       
+      hiResActive = false;
       if (currentFormat == FORMAT_MP3) {
         mp3Decoder = new BackgroundAudioMP3(*audioOut);
         mp3Decoder->begin();
         Serial.println("   Format: MP3");
+      } else if (currentFormat == FORMAT_WAV && readWavFormat(audioFile, &wavFormat) && isHiResWav(wavFormat)) {
+        // File is at the PCM data: frames go straight to writeHiRes()
+        hiResActive = true;
+        audioOut->setFrequency(wavFormat.sampleRate);
+        currentPosition = wavFormat.dataOffset;
+        Serial.printf("   Format: WAV %d-bit (direct, %d-bit out)\n", wavFormat.bitsPerSample, (int)outputBitDepth);
       } else if (currentFormat == FORMAT_WAV) {
+        audioFile.seek(0);
         wavDecoder = new BackgroundAudioWAV(*audioOut);
         wavDecoder->begin();
         Serial.println("   Format: WAV");
@@ -149,6 +256,8 @@ void audioPlaybackTask(void* parameter) {
         continue;
       }
       
+      // Next/previous entries are usually on the resident page already
+      playlistPrefetch(track);
       needNewFile = false;
     }
     
@@ -163,7 +272,7 @@ void audioPlaybackTask(void* parameter) {
     }
     
     // === Data Feed Loop ===
-    if (audioFile && (mp3Decoder || wavDecoder)) {
+    if (audioFile && (mp3Decoder || wavDecoder || hiResActive)) {
       static int lastAppliedVolume = -1;
       
       if (currentVolume != lastAppliedVolume) {
@@ -177,15 +286,42 @@ void audioPlaybackTask(void* parameter) {
       if (mp3Decoder) mp3Decoder->setGain(vol);
       if (wavDecoder) wavDecoder->setGain(vol);
       
+      // === Seek ===
+      int32_t seekMs = seekRequestMs;
+      if (seekMs >= 0) {
+        uint32_t offset, dataStart;
+        SeekResult seekResult = trackSeekOffset(currentTrack, path, audioFile.size(), seekMs, &offset, &dataStart);
+        if (seekResult != SEEK_OK) {
+          Serial.println(seekResult == SEEK_NO_TABLE ? "❌ No seek table for this track (build a .ovw sidecar)"
+                                               : "❌ Seek position out of range");
+          seekRequestMs = -1;
+        } else if (audioFile.position() >= dataStart) {
+          // Header already went to the decoder: it just sees audio from the new position
+          audioFile.seek(offset);
+          currentPosition = offset;
+          seekRequestMs = -1;
+          Serial.printf("⏩ Seek to %lu ms (offset %lu)\n", (unsigned long)seekMs, (unsigned long)offset);
+        }
+      }
+      
       bool readyForData = false;
       if (mp3Decoder) readyForData = (mp3Decoder->availableForWrite() > sizeof(buffer));
       if (wavDecoder) readyForData = (wavDecoder->availableForWrite() > sizeof(buffer));
+      if (hiResActive) readyForData = (audioOut->availableForWrite() >= (int)sizeof(hiResBuffer));
       
       if (readyForData) {
-        int bytesRead = audioFile.read(buffer, sizeof(buffer));
+        int bytesRead;
+        if (hiResActive) {
+          bytesRead = readHiResFrames(audioFile, wavFormat, hiResBuffer, HIRES_BLOCK_FRAMES);
+          if (bytesRead > 0) audioOut->writeHiRes(hiResBuffer, bytesRead / wavFormat.blockAlign, vol);
+        } else {
+          bytesRead = audioFile.read(buffer, sizeof(buffer));
+          if (bytesRead > 0) {
+            if (mp3Decoder) mp3Decoder->write(buffer, bytesRead);
+            if (wavDecoder) wavDecoder->write(buffer, bytesRead);
+          }
+        }
         if (bytesRead > 0) {
-          if (mp3Decoder) mp3Decoder->write(buffer, bytesRead);
-          if (wavDecoder) wavDecoder->write(buffer, bytesRead);
           currentPosition += bytesRead;
         } else {
           Serial.println("✅ Track finished");
@@ -222,6 +358,9 @@ void audioPlaybackTask(void* parameter) {
 void setup() {
   Serial.setRxBufferSize(8192);
   Serial.begin(460800);
+  // PSRAM was set up (and memory-tested) before setup() ran; the boot profiler times it from this line
+  if (psramFound()) Serial.printf("🧠 PSRAM ready: %u KB\n", (unsigned)(ESP.getPsramSize() / 1024));
+  else Serial.println("🧠 PSRAM not found");
   delay(1000);
   
   Serial.println("\n╔════════════════════════════════════════╗");
@@ -243,7 +382,7 @@ void setup() {
   }
   Serial.println("✅ SD Card OK\n");
   
-  scanPlaylist();
+  loadPlaylist();
   if (playlistSize == 0) {
     Serial.println("❌ No WAV files found!");
     while (1) delay(1000);
@@ -253,9 +392,11 @@ void setup() {
     currentTrack = 0;
   }
   
-  File testFile = SD.open(playlist[currentTrack], FILE_READ);
+  char path[MAX_FILENAME] = "";
+  playlistGetPath(currentTrack, path, sizeof(path));
+  File testFile = SD.open(path, FILE_READ);
   if (!testFile) {
-    Serial.printf("⚠️  Saved track not found: %s\n", playlist[currentTrack]);
+    Serial.printf("⚠️  Saved track not found: %s\n", path);
     Serial.println("   Resetting to first track");
     currentTrack = 0;
     currentPosition = 0;
@@ -319,5 +460,7 @@ void setup() {
 void loop() {
   handleSerialCommand();
   handleFileUpload();
+  handlePcmStream();
+  handlePlaylistRescan();
   vTaskDelay(10 / portTICK_PERIOD_MS);
 }